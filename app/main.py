@@ -11,9 +11,11 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from config.settings import app_config
 from core.services.scoring_service import ScoringService
+from core.services.scoring_catalog import get_scoring_catalog
 from core.services.project_service import ProjectService
 from core.services.fund_service import fund_service
 from core.services.investment_service import investment_service
+from core.services.dashboard_service import dashboard_service
 from core.services.user_service import UserService
 
 # 页面配置
@@ -165,6 +167,10 @@ def init_session_state():
         st.session_state.page_selected = '📈 仪表盘'
     if 'remembered_username' not in st.session_state:
         st.session_state.remembered_username = ''
+    if 'db_session' not in st.session_state:
+        # 读写分离路由状态：本会话写入后短时间内的读取仍走主库
+        from app.utils.database import DbSession
+        st.session_state.db_session = DbSession()
 
     # 初始化会话ID（用于跟踪会话）
     if 'session_id' not in st.session_state:
@@ -298,6 +304,7 @@ def show_sidebar():
                 'scoring': '📝 评分录入',
                 'results': '📊 结果展示',
                 'statistics': '📉 统计分析',
+                'sensitivity': '🔀 权重模拟',
                 'admin': '⚙️ 系统管理'
             }
 
@@ -324,6 +331,10 @@ def show_sidebar():
             if user_service.check_permission(user['role'], 'can_view_statistics'):
                 available_pages.append('statistics')
 
+            # 权重模拟
+            if user_service.check_permission(user['role'], 'can_view_statistics'):
+                available_pages.append('sensitivity')
+
             # 系统管理
             if user_service.check_permission(user['role'], 'can_manage_users'):
                 available_pages.append('admin')
@@ -397,32 +408,25 @@ def show_dashboard():
         </div>
         """, unsafe_allow_html=True)
 
+    # 仪表盘数据并发加载，一次拿到全部统计
+    snapshot = dashboard_service.load_snapshot()
+    grade_dist = snapshot.grade_distribution
+
     # 统计卡片（使用基金数据）
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        total_funds = fund_service.count_funds()
-        st.metric("总基金数", total_funds)
+        st.metric("总基金数", snapshot.total_funds)
 
     with col2:
         # 统计已评分的基金数量（已计算总分的）
-        from app.utils.database import get_db_connection
-        with get_db_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT COUNT(*) as count FROM fund_total_scores")
-                result = cursor.fetchone()
-                scored_funds = result['count'] if result else 0
-        st.metric("已评分基金", scored_funds)
+        st.metric("已评分基金", snapshot.scored_funds)
 
     with col3:
-        grade_dist = scoring_service.get_fund_grade_distribution()
-        excellent_count = grade_dist.get('excellent', 0)
-        st.metric("优秀基金数", excellent_count)
+        st.metric("优秀基金数", snapshot.excellent_count)
 
     with col4:
-        total = sum(grade_dist.values())
-        excellent_rate = (excellent_count / total * 100) if total > 0 else 0
-        st.metric("优秀率", f"{excellent_rate:.1f}%")
+        st.metric("优秀率", f"{snapshot.excellent_rate:.1f}%")
 
     st.divider()
 
@@ -445,7 +449,7 @@ def show_dashboard():
 
     with col2:
         st.subheader("维度平均分")
-        dimension_avg = scoring_service.get_fund_dimension_averages()
+        dimension_avg = snapshot.dimension_averages
         if dimension_avg:
             import pandas as pd
             df = pd.DataFrame([
@@ -459,21 +463,7 @@ def show_dashboard():
 
     # 最近基金
     st.subheader("基金评分状态")
-    # 获取所有基金及其评分状态
-    with get_db_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT f.fund_code, f.fund_name, f.status,
-                       COALESCE(ft.total_score, 0) as total_score,
-                       ft.grade,
-                       f.created_at
-                FROM funds f
-                LEFT JOIN fund_total_scores ft ON f.id = ft.fund_id
-                WHERE f.status IN ('active', 'completed')
-                ORDER BY f.created_at DESC
-                LIMIT 10
-            """)
-            funds = cursor.fetchall()
+    funds = snapshot.recent_funds
 
     if funds:
         import pandas as pd
@@ -496,6 +486,38 @@ def show_dashboard():
         st.info("暂无基金数据")
 
 
+def _page_cursor(key: str, filters: tuple):
+    """
+    当前列表页的游标
+
+    每个列表在 session_state 中保存已翻过页面的游标栈，栈顶是当前页；
+    筛选条件变化时回到第一页。
+    """
+    state_key = f"{key}_pager"
+    pager = st.session_state.get(state_key)
+    if pager is None or pager['filters'] != filters:
+        pager = {'filters': filters, 'cursors': [None]}
+        st.session_state[state_key] = pager
+    return pager['cursors'][-1]
+
+
+def _show_pager(key: str, page):
+    """列表下方的上一页/下一页按钮"""
+    pager = st.session_state[f"{key}_pager"]
+    page_no = len(pager['cursors'])
+    col1, col2, col3 = st.columns([1, 3, 1])
+    with col1:
+        if st.button("⬅️ 上一页", key=f"{key}_prev", disabled=page_no == 1, use_container_width=True):
+            pager['cursors'].pop()
+            st.rerun()
+    with col2:
+        st.caption(f"第 {page_no} 页")
+    with col3:
+        if st.button("下一页 ➡️", key=f"{key}_next", disabled=not page.has_more, use_container_width=True):
+            pager['cursors'].append(page.next_cursor)
+            st.rerun()
+
+
 def show_fund_management():
     """显示基金管理页面"""
     st.title("💰 基金管理")
@@ -562,11 +584,13 @@ def show_fund_management():
 
     # 获取基金列表
     status = None if status_filter == "全部" else status_filter
-    funds = fund_service.list_funds(
-        status=status,
-        region=region_filter if region_filter else None,
-        fund_type=fund_type_filter if fund_type_filter else None
+    filters = (status, region_filter or None, fund_type_filter or None)
+    page = fund_service.list_funds_page(
+        *filters,
+        cursor=_page_cursor('fm', filters),
+        limit=app_config.list_page_size
     )
+    funds = page.items
 
     # 显示基金列表
     if funds:
@@ -579,6 +603,7 @@ def show_fund_management():
             use_container_width=True,
             hide_index=True
         )
+        _show_pager('fm', page)
     else:
         st.info("暂无基金数据，请先创建基金")
 
@@ -662,11 +687,13 @@ def show_investment_management():
 
     # 获取投资列表
     status = None if status_filter == "全部" else status_filter
-    investments = investment_service.list_investments(
-        fund_id=fund_id,
-        status=status,
-        industry=industry_filter if industry_filter else None
+    filters = (fund_id, status, industry_filter or None)
+    page = investment_service.list_investments_page(
+        *filters,
+        cursor=_page_cursor('im', filters),
+        limit=app_config.list_page_size
     )
+    investments = page.items
 
     # 显示投资列表
     if investments:
@@ -679,6 +706,7 @@ def show_investment_management():
             use_container_width=True,
             hide_index=True
         )
+        _show_pager('im', page)
     else:
         st.info("该基金下暂无投资数据，请先创建投资")
 
@@ -752,11 +780,13 @@ def show_project_management():
 
     # 获取项目列表
     status = None if status_filter == "全部" else status_filter
-    projects = project_service.list_projects(
-        status=status,
-        region=region_filter if region_filter else None,
-        industry=industry_filter if industry_filter else None
+    filters = (status, region_filter or None, industry_filter or None)
+    page = project_service.list_projects_page(
+        *filters,
+        cursor=_page_cursor('pm', filters),
+        limit=app_config.list_page_size
     )
+    projects = page.items
 
     # 显示项目列表
     if projects:
@@ -769,6 +799,7 @@ def show_project_management():
             use_container_width=True,
             hide_index=True
         )
+        _show_pager('pm', page)
     else:
         st.info("暂无项目数据，请先创建项目")
 
@@ -829,83 +860,8 @@ def show_scoring():
     # 获取当前评分
     current_scores = scoring_service.get_fund_scoring_detail(fund_id)
 
-    # 为每个指标创建评分选项（包括子指标）
-    scoring_options = {}
-
-    for dim_code, dimension in SCORING_DIMENSIONS.items():
-        for indicator in dimension['indicators']:
-            # 处理父指标（包含子指标）- 为子指标生成选项
-            if indicator.get('type') == 'parent':
-                sub_indicators = indicator.get('sub_indicators', [])
-                for sub in sub_indicators:
-                    options = []
-                    if 'scoring_guide' in sub and sub['scoring_guide']:
-                        # 将评分指南转换为选项
-                        for score_range, description in sub['scoring_guide'].items():
-                            # 解析分数范围
-                            if '-' in score_range:
-                                min_score, max_score = score_range.split('-')
-                                options.append({
-                                    'label': f"{description} ({min_score}-{max_score}分)",
-                                    'score': float(max_score),  # 使用最高分
-                                    'description': description
-                                })
-                            else:
-                                # 单个分数
-                                options.append({
-                                    'label': f"{description} ({score_range}分)",
-                                    'score': float(score_range),
-                                    'description': description
-                                })
-                    else:
-                        # 如果没有评分指南，提供0到最高分的整数选项
-                        max_score = int(sub['max_score'])
-                        for i in range(max_score + 1):
-                            options.append({
-                                'label': f"{i}分",
-                                'score': float(i),
-                                'description': f"{i}分"
-                            })
-
-                    # 按分数降序排列
-                    options.sort(key=lambda x: x['score'], reverse=True)
-                    scoring_options[sub['code']] = options
-                # 父指标本身不创建评分选项，继续下一个
-                continue
-
-            # 处理叶子指标（实际评分）
-            options = []
-            if 'scoring_guide' in indicator and indicator['scoring_guide']:
-                # 将评分指南转换为选项
-                for score_range, description in indicator['scoring_guide'].items():
-                    # 解析分数范围
-                    if '-' in score_range:
-                        min_score, max_score = score_range.split('-')
-                        options.append({
-                            'label': f"{description} ({min_score}-{max_score}分)",
-                            'score': float(max_score),  # 使用最高分
-                            'description': description
-                        })
-                    else:
-                        # 单个分数
-                        options.append({
-                            'label': f"{description} ({score_range}分)",
-                            'score': float(score_range),
-                            'description': description
-                        })
-            else:
-                # 如果没有评分指南，提供0到最高分的整数选项
-                max_score = int(indicator['max_score'])
-                for i in range(max_score + 1):
-                    options.append({
-                        'label': f"{i}分",
-                        'score': float(i),
-                        'description': f"{i}分"
-                    })
-
-            # 按分数降序排列
-            options.sort(key=lambda x: x['score'], reverse=True)
-            scoring_options[indicator['code']] = options
+    # 评分选项表（导入时由 SCORING_DIMENSIONS 编译一次，所有基金和会话共用）
+    from app.utils.scoring_options import OPTION_TABLES
 
     # 创建回调函数用于自动保存单个评分
     def save_single_score(fund_id, indicator_code, dim_code, user_id):
@@ -921,76 +877,48 @@ def show_scoring():
         if selectbox_key in st.session_state:
             selected_index = st.session_state[selectbox_key]
 
-            # 获取该指标对应的所有选项
-            indicator_key = f"_options_{fund_id}_{indicator_code}"
-            if indicator_key in st.session_state:
-                options = st.session_state[indicator_key]
-                score_value = options[selected_index]['score']
-
-                # 获取dimension_id和indicator_id
-                from app.utils.database import get_db_connection
-                with get_db_connection() as conn:
-                    with conn.cursor() as cursor:
-                        cursor.execute(
-                            "SELECT id FROM scoring_dimensions WHERE dimension_code = %s",
-                            (dim_code,)
-                        )
-                        dim_result = cursor.fetchone()
-                        if dim_result:
-                            dimension_id = dim_result['id']
-
-                            cursor.execute(
-                                "SELECT id FROM scoring_indicators WHERE indicator_code = %s",
-                                (indicator_code,)
-                            )
-                            ind_result = cursor.fetchone()
-                            if ind_result:
-                                indicator_id = ind_result['id']
-
-                                # 保存评分
-                                from decimal import Decimal
-                                logger.info(f"准备保存评分: fund_id={fund_id}, indicator_code={indicator_code}, score={score_value}")
-                                result = scoring_service.submit_fund_indicator_score(
-                                    fund_id=fund_id,
-                                    dimension_id=dimension_id,
-                                    indicator_id=indicator_id,
-                                    raw_score=Decimal(str(score_value)),
-                                    scorer_id=user_id,
-                                    scorer_comment=None
-                                )
-
-                                logger.info(f"保存结果: {result}")
-                                if result['success']:
-                                    st.session_state[f"_last_saved_{indicator_code}"] = f"✓ 已保存：{score_value}分"
-                                    st.session_state[f"score_value_{fund_id}_{indicator_code}"] = score_value
-                                else:
-                                    logger.error(f"保存失败: {result.get('message')}")
-                                    st.session_state[f"_last_saved_{indicator_code}"] = f"❌ 保存失败: {result.get('message')}"
-                            else:
-                                logger.error(f"未找到indicator: indicator_code={indicator_code}")
-                        else:
-                            logger.error(f"未找到dimension: dim_code={dim_code}")
+            # 获取该指标的选项表
+            table = OPTION_TABLES.get(indicator_code)
+            if table is not None:
+                score_value = table.options[selected_index].score
+
+                # 保存评分，并把分差增量更新到父指标、维度汇总和总分（只改这只基金的几行）
+                from decimal import Decimal
+                logger.info(f"准备保存评分: fund_id={fund_id}, indicator_code={indicator_code}, score={score_value}")
+                result = scoring_service.update_fund_indicator_score(
+                    fund_id, indicator_code, Decimal(str(score_value)), user_id
+                )
+
+                logger.info(f"保存结果: {result}")
+                if result['success']:
+                    saved = f"✓ 已保存：{score_value}分"
+                    if result['data']['total_score'] is not None:
+                        saved += f"（总分 {result['data']['total_score']:.2f}）"
+                    st.session_state[f"_last_saved_{indicator_code}"] = saved
+                    st.session_state[f"score_value_{fund_id}_{indicator_code}"] = score_value
+                else:
+                    logger.error(f"保存失败: {result.get('message')}")
+                    st.session_state[f"_last_saved_{indicator_code}"] = f"❌ 保存失败: {result.get('message')}"
             else:
-                logger.error(f"未找到options: {indicator_key}")
+                logger.error(f"未找到评分选项: {indicator_code}")
         else:
             logger.error(f"未找到selectbox值: {selectbox_key}")
 
+    # 回调在脚本重跑之前执行（main() 尚未绑定会话），写入要记在本会话上，之后的读取才会走主库
+    from app.utils.database import with_db_session
+    save_single_score = with_db_session(st.session_state.db_session, save_single_score)
+
     # 创建评分表单（移除form wrapper，使用callbacks自动保存）
     user = st.session_state.user
 
-    # 检查当前已评分数量
-    from app.utils.database import get_db_connection
-    with get_db_connection() as conn:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "SELECT COUNT(DISTINCT indicator_id) as scored_count FROM fund_scores WHERE fund_id = %s",
-                (fund_id,)
-            )
-            scored_count_result = cursor.fetchone()
-            current_scored_count = scored_count_result['scored_count'] if scored_count_result else 0
+    # 当前评分进度（评分完整度位图）
+    progress = scoring_service.get_fund_scoring_progress(fund_id)
 
     # 添加提示信息
-    st.info(f"💡 **自动保存已启用**：每次选择评分选项后会自动保存到数据库。当前已完成 {current_scored_count}/26 个指标的评分。全部评分完成后，请点击底部的「计算总分」按钮。")
+    st.info(f"💡 **自动保存已启用**：每次选择评分选项后会自动保存到数据库。当前已完成 {progress.scored_count}/{progress.leaf_count} 个指标的评分。全部评分完成后，请点击底部的「计算总分」按钮。")
+    st.progress(progress.ratio)
+    if progress.missing and progress.scored_count:
+        st.caption(f"未评分：{'、'.join(progress.missing)}")
 
     # 维度计数器
     dim_idx = 0
@@ -1043,7 +971,7 @@ def show_scoring():
                     sub_idx = 0
                     for sub in sub_indicators:
                         sub_idx += 1
-                        options = scoring_options.get(sub['code'], [])
+                        table = OPTION_TABLES[sub['code']]
 
                         # 获取当前选择的索引
                         current_score = 0
@@ -1054,21 +982,8 @@ def show_scoring():
                                         current_score = ind['score']
                                         break
 
-                        # 找到当前分数对应的索引（精确匹配）
-                        default_index = 0
-                        score_found = False
-                        for i, opt in enumerate(options):
-                            if opt['score'] == current_score:
-                                default_index = i
-                                score_found = True
-                                break
-
-                        # 如果没有找到匹配的分数，使用第一个选项
-                        if not score_found and options:
-                            default_index = 0
-                        # 如果当前分数为0（未评分），查找第一个选项
-                        elif current_score == 0 and options:
-                            default_index = 0
+                        # 找到当前分数对应的索引（精确匹配，没有匹配时使用第一个选项）
+                        default_index = table.index_of(current_score)
 
                         # 子指标标题栏（缩进显示）
                         st.markdown(f"""
@@ -1077,11 +992,7 @@ def show_scoring():
                             </div>
                         """, unsafe_allow_html=True)
 
-                        # 将选项存储到session_state，供回调函数使用
-                        st.session_state[f"_options_{fund_id}_{sub['code']}"] = options
-
-                        # 创建选项标签列表（用于显示）
-                        option_labels = [opt['label'] for opt in options]
+                        option_labels = table.labels
 
                         # 使用columns实现缩进（与标题40px缩进保持一致）
                         col_space, col_content = st.columns([0.08, 0.92])
@@ -1089,7 +1000,7 @@ def show_scoring():
                             # 使用selectbox让用户选择评分等级（带自动保存）
                             selected_index = st.selectbox(
                                 f"_{sub['code']}",  # 使用下划线前缀使标签最小化
-                                options=range(len(options)),
+                                options=range(len(option_labels)),
                                 format_func=lambda i: option_labels[i],
                                 index=default_index,
                                 key=f"score_{fund_id}_{sub['code']}",
@@ -1099,8 +1010,7 @@ def show_scoring():
                             )
 
                         # 将选择的分数存储到session_state
-                        selected_option = options[selected_index]
-                        st.session_state[f"score_value_{fund_id}_{sub['code']}"] = selected_option['score']
+                        st.session_state[f"score_value_{fund_id}_{sub['code']}"] = table.options[selected_index].score
 
                         # 显示保存状态
                         saved_key = f"_last_saved_{sub['code']}"
@@ -1111,7 +1021,7 @@ def show_scoring():
 
                 # 处理叶子指标（直接评分）
                 else:
-                    options = scoring_options.get(indicator['code'], [])
+                    table = OPTION_TABLES[indicator['code']]
 
                     # 获取当前选择的索引
                     current_score = 0
@@ -1122,21 +1032,8 @@ def show_scoring():
                                     current_score = ind['score']
                                     break
 
-                    # 找到当前分数对应的索引（精确匹配）
-                    default_index = 0
-                    score_found = False
-                    for i, opt in enumerate(options):
-                        if opt['score'] == current_score:
-                            default_index = i
-                            score_found = True
-                            break
-
-                    # 如果没有找到匹配的分数，使用第一个选项
-                    if not score_found and options:
-                        default_index = 0
-                    # 如果当前分数为0（未评分），查找第一个选项
-                    elif current_score == 0 and options:
-                        default_index = 0
+                    # 找到当前分数对应的索引（精确匹配，没有匹配时使用第一个选项）
+                    default_index = table.index_of(current_score)
 
                     # 叶子指标标题栏（与父指标样式一致）
                     st.markdown(f"""
@@ -1145,16 +1042,12 @@ def show_scoring():
                         </div>
                     """, unsafe_allow_html=True)
 
-                    # 将选项存储到session_state，供回调函数使用
-                    st.session_state[f"_options_{fund_id}_{indicator['code']}"] = options
-
-                    # 创建选项标签列表（用于显示）
-                    option_labels = [opt['label'] for opt in options]
+                    option_labels = table.labels
 
                     # 使用selectbox让用户选择评分等级（带自动保存）
                     selected_index = st.selectbox(
                         f"_{indicator['code']}",  # 使用下划线前缀使标签最小化
-                        options=range(len(options)),
+                        options=range(len(option_labels)),
                         format_func=lambda i: option_labels[i],
                         index=default_index,
                         key=f"score_{fund_id}_{indicator['code']}",
@@ -1164,8 +1057,7 @@ def show_scoring():
                     )
 
                     # 将选择的分数存储到session_state
-                    selected_option = options[selected_index]
-                    st.session_state[f"score_value_{fund_id}_{indicator['code']}"] = selected_option['score']
+                    st.session_state[f"score_value_{fund_id}_{indicator['code']}"] = table.options[selected_index].score
 
                     # 显示保存状态
                     saved_key = f"_last_saved_{indicator['code']}"
@@ -1210,142 +1102,74 @@ def save_scores_with_options(fund_id: int, structure: dict, scorer_id: int):
     with st.spinner("正在保存评分..."):
         for dim_code, dimension in SCORING_DIMENSIONS.items():
             for indicator in dimension['indicators']:
-                # 处理父指标：收集子指标评分
+                # 处理父指标：收集子指标评分，父指标得分为子指标之和
                 if indicator.get('type') == 'parent':
                     sub_indicators = indicator.get('sub_indicators', [])
                     for sub in sub_indicators:
                         score_key = f"score_value_{fund_id}_{sub['code']}"
                         if score_key in st.session_state:
                             scores_to_save.append({
-                                'code': sub['code'],
-                                'name': sub['name'],
-                                'score': Decimal(str(st.session_state[score_key])),
-                                'is_parent': False
+                                'indicator_code': sub['code'],
+                                'raw_score': Decimal(str(st.session_state[score_key]))
                             })
+                    if any(f"score_value_{fund_id}_{sub['code']}" in st.session_state for sub in sub_indicators):
+                        parent_total = sum([
+                            float(st.session_state.get(f"score_value_{fund_id}_{sub['code']}", 0))
+                            for sub in sub_indicators
+                        ])
+                        scores_to_save.append({
+                            'indicator_code': indicator['code'],
+                            'raw_score': Decimal(str(parent_total))
+                        })
 
                 # 处理叶子指标：直接保存
                 else:
                     score_key = f"score_value_{fund_id}_{indicator['code']}"
                     if score_key in st.session_state:
                         scores_to_save.append({
-                            'code': indicator['code'],
-                            'name': indicator['name'],
-                            'score': Decimal(str(st.session_state[score_key])),
-                            'is_parent': False
+                            'indicator_code': indicator['code'],
+                            'raw_score': Decimal(str(st.session_state[score_key]))
                         })
 
-        # 保存所有评分
-        for score_data in scores_to_save:
-            # 获取dimension_id
-            from app.utils.database import get_db_connection
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    # 获取dimension_id
-                    cursor.execute(
-                        "SELECT id FROM scoring_dimensions WHERE dimension_code = %s",
-                        (dim_code,)
-                    )
-                    dim_result = cursor.fetchone()
-                    if dim_result:
-                        dimension_id = dim_result['id']
-
-                        # 获取indicator_id
-                        cursor.execute(
-                            "SELECT id FROM scoring_indicators WHERE indicator_code = %s",
-                            (score_data['code'],)
-                        )
-                        ind_result = cursor.fetchone()
-                        if ind_result:
-                            indicator_id = ind_result['id']
-
-                            result = scoring_service.submit_fund_indicator_score(
-                                fund_id=fund_id,
-                                dimension_id=dimension_id,
-                                indicator_id=indicator_id,
-                                raw_score=score_data['score'],
-                                scorer_id=scorer_id,
-                                scorer_comment=None
-                            )
-
-                            if result['success']:
-                                success_count += 1
-                            else:
-                                error_count += 1
-                                st.error(f"{score_data['name']}: {result['message']}")
-
-        # 保存父指标的汇总分数
-        for dim_code, dimension in SCORING_DIMENSIONS.items():
-            for indicator in dimension['indicators']:
-                if indicator.get('type') == 'parent':
-                    # 计算子指标汇总得分
-                    sub_indicators = indicator.get('sub_indicators', [])
-                    total_score = sum([
-                        float(st.session_state.get(f"score_value_{fund_id}_{sub['code']}", 0))
-                        for sub in sub_indicators
-                    ])
-
-                    # 保存父指标得分
-                    from app.utils.database import get_db_connection
-                    with get_db_connection() as conn:
-                        with conn.cursor() as cursor:
-                            cursor.execute(
-                                "SELECT id FROM scoring_dimensions WHERE dimension_code = %s",
-                                (dim_code,)
-                            )
-                            dim_result = cursor.fetchone()
-                            if dim_result:
-                                dimension_id = dim_result['id']
-
-                                cursor.execute(
-                                    "SELECT id FROM scoring_indicators WHERE indicator_code = %s",
-                                    (indicator['code'],)
-                                )
-                                ind_result = cursor.fetchone()
-                                if ind_result:
-                                    indicator_id = ind_result['id']
-
-                                    result = scoring_service.submit_fund_indicator_score(
-                                        fund_id=fund_id,
-                                        dimension_id=dimension_id,
-                                        indicator_id=indicator_id,
-                                        raw_score=Decimal(str(total_score)),
-                                        scorer_id=scorer_id,
-                                        scorer_comment=None
-                                    )
-
-        if error_count == 0 and success_count > 0:
-            with st.spinner("正在计算总分..."):
-                # 计算维度汇总
-                for dim_code, dimension in structure.items():
-                    from app.utils.database import get_db_connection
-                    with get_db_connection() as conn:
-                        with conn.cursor() as cursor:
-                            cursor.execute(
-                                "SELECT id FROM scoring_dimensions WHERE dimension_code = %s",
-                                (dim_code,)
-                            )
-                            dim_result = cursor.fetchone()
-                            if dim_result:
-                                scoring_service.calculate_and_save_fund_dimension_score(
-                                    fund_id, dim_result['id']
-                                )
-
-                # 计算总分
-                total_result = scoring_service.calculate_fund_total_score(fund_id)
-
-                if total_result['success']:
-                    st.success(f"✅ 评分保存成功！总分: {total_result['data']['total_score']:.2f}，等级: {total_result['data']['grade_name']}")
-                    st.balloons()
-
-                    # 刷新页面以显示最新评分结果
-                    import time
-                    time.sleep(1)
-                    try:
-                        st.rerun()
-                    except AttributeError:
-                        st.experimental_rerun()
+        # 保存评分、维度汇总和总分在同一个工作单元内完成，只提交一次
+        from app.utils.database import unit_of_work, UnitOfWorkRollback
+        total_result = None
+        try:
+            with unit_of_work():
+                # 所有指标评分一次批量写入
+                result = scoring_service.submit_fund_indicator_scores(fund_id, scores_to_save, scorer_id)
+                if result['success']:
+                    success_count = result['data']['saved_count']
                 else:
-                    st.warning(total_result['message'])
+                    error_count = len(scores_to_save)
+                    st.error(result['message'])
+
+                if error_count == 0 and success_count > 0:
+                    with st.spinner("正在计算总分..."):
+                        # 计算维度汇总
+                        for dim_code, dimension in structure.items():
+                            scoring_service.calculate_and_save_fund_dimension_score(fund_id, dimension['id'])
+
+                        # 计算总分
+                        total_result = scoring_service.calculate_fund_total_score(fund_id)
+        except UnitOfWorkRollback:
+            st.error("保存失败，本次评分已全部回滚，请重试")
+            return
+
+        if total_result is not None:
+            if total_result['success']:
+                st.success(f"✅ 评分保存成功！总分: {total_result['data']['total_score']:.2f}，等级: {total_result['data']['grade_name']}")
+                st.balloons()
+
+                # 刷新页面以显示最新评分结果
+                import time
+                time.sleep(1)
+                try:
+                    st.rerun()
+                except AttributeError:
+                    st.experimental_rerun()
+            else:
+                st.warning(total_result['message'])
         elif error_count > 0:
             st.error(f"保存完成，但有 {error_count} 个指标失败")
         else:
@@ -1356,54 +1180,25 @@ def show_results():
     """显示结果展示页面"""
     st.title("📊 结果展示")
 
-    # 获取已评分的基金（包括 active 和 completed 状态）
-    active_funds = fund_service.list_funds(status='active') or []
-    completed_funds = fund_service.list_funds(status='completed') or []
-    funds = active_funds + completed_funds
-
-    # 筛选出有评分的基金（已计算总分的或者已评满26个指标的）
-    funds_with_scores = []
-    for fund in funds:
-        # 检查是否有总分记录（已计算总分的）
-        from app.utils.database import get_db_connection
-        with get_db_connection() as conn:
-            with conn.cursor() as cursor:
-                # 首先检查是否有总分记录
-                cursor.execute("SELECT COUNT(*) as count FROM fund_total_scores WHERE fund_id = %s", (fund['id'],))
-                result = cursor.fetchone()
-                if result and result['count'] > 0:
-                    funds_with_scores.append(fund)
-                    continue
-
-                # 如果没有总分记录，检查是否已完成26个指标的评分
-                cursor.execute(
-                    "SELECT COUNT(DISTINCT indicator_id) as scored_count FROM fund_scores WHERE fund_id = %s",
-                    (fund['id'],)
-                )
-                score_result = cursor.fetchone()
-                if score_result and score_result['scored_count'] >= 26:
-                    funds_with_scores.append(fund)
+    # 获取已评分的基金（包括 active 和 completed 状态）：已计算总分的或者已评满全部叶子指标的，
+    # 一次查询取出全部基金的评分完整度位图
+    funds = scoring_service.list_fund_scoring_progress(statuses=['active', 'completed'])
+    funds_with_scores = [fund for fund in funds if fund['has_total'] or fund['is_complete']]
 
     if not funds_with_scores:
-        st.info("暂无已完成评分的基金（需要完成所有26个指标评分并计算总分）")
+        st.info(f"暂无已完成评分的基金（需要完成所有{get_scoring_catalog().leaf_count}个指标评分并计算总分）")
         # 检查是否有部分完成的评分
-        from app.utils.database import get_db_connection
-        with get_db_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute("""
-                    SELECT f.fund_code, f.fund_name, COUNT(DISTINCT fs.indicator_id) as scored_count
-                    FROM funds f
-                    LEFT JOIN fund_scores fs ON f.id = fs.fund_id
-                    WHERE f.status = 'active'
-                    GROUP BY f.id
-                    HAVING scored_count > 0
-                    ORDER BY scored_count DESC
-                """)
-                partial_scores = cursor.fetchall()
-                if partial_scores:
-                    st.write("**部分完成评分的基金：**")
-                    for row in partial_scores:
-                        st.caption(f"• {row['fund_code']} - {row['fund_name']}: {row['scored_count']}/26 个指标")
+        partial_scores = sorted(
+            (fund for fund in funds if fund['status'] == 'active' and fund['progress'].scored_count > 0),
+            key=lambda fund: -fund['progress'].scored_count
+        )
+        if partial_scores:
+            st.write("**部分完成评分的基金：**")
+            for fund in partial_scores:
+                progress = fund['progress']
+                st.caption(f"• {fund['fund_code']} - {fund['fund_name']}: "
+                           f"{progress.scored_count}/{progress.leaf_count} 个指标")
+                st.progress(progress.ratio)
         return
 
     # 基金选择
@@ -1415,17 +1210,15 @@ def show_results():
 
     fund_id = fund_options[selected]
 
-    # 获取评分详情
-    detail = scoring_service.get_fund_scoring_detail(fund_id)
+    # 一次查询取出基金信息、指标评分、维度汇总、总分和排名
+    snapshot = scoring_service.get_fund_scoring_snapshot(fund_id)
 
-    if not detail.get('success'):
-        st.error(detail.get('message', '获取评分详情失败'))
+    if not snapshot:
+        st.error('基金不存在')
         return
 
-    data = detail['data']
-
     # 如果没有计算总分，显示提示
-    if data.get('total_score') is None:
+    if snapshot.total_score is None:
         st.warning("⚠️ 该基金已完成所有指标评分，但尚未计算总分。请前往「📝 评分录入」页面点击「🧮 计算总分」按钮。")
         st.divider()
 
@@ -1433,19 +1226,30 @@ def show_results():
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("总分", f"{data['total_score']:.2f}" if data['total_score'] else "-")
+        st.metric("总分", f"{snapshot.total_score:.2f}" if snapshot.total_score else "-")
 
     with col2:
-        grade_name = data.get('grade_name') or '-'
-        st.metric("等级", grade_name)
+        st.metric("等级", snapshot.grade_name or '-')
 
     with col3:
-        rank = data.get('rank')
+        rank = snapshot.rank
         st.metric("排名", f"第 {rank} 名" if rank else "-")
 
     with col4:
-        fund = fund_service.get_fund(fund_id)
-        st.metric("基金状态", fund['status'] if fund else '-')
+        st.metric("基金状态", snapshot.fund_status or '-')
+
+    # 同组排名（读取 fund_peer_rankings，保存总分时在同一事务中重算该基金所在的分组）
+    if snapshot.peer_rankings:
+        import pandas as pd
+        st.dataframe(pd.DataFrame([
+            {
+                '排名范围': ranking.label,
+                '分组': ranking.group or '-',
+                '名次': f"{ranking.rank} / {ranking.group_size}",
+                '百分位': f"{ranking.percentile}%" if ranking.group_size > 1 else '-'
+            }
+            for ranking in snapshot.peer_rankings.values()
+        ]), use_container_width=True, hide_index=True)
 
     st.divider()
 
@@ -1457,10 +1261,9 @@ def show_results():
             from datetime import datetime
 
             try:
-                excel_data = export_service.export_scoring_report_excel(fund_id)
+                excel_data = export_service.export_scoring_report_excel(fund_id, snapshot)
 
-                fund = fund_service.get_fund(fund_id)
-                filename = f"评分报告_{fund['fund_code']}_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
+                filename = f"评分报告_{snapshot.fund_code}_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
 
                 st.download_button(
                     label="点击下载 Excel 文件",
@@ -1475,39 +1278,36 @@ def show_results():
     st.divider()
 
     # 显示各维度评分
-    # 获取维度汇总数据（使用数据库中计算好的值）
-    from app.utils.database import get_db_connection
-    with get_db_connection() as conn:
-        with conn.cursor() as cursor:
-            sql = """
-                SELECT iss.*, sd.dimension_code
-                FROM fund_scoring_summary iss
-                JOIN scoring_dimensions sd ON iss.dimension_id = sd.id
-                WHERE iss.fund_id = %s
-                ORDER BY sd.display_order
-            """
-            cursor.execute(sql, (fund_id,))
-            dimension_summaries = {row['dimension_code']: row for row in cursor.fetchall()}
-
-    for dim_code, dim_data in data['dimensions'].items():
-        st.subheader(f"### {dim_data['name']}")
-
-        # 使用数据库中的维度汇总数据
-        if dim_code in dimension_summaries:
-            dim_summary = dimension_summaries[dim_code]
-            dim_total = float(dim_summary['total_score'])
-            dim_weighted = float(dim_summary['weighted_total'])
+    import pandas as pd
+    for dim_code, dimension in snapshot.dimensions.items():
+        if not dimension.indicators:
+            continue
+        st.subheader(f"### {dimension.name}")
+
+        # 使用数据库中计算好的维度汇总
+        if dimension.total_score is not None:
+            dim_total = float(dimension.total_score)
+            dim_weighted = float(dimension.weighted_total)
         else:
             # 回退方案：计算得分（仅当数据库中没有汇总数据时）
-            dim_total = sum(ind['score'] for ind in dim_data['indicators'])
-            dim_weighted = sum(ind['weighted_score'] for ind in dim_data['indicators'])
+            dim_total = sum(float(ind.score) for ind in dimension.indicators)
+            dim_weighted = sum(float(ind.weighted_score) for ind in dimension.indicators)
 
         st.info(f"维度得分: {dim_total:.2f} / 加权得分: {dim_weighted:.2f}")
 
         # 指标列表
-        import pandas as pd
-        df = pd.DataFrame(dim_data['indicators'])
-        df.columns = ['指标代码', '指标名称', '得分', '加权得分', '评分人', '说明', '评分时间']
+        df = pd.DataFrame([
+            {
+                '指标代码': ind.code,
+                '指标名称': ind.name,
+                '得分': float(ind.score),
+                '加权得分': float(ind.weighted_score),
+                '评分人': ind.scorer_name,
+                '说明': ind.comment,
+                '评分时间': ind.scored_at.isoformat() if ind.scored_at else None
+            }
+            for ind in dimension.indicators
+        ])
         st.dataframe(df, use_container_width=True, hide_index=True)
 
 
@@ -1531,6 +1331,119 @@ def show_statistics():
     else:
         st.info("暂无评分数据")
 
+    # 导出全部基金排名
+    st.subheader("基金排名导出")
+    if st.button("📥 导出基金排名"):
+        from core.services.export_service import export_service
+        from datetime import datetime
+
+        try:
+            excel_data = export_service.export_fund_rankings_excel()
+            st.download_button(
+                label="点击下载 Excel 文件",
+                data=excel_data,
+                file_name=f"基金排名_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+        except Exception as e:
+            st.error(f"导出失败: {str(e)}")
+
+
+def show_weight_sensitivity():
+    """显示维度权重模拟页面（what-if，只在内存中计算，不修改数据库）"""
+    st.title("🔀 权重模拟")
+    st.caption("调整维度权重，查看等级分布和排名的变化。各维度得分按 新权重 / 当前权重 缩放后相加，不修改任何评分数据。")
+
+    # 维度得分只载入一次，之后每个方案都在内存中计算
+    if st.session_state.get('weight_sensitivity') is None or st.button("🔄 重新载入评分数据"):
+        st.session_state.weight_sensitivity = scoring_service.load_weight_sensitivity()
+    analyzer = st.session_state.weight_sensitivity
+    if analyzer is None:
+        st.error("载入评分数据失败")
+        return
+    if len(analyzer.fund_ids) == 0:
+        st.info("暂无已计算总分的基金")
+        return
+
+    import numpy as np
+    import pandas as pd
+    from app.utils.scoring import ScoringCalculator
+
+    current = analyzer.current_weights
+    structure = scoring_service.get_scoring_structure()
+    dimension_names = {code: structure[code]['name'] if code in structure else code for code in analyzer.dimension_codes}
+    st.write(f"已计算总分的基金: {len(analyzer.fund_ids)} 只；当前权重: " +
+             "，".join(f"{dimension_names[code]} {weight:g}" for code, weight in current.items()))
+
+    top_n = st.number_input("比较前 N 名", min_value=1, max_value=len(analyzer.fund_ids), value=min(10, len(analyzer.fund_ids)))
+
+    # 扫描方案：一个维度的权重在区间内变化，差额由另一个维度补足，总权重不变
+    st.subheader("权重扫描")
+    col1, col2, col3, col4 = st.columns(4)
+    codes = list(analyzer.dimension_codes)
+    with col1:
+        vary = st.selectbox("调整维度", codes, format_func=dimension_names.get)
+    with col2:
+        balance = st.selectbox("差额补足维度", [c for c in codes if c != vary], format_func=dimension_names.get)
+    with col3:
+        low, high = st.slider(
+            "权重范围", 0.0, current[vary] + current[balance],
+            (max(0.0, current[vary] - 10), min(current[vary] + current[balance], current[vary] + 10))
+        )
+    with col4:
+        step = st.number_input("步长", min_value=0.5, value=1.0, step=0.5)
+
+    values = np.round(np.arange(low, high + step / 2, step), 2)
+    scenarios = [{vary: float(v), balance: current[vary] + current[balance] - float(v)} for v in values]
+    results = analyzer.run(scenarios, top_n=int(top_n))
+
+    grade_codes = list(analyzer.engine.grade_codes)
+    df = pd.DataFrame([
+        {
+            dimension_names[vary]: r.weights[vary],
+            dimension_names[balance]: r.weights[balance],
+            'Spearman': round(r.spearman, 4),
+            'Kendall': round(r.kendall, 4),
+            **{ScoringCalculator.get_grade_name(g): r.grade_counts[g] for g in grade_codes},
+            '等级变化': len(r.grade_changed),
+            f'进入前{top_n}名': len(r.entered_top),
+            f'退出前{top_n}名': len(r.left_top)
+        }
+        for r in results
+    ])
+    st.line_chart(df.set_index(dimension_names[vary])[['Spearman', 'Kendall']])
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    # 单个方案的明细
+    st.subheader("方案明细")
+    chosen = st.select_slider(f"{dimension_names[vary]}权重", options=list(values), value=values[len(values) // 2])
+    result = results[list(values).index(chosen)]
+    totals = analyzer.scenario_totals(analyzer.weight_matrix([result.weights]))[0]
+    position = {fund_id: i for i, fund_id in enumerate(analyzer.fund_ids.tolist())}
+
+    def fund_rows(fund_ids):
+        return pd.DataFrame([
+            {
+                '基金': analyzer.fund_names.get(fund_id, fund_id),
+                '当前总分': analyzer.baseline_totals[position[fund_id]] / 100,
+                '模拟总分': totals[position[fund_id]] / 100,
+                '当前等级': ScoringCalculator.get_grade_name(grade_codes[analyzer.baseline_grades[position[fund_id]]]),
+                '模拟等级': ScoringCalculator.get_grade_name(grade_codes[analyzer.engine.grade_index(totals[position[fund_id]])])
+            }
+            for fund_id in fund_ids
+        ])
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("等级变化", len(result.grade_changed))
+    col2.metric(f"进入前{top_n}名", len(result.entered_top))
+    col3.metric(f"退出前{top_n}名", len(result.left_top))
+    for title, fund_ids in [('等级变化的基金', result.grade_changed),
+                            (f'进入前{top_n}名的基金', result.entered_top),
+                            (f'退出前{top_n}名的基金', result.left_top)]:
+        if fund_ids:
+            st.write(f"**{title}**")
+            st.dataframe(fund_rows(fund_ids), use_container_width=True, hide_index=True)
+
 
 def show_admin():
     """显示系统管理页面"""
@@ -1545,7 +1458,11 @@ def show_admin():
     st.subheader("用户管理")
 
     # 用户列表
-    users = user_service.list_users()
+    page = user_service.list_users_page(
+        cursor=_page_cursor('um', ()),
+        limit=app_config.list_page_size
+    )
+    users = page.items
 
     if users:
         import pandas as pd
@@ -1556,14 +1473,79 @@ def show_admin():
             use_container_width=True,
             hide_index=True
         )
+        _show_pager('um', page)
     else:
         st.info("暂无用户数据")
 
+    show_query_stats()
+
+
+def show_query_stats():
+    """显示SQL执行统计（最近的页面重跑和进程累计）"""
+    import pandas as pd
+    from config.settings import db_config
+    from app.utils.query_stats import get_process_stats, get_recent_reruns, reset_query_stats
+
+    st.subheader("SQL执行统计")
+
+    if not db_config.query_stats_enabled:
+        st.info("SQL执行统计未开启（DB_QUERY_STATS=False）")
+        return
+
+    process_stats = get_process_stats()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("累计查询次数", process_stats.queries)
+    with col2:
+        st.metric("累计SQL耗时(ms)", f"{process_stats.total_ms:.1f}")
+    with col3:
+        st.metric(f"慢查询(≥{db_config.slow_query_threshold_ms:.0f}ms)", process_stats.slow_queries)
+
+    # 最近的页面重跑（不含当前这次）
+    reruns = [r.summary() for r in get_recent_reruns()]
+    if reruns:
+        st.markdown("**最近的页面重跑**")
+        df = pd.DataFrame(reruns).rename(columns={
+            'page': '页面', 'started_at': '时间', 'queries': '查询次数',
+            'sql_ms': 'SQL耗时(ms)', 'slow_queries': '慢查询', 'elapsed_ms': '页面耗时(ms)'
+        })
+        st.dataframe(df, use_container_width=True, hide_index=True)
+
+        page_options = {f"{r.started_at:%H:%M:%S} {r.page}": r for r in get_recent_reruns()}
+        selected = st.selectbox("查看某次重跑的SQL明细", list(page_options.keys()))
+        rows = page_options[selected].stats.rows()
+        if rows:
+            st.dataframe(_query_stats_frame(rows), use_container_width=True, hide_index=True)
+
+    st.markdown("**进程累计（按总耗时排序）**")
+    rows = process_stats.rows()
+    if rows:
+        st.dataframe(_query_stats_frame(rows), use_container_width=True, hide_index=True)
+    else:
+        st.info("暂无SQL记录")
+
+    if st.button("清空统计"):
+        reset_query_stats()
+        st.rerun()
+
+
+def _query_stats_frame(rows: list):
+    """SQL汇总行转为中文列名的表格"""
+    import pandas as pd
+    return pd.DataFrame(rows).rename(columns={
+        'fingerprint': 'SQL指纹', 'calls': '次数', 'total_ms': '总耗时(ms)',
+        'avg_ms': '平均(ms)', 'max_ms': '最大(ms)', 'rows': '行数', 'callers': '调用方'
+    })
+
 
 def main():
     """应用主入口"""
     init_session_state()
 
+    # 评分规则变化后在后台分批重算过期的基金评分（每个进程只启动一个线程）
+    from core.services.rescore_service import start_stale_sweeper
+    start_stale_sweeper()
+
     # 检查登录状态
     if not st.session_state.get('user'):
         show_login()
@@ -1575,22 +1557,28 @@ def main():
     # 路由到对应页面
     page = st.session_state.current_page
 
-    if page == 'dashboard':
-        show_dashboard()
-    elif page == 'funds':
-        show_fund_management()
-    elif page == 'investments':
-        show_investment_management()
-    elif page == 'projects':
-        show_project_management()  # 保留向后兼容
-    elif page == 'scoring':
-        show_scoring()
-    elif page == 'results':
-        show_results()
-    elif page == 'statistics':
-        show_statistics()
-    elif page == 'admin':
-        show_admin()
+    # 统计本次重跑发出的SQL，结果在系统管理页面查看
+    from app.utils.database import bind_db_session
+    from app.utils.query_stats import track_rerun
+    with bind_db_session(st.session_state.db_session), track_rerun(page):
+        if page == 'dashboard':
+            show_dashboard()
+        elif page == 'funds':
+            show_fund_management()
+        elif page == 'investments':
+            show_investment_management()
+        elif page == 'projects':
+            show_project_management()  # 保留向后兼容
+        elif page == 'scoring':
+            show_scoring()
+        elif page == 'results':
+            show_results()
+        elif page == 'statistics':
+            show_statistics()
+        elif page == 'sensitivity':
+            show_weight_sensitivity()
+        elif page == 'admin':
+            show_admin()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,188 @@
+"""
+批量评分计算
+
+把 config/scoring_rules.SCORING_DIMENSIONS 编译成矩阵，一次计算多只基金的
+父指标得分、维度得分、维度加权得分、总分、等级和排名。
+
+计算规则与 ScoringCalculator 逐只计算的结果完全一致（保留2位小数后）：
+- 叶子指标得分截断到 [0, 满分] 后保留2位小数
+- 父指标得分、维度得分 = 所属叶子指标得分之和
+- 维度加权得分 = 维度得分 × 维度权重 / 100，保留2位小数
+- 总分 = 各维度得分之和（与 ScoringService.calculate_fund_total_score 一致）
+- 等级按 GRADING_STANDARDS 的最低分划分，排名并列同名次、后续名次跳过
+
+内部全部以"分"（0.01）为单位的整数计算，舍入方式与 Decimal.quantize 默认的
+银行家舍入（ROUND_HALF_EVEN）相同，不受浮点误差影响。
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.utils.fixed_point import cents, divide_half_even
+from config.scoring_rules import GRADING_STANDARDS, SCORING_DIMENSIONS
+
+
+def to_cents(values) -> np.ndarray:
+    """
+    把分数转换为以"分"为单位的整数，结果与 Decimal(str(x)).quantize(Decimal('0.01')) 一致
+
+    绝大多数元素直接 rint(x × 100)；x × 100 接近半分时浮点误差会决定舍入方向，
+    这些元素改用 Decimal 精确舍入。
+    """
+    array = np.asarray(values, dtype=np.float64)
+    scaled = array * 100
+    rounded = np.rint(scaled)
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_half.any():
+        rounded[near_half] = [cents(float(value)) for value in array[near_half]]
+    return rounded.astype(np.int64)
+
+
+@dataclass
+class BatchScoringResult:
+    """批量评分结果，金额类数组均为 Decimal 语义下的两位小数（float），行顺序与输入一致"""
+    leaf_scores: np.ndarray         # (基金数 × 叶子指标数) 截断后的叶子指标得分
+    parent_totals: np.ndarray       # (基金数 × 父指标数)
+    dimension_totals: np.ndarray    # (基金数 × 维度数)
+    weighted_totals: np.ndarray     # (基金数 × 维度数)
+    total_scores: np.ndarray        # (基金数,)
+    grades: np.ndarray              # (基金数,) 等级代码
+    ranks: np.ndarray               # (基金数,) 并列同名次
+
+
+class BatchScoringEngine:
+    """由评分规则编译出的批量评分计算器"""
+
+    def __init__(
+        self,
+        dimensions: Mapping[str, Dict] = SCORING_DIMENSIONS,
+        grading_standards: Mapping[str, Dict] = GRADING_STANDARDS
+    ):
+        leaf_codes: List[str] = []
+        leaf_max: List[float] = []
+        leaf_parent: List[Optional[int]] = []
+        leaf_dimension: List[int] = []
+        parent_codes: List[str] = []
+
+        for dim_index, dimension in enumerate(dimensions.values()):
+            for indicator in dimension['indicators']:
+                if indicator.get('type') == 'parent':
+                    parent_index = len(parent_codes)
+                    parent_codes.append(indicator['code'])
+                    leaves = [(sub, parent_index) for sub in indicator.get('sub_indicators', [])]
+                else:
+                    leaves = [(indicator, None)]
+                for leaf, parent_index in leaves:
+                    leaf_codes.append(leaf['code'])
+                    leaf_max.append(leaf['max_score'])
+                    leaf_parent.append(parent_index)
+                    leaf_dimension.append(dim_index)
+
+        self.leaf_codes: Tuple[str, ...] = tuple(leaf_codes)
+        self.parent_codes: Tuple[str, ...] = tuple(parent_codes)
+        self.dimension_codes: Tuple[str, ...] = tuple(dimensions)
+        self.leaf_index: Dict[str, int] = {code: i for i, code in enumerate(leaf_codes)}
+
+        # 叶子→父指标、叶子→维度的汇总矩阵（0/1）
+        self.leaf_parent_matrix = np.zeros((len(leaf_codes), len(parent_codes)), dtype=np.int64)
+        self.leaf_dimension_matrix = np.zeros((len(leaf_codes), len(self.dimension_codes)), dtype=np.int64)
+        for i, (parent_index, dim_index) in enumerate(zip(leaf_parent, leaf_dimension)):
+            if parent_index is not None:
+                self.leaf_parent_matrix[i, parent_index] = 1
+            self.leaf_dimension_matrix[i, dim_index] = 1
+
+        self.leaf_max_cents = to_cents(leaf_max)
+        # 维度权重同样以0.01为单位，加权得分 = 维度得分 × 权重 / 10000
+        self.dimension_weight_cents = to_cents([d['weight'] for d in dimensions.values()])
+
+        # 等级按最低分从高到低排列
+        ordered = sorted(grading_standards.items(), key=lambda item: -item[1]['min'])
+        self.grade_codes = np.array([code for code, _ in ordered], dtype=object)
+        self.grade_min_cents = to_cents([standard['min'] for _, standard in ordered])
+
+    def score_matrix(self, fund_scores: Iterable[Mapping[str, object]]) -> np.ndarray:
+        """
+        把每只基金的 {叶子指标编码: 原始评分} 转成 (基金数 × 叶子指标数) 评分矩阵
+
+        未评分和非叶子指标编码按 0 分处理（与逐只计算时只累加已有评分一致）。
+        """
+        rows = list(fund_scores)
+        matrix = np.zeros((len(rows), len(self.leaf_codes)), dtype=np.float64)
+        for row_index, scores in enumerate(rows):
+            for code, score in scores.items():
+                column = self.leaf_index.get(code)
+                if column is not None and score is not None:
+                    matrix[row_index, column] = float(score)
+        return matrix
+
+    def compute(self, scores) -> BatchScoringResult:
+        """
+        计算一批基金的全部得分
+
+        Args:
+            scores: (基金数 × 叶子指标数) 原始评分，列顺序为 leaf_codes
+
+        Returns:
+            BatchScoringResult
+        """
+        leaf = to_cents(scores)
+        if leaf.ndim != 2 or leaf.shape[1] != len(self.leaf_codes):
+            raise ValueError(f"score matrix must have {len(self.leaf_codes)} columns, got shape {leaf.shape}")
+        leaf = np.clip(leaf, 0, self.leaf_max_cents)
+
+        parent = leaf @ self.leaf_parent_matrix
+        dimension = leaf @ self.leaf_dimension_matrix
+        weighted = divide_half_even(dimension * self.dimension_weight_cents, 10000)
+        total = dimension.sum(axis=1)
+
+        grade_index = self.grade_index(total)
+
+        # 名次 = 1 + 总分严格更高的基金数
+        descending = np.sort(-total)
+        ranks = np.searchsorted(descending, -total, side='left') + 1
+
+        return BatchScoringResult(
+            leaf_scores=leaf / 100,
+            parent_totals=parent / 100,
+            dimension_totals=dimension / 100,
+            weighted_totals=weighted / 100,
+            total_scores=total / 100,
+            grades=self.grade_codes[grade_index],
+            ranks=ranks
+        )
+
+    def grade_index(self, total_cents: np.ndarray) -> np.ndarray:
+        """
+        总分（分）对应的等级在 grade_codes 中的下标，数组形状不变
+
+        取第一个满足 总分 >= 最低分 的等级；低于所有最低分时取最后一档。
+        """
+        ascending = self.grade_min_cents[::-1]
+        position = np.searchsorted(ascending, total_cents, side='right') - 1
+        return len(self.grade_codes) - 1 - np.maximum(position, 0)
+
+    def scenario_totals(self, dimension_cents, weights) -> np.ndarray:
+        """
+        按其他维度权重重算总分
+
+        每个维度得分按 新权重 / 当前权重 缩放（保留2位小数，银行家舍入）后相加；
+        新权重等于当前权重时结果就是当前总分。
+
+        Args:
+            dimension_cents: (基金数 × 维度数) 维度得分，单位为分，列顺序为 dimension_codes
+            weights: (方案数 × 维度数) 维度权重
+
+        Returns:
+            (方案数 × 基金数) 总分，单位为分
+        """
+        if np.any(self.dimension_weight_cents <= 0):
+            raise ValueError("dimension weights must be positive to rescale dimension scores")
+        weight_cents = to_cents(np.atleast_2d(weights))
+        if weight_cents.shape[1] != len(self.dimension_codes):
+            raise ValueError(f"weights must have {len(self.dimension_codes)} columns, got shape {weight_cents.shape}")
+        scaled = divide_half_even(
+            np.asarray(dimension_cents, dtype=np.int64)[None, :, :] * weight_cents[:, None, :],
+            self.dimension_weight_cents[None, None, :]
+        )
+        return scaled.sum(axis=2)
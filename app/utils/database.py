@@ -1,20 +1,576 @@
 """
 数据库连接管理
 """
+import contextvars
+import functools
+import itertools
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.cursors import DictCursor, SSDictCursor
 from contextlib import contextmanager
 import logging
 
-from config.settings import db_config
+from config.settings import db_config, parse_dsn
+from app.utils.query_stats import record_query
 
 logger = logging.getLogger(__name__)
 
+# 两种后端的数据库异常
+_DB_ERRORS = (pymysql.Error, sqlite3.Error)
+
+
+class PoolTimeoutError(Exception):
+    """在超时时间内未能从连接池获取到连接"""
+
+
+@dataclass
+class PoolStats:
+    """连接池运行计数"""
+    max_size: int
+    size: int  # 当前已打开的连接数（使用中 + 空闲）
+    in_use: int
+    idle: int
+    waits: int  # 因连接池已满而等待的次数
+    timeouts: int  # 等待超时的次数
+    created: int  # 累计新建的连接数
+    recycled: int  # 因超过存活时间或存活检查失败而关闭的连接数
+
+
+class InstrumentedDictCursor(DictCursor):
+    """记录每次执行的耗时、行数和调用方的 DictCursor"""
+
+    _batch = False
+
+    def execute(self, query, args=None):
+        if self._batch:
+            return super().execute(query, args)
+        note_statement(query)
+        started = time.perf_counter()
+        result = super().execute(query, args)
+        record_query(query, args, started, self.rowcount)
+        return result
+
+    def executemany(self, query, args):
+        # executemany 内部会多次调用 execute，只按一次批量执行记录
+        note_statement(query)
+        started = time.perf_counter()
+        self._batch = True
+        try:
+            result = super().executemany(query, args)
+        finally:
+            self._batch = False
+        record_query(query, args, started, self.rowcount)
+        return result
+
+
+class InstrumentedSSDictCursor(SSDictCursor):
+    """
+    服务端（非缓冲）DictCursor
+
+    结果集留在服务端按需读取，execute 时还不知道行数，
+    因此在游标关闭时记录整个读取过程的耗时和实际读取的行数。
+    """
+
+    _pending = None
+
+    def execute(self, query, args=None):
+        self._flush_record()
+        self._pending = (query, args, time.perf_counter())
+        return super().execute(query, args)
+
+    def _flush_record(self):
+        if self._pending is not None:
+            query, args, started = self._pending
+            self._pending = None
+            record_query(query, args, started, self.rownumber)
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._flush_record()
+
+
+def _create_connection(dsn: str = None):
+    """
+    新建一个数据库连接（按 DB_BACKEND 选择 MySQL 或 SQLite）
+
+    Args:
+        dsn: 为空时连接主库，否则连接 DSN 指定的库（只读副本）
+    """
+    params = parse_dsn(dsn) if dsn else vars(db_config)
+    if params['backend'] == 'sqlite':
+        from app.utils.sqlite_backend import connect
+        return connect(params['sqlite_path'])
+    return pymysql.connect(
+        host=params['host'],
+        port=params['port'],
+        user=params['user'],
+        password=params['password'],
+        database=params['database'],
+        charset=db_config.charset,
+        cursorclass=InstrumentedDictCursor
+    )
+
+
+class ConnectionPool:
+    """
+    线程安全的有界连接池
+
+    - 最多同时打开 max_size 个连接，连接池已满时借用方最多等待 timeout 秒
+    - 连接存活超过 max_lifetime 秒后在归还或借出时关闭重建
+    - 空闲超过 ping_interval 秒的连接在借出前先 ping，失效则重建
+    - 归还时回滚未提交的事务，保证下一个借用方拿到干净的连接
+    """
+
+    def __init__(
+        self,
+        connect=_create_connection,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_lifetime: float = 3600,
+        timeout: float = 10,
+        ping_interval: float = 10
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connection, last_used_at)
+        self._born = {}  # id(connection) -> created_at
+        self._size = 0
+        self._in_use = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._warmed = False
+        self._closed = False
+        self.pid = os.getpid()
+
+    def _open(self):
+        """新建连接并登记创建时间（调用方已预留名额）"""
+        conn = self._connect()
+        with self._cond:
+            self._born[id(conn)] = time.monotonic()
+            self._created += 1
+        return conn
+
+    def _discard(self, conn):
+        """关闭连接（在锁外调用，避免网络操作阻塞其他线程）"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, conn, now: float) -> bool:
+        born = self._born.get(id(conn), now)
+        return self.max_lifetime > 0 and now - born >= self.max_lifetime
+
+    def _warm_up(self):
+        """首次使用时预建 min_size 个空闲连接（只有第一个调用的线程执行）"""
+        with self._cond:
+            if self._warmed:
+                return
+            self._warmed = True
+        for _ in range(self.min_size):
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                logger.warning(f"Connection pool warm-up failed: {str(e)}")
+                return
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self):
+        """借出一个连接，连接池已满时阻塞等待"""
+        self._warm_up()
+
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        to_close = []
+        conn = None
+        last_used = None
+        try:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        candidate, used_at = self._idle.pop()
+                        if self._expired(candidate, now):
+                            self._born.pop(id(candidate), None)
+                            self._size -= 1
+                            self._recycled += 1
+                            to_close.append(candidate)
+                            continue
+                        conn, last_used = candidate, used_at
+                        break
+                    if conn is not None or self._size < self.max_size:
+                        if conn is None:
+                            self._size += 1
+                        self._in_use += 1
+                        break
+
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"(pool size {self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+        finally:
+            for stale in to_close:
+                self._discard(stale)
+
+        if conn is not None and time.monotonic() - last_used >= self.ping_interval:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                logger.info("Discarding dead pooled connection")
+                with self._cond:
+                    self._born.pop(id(conn), None)
+                    self._recycled += 1
+                self._discard(conn)
+                conn = None
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn):
+        """归还连接：回滚未提交的事务，过期或已损坏的连接直接关闭"""
+        healthy = getattr(conn, 'open', True)
+        if healthy:
+            try:
+                conn.rollback()
+            except Exception:
+                healthy = False
+
+        now = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            if healthy and not self._closed and not self._expired(conn, now):
+                self._idle.append((conn, now))
+                conn = None
+            else:
+                self._born.pop(id(conn), None)
+                self._size -= 1
+                self._recycled += 1
+            self._cond.notify()
+
+        if conn is not None:
+            self._discard(conn)
+
+    def stats(self) -> PoolStats:
+        """读取连接池计数"""
+        with self._cond:
+            return PoolStats(
+                max_size=self.max_size,
+                size=self._size,
+                in_use=self._in_use,
+                idle=len(self._idle),
+                waits=self._waits,
+                timeouts=self._timeouts,
+                created=self._created,
+                recycled=self._recycled
+            )
+
+    def close(self):
+        """关闭所有空闲连接（使用中的连接在归还时关闭）"""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            for conn in idle:
+                self._born.pop(id(conn), None)
+            self._size -= len(idle)
+            self._closed = True
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """获取进程内的全局连接池（fork出的子进程会重建自己的连接池）"""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = _new_pool()
+        return _pool
+
+
+def get_pool_stats() -> PoolStats:
+    """读取全局连接池的计数（使用中、空闲、等待、新建、回收）"""
+    return get_pool().stats()
+
+
+def _new_pool(dsn: str = None) -> ConnectionPool:
+    return ConnectionPool(
+        connect=(lambda: _create_connection(dsn)) if dsn else _create_connection,
+        min_size=db_config.pool_min_size,
+        max_size=db_config.pool_max_size,
+        max_lifetime=db_config.pool_max_lifetime,
+        timeout=db_config.pool_timeout,
+        ping_interval=db_config.pool_ping_interval
+    )
+
+
+_replica_pools = None
+_replica_cycle = None
+
+
+def get_replica_pools() -> list:
+    """获取各只读副本的连接池（未配置副本时为空列表）"""
+    global _replica_pools, _replica_cycle
+    pools = _replica_pools
+    if pools is not None and (not pools or pools[0].pid == os.getpid()):
+        return pools
+    with _pool_lock:
+        if _replica_pools is None or (_replica_pools and _replica_pools[0].pid != os.getpid()):
+            _replica_pools = [_new_pool(dsn) for dsn in db_config.replica_dsns]
+            _replica_cycle = itertools.cycle(range(len(_replica_pools))) if _replica_pools else None
+        return _replica_pools
+
+
+def get_replica_pool_stats() -> list:
+    """读取各只读副本连接池的计数"""
+    return [pool.stats() for pool in get_replica_pools()]
+
+
+def close_pool():
+    """关闭全局连接池（包括只读副本的连接池）"""
+    global _pool, _replica_pools
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        for pool in _replica_pools or []:
+            pool.close()
+        _replica_pools = None
+
+
+# ==================== 读写分离 ====================
+
+@dataclass
+class DbSession:
+    """一个用户会话的读写路由状态：写入后短时间内的读取仍走主库，保证读到自己的写入"""
+    last_write_at: float = float('-inf')
+
+    def note_write(self):
+        self.last_write_at = time.monotonic()
+
+    def is_sticky(self) -> bool:
+        return time.monotonic() - self.last_write_at < db_config.replica_sticky_seconds
+
+
+_current_db_session = contextvars.ContextVar('db_session', default=None)
+_thread_db_session = threading.local()
+
+_WRITE_STATEMENT = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|ALTER|DROP|TRUNCATE|RENAME)\b", re.I)
+
+
+def current_db_session() -> DbSession:
+    """当前上下文绑定的会话；未绑定时（脚本、后台线程）每个线程各用一个"""
+    session = _current_db_session.get()
+    if session is None:
+        session = getattr(_thread_db_session, 'session', None)
+        if session is None:
+            session = _thread_db_session.session = DbSession()
+    return session
+
 
 @contextmanager
-def get_db_connection():
+def bind_db_session(session: DbSession):
     """
-    获取数据库连接的上下文管理器
+    在当前上下文中绑定会话的读写路由状态
+
+    使用示例:
+        with bind_db_session(st.session_state.db_session):
+            show_results()
+    """
+    token = _current_db_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_db_session.reset(token)
+
+
+def with_db_session(session: DbSession, callback):
+    """
+    包装控件回调，使其在会话的读写路由状态下执行
+
+    Streamlit 在脚本重跑之前执行 on_change / on_click 回调，此时 main() 还没有绑定会话，
+    回调中的写入需要自己绑定，之后的读取才会粘滞到主库。
+
+    使用示例:
+        st.selectbox(..., on_change=with_db_session(st.session_state.db_session, save_single_score))
+    """
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        with bind_db_session(session):
+            return callback(*args, **kwargs)
+    return wrapper
+
+
+def note_statement(sql: str):
+    """游标执行SQL前调用：写语句会让当前会话在一段时间内只读主库"""
+    if _WRITE_STATEMENT.match(sql):
+        current_db_session().note_write()
+
+
+def _read_pool():
+    """选一个只读副本的连接池；未配置副本或会话刚写入过时返回 None（走主库）"""
+    pools = get_replica_pools()
+    if not pools or current_db_session().is_sticky():
+        return None
+    with _pool_lock:
+        return pools[next(_replica_cycle)]
+
+
+class UnitOfWorkRollback(Exception):
+    """工作单元内有操作失败，整个工作单元已回滚"""
+
+
+class _UnitOfWorkConnection:
+    """
+    工作单元内共享的连接代理
+
+    仓储方法照常调用 commit()，实际提交推迟到最外层工作单元结束时统一执行；
+    rollback() 把整个工作单元标记为只能回滚。
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self.rollback_only = False
+        self.rollback_hooks = []
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollback_only = True
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+_current_unit_of_work = contextvars.ContextVar('db_unit_of_work', default=None)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    在当前上下文中开启一个工作单元（事务）
+
+    工作单元内所有 get_db_connection() 调用（包括各仓储方法）共用同一个连接，
+    正常结束时只提交一次，出现异常时整体回滚。嵌套调用会加入外层工作单元；
+    嵌套工作单元或仓储方法中抛出的异常即使被调用方捕获，外层结束时也会回滚并抛出 UnitOfWorkRollback。
+
+    使用示例:
+        with unit_of_work():
+            scoring_repo.save_fund_total(...)
+            fund_repo.update_status(fund_id, 'completed')
+    """
+    current = _current_unit_of_work.get()
+    if current is not None:
+        try:
+            yield current
+        except BaseException:
+            current.rollback_only = True
+            raise
+        return
+
+    with get_db_connection() as connection:
+        shared = _UnitOfWorkConnection(connection)
+        token = _current_unit_of_work.set(shared)
+        try:
+            yield shared
+        except BaseException:
+            connection.rollback()
+            _run_rollback_hooks(shared)
+            raise
+        finally:
+            _current_unit_of_work.reset(token)
+
+        if shared.rollback_only:
+            connection.rollback()
+            _run_rollback_hooks(shared)
+            raise UnitOfWorkRollback("Unit of work was rolled back because an operation inside it failed")
+        connection.commit()
+
+
+def _run_rollback_hooks(shared: _UnitOfWorkConnection):
+    for hook in shared.rollback_hooks:
+        try:
+            hook()
+        except Exception as e:
+            logger.error(f"Error running rollback hook: {str(e)}")
+
+
+def on_rollback(callback):
+    """
+    当前工作单元回滚时调用 callback（例如丢弃已按未提交数据修改的进程内缓存）
+
+    不在工作单元中时不登记：此时每条写入各自立即提交。
+    """
+    shared = _current_unit_of_work.get()
+    if shared is not None:
+        shared.rollback_hooks.append(callback)
+
+
+def in_unit_of_work() -> bool:
+    """当前上下文是否处于工作单元中"""
+    return _current_unit_of_work.get() is not None
+
+
+@contextmanager
+def get_db_connection(read_only: bool = False):
+    """
+    从连接池借用数据库连接的上下文管理器
+
+    退出时连接归还连接池（未提交的事务会被回滚），而不是关闭。
+    处于 unit_of_work() 中时返回工作单元共享的连接，commit() 推迟到工作单元结束。
+    read_only=True 时优先从只读副本借用（会话刚写入过、处于工作单元中或副本不可用时仍走主库）。
 
     使用示例:
         with get_db_connection() as conn:
@@ -22,44 +578,74 @@ def get_db_connection():
                 cursor.execute("SELECT * FROM users")
                 result = cursor.fetchall()
     """
+    shared = _current_unit_of_work.get()
+    if shared is not None:
+        try:
+            yield shared
+        except Exception as e:
+            # 调用方即使捕获了异常，已写入的部分也不能随工作单元提交
+            shared.rollback_only = True
+            if isinstance(e, _DB_ERRORS):
+                logger.error(f"Database connection error: {str(e)}")
+            raise
+        return
+
+    pool = _read_pool() if read_only else None
     connection = None
+    if pool is not None:
+        try:
+            connection = pool.acquire()
+        except (PoolTimeoutError, *_DB_ERRORS) as e:
+            logger.warning(f"Replica unavailable, reading from primary: {str(e)}")
+
+    if connection is None:
+        pool = get_pool()
+        try:
+            connection = pool.acquire()
+        except _DB_ERRORS as e:
+            logger.error(f"Database connection error: {str(e)}")
+            raise
+
     try:
-        connection = pymysql.connect(
-            host=db_config.host,
-            port=db_config.port,
-            user=db_config.user,
-            password=db_config.password,
-            database=db_config.database,
-            charset=db_config.charset,
-            cursorclass=DictCursor
-        )
         yield connection
-    except pymysql.Error as e:
+    except _DB_ERRORS as e:
         logger.error(f"Database connection error: {str(e)}")
         raise
     finally:
-        if connection:
-            connection.close()
+        pool.release(connection)
+
+
+def stream_query(sql: str, args=None, chunk_size: int = 1000, read_only: bool = False):
+    """
+    用服务端游标逐批读取大结果集
+
+    每次产出最多 chunk_size 行（字典列表），内存中只保留当前批次。
+    读取完毕（或调用方提前结束迭代）后才归还连接；迭代期间不要在同一个
+    工作单元的连接上执行其他SQL。read_only 的含义与 get_db_connection 相同。
+
+    使用示例:
+        for rows in stream_query("SELECT * FROM fund_total_scores", chunk_size=500):
+            handle(rows)
+    """
+    with get_db_connection(read_only=read_only) as conn:
+        with conn.cursor(InstrumentedSSDictCursor) as cursor:
+            cursor.execute(sql, args)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
 
 
 def get_connection():
     """
     获取数据库连接（非上下文管理器版本）
 
-    注意：使用此方法需要手动关闭连接
+    注意：使用此方法需要手动关闭连接，该连接不经过连接池
     """
     try:
-        connection = pymysql.connect(
-            host=db_config.host,
-            port=db_config.port,
-            user=db_config.user,
-            password=db_config.password,
-            database=db_config.database,
-            charset=db_config.charset,
-            cursorclass=DictCursor
-        )
-        return connection
-    except pymysql.Error as e:
+        return _create_connection()
+    except _DB_ERRORS as e:
         logger.error(f"Database connection error: {str(e)}")
         raise
 
@@ -83,6 +669,10 @@ def init_database():
     初始化数据库
     创建数据库（如果不存在）
     """
+    if db_config.backend == 'sqlite':
+        # SQLite 首次连接时自动建库建表
+        return test_connection()
+
     try:
         # 先连接到MySQL服务器（不指定数据库）
         connection = pymysql.connect(
@@ -0,0 +1,143 @@
+"""
+指标数据自动评分
+
+导入时把 config/scoring_rules.METRIC_BANDS 编译成每个指标的分档表：各档下限（严格升序）、
+是否含下限和各档得分（以"分"为单位的整数）。一列指标数据用 np.searchsorted 一次映射到分档得分，
+单个数值用 bisect，二者结果相同。得分可以直接写入批量评分路径（core/services/autoscore_service.py）。
+"""
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+import math
+
+import numpy as np
+
+from app.utils.fixed_point import cents
+from app.utils.scoring_options import OPTION_TABLES, IndicatorOptions
+from config.scoring_rules import METRIC_BANDS
+
+# 没有数据（空白、NaN 或无法解析为数值）的位置
+MISSING = -1
+
+
+@dataclass(frozen=True)
+class MetricBand:
+    """一个指标的分档表"""
+    code: str                       # 指标编码
+    metric: str                     # 指标数据字段
+    name: str
+    unit: str
+    thresholds: Tuple[float, ...]   # 各档下限，严格升序
+    inclusive: Tuple[bool, ...]     # 是否含下限
+    scores: Tuple[int, ...]         # 低于第一档的得分，然后是各档得分（分）
+    _arrays: Tuple[np.ndarray, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, '_arrays', (
+            np.array(self.thresholds, dtype=np.float64),
+            np.array(self.inclusive, dtype=bool),
+            np.array(self.scores, dtype=np.int64)
+        ))
+
+    def score_cents(self, value) -> Optional[int]:
+        """单个数值的得分（分），没有数据时为 None"""
+        if value is None:
+            return None
+        value = float(value)
+        if math.isnan(value):
+            return None
+        position = bisect_left(self.thresholds, value)
+        if position < len(self.thresholds) and self.thresholds[position] == value and self.inclusive[position]:
+            position += 1
+        return self.scores[position]
+
+    def evaluate(self, values) -> np.ndarray:
+        """一列数据的得分（分），没有数据的位置为 MISSING"""
+        thresholds, inclusive, scores = self._arrays
+        array = np.asarray(values, dtype=np.float64)
+        # 小于该值的下限个数；恰好等于含下限的下限时归入上一档
+        position = np.searchsorted(thresholds, array, side='left')
+        at = np.minimum(position, len(thresholds) - 1)
+        position = position + ((position < len(thresholds)) & (thresholds[at] == array) & inclusive[at])
+        result = scores[position]
+        result[np.isnan(array)] = MISSING
+        return result
+
+
+def _compile_band(code: str, config: Dict, table: Optional[IndicatorOptions]) -> MetricBand:
+    """
+    Raises:
+        ValueError: 指标不是叶子指标、下限不是严格升序或得分不在评分选项中
+    """
+    if table is None or table.is_parent:
+        raise ValueError(f"{code}: 只有叶子指标可以按指标数据评分")
+    bands = config['bands']
+    thresholds = tuple(float(band[0]) for band in bands)
+    if any(low >= high for low, high in zip(thresholds, thresholds[1:])):
+        raise ValueError(f"{code}: 分档下限必须严格升序")
+    scores = (config['base'],) + tuple(band[2] for band in bands)
+    invalid = [score for score in scores if float(score) not in table.scores]
+    if invalid:
+        raise ValueError(f"{code}: 得分 {invalid} 不在评分选项 {list(table.scores)} 中")
+    return MetricBand(
+        code=code,
+        metric=config['metric'],
+        name=config['name'],
+        unit=config.get('unit', ''),
+        thresholds=thresholds,
+        inclusive=tuple(bool(band[1]) for band in bands),
+        scores=tuple(cents(score) for score in scores)
+    )
+
+
+def compile_metric_bands(
+    bands: Mapping[str, Dict] = METRIC_BANDS,
+    tables: Mapping[str, IndicatorOptions] = OPTION_TABLES
+) -> Mapping[str, MetricBand]:
+    """
+    编译分档表
+
+    Returns:
+        {指标编码: 分档表}
+
+    Raises:
+        ValueError: 配置有误，或两个指标使用同一个指标数据字段
+    """
+    compiled = {code: _compile_band(code, config, tables.get(code)) for code, config in bands.items()}
+    metrics = [band.metric for band in compiled.values()]
+    duplicated = sorted({metric for metric in metrics if metrics.count(metric) > 1})
+    if duplicated:
+        raise ValueError(f"指标数据字段重复: {duplicated}")
+    return MappingProxyType(compiled)
+
+
+# 导入时编译一次，进程内共享
+METRIC_BAND_TABLES = compile_metric_bands()
+
+
+class MetricScorer:
+    """把多只基金的指标数据映射为叶子指标得分"""
+
+    def __init__(self, bands: Mapping[str, MetricBand] = METRIC_BAND_TABLES):
+        self.bands = bands
+        self._by_column = {}
+        for band in bands.values():
+            self._by_column[band.metric] = band
+            self._by_column[band.name] = band
+
+    def resolve_columns(self, columns: Iterable[str]) -> Dict[str, MetricBand]:
+        """数据表中可自动评分的列（列名为指标数据字段或其中文名称）→ 分档表"""
+        return {column: self._by_column[column] for column in columns if column in self._by_column}
+
+    def evaluate(self, metrics: Mapping[str, Iterable]) -> Dict[str, np.ndarray]:
+        """
+        批量评分
+
+        Args:
+            metrics: {列名: 各基金的数据}，各列等长；不能自动评分的列忽略
+
+        Returns:
+            {指标编码: 各基金的得分（分），没有数据的位置为 MISSING}
+        """
+        return {band.code: band.evaluate(metrics[column]) for column, band in self.resolve_columns(metrics).items()}
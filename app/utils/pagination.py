@@ -0,0 +1,77 @@
+"""
+键集（游标）分页
+
+列表按 (created_at, id) 倒序排列，下一页从上一页最后一行之后继续查找，
+不使用 OFFSET，翻到多深的页面每页都只扫描 limit + 1 行。
+游标是 (created_at, id) 编码成的不透明字符串，页面只需原样回传。
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+
+@dataclass
+class Page:
+    """一页查询结果"""
+    items: List[dict] = field(default_factory=list)
+    next_cursor: Optional[str] = None  # 没有下一页时为 None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """把一行的 (created_at, id) 编码为游标"""
+    payload = json.dumps([created_at.isoformat(' '), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解析游标
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor}") from e
+
+
+def keyset_sql(alias: str, cursor: Optional[str], limit: int) -> Tuple[str, str, list]:
+    """
+    生成键集分页的查询片段
+
+    Args:
+        alias: 表别名
+        cursor: 上一页返回的游标，首页为 None
+        limit: 每页行数
+
+    Returns:
+        (追加到 WHERE 后的条件, ORDER BY ... LIMIT 子句, 参数列表)
+        参数顺序为：条件参数在前，LIMIT 参数在后
+    """
+    condition = ''
+    params = []
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        condition = f" AND ({alias}.created_at < %s OR ({alias}.created_at = %s AND {alias}.id < %s))"
+        params = [created_at, created_at, row_id]
+    # 多取一行，用来判断是否还有下一页
+    order = f" ORDER BY {alias}.created_at DESC, {alias}.id DESC LIMIT %s"
+    return condition, order, params + [limit + 1]
+
+
+def build_page(rows: List[dict], limit: int) -> Page:
+    """由多取一行的查询结果构建分页结果"""
+    if len(rows) <= limit:
+        return Page(items=rows)
+    items = rows[:limit]
+    last = items[-1]
+    return Page(items=items, next_cursor=encode_cursor(last['created_at'], last['id']))
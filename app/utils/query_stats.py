@@ -0,0 +1,298 @@
+"""
+SQL执行统计
+
+记录每条SQL的指纹、参数个数、耗时、返回行数和发起调用的仓储方法，
+按页面重跑（Streamlit rerun）和进程两个维度汇总，并把超过阈值的慢查询写入慢查询日志。
+"""
+import contextvars
+import logging
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config.settings import db_config
+
+logger = logging.getLogger(__name__)
+
+# 慢查询单独写入一个日志，便于离线分析
+slow_query_logger = logging.getLogger('fund_scoring.slow_query')
+
+_slow_log_lock = threading.Lock()
+_slow_log_configured = False
+
+
+def _ensure_slow_query_handler():
+    """首次记录慢查询时按配置挂上文件日志"""
+    global _slow_log_configured
+    if _slow_log_configured:
+        return
+    with _slow_log_lock:
+        if _slow_log_configured:
+            return
+        _slow_log_configured = True
+        if not db_config.slow_query_log:
+            return
+        try:
+            path = Path(db_config.slow_query_log)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.FileHandler(path, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            slow_query_logger.addHandler(handler)
+            slow_query_logger.setLevel(logging.INFO)
+        except OSError as e:
+            logger.warning(f"Cannot open slow query log {db_config.slow_query_log}: {str(e)}")
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """
+    归一化SQL，得到同一类查询共用的指纹
+
+    字面量和占位符替换为 ?，IN (...) 列表折叠为 (?+)，空白合并，关键字转小写。
+    """
+    text = _STRING_LITERAL.sub('?', sql)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _PLACEHOLDER_LIST.sub('(?+)', text)
+    text = _WHITESPACE.sub(' ', text).strip()
+    return text.lower()
+
+
+def param_count(args) -> int:
+    """SQL参数个数"""
+    if args is None:
+        return 0
+    if isinstance(args, (list, tuple, dict)):
+        return len(args)
+    return 1
+
+
+_SKIP_MODULES = ('app.utils.database', 'app.utils.query_stats', 'app.utils.sqlite_backend', 'pymysql', 'contextlib', 'sqlite3')
+
+
+def calling_method() -> str:
+    """
+    找到发起SQL的调用方
+
+    优先返回仓储方法（如 ScoringRepository.get_fund_scores），
+    其次是服务方法，都没有时返回第一个业务代码帧。
+    """
+    frame = sys._getframe(1)
+    fallback = None
+    service = None
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(_SKIP_MODULES):
+            owner = frame.f_locals.get('self')
+            name = frame.f_code.co_name
+            if owner is not None:
+                name = f"{type(owner).__name__}.{name}"
+            if module.startswith('core.repositories'):
+                return name
+            if service is None and module.startswith('core.services'):
+                service = name
+            if fallback is None:
+                fallback = f"{module.rsplit('.', 1)[-1]}.{name}"
+        frame = frame.f_back
+    return service or fallback or 'unknown'
+
+
+@dataclass
+class QueryRecord:
+    """单次SQL执行记录"""
+    fingerprint: str
+    param_count: int
+    duration_ms: float
+    rows: int
+    caller: str
+    executed_at: datetime = field(default_factory=datetime.now)
+
+
+@dataclass
+class FingerprintStats:
+    """同一指纹的累计统计"""
+    fingerprint: str
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    callers: set = field(default_factory=set)
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+    def add(self, record: QueryRecord):
+        self.calls += 1
+        self.total_ms += record.duration_ms
+        self.max_ms = max(self.max_ms, record.duration_ms)
+        self.rows += record.rows
+        self.callers.add(record.caller)
+
+
+class QueryStats:
+    """按指纹汇总SQL执行情况（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_fingerprint: Dict[str, FingerprintStats] = {}
+        self.queries = 0
+        self.total_ms = 0.0
+        self.slow_queries = 0
+
+    def add(self, record: QueryRecord, slow: bool = False):
+        with self._lock:
+            stats = self._by_fingerprint.get(record.fingerprint)
+            if stats is None:
+                stats = FingerprintStats(record.fingerprint)
+                self._by_fingerprint[record.fingerprint] = stats
+            stats.add(record)
+            self.queries += 1
+            self.total_ms += record.duration_ms
+            if slow:
+                self.slow_queries += 1
+
+    def rows(self) -> List[Dict]:
+        """按总耗时倒序输出汇总表"""
+        with self._lock:
+            items = sorted(self._by_fingerprint.values(), key=lambda s: s.total_ms, reverse=True)
+            return [
+                {
+                    'fingerprint': s.fingerprint,
+                    'calls': s.calls,
+                    'total_ms': round(s.total_ms, 2),
+                    'avg_ms': round(s.avg_ms, 2),
+                    'max_ms': round(s.max_ms, 2),
+                    'rows': s.rows,
+                    'callers': ', '.join(sorted(s.callers))
+                }
+                for s in items
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._by_fingerprint.clear()
+            self.queries = 0
+            self.total_ms = 0.0
+            self.slow_queries = 0
+
+
+@dataclass
+class RerunReport:
+    """一次页面重跑期间的SQL统计"""
+    page: str
+    started_at: datetime
+    stats: QueryStats = field(default_factory=QueryStats)
+    elapsed_ms: float = 0.0
+
+    def summary(self) -> Dict:
+        return {
+            'page': self.page,
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'queries': self.stats.queries,
+            'sql_ms': round(self.stats.total_ms, 2),
+            'slow_queries': self.stats.slow_queries,
+            'elapsed_ms': round(self.elapsed_ms, 2)
+        }
+
+
+_process_stats = QueryStats()
+_recent_reruns = deque(maxlen=50)
+_current_rerun = contextvars.ContextVar('query_stats_rerun', default=None)
+
+
+def record_query(sql: str, args, started: float, rows: int):
+    """
+    记录一次SQL执行
+
+    Args:
+        sql: 原始SQL
+        args: 执行参数
+        started: time.perf_counter() 记录的开始时间
+        rows: 返回或影响的行数
+    """
+    if not db_config.query_stats_enabled:
+        return
+    duration_ms = (time.perf_counter() - started) * 1000
+    record = QueryRecord(
+        fingerprint=fingerprint(sql),
+        param_count=param_count(args),
+        duration_ms=duration_ms,
+        rows=max(rows or 0, 0),
+        caller=calling_method()
+    )
+    slow = duration_ms >= db_config.slow_query_threshold_ms
+    _process_stats.add(record, slow)
+    report = _current_rerun.get()
+    if report is not None:
+        report.stats.add(record, slow)
+    if slow:
+        _ensure_slow_query_handler()
+        slow_query_logger.warning(
+            f"{duration_ms:.1f}ms rows={record.rows} params={record.param_count} "
+            f"caller={record.caller} sql={record.fingerprint}"
+        )
+
+
+@contextmanager
+def track_rerun(page: str):
+    """
+    统计一次页面重跑期间发出的SQL
+
+    使用示例:
+        with track_rerun('scoring'):
+            show_scoring()
+    """
+    report = RerunReport(page=page, started_at=datetime.now())
+    token = _current_rerun.set(report)
+    started = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.elapsed_ms = (time.perf_counter() - started) * 1000
+        _current_rerun.reset(token)
+        _recent_reruns.append(report)
+
+
+@contextmanager
+def attach_rerun(report: Optional[RerunReport]):
+    """在工作线程中把SQL记到发起线程的页面重跑统计上"""
+    token = _current_rerun.set(report)
+    try:
+        yield report
+    finally:
+        _current_rerun.reset(token)
+
+
+def current_rerun() -> Optional[RerunReport]:
+    """当前上下文正在统计的页面重跑"""
+    return _current_rerun.get()
+
+
+def get_process_stats() -> QueryStats:
+    """进程启动以来的SQL汇总"""
+    return _process_stats
+
+
+def get_recent_reruns() -> List[RerunReport]:
+    """最近的页面重跑统计（新的在前）"""
+    return list(reversed(_recent_reruns))
+
+
+def reset_query_stats():
+    """清空进程级统计和重跑记录"""
+    _process_stats.reset()
+    _recent_reruns.clear()
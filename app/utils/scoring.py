@@ -2,13 +2,51 @@
 评分计算逻辑模块
 """
 from decimal import Decimal
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 import logging
 
+from app.utils.fixed_point import apply_weight, cents, exact_cents, to_decimal
+from app.utils.scoring_options import DIMENSION_INDICATORS, OPTION_TABLES
 from config.scoring_rules import SCORING_DIMENSIONS, GRADING_STANDARDS
 
 logger = logging.getLogger(__name__)
 
+# 等级最低分（分），按 _determine_grade 的判断顺序排列，低于全部时为不合格
+_GRADE_MIN_CENTS = tuple(
+    (grade, cents(Decimal(str(GRADING_STANDARDS[grade]['min']))))
+    for grade in ('excellent', 'good', 'qualified')
+)
+
+
+def _sum_cents(values: Iterable[Decimal]) -> int:
+    """
+    求和并舍入到"分"，与 sum(values).quantize(Decimal('0.01')) 一致
+
+    全部是两位小数时按整数相加；有更多位小数时先精确求和再舍入。
+    """
+    values = list(values)
+    exact = [exact_cents(value) for value in values]
+    if None in exact:
+        return cents(sum(values))
+    return sum(exact)
+
+
+# 一级指标编码 → 位（按维度和配置顺序），validate_score_completeness 用位图判断缺失
+_INDICATOR_BITS = {
+    code: bit
+    for bit, code in enumerate(code for codes in DIMENSION_INDICATORS.values() for code in codes)
+}
+_DIMENSION_MASKS = {
+    dim_code: sum(1 << _INDICATOR_BITS[code] for code in codes)
+    for dim_code, codes in DIMENSION_INDICATORS.items()
+}
+_COMPLETE_MASK = (1 << len(_INDICATOR_BITS)) - 1
+_INDICATOR_LABELS = tuple(
+    f"{SCORING_DIMENSIONS[dim_code]['name']}-{OPTION_TABLES[code].name}"
+    for dim_code, codes in DIMENSION_INDICATORS.items()
+    for code in codes
+)
+
 
 class ScoringCalculator:
     """评分计算器"""
@@ -30,17 +68,16 @@ class ScoringCalculator:
         Returns:
             (原始评分, 原始评分)  # 两者相同，用于兼容现有接口
         """
-        # 验证分数不超过最高分
-        if raw_score > max_score:
-            raw_score = max_score
-        if raw_score < 0:
-            raw_score = Decimal('0')
-
-        # 保留2位小数
-        raw_score = raw_score.quantize(Decimal('0.01'))
+        # 截断到 [0, 最高分] 并保留2位小数（整数"分"计算）
+        score = to_decimal(ScoringCalculator.indicator_score_cents(cents(raw_score), cents(max_score)))
 
         # 返回相同的分数（加权在维度级别计算）
-        return raw_score, raw_score
+        return score, score
+
+    @staticmethod
+    def indicator_score_cents(raw_cents: int, max_cents: int) -> int:
+        """指标得分（分）：原始评分截断到 [0, 最高分]"""
+        return min(max(raw_cents, 0), max_cents)
 
     @staticmethod
     def calculate_dimension_score(
@@ -61,20 +98,19 @@ class ScoringCalculator:
         if not indicator_scores:
             return Decimal('0'), Decimal('0')
 
-        # 维度总分 = 所有指标得分相加
-        total_score = sum(item['score'] for item in indicator_scores)
-        total_score = total_score.quantize(Decimal('0.01'))
+        # 维度总分 = 所有指标得分相加（得分都是两位小数时直接按整数"分"相加）
+        total_cents = _sum_cents(item['score'] for item in indicator_scores)
 
-        # 维度加权总分 = 维度总分 × (维度权重 / 100)
-        if dimension_weight is not None:
-            weighted_total = (total_score * dimension_weight) / Decimal('100')
-        else:
-            # 如果没有提供维度权重，使用未加权总分（向后兼容）
-            weighted_total = total_score
+        # 维度加权总分 = 维度总分 × (维度权重 / 100)；没有提供维度权重时使用未加权总分（向后兼容）
+        total_cents, weighted_cents = ScoringCalculator.dimension_score_cents([total_cents], dimension_weight)
 
-        weighted_total = weighted_total.quantize(Decimal('0.01'))
+        return to_decimal(total_cents), to_decimal(weighted_cents)
 
-        return total_score, weighted_total
+    @staticmethod
+    def dimension_score_cents(score_cents: Iterable[int], dimension_weight=None) -> Tuple[int, int]:
+        """维度总分和加权总分（分）"""
+        total = sum(score_cents)
+        return total, apply_weight(total, dimension_weight) if dimension_weight is not None else total
 
     @staticmethod
     def calculate_total_score(
@@ -90,13 +126,24 @@ class ScoringCalculator:
         Returns:
             (总分, 等级代码)
         """
-        total_score = sum(dimension_weighted_scores.values())
-        total_score = total_score.quantize(Decimal('0.01'))
+        total_cents, grade = ScoringCalculator.total_score_cents(
+            [_sum_cents(dimension_weighted_scores.values())]
+        )
+        return to_decimal(total_cents), grade
 
-        # 评定等级
-        grade = ScoringCalculator._determine_grade(total_score)
+    @staticmethod
+    def total_score_cents(dimension_cents: Iterable[int]) -> Tuple[int, str]:
+        """总分（分）和等级代码"""
+        total = sum(dimension_cents)
+        return total, ScoringCalculator.grade_for_cents(total)
 
-        return total_score, grade
+    @staticmethod
+    def grade_for_cents(total_cents: int) -> str:
+        """根据总分（分）确定等级"""
+        for grade, min_cents in _GRADE_MIN_CENTS:
+            if total_cents >= min_cents:
+                return grade
+        return 'unqualified'
 
     @staticmethod
     def _determine_grade(total_score: Decimal) -> str:
@@ -135,24 +182,23 @@ class ScoringCalculator:
         Returns:
             (是否完整, 缺失的指标列表)
         """
-        missing_indicators = []
-
-        for dim_code, dimension in SCORING_DIMENSIONS.items():
-            for indicator in dimension['indicators']:
-                # 检查该指标是否有评分
-                indicator_found = False
-                for score_record in dimension_scores.get(dim_code, []):
-                    if score_record.get('indicator_code') == indicator['code']:
-                        indicator_found = True
-                        if score_record.get('score') is None:
-                            missing_indicators.append(f"{dimension['name']}-{indicator['name']}")
-                        break
-
-                if not indicator_found:
-                    missing_indicators.append(f"{dimension['name']}-{indicator['name']}")
-
-        is_complete = len(missing_indicators) == 0
-        return is_complete, missing_indicators
+        # 一趟扫描得到已评分位图：每个指标取本维度的第一条评分记录
+        seen = scored = 0
+        for dim_code, dim_mask in _DIMENSION_MASKS.items():
+            for score_record in dimension_scores.get(dim_code, []):
+                bit = _INDICATOR_BITS.get(score_record.get('indicator_code'))
+                if bit is None or not dim_mask >> bit & 1 or seen >> bit & 1:
+                    continue
+                seen |= 1 << bit
+                if score_record.get('score') is not None:
+                    scored |= 1 << bit
+
+        if scored == _COMPLETE_MASK:
+            return True, []
+        missing_indicators = [
+            label for bit, label in enumerate(_INDICATOR_LABELS) if not scored >> bit & 1
+        ]
+        return False, missing_indicators
 
     @staticmethod
     def calculate_project_ranking(
@@ -179,18 +225,30 @@ class ScoringCalculator:
         )
 
         # 分配排名（处理并列情况）
-        for i, project in enumerate(sorted_scores):
-            if i == 0:
-                project['rank'] = 1
-            else:
-                prev_score = sorted_scores[i-1]['total_score']
-                curr_score = project['total_score']
-                if curr_score == prev_score:
-                    project['rank'] = sorted_scores[i-1]['rank']
-                else:
-                    project['rank'] = i + 1
-
-        return sorted_scores
+        return list(ScoringCalculator.rank_sorted_scores(sorted_scores))
+
+    @staticmethod
+    def rank_sorted_scores(sorted_scores: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        为已按总分降序排列的记录逐条分配排名（并列同名次，后续名次跳过）
+
+        不需要把全部记录放进内存，可以直接消费流式查询的结果。
+
+        Args:
+            sorted_scores: 按 total_score 降序排列的记录
+
+        Yields:
+            添加了rank字段的记录
+        """
+        prev_score = None
+        prev_rank = 0
+        for i, item in enumerate(sorted_scores):
+            curr_score = item['total_score']
+            if i == 0 or curr_score != prev_score:
+                prev_rank = i + 1
+            item['rank'] = prev_rank
+            prev_score = curr_score
+            yield item
 
 
 class ScoringStatistics:
@@ -0,0 +1,132 @@
+"""
+评分选项表
+
+导入时把 config/scoring_rules.SCORING_DIMENSIONS 编译一次，得到每个指标不可变的选项表：
+选项标签、分值（按分值降序）、满分、权重、编号和父子关系。评分页面、完整性校验和导出共用这些表，
+不再在每次页面刷新、每只基金、每个会话里重新解析 scoring_guide。
+
+RULE_SET_HASH 是评分规则和等级标准的内容指纹，规则有任何改动都会变化。
+"""
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+import hashlib
+import json
+
+from config.scoring_rules import GRADING_STANDARDS, SCORING_DIMENSIONS
+
+
+@dataclass(frozen=True)
+class ScoringOption:
+    """一个评分选项"""
+    label: str
+    score: float
+    description: str
+
+
+@dataclass(frozen=True)
+class IndicatorOptions:
+    """一个指标的选项表（父指标没有选项，得分为子指标之和）"""
+    code: str
+    name: str
+    dimension_code: str
+    number: str                       # 页面和导出中的编号，如 "1.2.3"
+    max_score: float
+    weight: float
+    options: Tuple[ScoringOption, ...]
+    parent_code: Optional[str] = None
+    children: Tuple[str, ...] = ()
+
+    @property
+    def is_parent(self) -> bool:
+        return bool(self.children)
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        return tuple(option.label for option in self.options)
+
+    @property
+    def scores(self) -> Tuple[float, ...]:
+        return tuple(option.score for option in self.options)
+
+    def index_of(self, score) -> int:
+        """分值对应的选项下标（精确匹配），没有匹配时为第一个选项"""
+        for i, option in enumerate(self.options):
+            if option.score == score:
+                return i
+        return 0
+
+
+def _compile_options(indicator: Dict) -> Tuple[ScoringOption, ...]:
+    """scoring_guide 的键为单个分值（"2.5"）或分数段（"80-90"，取最高分）；没有评分指南时为 0 到满分的整数"""
+    options = []
+    guide = indicator.get('scoring_guide')
+    if guide:
+        for score_range, description in guide.items():
+            if '-' in score_range:
+                min_score, max_score = score_range.split('-')
+                options.append(ScoringOption(f"{description} ({min_score}-{max_score}分)", float(max_score), description))
+            else:
+                options.append(ScoringOption(f"{description} ({score_range}分)", float(score_range), description))
+    else:
+        for i in range(int(indicator['max_score']) + 1):
+            options.append(ScoringOption(f"{i}分", float(i), f"{i}分"))
+    # 按分数降序排列（同分保持配置顺序）
+    return tuple(sorted(options, key=lambda option: option.score, reverse=True))
+
+
+def compile_option_tables(
+    dimensions: Mapping[str, Dict] = SCORING_DIMENSIONS
+) -> Tuple[Mapping[str, IndicatorOptions], Mapping[str, Tuple[str, ...]]]:
+    """
+    编译评分选项表
+
+    Returns:
+        ({指标编码: 选项表}, {维度编码: 该维度一级指标编码（按配置顺序）})
+    """
+    tables = {}
+    top_level = {}
+    for dim_idx, (dim_code, dimension) in enumerate(dimensions.items(), 1):
+        codes = []
+        for ind_idx, indicator in enumerate(dimension['indicators'], 1):
+            subs = indicator.get('sub_indicators', []) if indicator.get('type') == 'parent' else []
+            for sub_idx, sub in enumerate(subs, 1):
+                tables[sub['code']] = IndicatorOptions(
+                    code=sub['code'],
+                    name=sub['name'],
+                    dimension_code=dim_code,
+                    number=f"{dim_idx}.{ind_idx}.{sub_idx}",
+                    max_score=float(sub['max_score']),
+                    weight=float(sub.get('weight', 0)),
+                    options=_compile_options(sub),
+                    parent_code=indicator['code']
+                )
+            tables[indicator['code']] = IndicatorOptions(
+                code=indicator['code'],
+                name=indicator['name'],
+                dimension_code=dim_code,
+                number=f"{dim_idx}.{ind_idx}",
+                max_score=float(indicator['max_score']),
+                weight=float(indicator.get('weight', 0)),
+                options=() if subs else _compile_options(indicator),
+                children=tuple(sub['code'] for sub in subs)
+            )
+            codes.append(indicator['code'])
+        top_level[dim_code] = tuple(codes)
+    return MappingProxyType(tables), MappingProxyType(top_level)
+
+
+def rule_set_hash(dimensions: Mapping[str, Dict], grading: Mapping[str, Dict] = GRADING_STANDARDS) -> str:
+    """评分规则和等级标准的内容指纹（sha256 前16位）"""
+    payload = json.dumps({'dimensions': dimensions, 'grades': grading}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+# 导入时编译一次，进程内共享
+OPTION_TABLES, DIMENSION_INDICATORS = compile_option_tables()
+RULE_SET_HASH = rule_set_hash(SCORING_DIMENSIONS)
+
+
+def get_indicator_options(code: str) -> Optional[IndicatorOptions]:
+    """按指标编码取选项表，未配置的指标返回 None"""
+    return OPTION_TABLES.get(code)
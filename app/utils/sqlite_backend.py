@@ -0,0 +1,521 @@
+"""
+SQLite 数据库后端
+
+在没有 MySQL 的环境（本地开发、CI、性能测试）中运行整个仓储层：
+- 把仓储层用到的 MySQL 语法翻译成 SQLite 语法（%s 占位符、ON DUPLICATE KEY UPDATE、
+  UPDATE ... JOIN、JSON_ARRAYAGG、ENUM、ON UPDATE CURRENT_TIMESTAMP、内联索引等）
+- 提供与 pymysql DictCursor 用法一致的连接和游标（with conn.cursor()、字典行、lastrowid、rowcount）
+- 首次连接时按顺序执行 database/schema.sql 和结构迁移脚本
+
+通过 DB_BACKEND=sqlite 启用，DB_SQLITE_PATH 指定数据库文件，:memory: 表示进程内的内存数据库。
+"""
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Tuple
+
+from pymysql.cursors import SSCursor
+
+from app.utils.database import note_statement
+from app.utils.query_stats import record_query
+
+logger = logging.getLogger(__name__)
+
+DATABASE_DIR = Path(__file__).resolve().parent.parent.parent / "database"
+
+# 按顺序执行的建表脚本（数据迁移脚本只用于从旧版 MySQL 库升级，不在这里执行）
+SCHEMA_FILES = [
+    "schema.sql",
+    "migrations/add_funds_table.sql",
+    "migrations/create_investments_table.sql",
+    "migrations/002_add_hierarchical_indicators.sql",
+    "migrations/003_create_fund_scoring_tables.sql",
+    "migrations/004_create_scoring_catalog_version.sql",
+    "migrations/005_add_keyset_pagination_indexes.sql",
+    "migrations/006_create_fund_score_aggregates.sql",
+    "migrations/007_add_rule_set_hash.sql",
+    "migrations/008_create_fund_peer_rankings.sql",
+    "migrations/009_add_fund_scored_mask.sql",
+    "migrations/010_create_fund_ranking_version.sql",
+]
+
+MEMORY_PATH = ':memory:'
+_MEMORY_URI = 'file:fund_scoring_memory?mode=memory&cache=shared'
+
+
+# ==================== 类型转换 ====================
+
+def _convert_decimal(value: bytes):
+    return Decimal(value.decode())
+
+
+def _convert_timestamp(value: bytes):
+    text = value.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _convert_date(value: bytes):
+    text = value.decode()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+# 与 pymysql 保持一致：DECIMAL 列返回 Decimal，日期时间列返回 date/datetime
+sqlite3.register_adapter(Decimal, str)
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(' '))
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_converter('DECIMAL', _convert_decimal)
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+sqlite3.register_converter('DATETIME', _convert_timestamp)
+sqlite3.register_converter('DATE', _convert_date)
+
+
+# ==================== SQL 翻译 ====================
+
+_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`")
+_MASK = re.compile(r"\x00(\d+)\x00")
+_COMMENT = re.compile(r"--[^\n]*")
+_NAMED_PLACEHOLDER = re.compile(r"%\((\w+)\)s")
+
+_ON_DUPLICATE = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_FUNC = re.compile(r"\bVALUES\s*\(\s*(\w+)\s*\)", re.I)
+_NOW = re.compile(r"\bNOW\s*\(\s*\)", re.I)
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\b", re.I)
+_INSERT_IGNORE = re.compile(r"^\s*INSERT\s+IGNORE\b", re.I)
+_UPDATE_JOIN = re.compile(
+    r"^\s*UPDATE\s+(\w+)\s+(?:AS\s+)?(\w+)\s+(?:INNER\s+)?JOIN\s+(.*?)\s+(?:AS\s+)?(\w+)\s+ON\s+(.*?)"
+    r"\s+SET\s+(.*?)(?:\s+WHERE\s+(.*))?$",
+    re.I | re.S
+)
+_NULL_SAFE_EQUAL = re.compile(r"\s*<=>\s*")
+_JSON_ARRAYAGG = re.compile(r"\bJSON_ARRAYAGG\s*\(", re.I)
+
+_CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*)\)([^)]*)$", re.I | re.S)
+_ALTER_TABLE = re.compile(r"^\s*ALTER\s+TABLE\s+(\w+)\s+(.*)$", re.I | re.S)
+_RENAME_TABLE = re.compile(r"^\s*RENAME\s+TABLE\s+(\w+)\s+TO\s+(\w+)\s*$", re.I)
+_INDEX_DEF = re.compile(r"^(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)$", re.I | re.S)
+_UNIQUE_KEY_DEF = re.compile(r"^UNIQUE\s+(?:KEY|INDEX)\s+\w+\s*(\([^)]*\))$", re.I | re.S)
+_ENUM = re.compile(r"\bENUM\s*\(([^)]*)\)", re.I)
+_COLUMN_COMMENT = re.compile(r"\s+COMMENT\s+\x00\d+\x00", re.I)
+_ON_UPDATE_NOW = re.compile(r"\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP\b", re.I)
+_AUTO_INCREMENT = re.compile(r"\bAUTO_INCREMENT\b", re.I)
+_IGNORED = re.compile(r"^\s*(CREATE\s+DATABASE|USE|SET\s+NAMES|SET\s+FOREIGN_KEY_CHECKS)\b", re.I)
+
+
+def _mask_literals(sql: str) -> Tuple[str, List[str]]:
+    """把字符串字面量替换为占位标记，避免翻译规则误改字面量内容"""
+    literals = []
+
+    def keep(match):
+        text = match.group(0)
+        if text.startswith('`'):
+            text = '"' + text[1:-1] + '"'
+        literals.append(text)
+        return f"\x00{len(literals) - 1}\x00"
+
+    return _LITERAL.sub(keep, sql), literals
+
+
+def _unmask(sql: str, literals: List[str]) -> str:
+    return _MASK.sub(lambda m: literals[int(m.group(1))], sql)
+
+
+def _split_top_level(body: str) -> List[str]:
+    """按最外层逗号拆分（括号内的逗号不拆）"""
+    parts, depth, current = [], 0, []
+    for char in body:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    tail = ''.join(current).strip()
+    if tail:
+        parts.append(tail)
+    return parts
+
+
+def _translate_column(definition: str, table: str, extras: List[str]) -> str:
+    """翻译单个列定义"""
+    name = definition.split()[0]
+    if _AUTO_INCREMENT.search(definition):
+        return f"{name} INTEGER PRIMARY KEY AUTOINCREMENT"
+
+    definition = _COLUMN_COMMENT.sub('', definition)
+    definition = re.sub(r"\s+UNSIGNED\b", '', definition, flags=re.I)
+    if _ON_UPDATE_NOW.search(definition):
+        definition = _ON_UPDATE_NOW.sub('', definition)
+        extras.append(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_{name}_on_update AFTER UPDATE ON {table} "
+            f"FOR EACH ROW WHEN NEW.{name} IS OLD.{name} "
+            f"BEGIN UPDATE {table} SET {name} = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END"
+        )
+    enum = _ENUM.search(definition)
+    if enum:
+        definition = _ENUM.sub('TEXT', definition) + f" CHECK ({name} IN ({enum.group(1)}))"
+    return definition
+
+
+def _index_statement(table: str, name: str, columns: str, unique: bool) -> str:
+    # SQLite 的索引名在整个库内唯一，加上表名前缀
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    return f"CREATE {kind} IF NOT EXISTS {table}_{name} ON {table} ({columns.strip()})"
+
+
+def _translate_create_table(match) -> List[str]:
+    if_not_exists, table, body = match.group(1) or '', match.group(2), match.group(3)
+    items, extras = [], []
+    for item in _split_top_level(body):
+        index = _INDEX_DEF.match(item)
+        unique_key = _UNIQUE_KEY_DEF.match(item)
+        if unique_key:
+            items.append(f"UNIQUE {unique_key.group(1)}")
+        elif index:
+            extras.insert(0, _index_statement(table, index.group(2), index.group(3), bool(index.group(1))))
+        elif re.match(r"^(PRIMARY\s+KEY|FOREIGN\s+KEY|UNIQUE\s*\(|CONSTRAINT|CHECK)\b", item, re.I):
+            items.append(_COLUMN_COMMENT.sub('', item))
+        else:
+            items.append(_translate_column(item, table, extras))
+    create = f"CREATE TABLE {if_not_exists}{table} (\n    " + ",\n    ".join(items) + "\n)"
+    return [create] + extras
+
+
+def _translate_alter_table(match) -> List[str]:
+    table, clauses = match.group(1), match.group(2)
+    statements = []
+    for clause in _split_top_level(clauses):
+        add_column = re.match(r"^ADD\s+COLUMN\s+(.*)$", clause, re.I | re.S)
+        add_index = re.match(r"^ADD\s+(UNIQUE\s+)?(?:INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)$", clause, re.I | re.S)
+        if add_column:
+            extras = []
+            column = _translate_column(add_column.group(1), table, extras)
+            statements.append(f"ALTER TABLE {table} ADD COLUMN {column}")
+            statements.extend(extras)
+        elif add_index:
+            statements.append(_index_statement(table, add_index.group(2), add_index.group(3), bool(add_index.group(1))))
+        elif re.match(r"^ADD\s+(FOREIGN\s+KEY|CONSTRAINT)\b", clause, re.I):
+            # SQLite 不能给已有表追加约束，外键只在建表语句中生效
+            logger.debug(f"Skipping constraint on {table}: {clause}")
+        else:
+            statements.append(f"ALTER TABLE {table} {clause}")
+    return statements
+
+
+def _translate_update_join(match) -> str:
+    """UPDATE t a JOIN (...) r ON ... SET a.c = ... WHERE ... → UPDATE t AS a SET c = ... FROM (...) AS r WHERE ..."""
+    table, alias, source, source_alias, on, assignments, where = match.groups()
+    # SQLite 的 SET 左侧不能带表别名
+    assignments = re.sub(rf"(^|,)\s*{alias}\.(\w+)\s*=", r"\1 \2 =", assignments).strip()
+    condition = f"({on})" + (f" AND ({where})" if where else '')
+    return f"UPDATE {table} AS {alias} SET {assignments} FROM {source} AS {source_alias} WHERE {condition}"
+
+
+def _translate_dml(sql: str) -> str:
+    sql = _INSERT_IGNORE.sub('INSERT OR IGNORE', sql)
+    update_join = _UPDATE_JOIN.match(sql)
+    if update_join:
+        sql = _translate_update_join(update_join)
+    sql = _NULL_SAFE_EQUAL.sub(' IS ', sql)
+    sql = _JSON_ARRAYAGG.sub('json_group_array(', sql)
+    duplicate = _ON_DUPLICATE.search(sql)
+    if duplicate:
+        head, tail = sql[:duplicate.start()], sql[duplicate.end():]
+        sql = head + "ON CONFLICT DO UPDATE SET" + _VALUES_FUNC.sub(r"excluded.\1", tail)
+    sql = _NOW.sub('CURRENT_TIMESTAMP', sql)
+    sql = _FOR_UPDATE.sub('', sql)
+    return sql
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(sql: str, has_params: bool = True) -> Tuple[str, ...]:
+    """
+    把一条 MySQL 语句翻译为一条或多条 SQLite 语句
+
+    Args:
+        sql: MySQL 语法的 SQL（pymysql 风格的 %s / %(name)s 占位符）
+        has_params: 是否带参数执行；与 pymysql 一致，只有带参数时 %% 才表示 %
+
+    Returns:
+        SQLite 语句元组（不需要执行时为空元组）
+    """
+    masked, literals = _mask_literals(sql)
+    masked = _COMMENT.sub('', masked).strip().rstrip(';').strip()
+    if not masked or _IGNORED.match(masked):
+        return ()
+
+    masked = _NAMED_PLACEHOLDER.sub(r":\1", masked).replace('%s', '?')
+    if has_params:
+        masked = masked.replace('%%', '%')
+
+    create = _CREATE_TABLE.match(masked)
+    alter = _ALTER_TABLE.match(masked)
+    rename = _RENAME_TABLE.match(masked)
+    if create:
+        statements = _translate_create_table(create)
+    elif alter:
+        statements = _translate_alter_table(alter)
+    elif rename:
+        statements = [f"ALTER TABLE {rename.group(1)} RENAME TO {rename.group(2)}"]
+    else:
+        statements = [_translate_dml(masked)]
+    return tuple(_unmask(statement, literals) for statement in statements)
+
+
+def split_statements(script: str) -> List[str]:
+    """把 SQL 脚本按分号拆分为语句（忽略字面量和注释中的分号）"""
+    masked, literals = _mask_literals(script)
+    masked = _COMMENT.sub('', masked)
+    return [_unmask(s, literals).strip() for s in masked.split(';') if s.strip()]
+
+
+# ==================== 连接与游标 ====================
+
+def _dict_factory(cursor, row):
+    return {column[0]: row[index] for index, column in enumerate(cursor.description)}
+
+
+def _concat(*args):
+    # 与 MySQL 一致：任一参数为 NULL 时结果为 NULL
+    if any(arg is None for arg in args):
+        return None
+    return ''.join(str(arg) for arg in args)
+
+
+def _params(args):
+    if args is None:
+        return ()
+    if isinstance(args, (tuple, dict)):
+        return args
+    if isinstance(args, list):
+        return tuple(args)
+    return (args,)
+
+
+class SQLiteCursor:
+    """
+    pymysql DictCursor 风格的 SQLite 游标
+
+    默认与 DictCursor 一样在 execute 时取回全部结果；buffered=False 时与 SSDictCursor 一样
+    按需逐批读取，耗时和行数在游标关闭时记录。
+    """
+
+    def __init__(self, connection: 'SQLiteConnection', buffered: bool = True):
+        self.connection = connection
+        self.buffered = buffered
+        self._cursor = connection.raw.cursor()
+        self._rows = None
+        self._position = 0
+        self._pending = None
+        self._streamed = 0
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+
+    def _flush_record(self):
+        if self._pending is not None:
+            query, args, started = self._pending
+            self._pending = None
+            record_query(query, args, started, self._streamed)
+
+    def execute(self, query: str, args=None):
+        self._flush_record()
+        note_statement(query)
+        started = time.perf_counter()
+        params = _params(args)
+        statements = translate_sql(query, args is not None)
+        self._rows = None
+        self._position = 0
+        self.rowcount = 0
+        self.description = None
+        for index, statement in enumerate(statements):
+            self._cursor.execute(statement, params if index == 0 else ())
+        if statements:
+            self.lastrowid = self._cursor.lastrowid
+            self.description = self._cursor.description
+            if self.description is not None and not self.buffered:
+                self._pending = (query, args, started)
+                self._streamed = 0
+                return -1
+            if self.description is not None:
+                self._rows = self._cursor.fetchall()
+                self.rowcount = len(self._rows)
+            else:
+                self.rowcount = self._cursor.rowcount
+        record_query(query, args, started, self.rowcount)
+        return self.rowcount
+
+    def executemany(self, query: str, args):
+        note_statement(query)
+        started = time.perf_counter()
+        statements = translate_sql(query, True)
+        self._rows = None
+        self.description = None
+        self.rowcount = 0
+        if statements:
+            self._cursor.executemany(statements[0], [_params(a) for a in args])
+            for statement in statements[1:]:
+                self._cursor.execute(statement)
+            self.rowcount = self._cursor.rowcount
+            self.lastrowid = self._cursor.lastrowid
+        record_query(query, args, started, self.rowcount)
+        return self.rowcount
+
+    def fetchone(self):
+        if self._rows is None:
+            row = self._cursor.fetchone() if self.description is not None else None
+            self._streamed += row is not None
+            return row
+        if self._position >= len(self._rows):
+            return None
+        row = self._rows[self._position]
+        self._position += 1
+        return row
+
+    def fetchmany(self, size: int = None):
+        size = size or self._cursor.arraysize
+        if self._rows is None:
+            rows = self._cursor.fetchmany(size) if self.description is not None else []
+            self._streamed += len(rows)
+            return rows
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        if self._rows is None:
+            rows = self._cursor.fetchall() if self.description is not None else []
+            self._streamed += len(rows)
+            return rows
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor.close()
+        self._flush_record()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SQLiteConnection:
+    """pymysql 连接风格的 SQLite 连接"""
+
+    def __init__(self, raw: sqlite3.Connection):
+        self.raw = raw
+        self.open = True
+
+    def cursor(self, cursor=None) -> SQLiteCursor:
+        """cursor 为 SSCursor/SSDictCursor（及其子类）时返回按需读取的游标"""
+        buffered = not (isinstance(cursor, type) and issubclass(cursor, SSCursor))
+        return SQLiteCursor(self, buffered=buffered)
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def ping(self, reconnect: bool = False):
+        self.raw.execute("SELECT 1")
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self.raw.close()
+
+
+# ==================== 建库 ====================
+
+_bootstrap_lock = threading.Lock()
+_bootstrapped = set()
+_memory_anchor = None
+
+
+def bootstrap(connection: SQLiteConnection):
+    """按顺序执行建表脚本和结构迁移，已执行过的脚本记录在 schema_migrations 中"""
+    raw = connection.raw
+    raw.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "name TEXT PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    applied = {row['name'] for row in raw.execute("SELECT name FROM schema_migrations")}
+    for name in SCHEMA_FILES:
+        if name in applied:
+            continue
+        script = (DATABASE_DIR / name).read_text(encoding='utf-8')
+        with connection.cursor() as cursor:
+            for statement in split_statements(script):
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+        connection.commit()
+        logger.info(f"Applied {name} to SQLite database")
+
+
+def connect(path: str) -> SQLiteConnection:
+    """
+    打开 SQLite 数据库（首次打开时自动建表）
+
+    Args:
+        path: 数据库文件路径，:memory: 表示进程内共享的内存数据库
+    """
+    global _memory_anchor
+    memory = path == MEMORY_PATH
+    target = _MEMORY_URI if memory else path
+    if not memory:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    raw = sqlite3.connect(
+        target,
+        uri=memory,
+        timeout=30,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=False
+    )
+    raw.row_factory = _dict_factory
+    raw.create_function('CONCAT', -1, _concat)
+    raw.create_function('NOW', 0, lambda: datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    raw.execute("PRAGMA foreign_keys = ON")
+    if not memory:
+        raw.execute("PRAGMA journal_mode = WAL")
+    connection = SQLiteConnection(raw)
+
+    with _bootstrap_lock:
+        if memory and _memory_anchor is None:
+            # 共享内存库在最后一个连接关闭时销毁，保留一个连接让数据在进程内一直存在
+            _memory_anchor = sqlite3.connect(target, uri=True, check_same_thread=False)
+        if target not in _bootstrapped:
+            bootstrap(connection)
+            _bootstrapped.add(target)
+    return connection
+
+
+def reset_memory_database():
+    """销毁进程内的内存数据库，下次连接时重新建表"""
+    global _memory_anchor
+    with _bootstrap_lock:
+        if _memory_anchor is not None:
+            _memory_anchor.close()
+            _memory_anchor = None
+        _bootstrapped.discard(_MEMORY_URI)
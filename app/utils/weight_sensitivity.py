@@ -0,0 +1,236 @@
+"""
+维度权重敏感性分析（what-if）
+
+一次载入全部基金的维度得分，对一批候选维度权重（方案）整体向量化计算：
+- 每个方案下的总分、等级分布和排名
+- 与当前排名的 Spearman / Kendall tau-b 等级相关系数（并列按平均名次 / tau-b 处理）
+- 等级变化的基金、进入和退出前 N 名的基金
+
+只在内存中计算，不读写数据库。总分以"分"（0.01）为单位的整数计算，
+维度得分的缩放规则见 BatchScoringEngine.scenario_totals。
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from app.utils.batch_scoring import BatchScoringEngine, to_cents
+
+# 每块方案的 方案数 × 基金数 上限，控制中间数组的内存
+_BLOCK_CELLS = 2_000_000
+
+
+def _row_searchsorted(sorted_rows: np.ndarray, values: np.ndarray, side: str) -> np.ndarray:
+    """
+    对每一行分别做 searchsorted（每行升序的非负整数）
+
+    给每行加上互不重叠的偏移量后拼成一维，一次 searchsorted 完成。
+    """
+    rows, width = sorted_rows.shape
+    span = int(max(sorted_rows.max(initial=0), values.max(initial=0))) + 1
+    offsets = np.arange(rows, dtype=np.int64)[:, None]
+    positions = np.searchsorted(
+        (sorted_rows + offsets * span).ravel(), (values + offsets * span).ravel(), side=side
+    )
+    return positions.reshape(values.shape) - offsets * width
+
+
+def average_ranks(values: np.ndarray) -> np.ndarray:
+    """每行的升序名次（从1开始），并列取平均名次"""
+    ordered = np.sort(values, axis=1)
+    less = _row_searchsorted(ordered, values, 'left')
+    not_greater = _row_searchsorted(ordered, values, 'right')
+    return (less + not_greater + 1) / 2
+
+
+def competition_ranks(values: np.ndarray) -> np.ndarray:
+    """每行的降序名次：1 + 严格更高的个数（与 ScoringCalculator.calculate_project_ranking 一致）"""
+    ordered = np.sort(values, axis=1)
+    return values.shape[1] - _row_searchsorted(ordered, values, 'right') + 1
+
+
+def spearman(baseline: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    每行与 baseline 的 Spearman 等级相关系数
+
+    Args:
+        baseline: (n,) 非负整数
+        values: (行数 × n) 非负整数
+
+    Returns:
+        (行数,)；任一方全部并列时为 nan
+    """
+    base = average_ranks(baseline[None, :])[0]
+    ranks = average_ranks(values)
+    base = base - base.mean()
+    ranks = ranks - ranks.mean(axis=1, keepdims=True)
+    denominator = np.sqrt((base ** 2).sum() * (ranks ** 2).sum(axis=1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (ranks @ base) / denominator
+
+
+def _tied_pairs(values: np.ndarray) -> np.ndarray:
+    """每行中取值相同的元素对数"""
+    ordered = np.sort(values, axis=1)
+    first = _row_searchsorted(ordered, ordered, 'left')
+    return (np.arange(values.shape[1])[None, :] - first).sum(axis=1)
+
+
+def _count_inversions(rows: np.ndarray) -> np.ndarray:
+    """
+    每行中 i < j 且 rows[i] > rows[j] 的对数
+
+    自底向上归并：每层把相邻的两个有序块配对，右块每个元素在左块中严格更大的个数
+    用一次整体 searchsorted 求出，再把两块合并排序。共 log2(n) 层。
+    """
+    count, n = rows.shape
+    size = 1 << max(n - 1, 0).bit_length()
+    # 补齐到2的幂：补位在末尾且大于所有值，不会产生逆序
+    blocks = np.full((count, size), int(rows.max(initial=0)) + 1, dtype=np.int64)
+    blocks[:, :n] = rows
+    inversions = np.zeros(count, dtype=np.int64)
+    width = 1
+    while width < size:
+        pairs = blocks.reshape(count, size // (2 * width), 2, width)
+        left = pairs[:, :, 0, :].reshape(-1, width)
+        right = pairs[:, :, 1, :].reshape(-1, width)
+        greater = width - _row_searchsorted(left, right, 'right')
+        inversions += greater.reshape(count, -1).sum(axis=1)
+        blocks = np.sort(blocks.reshape(count, -1, 2 * width), axis=2).reshape(count, size)
+        width *= 2
+    return inversions
+
+
+def kendall_tau_b(baseline: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    每行与 baseline 的 Kendall tau-b 相关系数，O(n log² n)
+
+    按 (baseline, 行值) 排序后，不一致对数就是行值序列的逆序对数。
+
+    Returns:
+        (行数,)；任一方全部并列时为 nan
+    """
+    n = baseline.shape[0]
+    total_pairs = n * (n - 1) // 2
+    x_ties = int(_tied_pairs(baseline[None, :])[0])
+    y_ties = _tied_pairs(values)
+
+    # 把 baseline 的稠密名次放在高位，一次排序得到按 (baseline, 行值) 排列的行值序列
+    x_dense = np.unique(baseline, return_inverse=True)[1].astype(np.int64)
+    span = int(values.max(initial=0)) + 1
+    joint = np.sort(x_dense[None, :] * span + values, axis=1)
+    joint_ties = _tied_pairs(joint)
+    discordant = _count_inversions(joint % span)
+
+    numerator = total_pairs - x_ties - y_ties + joint_ties - 2 * discordant
+    denominator = np.sqrt(float(total_pairs - x_ties) * (total_pairs - y_ties).astype(np.float64))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return numerator / denominator
+
+
+@dataclass
+class ScenarioResult:
+    """一个权重方案的分析结果"""
+    weights: Dict[str, float]
+    grade_counts: Dict[str, int]
+    spearman: float
+    kendall: float
+    grade_changed: List[int] = field(default_factory=list)     # 等级变化的基金ID
+    entered_top: List[int] = field(default_factory=list)       # 新进入前 N 名的基金ID
+    left_top: List[int] = field(default_factory=list)          # 退出前 N 名的基金ID
+
+
+class WeightSensitivity:
+    """载入了全部基金维度得分的权重敏感性分析器"""
+
+    def __init__(
+        self,
+        fund_ids: Sequence[int],
+        dimension_scores,
+        engine: Optional[BatchScoringEngine] = None,
+        fund_names: Optional[Mapping[int, str]] = None
+    ):
+        """
+        Args:
+            fund_ids: 基金ID
+            dimension_scores: (基金数 × 维度数) 维度得分，列顺序为 engine.dimension_codes
+            engine: 评分规则编译出的计算器（提供当前维度权重和等级标准）
+            fund_names: {基金ID: 名称}，页面展示用
+        """
+        self.engine = engine or BatchScoringEngine()
+        self.fund_ids = np.asarray(fund_ids, dtype=np.int64)
+        self.fund_names = dict(fund_names or {})
+        self.dimension_cents = to_cents(
+            np.asarray(dimension_scores, dtype=np.float64).reshape(len(self.fund_ids), len(self.engine.dimension_codes))
+        )
+        self.baseline_totals = self.dimension_cents.sum(axis=1)
+        self.baseline_grades = self.engine.grade_index(self.baseline_totals)
+        self.baseline_ranks = competition_ranks(self.baseline_totals[None, :])[0] if len(self.fund_ids) else self.baseline_totals
+
+    @property
+    def dimension_codes(self):
+        return self.engine.dimension_codes
+
+    @property
+    def current_weights(self) -> Dict[str, float]:
+        return {code: cents / 100 for code, cents in zip(self.dimension_codes, self.engine.dimension_weight_cents.tolist())}
+
+    def weight_matrix(self, scenarios: Sequence[Mapping[str, float]]) -> np.ndarray:
+        """把 [{维度编码: 权重}] 转成 (方案数 × 维度数) 权重矩阵，未给出的维度沿用当前权重"""
+        current = self.current_weights
+        return np.array(
+            [[float(scenario.get(code, current[code])) for code in self.dimension_codes] for scenario in scenarios],
+            dtype=np.float64
+        ).reshape(len(scenarios), len(self.dimension_codes))
+
+    def run(self, weights, top_n: int = 10, with_kendall: bool = True) -> List[ScenarioResult]:
+        """
+        计算一批权重方案
+
+        Args:
+            weights: (方案数 × 维度数) 权重矩阵，或 [{维度编码: 权重}]
+            top_n: 比较前 N 名（按名次，并列时可能多于 N 只）
+            with_kendall: 是否计算 Kendall tau-b（比 Spearman 慢，方案很多时可关闭）
+
+        Returns:
+            每个方案一个 ScenarioResult，顺序与输入一致
+        """
+        if len(weights) == 0:
+            return []
+        if isinstance(weights[0], Mapping):
+            weights = self.weight_matrix(weights)
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        count = len(self.fund_ids)
+        if count == 0:
+            return [
+                ScenarioResult(dict(zip(self.dimension_codes, row.tolist())), {}, float('nan'), float('nan'))
+                for row in weights
+            ]
+
+        baseline_top = self.baseline_ranks <= top_n
+        block = max(1, _BLOCK_CELLS // count)
+        results = []
+        for start in range(0, len(weights), block):
+            rows = weights[start:start + block]
+            totals = self.engine.scenario_totals(self.dimension_cents, rows)
+            grades = self.engine.grade_index(totals)
+            top = competition_ranks(totals) <= top_n
+            rho = spearman(self.baseline_totals, totals)
+            tau = kendall_tau_b(self.baseline_totals, totals) if with_kendall else np.full(len(rows), np.nan)
+            grade_counts = np.stack([(grades == g).sum(axis=1) for g in range(len(self.engine.grade_codes))], axis=1)
+
+            for i, row in enumerate(rows):
+                results.append(ScenarioResult(
+                    weights=dict(zip(self.dimension_codes, row.tolist())),
+                    grade_counts={code: int(n) for code, n in zip(self.engine.grade_codes, grade_counts[i])},
+                    spearman=float(rho[i]),
+                    kendall=float(tau[i]),
+                    grade_changed=self.fund_ids[grades[i] != self.baseline_grades].tolist(),
+                    entered_top=self.fund_ids[top[i] & ~baseline_top].tolist(),
+                    left_top=self.fund_ids[baseline_top & ~top[i]].tolist()
+                ))
+        return results
+
+    def scenario_totals(self, weights) -> np.ndarray:
+        """单独取某些方案下每只基金的总分（分）"""
+        return self.engine.scenario_totals(self.dimension_cents, np.atleast_2d(weights))
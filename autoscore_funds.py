@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+按指标数据自动评分
+
+读取指标数据文件（.csv 或 Excel，每行一只基金：基金编码列加若干指标数据列），
+按 config/scoring_rules.METRIC_BANDS 的分档把数据映射为叶子指标得分，批量写入并重算
+父指标、维度汇总、已有总分和排名。可用的列见 --list-metrics。
+
+使用方法:
+    python autoscore_funds.py metrics.csv --scorer admin
+    python autoscore_funds.py metrics.xlsx --scorer admin --chunk-size 1000
+    python autoscore_funds.py --list-metrics
+"""
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.metric_bands import METRIC_BAND_TABLES
+
+
+def list_metrics():
+    print("可自动评分的指标（列名可用字段名或中文名称）:")
+    for band in METRIC_BAND_TABLES.values():
+        print(f"  {band.code:<14} {band.metric:<30} {band.name}（{band.unit}）")
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description='按指标数据自动评分')
+    parser.add_argument('path', nargs='?', help='指标数据文件（.csv / .xlsx）')
+    parser.add_argument('--scorer', help='记为评分人的用户名')
+    parser.add_argument('--chunk-size', type=int, default=None, help='每批基金数（默认 RESCORE_CHUNK_SIZE）')
+    parser.add_argument('--list-metrics', action='store_true', help='列出可自动评分的指标数据列')
+    args = parser.parse_args()
+
+    if args.list_metrics:
+        list_metrics()
+        return True
+    if not args.path or not args.scorer:
+        parser.error('需要指标数据文件和 --scorer')
+
+    from core.repositories.user_repository import UserRepository
+    from core.services.autoscore_service import autoscore_funds, load_metrics_file
+
+    try:
+        scorer = UserRepository().get_by_username(args.scorer)
+        if not scorer:
+            print(f"❌ 用户不存在: {args.scorer}")
+            return False
+
+        metrics = load_metrics_file(args.path)
+        print(f"开始按指标数据自动评分（{len(metrics)} 行）...")
+        report = autoscore_funds(metrics, scorer['id'], chunk_size=args.chunk_size)
+        for column, code in report.columns.items():
+            print(f"  {column} → {code}")
+        print(f"✓ 评分 {report.funds} 只基金、{report.scores} 项指标，用时 {report.seconds:.1f}s"
+              f"（{report.funds_per_second:.0f} 只/秒）")
+        print(f"  汇总或总分有变化的基金: {report.changed_funds}，等级变化: {report.grade_changes}，"
+              f"排名变化: {report.rank_changes}")
+        if report.invalid_cells:
+            print(f"⚠️ {report.invalid_cells} 个单元格无法解析为数值，未评分")
+        if report.unknown_funds:
+            print(f"⚠️ {len(report.unknown_funds)} 个基金编码不存在: {', '.join(report.unknown_funds[:20])}")
+        print("\n✅ 自动评分完成")
+        return True
+    except Exception as e:
+        print(f"❌ 自动评分失败: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -426,6 +426,125 @@ SCORING_DIMENSIONS = {
     }
 }
 
+# 可按指标数据自动评分的叶子指标（app/utils/metric_bands.py 编译）
+# bands 按下限升序，每档为 (下限, 是否含下限, 得分)，数据低于第一档时得 base 分；
+# 得分必须是 scoring_guide 中的分值。比例类数据按百分数填写（72.5 表示 72.5%）。
+METRIC_BANDS = {
+    'POLICY_01': {
+        'metric': 'new_productivity_ratio',
+        'name': '投向新质生产力领域比例',
+        'unit': '%',
+        'base': 0,
+        'bands': [(0, False, 1), (10, True, 2), (20, True, 3), (30, True, 4), (40, True, 5),
+                  (50, True, 6), (60, True, 7), (70, True, 8), (80, True, 9), (90, True, 10)]
+    },
+    'POLICY_02_01': {
+        'metric': 'new_patent_count',
+        'name': '新增发明专利或技术成果数',
+        'unit': '项',
+        'base': 0,
+        'bands': [(1, True, 0.5), (2, True, 1), (3, True, 1.5), (4, True, 2), (5, True, 2.5), (6, True, 3)]
+    },
+    'POLICY_03_01': {
+        'metric': 'reinvestment_ratio',
+        'name': '返投比例',
+        'unit': '%',
+        'base': 3,
+        'bands': [(50, True, 2), (100, True, 1), (150, True, 0)]
+    },
+    'POLICY_04_01': {
+        'metric': 'carbon_reduction_ratio',
+        'name': '碳减排比例',
+        'unit': '%',
+        'base': 0,
+        'bands': [(1, True, 1), (3, True, 2), (5, True, 3)]
+    },
+    'POLICY_04_02': {
+        'metric': 'green_investment_ratio',
+        'name': '绿色发展投向比例',
+        'unit': '%',
+        'base': 0,
+        'bands': [(0, False, 1), (20, False, 2)]
+    },
+    'POLICY_05': {
+        'metric': 'private_enterprise_ratio',
+        'name': '民营企业占比',
+        'unit': '%',
+        'base': 0,
+        'bands': [(10, True, 1), (20, True, 2), (30, True, 3), (40, True, 4), (50, True, 5)]
+    },
+    'POLICY_07': {
+        'metric': 'social_capital_ratio',
+        'name': '社会资本占比',
+        'unit': '%',
+        'base': 0,
+        'bands': [(10, True, 1), (20, True, 2), (30, True, 3), (40, True, 4), (50, True, 5)]
+    },
+    'POLICY_08_01': {
+        'metric': 'contribution_rank_percentile',
+        'name': '就业/税收/营收排名百分位（前 x%）',
+        'unit': '%',
+        'base': 5,
+        'bands': [(10, False, 4), (30, False, 3), (50, False, 2), (70, False, 1), (90, False, 0)]
+    },
+    'LAYOUT_02': {
+        'metric': 'key_sector_ratio',
+        'name': '重点投向领域比例',
+        'unit': '%',
+        'base': 0,
+        'bands': [(30, True, 4), (50, True, 6), (70, True, 8), (90, True, 10)]
+    },
+    'LAYOUT_03_01': {
+        'metric': 'capacity_utilization_gap',
+        'name': '产能利用率与行业平均水平之差',
+        'unit': '百分点',
+        'base': 0,
+        'bands': [(-5, True, 3), (5, False, 5)]
+    },
+    'LAYOUT_03_02': {
+        'metric': 'asset_turnover_ratio',
+        'name': '资产周转率',
+        'unit': '%',
+        'base': 0,
+        'bands': [(60, True, 3), (80, True, 4), (100, True, 5)]
+    },
+    'EXEC_01_01': {
+        'metric': 'paid_in_ratio',
+        'name': '出资完成比例',
+        'unit': '%',
+        'base': 0,
+        'bands': [(30, True, 0.5), (50, True, 1)]
+    },
+    'EXEC_01_02': {
+        'metric': 'idle_fund_ratio',
+        'name': '闲置资金占比',
+        'unit': '%',
+        'base': 1,
+        'bands': [(30, True, 0)]
+    },
+    'EXEC_01_03': {
+        'metric': 'irr',
+        'name': '内部收益率',
+        'unit': '%',
+        'base': 0,
+        'bands': [(3, True, 1)]
+    },
+    'EXEC_01_04': {
+        'metric': 'asset_appreciation_ratio',
+        'name': '资产增值率',
+        'unit': '%',
+        'base': 0,
+        'bands': [(5, True, 1)]
+    },
+    'EXEC_02_01': {
+        'metric': 'executive_experience_years',
+        'name': '高级管理人员从业年限',
+        'unit': '年',
+        'base': 0,
+        'bands': [(10, False, 1)]
+    }
+}
+
 # 等级划分标准
 GRADING_STANDARDS = {
     'excellent': {'min': 90.0, 'name': '优秀', 'color': '#52c41a'},
@@ -1,11 +1,13 @@
 """
 基金数据访问类
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from decimal import Decimal
 import logging
 
 from app.utils.database import get_db_connection
+from app.utils.pagination import Page, build_page, keyset_sql
+from core.repositories.scoring_repository import refresh_peer_rankings, remove_fund_from_aggregates
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +42,7 @@ class FundRepository:
     def get_by_id(self, fund_id: int) -> Optional[dict]:
         """根据ID获取基金"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT f.*, u.real_name as creator_name
@@ -57,7 +59,7 @@ class FundRepository:
     def get_by_code(self, fund_code: str) -> Optional[dict]:
         """根据基金编码获取基金"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT f.*, u.real_name as creator_name
@@ -71,6 +73,47 @@ class FundRepository:
             logger.error(f"Error getting fund by code: {str(e)}")
             raise
 
+    def get_ids_by_codes(self, fund_codes: List[str], chunk_size: int = 500) -> Dict[str, int]:
+        """按基金编码批量查找基金ID，不存在的编码不在结果中"""
+        try:
+            ids = {}
+            codes = list(dict.fromkeys(fund_codes))
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    for start in range(0, len(codes), chunk_size):
+                        chunk = codes[start:start + chunk_size]
+                        cursor.execute(
+                            f"SELECT id, fund_code FROM funds WHERE fund_code IN ({','.join(['%s'] * len(chunk))})",
+                            chunk
+                        )
+                        ids.update((row['fund_code'], row['id']) for row in cursor.fetchall())
+            return ids
+        except Exception as e:
+            logger.error(f"Error getting fund ids by code: {str(e)}")
+            raise
+
+    @staticmethod
+    def _list_sql(status: Optional[str], region: Optional[str], fund_type: Optional[str]):
+        """基金列表查询及筛选条件"""
+        sql = """
+            SELECT f.*, u.real_name as creator_name
+            FROM funds f
+            LEFT JOIN users u ON f.created_by = u.id
+            WHERE 1=1
+        """
+        params = []
+
+        if status:
+            sql += " AND f.status = %s"
+            params.append(status)
+        if region:
+            sql += " AND f.region = %s"
+            params.append(region)
+        if fund_type:
+            sql += " AND f.fund_type = %s"
+            params.append(fund_type)
+        return sql, params
+
     def list_funds(
         self,
         status: Optional[str] = None,
@@ -78,42 +121,36 @@ class FundRepository:
         fund_type: Optional[str] = None,
         limit: int = 100
     ) -> List[dict]:
-        """查询基金列表"""
-        try:
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = """
-                        SELECT f.*, u.real_name as creator_name
-                        FROM funds f
-                        LEFT JOIN users u ON f.created_by = u.id
-                        WHERE 1=1
-                    """
-                    params = []
+        """查询基金列表（最新的 limit 条）"""
+        return self.list_funds_page(status, region, fund_type, limit=limit).items
 
-                    if status:
-                        sql += " AND f.status = %s"
-                        params.append(status)
-                    if region:
-                        sql += " AND f.region = %s"
-                        params.append(region)
-                    if fund_type:
-                        sql += " AND f.fund_type = %s"
-                        params.append(fund_type)
-
-                    sql += " ORDER BY f.created_at DESC LIMIT %s"
-                    params.append(limit)
-
-                    cursor.execute(sql, tuple(params))
-                    return cursor.fetchall()
+    def list_funds_page(
+        self,
+        status: Optional[str] = None,
+        region: Optional[str] = None,
+        fund_type: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page:
+        """按创建时间倒序分页查询基金列表（cursor 为上一页返回的 next_cursor）"""
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as db_cursor:
+                    sql, params = self._list_sql(status, region, fund_type)
+                    condition, order, page_params = keyset_sql('f', cursor, limit)
+                    db_cursor.execute(sql + condition + order, tuple(params + page_params))
+                    return build_page(db_cursor.fetchall(), limit)
         except Exception as e:
             logger.error(f"Error listing funds: {str(e)}")
             raise
 
     def update(self, fund_id: int, fund: dict) -> bool:
-        """更新基金信息"""
+        """更新基金信息（地区或基金类型有变化时同一事务中重算同组排名）"""
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
+                    cursor.execute("SELECT region, fund_type FROM funds WHERE id = %s FOR UPDATE", (fund_id,))
+                    old = cursor.fetchone()
                     sql = """
                         UPDATE funds SET
                             fund_name = %s, fund_manager = %s, total_amount = %s,
@@ -127,8 +164,11 @@ class FundRepository:
                         fund.get('region'), fund.get('department'), fund.get('description'),
                         fund_id
                     ))
+                    updated = cursor.rowcount > 0
+                    if old and (old['region'], old['fund_type']) != (fund.get('region'), fund.get('fund_type')):
+                        refresh_peer_rankings(cursor)
                     conn.commit()
-                    return cursor.rowcount > 0
+                    return updated
         except Exception as e:
             logger.error(f"Error updating fund: {str(e)}")
             raise
@@ -147,14 +187,18 @@ class FundRepository:
             raise
 
     def delete(self, fund_id: int) -> bool:
-        """删除基金"""
+        """删除基金（评分数据级联删除，同一事务中从汇总统计中减去并重算同组排名）"""
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
+                    remove_fund_from_aggregates(cursor, fund_id)
                     sql = "DELETE FROM funds WHERE id = %s"
                     cursor.execute(sql, (fund_id,))
+                    deleted = cursor.rowcount > 0
+                    if deleted:
+                        refresh_peer_rankings(cursor)
                     conn.commit()
-                    return cursor.rowcount > 0
+                    return deleted
         except Exception as e:
             logger.error(f"Error deleting fund: {str(e)}")
             raise
@@ -162,7 +206,7 @@ class FundRepository:
     def count_funds(self, status: Optional[str] = None) -> int:
         """统计基金数量"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT COUNT(*) as count FROM funds"
                     if status:
@@ -176,10 +220,32 @@ class FundRepository:
             logger.error(f"Error counting funds: {str(e)}")
             return 0
 
+    def list_recent_with_scores(self, limit: int = 10) -> List[dict]:
+        """获取最近创建的活跃/已完成基金及其总分和等级"""
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        SELECT f.fund_code, f.fund_name, f.status,
+                               COALESCE(ft.total_score, 0) as total_score,
+                               ft.grade,
+                               f.created_at
+                        FROM funds f
+                        LEFT JOIN fund_total_scores ft ON f.id = ft.fund_id
+                        WHERE f.status IN ('active', 'completed')
+                        ORDER BY f.created_at DESC
+                        LIMIT %s
+                    """
+                    cursor.execute(sql, (limit,))
+                    return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error listing recent funds with scores: {str(e)}")
+            raise
+
     def get_regions(self) -> List[str]:
         """获取所有地区列表"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT DISTINCT region FROM funds WHERE region IS NOT NULL ORDER BY region"
                     cursor.execute(sql)
@@ -191,7 +257,7 @@ class FundRepository:
     def get_fund_types(self) -> List[str]:
         """获取所有基金类型列表"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT DISTINCT fund_type FROM funds WHERE fund_type IS NOT NULL ORDER BY fund_type"
                     cursor.execute(sql)
@@ -203,7 +269,7 @@ class FundRepository:
     def get_fund_investments(self, fund_id: int) -> List[dict]:
         """获取基金下的所有投资"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT i.*, u.real_name as creator_name
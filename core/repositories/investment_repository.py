@@ -6,6 +6,7 @@ from decimal import Decimal
 import logging
 
 from app.utils.database import get_db_connection
+from app.utils.pagination import Page, build_page, keyset_sql
 
 logger = logging.getLogger(__name__)
 
@@ -41,7 +42,7 @@ class InvestmentRepository:
     def get_by_id(self, investment_id: int) -> Optional[dict]:
         """根据ID获取投资"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT i.*, u.real_name as creator_name,
@@ -60,7 +61,7 @@ class InvestmentRepository:
     def get_by_code(self, investment_code: str) -> Optional[dict]:
         """根据投资编码获取投资"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT i.*, u.real_name as creator_name,
@@ -76,6 +77,30 @@ class InvestmentRepository:
             logger.error(f"Error getting investment by code: {str(e)}")
             raise
 
+    @staticmethod
+    def _list_sql(fund_id: Optional[int], status: Optional[str], industry: Optional[str]):
+        """投资列表查询及筛选条件"""
+        sql = """
+            SELECT i.*, u.real_name as creator_name,
+                   f.fund_name, f.fund_code
+            FROM investments i
+            LEFT JOIN users u ON i.created_by = u.id
+            LEFT JOIN funds f ON i.fund_id = f.id
+            WHERE 1=1
+        """
+        params = []
+
+        if fund_id:
+            sql += " AND i.fund_id = %s"
+            params.append(fund_id)
+        if status:
+            sql += " AND i.status = %s"
+            params.append(status)
+        if industry:
+            sql += " AND i.industry = %s"
+            params.append(industry)
+        return sql, params
+
     def list_investments(
         self,
         fund_id: Optional[int] = None,
@@ -83,35 +108,25 @@ class InvestmentRepository:
         industry: Optional[str] = None,
         limit: int = 100
     ) -> List[dict]:
-        """查询投资列表"""
-        try:
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = """
-                        SELECT i.*, u.real_name as creator_name,
-                               f.fund_name, f.fund_code
-                        FROM investments i
-                        LEFT JOIN users u ON i.created_by = u.id
-                        LEFT JOIN funds f ON i.fund_id = f.id
-                        WHERE 1=1
-                    """
-                    params = []
-
-                    if fund_id:
-                        sql += " AND i.fund_id = %s"
-                        params.append(fund_id)
-                    if status:
-                        sql += " AND i.status = %s"
-                        params.append(status)
-                    if industry:
-                        sql += " AND i.industry = %s"
-                        params.append(industry)
+        """查询投资列表（最新的 limit 条）"""
+        return self.list_investments_page(fund_id, status, industry, limit=limit).items
 
-                    sql += " ORDER BY i.created_at DESC LIMIT %s"
-                    params.append(limit)
-
-                    cursor.execute(sql, tuple(params))
-                    return cursor.fetchall()
+    def list_investments_page(
+        self,
+        fund_id: Optional[int] = None,
+        status: Optional[str] = None,
+        industry: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page:
+        """按创建时间倒序分页查询投资列表（cursor 为上一页返回的 next_cursor）"""
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as db_cursor:
+                    sql, params = self._list_sql(fund_id, status, industry)
+                    condition, order, page_params = keyset_sql('i', cursor, limit)
+                    db_cursor.execute(sql + condition + order, tuple(params + page_params))
+                    return build_page(db_cursor.fetchall(), limit)
         except Exception as e:
             logger.error(f"Error listing investments: {str(e)}")
             raise
@@ -119,7 +134,7 @@ class InvestmentRepository:
     def get_investments_for_scoring(self) -> List[dict]:
         """获取待评分投资列表"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT i.*, f.fund_name, f.fund_code
@@ -187,7 +202,7 @@ class InvestmentRepository:
     def count_investments(self, status: Optional[str] = None, fund_id: Optional[int] = None) -> int:
         """统计投资数量"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT COUNT(*) as count FROM investments WHERE 1=1"
                     params = []
@@ -207,7 +222,7 @@ class InvestmentRepository:
     def get_industries(self) -> List[str]:
         """获取所有行业列表"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT DISTINCT industry FROM investments WHERE industry IS NOT NULL ORDER BY industry"
                     cursor.execute(sql)
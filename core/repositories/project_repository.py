@@ -6,6 +6,7 @@ from decimal import Decimal
 import logging
 
 from app.utils.database import get_db_connection
+from app.utils.pagination import Page, build_page, keyset_sql
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +43,7 @@ class ProjectRepository:
     def get_by_id(self, project_id: int) -> Optional[dict]:
         """根据ID获取项目"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT p.*, u.real_name as creator_name
@@ -59,7 +60,7 @@ class ProjectRepository:
     def get_by_code(self, project_code: str) -> Optional[dict]:
         """根据项目编码获取项目"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT p.*, u.real_name as creator_name
@@ -73,41 +74,54 @@ class ProjectRepository:
             logger.error(f"Error getting project by code: {str(e)}")
             raise
 
+    @staticmethod
+    def _list_sql(status: Optional[str], region: Optional[str], industry: Optional[str]):
+        """项目列表查询及筛选条件"""
+        sql = """
+            SELECT p.*, u.real_name as creator_name
+            FROM projects p
+            LEFT JOIN users u ON p.created_by = u.id
+            WHERE 1=1
+        """
+        params = []
+
+        if status:
+            sql += " AND p.status = %s"
+            params.append(status)
+        if region:
+            sql += " AND p.region = %s"
+            params.append(region)
+        if industry:
+            sql += " AND p.industry = %s"
+            params.append(industry)
+        return sql, params
+
     def list_projects(
         self,
         status: Optional[str] = None,
         region: Optional[str] = None,
         industry: Optional[str] = None,
-        limit: int = 100,
-        offset: int = 0
+        limit: int = 100
     ) -> List[dict]:
-        """查询项目列表"""
-        try:
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = """
-                        SELECT p.*, u.real_name as creator_name
-                        FROM projects p
-                        LEFT JOIN users u ON p.created_by = u.id
-                        WHERE 1=1
-                    """
-                    params = []
+        """查询项目列表（最新的 limit 条）"""
+        return self.list_projects_page(status, region, industry, limit=limit).items
 
-                    if status:
-                        sql += " AND p.status = %s"
-                        params.append(status)
-                    if region:
-                        sql += " AND p.region = %s"
-                        params.append(region)
-                    if industry:
-                        sql += " AND p.industry = %s"
-                        params.append(industry)
-
-                    sql += " ORDER BY p.created_at DESC LIMIT %s OFFSET %s"
-                    params.extend([limit, offset])
-
-                    cursor.execute(sql, params)
-                    return cursor.fetchall()
+    def list_projects_page(
+        self,
+        status: Optional[str] = None,
+        region: Optional[str] = None,
+        industry: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page:
+        """按创建时间倒序分页查询项目列表（cursor 为上一页返回的 next_cursor）"""
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as db_cursor:
+                    sql, params = self._list_sql(status, region, industry)
+                    condition, order, page_params = keyset_sql('p', cursor, limit)
+                    db_cursor.execute(sql + condition + order, tuple(params + page_params))
+                    return build_page(db_cursor.fetchall(), limit)
         except Exception as e:
             logger.error(f"Error listing projects: {str(e)}")
             raise
@@ -115,7 +129,7 @@ class ProjectRepository:
     def get_projects_for_scoring(self) -> List[dict]:
         """获取待评分项目列表"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT p.*, u.real_name as creator_name
@@ -186,7 +200,7 @@ class ProjectRepository:
     def count_projects(self, status: Optional[str] = None) -> int:
         """统计项目数量"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT COUNT(*) as count FROM projects WHERE 1=1"
                     params = []
@@ -203,7 +217,7 @@ class ProjectRepository:
     def get_regions(self) -> List[str]:
         """获取所有地区列表"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT DISTINCT region FROM projects WHERE region IS NOT NULL ORDER BY region"
                     cursor.execute(sql)
@@ -216,7 +230,7 @@ class ProjectRepository:
     def get_industries(self) -> List[str]:
         """获取所有行业列表"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT DISTINCT industry FROM projects WHERE industry IS NOT NULL ORDER BY industry"
                     cursor.execute(sql)
@@ -1,14 +1,306 @@
 """
 评分数据访问类
 """
-from typing import List, Optional, Dict
-from decimal import Decimal
+from typing import Iterator, List, Optional, Dict
+from decimal import Decimal, ROUND_HALF_UP
+import json
 import logging
 
-from app.utils.database import get_db_connection
+from app.utils.database import get_db_connection, stream_query
 
 logger = logging.getLogger(__name__)
 
+# 基金评分快照：基金信息、总分、指标评分和维度汇总一次查出，
+# 指标评分和维度汇总用 JSON 聚合成一列（数值和时间转为字符串，避免 JSON 数值丢失精度）
+FUND_SNAPSHOT_SQL = """
+    SELECT f.id AS fund_id, f.fund_code, f.fund_name, f.status, f.fund_manager, f.fund_type,
+           t.total_score, t.policy_score, t.layout_score, t.execution_score,
+           t.grade, t.rank_in_period, t.rule_set_hash,
+           (
+               SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                   'indicator_id', fs.indicator_id,
+                   'indicator_code', si.indicator_code,
+                   'indicator_name', si.indicator_name,
+                   'indicator_order', si.display_order,
+                   'dimension_code', sd.dimension_code,
+                   'dimension_name', sd.dimension_name,
+                   'dimension_order', sd.display_order,
+                   'score', CAST(fs.score AS CHAR),
+                   'weighted_score', CAST(fs.weighted_score AS CHAR),
+                   'scorer_id', fs.scorer_id,
+                   'scorer_name', u.real_name,
+                   'scorer_comment', fs.scorer_comment,
+                   'scored_at', CAST(fs.scored_at AS CHAR)
+               ))
+               FROM fund_scores fs
+               JOIN scoring_indicators si ON fs.indicator_id = si.id
+               JOIN scoring_dimensions sd ON si.dimension_id = sd.id
+               LEFT JOIN users u ON fs.scorer_id = u.id
+               WHERE fs.fund_id = f.id
+           ) AS scores_json,
+           (
+               SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                   'dimension_code', sd.dimension_code,
+                   'dimension_name', sd.dimension_name,
+                   'dimension_order', sd.display_order,
+                   'total_score', CAST(ss.total_score AS CHAR),
+                   'weighted_total', CAST(ss.weighted_total AS CHAR),
+                   'rule_set_hash', ss.rule_set_hash
+               ))
+               FROM fund_scoring_summary ss
+               JOIN scoring_dimensions sd ON ss.dimension_id = sd.id
+               WHERE ss.fund_id = f.id
+           ) AS summaries_json,
+           (
+               SELECT JSON_ARRAYAGG(JSON_OBJECT(
+                   'ranking_scope', pr.ranking_scope,
+                   'peer_group', pr.peer_group,
+                   'rank_in_group', pr.rank_in_group,
+                   'group_size', pr.group_size,
+                   'percentile', CAST(pr.percentile AS CHAR)
+               ))
+               FROM fund_peer_rankings pr
+               WHERE pr.fund_id = f.id
+           ) AS peer_rankings_json
+    FROM funds f
+    LEFT JOIN fund_total_scores t ON t.fund_id = f.id
+"""
+
+
+# 同组排名的范围 → (分组表达式, 参与排名的得分)：全部基金、同地区、同基金类型按总分，全部基金按各维度得分
+PEER_RANKING_SCOPES = {
+    'overall': ("''", 't.total_score'),
+    'region': ("COALESCE(f.region, '')", 't.total_score'),
+    'fund_type': ("COALESCE(f.fund_type, '')", 't.total_score'),
+    'POLICY': ("''", 't.policy_score'),
+    'LAYOUT': ("''", 't.layout_score'),
+    'EXECUTION': ("''", 't.execution_score'),
+}
+
+# 每只基金按范围展开成多行：(fund_id, ranking_scope, peer_group, score)
+_PEER_SCOPED_SQL = f"""
+        SELECT t.fund_id, s.ranking_scope,
+               CASE s.ranking_scope {' '.join(f"WHEN '{scope}' THEN {group}" for scope, (group, _) in PEER_RANKING_SCOPES.items())} END
+               AS peer_group,
+               CASE s.ranking_scope {' '.join(f"WHEN '{scope}' THEN {score}" for scope, (_, score) in PEER_RANKING_SCOPES.items())} END
+               AS score
+        FROM fund_total_scores t
+        JOIN funds f ON f.id = t.fund_id
+        CROSS JOIN ({' UNION ALL '.join(f"SELECT '{scope}' AS ranking_scope" for scope in PEER_RANKING_SCOPES)}) s
+"""
+
+# 一次按 (范围, 分组) 分区排序算出全部名次、组内基金数和百分位；
+# 只改写有变化的行（SQLite 的 upsert 要求 SELECT 带 WHERE 子句）
+_PEER_RANKINGS_TEMPLATE = f"""
+    INSERT INTO fund_peer_rankings
+    (fund_id, ranking_scope, peer_group, score, rank_in_group, group_size, percentile)
+    SELECT scoped.fund_id, scoped.ranking_scope, scoped.peer_group, scoped.score,
+           RANK() OVER (PARTITION BY scoped.ranking_scope, scoped.peer_group ORDER BY scoped.score DESC),
+           COUNT(*) OVER (PARTITION BY scoped.ranking_scope, scoped.peer_group),
+           ROUND(PERCENT_RANK() OVER (PARTITION BY scoped.ranking_scope, scoped.peer_group ORDER BY scoped.score) * 100, 2)
+    FROM ({_PEER_SCOPED_SQL}) scoped
+    {{partitions}}
+    WHERE 1 = 1
+    ON DUPLICATE KEY UPDATE
+    peer_group = VALUES(peer_group),
+    score = VALUES(score),
+    rank_in_group = VALUES(rank_in_group),
+    group_size = VALUES(group_size),
+    percentile = VALUES(percentile)
+"""
+
+_PEER_RANKINGS_SQL = _PEER_RANKINGS_TEMPLATE.format(partitions='')
+
+# 只重算包含某只基金的分区：全部基金和各维度范围、该基金的地区组和基金类型组
+_FUND_PEER_RANKINGS_SQL = _PEER_RANKINGS_TEMPLATE.format(partitions=f"""
+    JOIN ({_PEER_SCOPED_SQL} WHERE t.fund_id = %s) own
+        ON own.ranking_scope = scoped.ranking_scope AND own.peer_group = scoped.peer_group
+""")
+
+
+# 全量重算排名后排名版本号加一
+_BUMP_RANKING_VERSION_SQL = """
+    INSERT INTO fund_ranking_version (id, version) VALUES (1, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1
+"""
+
+# 汇总统计的增量更新：同一 (metric, bucket) 的行数和得分合计累加差值
+_AGGREGATE_DELTA_SQL = """
+    INSERT INTO fund_score_aggregates (metric, bucket, item_count, value_sum)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+    item_count = item_count + VALUES(item_count),
+    value_sum = value_sum + VALUES(value_sum)
+"""
+
+# 评分完整度位图：BIGINT 的 63 个非负位，每个叶子指标一个（scoring_indicators.completeness_bit）
+MAX_COMPLETENESS_BITS = 63
+
+# 单个指标评分写入后把该指标的位并入基金的位图（父指标没有位，位图不变）
+_MARK_SCORED_SQL = """
+    UPDATE funds
+    SET scored_mask = scored_mask | COALESCE(
+        (SELECT 1 << completeness_bit FROM scoring_indicators WHERE id = %s), 0
+    )
+    WHERE id = %s
+"""
+
+# 按已有的叶子指标评分重算基金的位图，只更新有变化的基金
+# （子查询用逗号连接：SQLite 后端把 UPDATE ... JOIN 的第一个 JOIN ... ON 当作被更新表的连接）
+_SCORED_MASK_SQL = """
+    UPDATE funds f
+    JOIN (
+        SELECT fs.fund_id, SUM(1 << si.completeness_bit) AS scored_mask
+        FROM fund_scores fs, scoring_indicators si
+        WHERE si.id = fs.indicator_id AND si.completeness_bit IS NOT NULL{fund_filter}
+        GROUP BY fs.fund_id
+    ) m ON m.fund_id = f.id
+    SET f.scored_mask = m.scored_mask
+    WHERE f.scored_mask <> m.scored_mask
+"""
+
+_CENT = Decimal('0.01')
+
+
+def _cents(value) -> Decimal:
+    """与 DECIMAL(5,2) 列入库时的舍入一致"""
+    return Decimal(str(value)).quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def _apply_aggregate_deltas(cursor, deltas: List[tuple]):
+    """在调用方的事务中累加汇总统计的差值，deltas 为 (metric, bucket, 行数差, 得分差)"""
+    for metric, bucket, count, value in deltas:
+        if count or value:
+            cursor.execute(_AGGREGATE_DELTA_SQL, (metric, bucket, count, value))
+
+
+def remove_fund_from_aggregates(cursor, fund_id: int):
+    """
+    从汇总统计中减去某只基金的总分和维度汇总
+
+    删除基金时（级联删除其评分数据）在同一事务中、删除语句之前调用。
+    """
+    cursor.execute(
+        "SELECT grade, total_score FROM fund_total_scores WHERE fund_id = %s FOR UPDATE",
+        (fund_id,)
+    )
+    deltas = [('grade', row['grade'] or '', -1, -row['total_score']) for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT dimension_id, weighted_total FROM fund_scoring_summary WHERE fund_id = %s FOR UPDATE",
+        (fund_id,)
+    )
+    deltas += [('dimension', str(row['dimension_id']), -1, -row['weighted_total']) for row in cursor.fetchall()]
+    _apply_aggregate_deltas(cursor, deltas)
+
+
+def refresh_fund_peer_rankings(cursor, fund_id: int) -> int:
+    """
+    在调用方的事务中只重算包含该基金的同组排名分区
+
+    一只基金总分或维度得分变化后调用；分组内其他基金的名次和百分位一并更新。
+
+    Returns:
+        写入的行数
+    """
+    cursor.execute(_FUND_PEER_RANKINGS_SQL, (fund_id,))
+    return max(cursor.rowcount, 0)
+
+
+def refresh_peer_rankings(cursor) -> int:
+    """
+    在调用方的事务中重算全部同组排名，并删除已没有总分的基金的排名
+
+    总分、维度得分或基金的地区、类型变化后调用。
+
+    Returns:
+        写入或删除的行数
+    """
+    cursor.execute(_PEER_RANKINGS_SQL)
+    written = max(cursor.rowcount, 0)
+    cursor.execute(
+        "DELETE FROM fund_peer_rankings WHERE fund_id NOT IN (SELECT fund_id FROM fund_total_scores)"
+    )
+    return written + max(cursor.rowcount, 0)
+
+
+def refresh_scored_masks(cursor, fund_ids: Optional[List[int]] = None) -> int:
+    """
+    在调用方的事务中按 fund_scores 重算基金的评分完整度位图
+
+    Args:
+        fund_ids: 要重算的基金；为 None 时重算全部基金（直接改库后修复用）
+
+    Returns:
+        位图有变化的基金数
+    """
+    fund_filter, params = '', []
+    if fund_ids is not None:
+        if not fund_ids:
+            return 0
+        fund_filter = f" AND fs.fund_id IN ({', '.join(['%s'] * len(fund_ids))})"
+        params = list(fund_ids)
+    cursor.execute(_SCORED_MASK_SQL.format(fund_filter=fund_filter), params)
+    changed = max(cursor.rowcount, 0)
+    # 已没有叶子指标评分的基金清零
+    sql = """
+        UPDATE funds SET scored_mask = 0
+        WHERE scored_mask <> 0 AND id NOT IN (
+            SELECT fs.fund_id FROM fund_scores fs
+            JOIN scoring_indicators si ON si.id = fs.indicator_id
+            WHERE si.completeness_bit IS NOT NULL
+        )
+    """
+    if fund_ids is not None:
+        sql += f" AND id IN ({', '.join(['%s'] * len(fund_ids))})"
+    cursor.execute(sql, params)
+    return changed + max(cursor.rowcount, 0)
+
+
+def assign_completeness_bits(cursor) -> int:
+    """
+    在调用方的事务中为还没有位的叶子指标按ID顺序分配评分完整度位
+
+    已分配的位不再变化，删除的指标的位也不复用，基金已有的位图始终有效。
+
+    Returns:
+        新分配的位数
+    """
+    cursor.execute("SELECT MAX(completeness_bit) AS max_bit FROM scoring_indicators")
+    row = cursor.fetchone()
+    next_bit = row['max_bit'] + 1 if row and row['max_bit'] is not None else 0
+    cursor.execute("""
+        SELECT id FROM scoring_indicators
+        WHERE completeness_bit IS NULL AND COALESCE(indicator_type, 'leaf') <> 'parent'
+        ORDER BY id
+    """)
+    indicator_ids = [row['id'] for row in cursor.fetchall()]
+    if next_bit + len(indicator_ids) > MAX_COMPLETENESS_BITS:
+        raise ValueError(
+            f"评分完整度位图最多 {MAX_COMPLETENESS_BITS} 个叶子指标（已用 {next_bit} 位，"
+            f"新增 {len(indicator_ids)} 个），请用 init_scoring_data.py 重建评分指标"
+        )
+    for bit, indicator_id in enumerate(indicator_ids, next_bit):
+        cursor.execute(
+            "UPDATE scoring_indicators SET completeness_bit = %s WHERE id = %s",
+            (bit, indicator_id)
+        )
+    return len(indicator_ids)
+
+
+def _chunks(ids: List[int], chunk_size: int) -> Iterator[List[int]]:
+    """去重后按 chunk_size 切分ID列表，用于 IN (...) 查询"""
+    unique = list(dict.fromkeys(ids))
+    for start in range(0, len(unique), chunk_size):
+        yield unique[start:start + chunk_size]
+
+
+def _parse_snapshot_row(row: Dict) -> Dict:
+    """把 JSON 聚合列解析为列表（没有数据时 MySQL 返回 NULL，SQLite 返回空数组）"""
+    row['scores'] = json.loads(row.pop('scores_json') or '[]')
+    row['summaries'] = json.loads(row.pop('summaries_json') or '[]')
+    row['peer_rankings'] = json.loads(row.pop('peer_rankings_json') or '[]')
+    return row
+
 
 class ScoringRepository:
     """评分数据访问类"""
@@ -16,7 +308,7 @@ class ScoringRepository:
     def get_all_dimensions(self) -> List[Dict]:
         """获取所有评分维度"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT * FROM scoring_dimensions
@@ -32,7 +324,7 @@ class ScoringRepository:
     def get_indicators_by_dimension(self, dimension_id: int) -> List[Dict]:
         """获取维度的所有指标"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT * FROM scoring_indicators
@@ -48,7 +340,7 @@ class ScoringRepository:
     def get_dimension_by_code(self, dimension_code: str) -> Optional[Dict]:
         """根据维度代码获取维度信息"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT * FROM scoring_dimensions
@@ -63,7 +355,7 @@ class ScoringRepository:
     def get_indicator_by_code(self, indicator_code: str) -> Optional[Dict]:
         """根据指标代码获取指标信息"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT si.*, sd.dimension_code
@@ -77,6 +369,54 @@ class ScoringRepository:
             logger.error(f"Error getting indicator by code: {str(e)}")
             raise
 
+    def get_all_indicators(self) -> List[Dict]:
+        """获取所有启用的指标（含父指标和子指标）"""
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        SELECT * FROM scoring_indicators
+                        WHERE is_active = TRUE
+                        ORDER BY dimension_id, display_order
+                    """
+                    cursor.execute(sql)
+                    return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error getting indicators: {str(e)}")
+            raise
+
+    def get_catalog_version(self) -> int:
+        """获取评分目录（维度和指标）的版本号"""
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT version FROM scoring_catalog_version WHERE id = 1")
+                    result = cursor.fetchone()
+                    return result['version'] if result else 0
+        except Exception as e:
+            logger.error(f"Error getting catalog version: {str(e)}")
+            raise
+
+    def bump_catalog_version(self) -> int:
+        """修改维度或指标后为新增的叶子指标分配完整度位，并把评分目录版本号加一，返回新版本号"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    assign_completeness_bits(cursor)
+                    sql = """
+                        INSERT INTO scoring_catalog_version (id, version) VALUES (1, 1)
+                        ON DUPLICATE KEY UPDATE version = version + 1
+                    """
+                    cursor.execute(sql)
+                    cursor.execute("SELECT version FROM scoring_catalog_version WHERE id = 1")
+                    version = cursor.fetchone()['version']
+                    conn.commit()
+                    logger.info(f"Scoring catalog version bumped to {version}")
+                    return version
+        except Exception as e:
+            logger.error(f"Error bumping catalog version: {str(e)}")
+            raise
+
     def save_score(
         self,
         project_id: int,
@@ -116,7 +456,7 @@ class ScoringRepository:
     def get_project_scores(self, project_id: int) -> List[Dict]:
         """获取项目的所有评分"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT ps.*, si.indicator_code, si.indicator_name,
@@ -165,7 +505,7 @@ class ScoringRepository:
     def get_dimension_summaries(self, project_id: int) -> List[Dict]:
         """获取项目的所有维度汇总"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT ss.*, sd.dimension_code, sd.dimension_name
@@ -223,7 +563,7 @@ class ScoringRepository:
     def get_project_total_score(self, project_id: int) -> Optional[Dict]:
         """获取项目总分"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT pts.*, u.real_name as reviewer_name
@@ -240,7 +580,7 @@ class ScoringRepository:
     def get_all_project_totals(self) -> List[Dict]:
         """获取所有项目总分（用于排名）"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT pts.*, p.project_code, p.project_name, p.region, p.industry
@@ -254,16 +594,51 @@ class ScoringRepository:
             logger.error(f"Error getting all project totals: {str(e)}")
             raise
 
-    def update_project_rankings(self, rankings: List[Dict]):
-        """批量更新项目排名"""
+    def iter_project_totals(self, chunk_size: int = 1000, read_only: bool = False) -> Iterator[List[Dict]]:
+        """
+        按总分降序逐批读取项目总分（服务端游标，每批最多 chunk_size 行）
+
+        导出等只读场景可传 read_only=True 走只读副本。
+        """
+        sql = """
+            SELECT pts.*, p.project_code, p.project_name, p.region, p.industry
+            FROM project_total_scores pts
+            JOIN projects p ON pts.project_id = p.id
+            ORDER BY pts.total_score DESC, pts.project_id
+        """
+        try:
+            yield from stream_query(sql, chunk_size=chunk_size, read_only=read_only)
+        except Exception as e:
+            logger.error(f"Error streaming project totals: {str(e)}")
+            raise
+
+    def update_project_rankings(self) -> int:
+        """
+        按总分重新计算项目排名（一条 RANK() 窗口函数的 UPDATE ... JOIN）
+
+        总分相同的排名相同，下一名跳过相应名次（1, 2, 2, 4），与 ScoringCalculator.calculate_project_ranking 一致。
+        只更新排名发生变化的行。
+
+        Returns:
+            排名发生变化的行数
+        """
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
-                    sql = "UPDATE project_total_scores SET rank_in_period = %s WHERE project_id = %s"
-                    for item in rankings:
-                        cursor.execute(sql, (item['rank'], item['project_id']))
+                    sql = """
+                        UPDATE project_total_scores t
+                        JOIN (
+                            SELECT project_id, RANK() OVER (ORDER BY total_score DESC) AS new_rank
+                            FROM project_total_scores
+                        ) r ON r.project_id = t.project_id
+                        SET t.rank_in_period = r.new_rank
+                        WHERE NOT (t.rank_in_period <=> r.new_rank)
+                    """
+                    cursor.execute(sql)
+                    changed = cursor.rowcount
                     conn.commit()
-                    logger.info(f"Updated {len(rankings)} project rankings")
+                    logger.info(f"Updated {changed} rankings")
+                    return changed
         except Exception as e:
             logger.error(f"Error updating rankings: {str(e)}")
             raise
@@ -278,9 +653,14 @@ class ScoringRepository:
         score: Decimal,
         weighted_score: Decimal,
         scorer_id: int,
-        scorer_comment: Optional[str] = None
+        scorer_comment: Optional[str] = None,
+        mark_scored: bool = True
     ) -> int:
-        """保存投资的单个指标评分"""
+        """
+        保存投资的单个指标评分，并把该指标并入基金的评分完整度位图
+
+        已知该指标原来就有评分（或是父指标）时可传 mark_scored=False 省去位图更新。
+        """
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
@@ -300,16 +680,204 @@ class ScoringRepository:
                         fund_id, dimension_id, indicator_id, score, weighted_score,
                         scorer_id, scorer_comment
                     ))
+                    score_id = cursor.lastrowid
+                    if mark_scored:
+                        cursor.execute(_MARK_SCORED_SQL, (indicator_id, fund_id))
                     conn.commit()
-                    return cursor.lastrowid
+                    return score_id
         except Exception as e:
             logger.error(f"Error saving investment score: {str(e)}")
             raise
 
+    def get_fund_score_for_update(self, fund_id: int, indicator_id: int) -> Optional[Dict]:
+        """读取并锁定基金的单个指标评分（增量更新前调用）"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        SELECT * FROM fund_scores
+                        WHERE fund_id = %s AND indicator_id = %s
+                        FOR UPDATE
+                    """
+                    cursor.execute(sql, (fund_id, indicator_id))
+                    return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Error getting fund score: {str(e)}")
+            raise
+
+    def add_fund_score_delta(self, fund_id: int, indicator_id: int, delta: Decimal) -> bool:
+        """
+        指标评分加上差值（父指标随子指标增量更新）
+
+        Returns:
+            该指标已有评分行时返回 True
+        """
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        UPDATE fund_scores
+                        SET score = score + %s, weighted_score = weighted_score + %s
+                        WHERE fund_id = %s AND indicator_id = %s
+                    """
+                    cursor.execute(sql, (delta, delta, fund_id, indicator_id))
+                    conn.commit()
+                    return cursor.rowcount > 0
+        except Exception as e:
+            logger.error(f"Error applying fund score delta: {str(e)}")
+            raise
+
+    def sum_fund_scores(self, fund_id: int, indicator_ids: List[int]) -> Decimal:
+        """基金若干指标的评分之和"""
+        if not indicator_ids:
+            return Decimal('0')
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    sql = f"""
+                        SELECT SUM(score) AS total
+                        FROM fund_scores
+                        WHERE fund_id = %s AND indicator_id IN ({', '.join(['%s'] * len(indicator_ids))})
+                    """
+                    cursor.execute(sql, [fund_id] + list(indicator_ids))
+                    row = cursor.fetchone()
+                    return _cents(row['total']) if row and row['total'] is not None else Decimal('0')
+        except Exception as e:
+            logger.error(f"Error summing fund scores: {str(e)}")
+            raise
+
+    def save_fund_scores_bulk(
+        self,
+        fund_id: Optional[int],
+        rows: List[Dict],
+        chunk_size: int = 500
+    ) -> int:
+        """
+        批量保存指标评分：每批一条多行 upsert，同一事务中重算涉及基金的评分完整度位图，全部写完后只提交一次
+
+        Args:
+            fund_id: 基金ID；为 None 时取每行自己的 fund_id（一次写多个基金）
+            rows: [{'dimension_id', 'indicator_id', 'score', 'weighted_score',
+                    'scorer_id', 'scorer_comment'(可选), 'fund_id'(fund_id 为 None 时必填)}]
+            chunk_size: 每条 INSERT 语句包含的行数
+
+        Returns:
+            写入的行数
+        """
+        if not rows:
+            return 0
+        columns = "(fund_id, dimension_id, indicator_id, score, weighted_score, scorer_id, scorer_comment)"
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    for start in range(0, len(rows), chunk_size):
+                        chunk = rows[start:start + chunk_size]
+                        sql = f"""
+                            INSERT INTO fund_scores {columns}
+                            VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(chunk))}
+                            ON DUPLICATE KEY UPDATE
+                            dimension_id = VALUES(dimension_id),
+                            score = VALUES(score),
+                            weighted_score = VALUES(weighted_score),
+                            scorer_id = VALUES(scorer_id),
+                            scorer_comment = VALUES(scorer_comment),
+                            scored_at = CURRENT_TIMESTAMP
+                        """
+                        params = []
+                        for row in chunk:
+                            params.extend((
+                                row['fund_id'] if fund_id is None else fund_id,
+                                row['dimension_id'], row['indicator_id'],
+                                row['score'], row['weighted_score'],
+                                row['scorer_id'], row.get('scorer_comment')
+                            ))
+                        cursor.execute(sql, params)
+                    fund_ids = [fund_id] if fund_id is not None else [row['fund_id'] for row in rows]
+                    for chunk_ids in _chunks(fund_ids, chunk_size):
+                        refresh_scored_masks(cursor, chunk_ids)
+                    conn.commit()
+                    logger.info(f"Saved {len(rows)} fund scores in bulk")
+                    return len(rows)
+        except Exception as e:
+            logger.error(f"Error saving fund scores in bulk: {str(e)}")
+            raise
+
+    def get_fund_scored_mask(self, fund_id: int) -> int:
+        """基金的评分完整度位图（基金不存在时为 0）"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT scored_mask FROM funds WHERE id = %s", (fund_id,))
+                    row = cursor.fetchone()
+                    return int(row['scored_mask']) if row else 0
+        except Exception as e:
+            logger.error(f"Error getting fund scored mask: {str(e)}")
+            raise
+
+    def list_fund_completeness(
+        self,
+        complete_mask: int,
+        statuses: Optional[List[str]] = None,
+        complete: Optional[bool] = None
+    ) -> List[Dict]:
+        """
+        一次查询列出基金的评分完整度（按创建时间倒序）
+
+        Args:
+            complete_mask: 全部叶子指标都已评分时的位图（ScoringCatalog.complete_mask）
+            statuses: 只列这些状态的基金，None 表示全部
+            complete: True 只列已评完的，False 只列未评完的，None 不筛选
+
+        Returns:
+            [{'id', 'fund_code', 'fund_name', 'status', 'scored_mask', 'is_complete', 'has_total'}]
+        """
+        sql = """
+            SELECT f.id, f.fund_code, f.fund_name, f.status, f.scored_mask,
+                   (f.scored_mask & %s) = %s AS is_complete,
+                   t.fund_id IS NOT NULL AS has_total
+            FROM funds f
+            LEFT JOIN fund_total_scores t ON t.fund_id = f.id
+            WHERE 1 = 1
+        """
+        params = [complete_mask, complete_mask]
+        if statuses:
+            sql += f" AND f.status IN ({', '.join(['%s'] * len(statuses))})"
+            params.extend(statuses)
+        if complete is not None:
+            sql += f" AND (f.scored_mask & %s) {'=' if complete else '<>'} %s"
+            params.extend([complete_mask, complete_mask])
+        sql += " ORDER BY f.created_at DESC, f.id DESC"
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    rows = cursor.fetchall()
+                    for row in rows:
+                        row['scored_mask'] = int(row['scored_mask'])
+                        row['is_complete'] = bool(row['is_complete'])
+                        row['has_total'] = bool(row['has_total'])
+                    return rows
+        except Exception as e:
+            logger.error(f"Error listing fund completeness: {str(e)}")
+            raise
+
+    def rebuild_fund_scored_masks(self) -> int:
+        """按 fund_scores 重算全部基金的评分完整度位图（直接改库后修复用），返回有变化的基金数"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    changed = refresh_scored_masks(cursor)
+                    conn.commit()
+                    logger.info(f"Rebuilt scored masks: {changed} funds changed")
+                    return changed
+        except Exception as e:
+            logger.error(f"Error rebuilding scored masks: {str(e)}")
+            raise
+
     def get_fund_scores(self, fund_id: int) -> List[Dict]:
         """获取投资的所有评分"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT ins.*, si.indicator_code, si.indicator_name,
@@ -328,33 +896,378 @@ class ScoringRepository:
             logger.error(f"Error getting investment scores: {str(e)}")
             raise
 
+    def get_fund_scoring_snapshot(self, fund_id: int, read_only: bool = True) -> Optional[Dict]:
+        """
+        一次查询取出基金评分的全部数据
+
+        Returns:
+            基金信息和总分字段，外加 scores（指标评分列表，含评分人姓名）
+            和 summaries（维度汇总列表）；基金不存在时返回 None
+        """
+        try:
+            with get_db_connection(read_only=read_only) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(FUND_SNAPSHOT_SQL + " WHERE f.id = %s", (fund_id,))
+                    row = cursor.fetchone()
+                    return _parse_snapshot_row(row) if row else None
+        except Exception as e:
+            logger.error(f"Error getting fund scoring snapshot: {str(e)}")
+            raise
+
+    def get_fund_scoring_snapshots(
+        self,
+        fund_ids: List[int],
+        chunk_size: int = 500,
+        read_only: bool = True
+    ) -> Dict[int, Dict]:
+        """
+        批量获取多只基金的评分快照（每 chunk_size 只基金一次查询）
+
+        Returns:
+            {fund_id: 与 get_fund_scoring_snapshot 相同格式的字典}，不存在的基金不出现在结果中
+        """
+        snapshots = {}
+        try:
+            with get_db_connection(read_only=read_only) as conn:
+                with conn.cursor() as cursor:
+                    for chunk in _chunks(fund_ids, chunk_size):
+                        placeholders = ','.join(['%s'] * len(chunk))
+                        cursor.execute(FUND_SNAPSHOT_SQL + f" WHERE f.id IN ({placeholders})", chunk)
+                        for row in cursor.fetchall():
+                            snapshots[row['fund_id']] = _parse_snapshot_row(row)
+            return snapshots
+        except Exception as e:
+            logger.error(f"Error getting fund scoring snapshots: {str(e)}")
+            raise
+
+    def get_fund_scores_by_funds(
+        self,
+        fund_ids: List[int],
+        chunk_size: int = 500,
+        read_only: bool = True
+    ) -> Dict[int, List[Dict]]:
+        """
+        批量获取多只基金的指标评分，按基金分组
+
+        Args:
+            read_only: 是否从只读副本读取（重算前读取需要主库的最新数据）
+
+        Returns:
+            {fund_id: [评分行（与 get_fund_scores 相同的列）]}，没有评分的基金对应空列表
+        """
+        grouped = {fund_id: [] for fund_id in fund_ids}
+        try:
+            with get_db_connection(read_only=read_only) as conn:
+                with conn.cursor() as cursor:
+                    for chunk in _chunks(fund_ids, chunk_size):
+                        placeholders = ','.join(['%s'] * len(chunk))
+                        sql = f"""
+                            SELECT ins.*, si.indicator_code, si.indicator_name,
+                                   sd.dimension_code, sd.dimension_name,
+                                   u.real_name as scorer_name
+                            FROM fund_scores ins
+                            JOIN scoring_indicators si ON ins.indicator_id = si.id
+                            JOIN scoring_dimensions sd ON ins.dimension_id = sd.id
+                            LEFT JOIN users u ON ins.scorer_id = u.id
+                            WHERE ins.fund_id IN ({placeholders})
+                            ORDER BY ins.fund_id, sd.display_order, si.display_order
+                        """
+                        cursor.execute(sql, chunk)
+                        for row in cursor.fetchall():
+                            grouped[row['fund_id']].append(row)
+            return grouped
+        except Exception as e:
+            logger.error(f"Error getting scores for funds: {str(e)}")
+            raise
+
+    def get_fund_scores_after(self, after_fund_id: int, fund_limit: int) -> List[Dict]:
+        """
+        按 fund_id 顺序读取下一批基金的全部指标评分（全量重算用，主库读取）
+
+        Args:
+            after_fund_id: 上一批最后一只基金的ID，首批为 0
+            fund_limit: 本批最多包含的基金数；同一基金的评分不会被拆到两批
+
+        Returns:
+            [{'fund_id', 'dimension_id', 'indicator_id', 'score', 'scorer_id'}]，按 fund_id 排序
+        """
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        SELECT fs.fund_id, fs.dimension_id, fs.indicator_id, fs.score, fs.scorer_id
+                        FROM fund_scores fs
+                        JOIN (
+                            SELECT DISTINCT fund_id FROM fund_scores
+                            WHERE fund_id > %s
+                            ORDER BY fund_id
+                            LIMIT %s
+                        ) batch ON batch.fund_id = fs.fund_id
+                        ORDER BY fs.fund_id, fs.indicator_id
+                    """
+                    cursor.execute(sql, (after_fund_id, fund_limit))
+                    return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error getting fund scores after {after_fund_id}: {str(e)}")
+            raise
+
+    def get_fund_results_by_funds(self, fund_ids: List[int], chunk_size: int = 500) -> Dict[int, Dict]:
+        """
+        批量读取多只基金的维度汇总和总分（全量重算比对用，主库读取）
+
+        Returns:
+            {fund_id: {'summaries': {dimension_id: 汇总行}, 'total': 总分行或 None}}
+        """
+        results = {fund_id: {'summaries': {}, 'total': None} for fund_id in fund_ids}
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    for chunk in _chunks(fund_ids, chunk_size):
+                        placeholders = ','.join(['%s'] * len(chunk))
+                        cursor.execute(
+                            f"SELECT fund_id, dimension_id, total_score, weighted_total, rule_set_hash "
+                            f"FROM fund_scoring_summary WHERE fund_id IN ({placeholders})",
+                            chunk
+                        )
+                        for row in cursor.fetchall():
+                            results[row['fund_id']]['summaries'][row['dimension_id']] = row
+                        cursor.execute(
+                            f"SELECT fund_id, total_score, policy_score, layout_score, execution_score, "
+                            f"grade, rank_in_period, rule_set_hash FROM fund_total_scores WHERE fund_id IN ({placeholders})",
+                            chunk
+                        )
+                        for row in cursor.fetchall():
+                            results[row['fund_id']]['total'] = row
+            return results
+        except Exception as e:
+            logger.error(f"Error getting fund results: {str(e)}")
+            raise
+
+    def save_fund_rescore_bulk(
+        self,
+        scores: List[Dict],
+        summaries: List[Dict],
+        totals: List[Dict],
+        chunk_size: int = 500
+    ) -> int:
+        """
+        批量写回全量重算的结果：每张表每批一条多行 upsert，全部写完后只提交一次
+
+        只改写得分相关的列和评分规则指纹，评分人、评语和审核信息保持不变；
+        同一事务中按写入前的行更新汇总统计。
+
+        Args:
+            scores: [{'fund_id', 'dimension_id', 'indicator_id', 'score', 'scorer_id'}]
+            summaries: [{'fund_id', 'dimension_id', 'total_score', 'weighted_total', 'rule_set_hash'}]
+            totals: [{'fund_id', 'total_score', 'policy_score', 'layout_score', 'execution_score', 'grade',
+                      'rule_set_hash'}]（只更新已有总分的基金）
+
+        Returns:
+            写入的行数
+        """
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    deltas = {}
+
+                    def add_delta(metric, bucket, count, value):
+                        old_count, old_value = deltas.get((metric, bucket), (0, Decimal('0')))
+                        deltas[(metric, bucket)] = (old_count + count, old_value + value)
+
+                    fund_ids = list({row['fund_id'] for row in summaries + totals})
+                    old_summaries, old_totals = {}, {}
+                    for chunk in _chunks(fund_ids, chunk_size):
+                        placeholders = ','.join(['%s'] * len(chunk))
+                        cursor.execute(
+                            f"SELECT fund_id, dimension_id, weighted_total FROM fund_scoring_summary "
+                            f"WHERE fund_id IN ({placeholders}) FOR UPDATE",
+                            chunk
+                        )
+                        for row in cursor.fetchall():
+                            old_summaries[(row['fund_id'], row['dimension_id'])] = row['weighted_total']
+                        cursor.execute(
+                            f"SELECT fund_id, grade, total_score FROM fund_total_scores "
+                            f"WHERE fund_id IN ({placeholders}) FOR UPDATE",
+                            chunk
+                        )
+                        for row in cursor.fetchall():
+                            old_totals[row['fund_id']] = row
+                    totals = [row for row in totals if row['fund_id'] in old_totals]
+
+                    for start in range(0, len(scores), chunk_size):
+                        chunk = scores[start:start + chunk_size]
+                        cursor.execute(f"""
+                            INSERT INTO fund_scores
+                            (fund_id, dimension_id, indicator_id, score, weighted_score, scorer_id)
+                            VALUES {', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(chunk))}
+                            ON DUPLICATE KEY UPDATE
+                            score = VALUES(score),
+                            weighted_score = VALUES(weighted_score)
+                        """, [value for row in chunk for value in (
+                            row['fund_id'], row['dimension_id'], row['indicator_id'],
+                            row['score'], row['score'], row['scorer_id']
+                        )])
+
+                    for start in range(0, len(summaries), chunk_size):
+                        chunk = summaries[start:start + chunk_size]
+                        cursor.execute(f"""
+                            INSERT INTO fund_scoring_summary
+                            (fund_id, dimension_id, total_score, weighted_total, rule_set_hash)
+                            VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(chunk))}
+                            ON DUPLICATE KEY UPDATE
+                            total_score = VALUES(total_score),
+                            weighted_total = VALUES(weighted_total),
+                            rule_set_hash = VALUES(rule_set_hash),
+                            calculated_at = CURRENT_TIMESTAMP
+                        """, [value for row in chunk for value in (
+                            row['fund_id'], row['dimension_id'], row['total_score'], _cents(row['weighted_total']),
+                            row.get('rule_set_hash')
+                        )])
+                        for row in chunk:
+                            old = old_summaries.get((row['fund_id'], row['dimension_id']))
+                            add_delta(
+                                'dimension', str(row['dimension_id']),
+                                0 if old is not None else 1,
+                                _cents(row['weighted_total']) - (old if old is not None else 0)
+                            )
+
+                    for start in range(0, len(totals), chunk_size):
+                        chunk = totals[start:start + chunk_size]
+                        cursor.execute(f"""
+                            INSERT INTO fund_total_scores
+                            (fund_id, total_score, policy_score, layout_score, execution_score, grade, rule_set_hash)
+                            VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(chunk))}
+                            ON DUPLICATE KEY UPDATE
+                            total_score = VALUES(total_score),
+                            policy_score = VALUES(policy_score),
+                            layout_score = VALUES(layout_score),
+                            execution_score = VALUES(execution_score),
+                            grade = VALUES(grade),
+                            rule_set_hash = VALUES(rule_set_hash)
+                        """, [value for row in chunk for value in (
+                            row['fund_id'], _cents(row['total_score']), row['policy_score'],
+                            row['layout_score'], row['execution_score'], row['grade'], row.get('rule_set_hash')
+                        )])
+                        for row in chunk:
+                            old = old_totals[row['fund_id']]
+                            add_delta('grade', old['grade'] or '', -1, -old['total_score'])
+                            add_delta('grade', row['grade'] or '', 1, _cents(row['total_score']))
+
+                    _apply_aggregate_deltas(cursor, [
+                        (metric, bucket, count, value) for (metric, bucket), (count, value) in deltas.items()
+                    ])
+                    conn.commit()
+                    written = len(scores) + len(summaries) + len(totals)
+                    logger.info(f"Saved {written} rescored fund rows in bulk")
+                    return written
+        except Exception as e:
+            logger.error(f"Error saving rescored fund results: {str(e)}")
+            raise
+
+    def get_stale_fund_ids(self, rule_set_hash: str, after_fund_id: int, limit: int) -> List[int]:
+        """
+        按 fund_id 顺序取下一批评分规则指纹过期（与 rule_set_hash 不同或为 NULL）的基金（主库读取）
+
+        维度汇总或总分任一行过期即算过期。
+        """
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        SELECT fund_id FROM (
+                            SELECT fund_id FROM fund_total_scores
+                            WHERE fund_id > %s AND (rule_set_hash IS NULL OR rule_set_hash <> %s)
+                            UNION
+                            SELECT fund_id FROM fund_scoring_summary
+                            WHERE fund_id > %s AND (rule_set_hash IS NULL OR rule_set_hash <> %s)
+                        ) stale
+                        ORDER BY fund_id
+                        LIMIT %s
+                    """
+                    cursor.execute(sql, (after_fund_id, rule_set_hash, after_fund_id, rule_set_hash, limit))
+                    return [row['fund_id'] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting stale funds: {str(e)}")
+            raise
+
+    def count_stale_funds(self, rule_set_hash: str) -> int:
+        """评分规则指纹过期的基金数"""
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        SELECT COUNT(*) AS stale_count FROM (
+                            SELECT fund_id FROM fund_total_scores
+                            WHERE rule_set_hash IS NULL OR rule_set_hash <> %s
+                            UNION
+                            SELECT fund_id FROM fund_scoring_summary
+                            WHERE rule_set_hash IS NULL OR rule_set_hash <> %s
+                        ) stale
+                    """
+                    cursor.execute(sql, (rule_set_hash, rule_set_hash))
+                    return int(cursor.fetchone()['stale_count'])
+        except Exception as e:
+            logger.error(f"Error counting stale funds: {str(e)}")
+            raise
+
     def save_fund_dimension_summary(
         self,
         fund_id: int,
         dimension_id: int,
         total_score: Decimal,
-        weighted_total: Decimal
+        weighted_total: Decimal,
+        rule_set_hash: Optional[str] = None
     ) -> int:
-        """保存投资的维度汇总"""
+        """保存投资的维度汇总及计算时的评分规则指纹（同一事务中更新维度平均分的汇总统计）"""
         try:
+            weighted_total = _cents(weighted_total)
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT weighted_total FROM fund_scoring_summary "
+                        "WHERE fund_id = %s AND dimension_id = %s FOR UPDATE",
+                        (fund_id, dimension_id)
+                    )
+                    old = cursor.fetchone()
                     sql = """
                         INSERT INTO fund_scoring_summary
-                        (fund_id, dimension_id, total_score, weighted_total)
-                        VALUES (%s, %s, %s, %s)
+                        (fund_id, dimension_id, total_score, weighted_total, rule_set_hash)
+                        VALUES (%s, %s, %s, %s, %s)
                         ON DUPLICATE KEY UPDATE
                         total_score = VALUES(total_score),
                         weighted_total = VALUES(weighted_total),
+                        rule_set_hash = VALUES(rule_set_hash),
                         calculated_at = CURRENT_TIMESTAMP
                     """
-                    cursor.execute(sql, (fund_id, dimension_id, total_score, weighted_total))
+                    cursor.execute(sql, (fund_id, dimension_id, total_score, weighted_total, rule_set_hash))
+                    summary_id = cursor.lastrowid
+                    _apply_aggregate_deltas(cursor, [(
+                        'dimension', str(dimension_id),
+                        0 if old else 1,
+                        weighted_total - (old['weighted_total'] if old else 0)
+                    )])
                     conn.commit()
-                    return cursor.lastrowid
+                    return summary_id
         except Exception as e:
             logger.error(f"Error saving investment dimension summary: {str(e)}")
             raise
 
+    def get_fund_dimension_summary_for_update(self, fund_id: int, dimension_id: int) -> Optional[Dict]:
+        """读取并锁定基金的单个维度汇总"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        SELECT * FROM fund_scoring_summary
+                        WHERE fund_id = %s AND dimension_id = %s
+                        FOR UPDATE
+                    """
+                    cursor.execute(sql, (fund_id, dimension_id))
+                    return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Error getting fund dimension summary: {str(e)}")
+            raise
+
     def save_fund_total(
         self,
         fund_id: int,
@@ -364,17 +1277,24 @@ class ScoringRepository:
         execution_score: Decimal,
         grade: str,
         reviewed_by: Optional[int] = None,
-        review_comment: Optional[str] = None
+        review_comment: Optional[str] = None,
+        rule_set_hash: Optional[str] = None
     ) -> int:
-        """保存投资总分"""
+        """保存投资总分及计算时的评分规则指纹（同一事务中更新等级分布的汇总统计）"""
         try:
+            total_score = _cents(total_score)
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT grade, total_score FROM fund_total_scores WHERE fund_id = %s FOR UPDATE",
+                        (fund_id,)
+                    )
+                    old = cursor.fetchone()
                     sql = """
                         INSERT INTO fund_total_scores
                         (fund_id, total_score, policy_score, layout_score,
-                         execution_score, grade, reviewed_by, review_comment)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                         execution_score, grade, reviewed_by, review_comment, rule_set_hash)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                         ON DUPLICATE KEY UPDATE
                         total_score = VALUES(total_score),
                         policy_score = VALUES(policy_score),
@@ -383,22 +1303,39 @@ class ScoringRepository:
                         grade = VALUES(grade),
                         reviewed_by = VALUES(reviewed_by),
                         review_comment = VALUES(review_comment),
+                        rule_set_hash = VALUES(rule_set_hash),
                         reviewed_at = CURRENT_TIMESTAMP
                     """
                     cursor.execute(sql, (
                         fund_id, total_score, policy_score, layout_score,
-                        execution_score, grade, reviewed_by, review_comment
+                        execution_score, grade, reviewed_by, review_comment, rule_set_hash
                     ))
+                    total_id = cursor.lastrowid
+                    deltas = [('grade', grade or '', 1, total_score)]
+                    if old:
+                        deltas.append(('grade', old['grade'] or '', -1, -old['total_score']))
+                    _apply_aggregate_deltas(cursor, deltas)
                     conn.commit()
-                    return cursor.lastrowid
+                    return total_id
         except Exception as e:
             logger.error(f"Error saving investment total: {str(e)}")
             raise
 
+    def get_fund_total_for_update(self, fund_id: int) -> Optional[Dict]:
+        """读取并锁定基金总分行（主库）"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT * FROM fund_total_scores WHERE fund_id = %s FOR UPDATE", (fund_id,))
+                    return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Error getting investment total score: {str(e)}")
+            raise
+
     def get_fund_total_score(self, fund_id: int) -> Optional[Dict]:
         """获取投资总分"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT its.*, u.real_name as reviewer_name
@@ -412,10 +1349,60 @@ class ScoringRepository:
             logger.error(f"Error getting investment total score: {str(e)}")
             raise
 
+    def get_fund_total_pairs(self) -> List[Dict]:
+        """所有基金的 fund_id、总分和排名（构建排名索引用，主库读取）"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT fund_id, total_score, rank_in_period FROM fund_total_scores")
+                    return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error getting fund total pairs: {str(e)}")
+            raise
+
+    def get_fund_ranking_version(self) -> int:
+        """基金排名的版本号（构建排名索引用，主库读取）"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT version FROM fund_ranking_version WHERE id = 1")
+                    result = cursor.fetchone()
+                    return result['version'] if result else 0
+        except Exception as e:
+            logger.error(f"Error getting fund ranking version: {str(e)}")
+            raise
+
+    def get_fund_ranking_fingerprint_for_update(self) -> Dict:
+        """
+        库中基金总分的指纹：已评分基金数、总分合计（读取汇总统计表）和排名版本号
+
+        加锁读取，读到其他事务已提交的最新值，跨进程的名次平移也因此按顺序执行。
+
+        Returns:
+            {'fund_count': int, 'total_sum': Decimal, 'version': int}
+        """
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT version FROM fund_ranking_version WHERE id = 1 FOR UPDATE")
+                    result = cursor.fetchone()
+                    version = result['version'] if result else 0
+                    cursor.execute("""
+                        SELECT COALESCE(SUM(item_count), 0) AS fund_count, COALESCE(SUM(value_sum), 0) AS total_sum
+                        FROM fund_score_aggregates
+                        WHERE metric = 'grade'
+                        FOR UPDATE
+                    """)
+                    result = cursor.fetchone()
+                    return {'fund_count': int(result['fund_count']), 'total_sum': result['total_sum'], 'version': version}
+        except Exception as e:
+            logger.error(f"Error getting fund ranking fingerprint: {str(e)}")
+            raise
+
     def get_all_fund_totals(self) -> List[Dict]:
         """获取所有基金总分（用于排名）"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = """
                         SELECT its.*, f.fund_code, f.fund_name, f.region
@@ -429,16 +1416,227 @@ class ScoringRepository:
             logger.error(f"Error getting all fund totals: {str(e)}")
             raise
 
-    def update_fund_rankings(self, rankings: List[Dict]):
-        """批量更新投资排名"""
+    def iter_fund_totals(self, chunk_size: int = 1000, read_only: bool = False) -> Iterator[List[Dict]]:
+        """
+        按总分降序逐批读取基金总分（服务端游标，每批最多 chunk_size 行）
+
+        导出等只读场景可传 read_only=True 走只读副本。
+        """
+        sql = """
+            SELECT its.*, f.fund_code, f.fund_name, f.region
+            FROM fund_total_scores its
+            JOIN funds f ON its.fund_id = f.id
+            ORDER BY its.total_score DESC, its.fund_id
+        """
+        try:
+            yield from stream_query(sql, chunk_size=chunk_size, read_only=read_only)
+        except Exception as e:
+            logger.error(f"Error streaming fund totals: {str(e)}")
+            raise
+
+    def iter_fund_rankings(self, chunk_size: int = 1000, read_only: bool = False) -> Iterator[List[Dict]]:
+        """
+        按总分降序逐批读取基金总分及同组排名（服务端游标）
+
+        每个范围的名次、组内基金数和百分位为 {范围小写}_rank / _group_size / _percentile 列，
+        还没有同组排名时为 NULL。
+        """
+        columns, joins = [], []
+        for scope in PEER_RANKING_SCOPES:
+            alias = f"pr_{scope.lower()}"
+            columns.append(
+                f"{alias}.rank_in_group AS {scope.lower()}_rank, {alias}.group_size AS {scope.lower()}_group_size, "
+                f"{alias}.percentile AS {scope.lower()}_percentile"
+            )
+            joins.append(
+                f"LEFT JOIN fund_peer_rankings {alias} ON {alias}.fund_id = its.fund_id "
+                f"AND {alias}.ranking_scope = '{scope}'"
+            )
+        sql = f"""
+            SELECT its.*, f.fund_code, f.fund_name, f.region, f.fund_type, {', '.join(columns)}
+            FROM fund_total_scores its
+            JOIN funds f ON its.fund_id = f.id
+            {' '.join(joins)}
+            ORDER BY its.total_score DESC, its.fund_id
+        """
+        try:
+            yield from stream_query(sql, chunk_size=chunk_size, read_only=read_only)
+        except Exception as e:
+            logger.error(f"Error streaming fund rankings: {str(e)}")
+            raise
+
+    def count_fund_totals(self) -> int:
+        """统计已计算总分的基金数量（各等级行数之和，读取汇总统计表）"""
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT COALESCE(SUM(item_count), 0) as count FROM fund_score_aggregates WHERE metric = 'grade'"
+                    )
+                    result = cursor.fetchone()
+                    return int(result['count']) if result else 0
+        except Exception as e:
+            logger.error(f"Error counting fund totals: {str(e)}")
+            raise
+
+    def get_fund_aggregates(self, metric: str) -> List[Dict]:
+        """读取某个统计项的汇总行（metric 为 grade 或 dimension）"""
+        try:
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        SELECT bucket, item_count, value_sum
+                        FROM fund_score_aggregates
+                        WHERE metric = %s AND item_count > 0
+                    """
+                    cursor.execute(sql, (metric,))
+                    return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error getting fund aggregates: {str(e)}")
+            raise
+
+    def rebuild_fund_aggregates(self) -> Dict[tuple, tuple]:
+        """
+        由 fund_total_scores / fund_scoring_summary 重新计算汇总统计（修复偏差）
+
+        Returns:
+            {(metric, bucket): ((重建前行数, 得分合计), (重建后行数, 得分合计))}，只包含有偏差的统计项
+        """
+        select_sql = "SELECT metric, bucket, item_count, value_sum FROM fund_score_aggregates"
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
-                    sql = "UPDATE fund_total_scores SET rank_in_period = %s WHERE fund_id = %s"
-                    for item in rankings:
-                        cursor.execute(sql, (item['rank'], item['fund_id']))
+                    cursor.execute(select_sql + " FOR UPDATE")
+                    before = {(r['metric'], r['bucket']): (r['item_count'], r['value_sum']) for r in cursor.fetchall()}
+                    cursor.execute("DELETE FROM fund_score_aggregates")
+                    cursor.execute("""
+                        INSERT INTO fund_score_aggregates (metric, bucket, item_count, value_sum)
+                        SELECT 'grade', COALESCE(grade, ''), COUNT(*), SUM(total_score)
+                        FROM fund_total_scores
+                        GROUP BY grade
+                    """)
+                    cursor.execute("""
+                        INSERT INTO fund_score_aggregates (metric, bucket, item_count, value_sum)
+                        SELECT 'dimension', CAST(dimension_id AS CHAR), COUNT(*), SUM(weighted_total)
+                        FROM fund_scoring_summary
+                        GROUP BY dimension_id
+                    """)
+                    cursor.execute(select_sql)
+                    after = {(r['metric'], r['bucket']): (r['item_count'], r['value_sum']) for r in cursor.fetchall()}
                     conn.commit()
-                    logger.info(f"Updated {len(rankings)} investment rankings")
+        except Exception as e:
+            logger.error(f"Error rebuilding fund aggregates: {str(e)}")
+            raise
+
+        empty = (0, Decimal('0'))
+        drift = {}
+        for key in before.keys() | after.keys():
+            old, new = before.get(key, empty), after.get(key, empty)
+            if old[0] != new[0] or _cents(old[1]) != _cents(new[1]):
+                drift[key] = (old, new)
+        logger.info(f"Rebuilt fund aggregates: {len(after)} rows, {len(drift)} drifted")
+        return drift
+
+    def update_fund_rankings(self) -> int:
+        """
+        按总分重新计算基金排名（一条 RANK() 窗口函数的 UPDATE ... JOIN），同一事务中重算同组排名
+
+        排名版本号同时加一，各进程的排名索引据此重新构建。
+
+        总分相同的排名相同，下一名跳过相应名次（1, 2, 2, 4），与 ScoringCalculator.calculate_project_ranking 一致。
+        只更新排名发生变化的行。
+
+        Returns:
+            rank_in_period 发生变化的行数
+        """
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    sql = """
+                        UPDATE fund_total_scores t
+                        JOIN (
+                            SELECT fund_id, RANK() OVER (ORDER BY total_score DESC) AS new_rank
+                            FROM fund_total_scores
+                        ) r ON r.fund_id = t.fund_id
+                        SET t.rank_in_period = r.new_rank
+                        WHERE NOT (t.rank_in_period <=> r.new_rank)
+                    """
+                    cursor.execute(sql)
+                    changed = cursor.rowcount
+                    refresh_peer_rankings(cursor)
+                    cursor.execute(_BUMP_RANKING_VERSION_SQL)
+                    conn.commit()
+                    logger.info(f"Updated {changed} investment rankings")
+                    return changed
         except Exception as e:
             logger.error(f"Error updating investment rankings: {str(e)}")
             raise
+
+    def update_fund_peer_rankings(self, fund_id: Optional[int] = None) -> int:
+        """
+        重算同组排名（地区、基金类型、各维度；一条窗口函数语句，只改写有变化的行）
+
+        Args:
+            fund_id: 只重算包含这只基金的分区（保存单只基金的总分后）；None 表示全部
+
+        Returns:
+            写入或删除的行数
+        """
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    if fund_id is None:
+                        written = refresh_peer_rankings(cursor)
+                    else:
+                        written = refresh_fund_peer_rankings(cursor, fund_id)
+                    conn.commit()
+                    logger.info(f"Updated {written} fund peer ranking rows")
+                    return written
+        except Exception as e:
+            logger.error(f"Error updating fund peer rankings: {str(e)}")
+            raise
+
+    def apply_fund_rank_shift(
+        self,
+        fund_id: int,
+        rank: int,
+        step: int,
+        low: Optional[Decimal],
+        high: Optional[Decimal]
+    ) -> int:
+        """
+        按排名索引给出的名次平移写回排名：只更新名次发生变化的行
+
+        总分在 [low, high) 内的其他基金名次加 step（low 为 None 表示不设下限），
+        再把这只基金的名次设为 rank。
+
+        Returns:
+            更新的行数
+        """
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    changed = 0
+                    if step:
+                        sql = """
+                            UPDATE fund_total_scores
+                            SET rank_in_period = rank_in_period + %s
+                            WHERE fund_id <> %s AND total_score < %s
+                        """
+                        params = [step, fund_id, high]
+                        if low is not None:
+                            sql += " AND total_score >= %s"
+                            params.append(low)
+                        cursor.execute(sql, params)
+                        changed += cursor.rowcount
+                    cursor.execute(
+                        "UPDATE fund_total_scores SET rank_in_period = %s "
+                        "WHERE fund_id = %s AND NOT (rank_in_period <=> %s)",
+                        (rank, fund_id, rank)
+                    )
+                    changed += cursor.rowcount
+                    conn.commit()
+                    return changed
+        except Exception as e:
+            logger.error(f"Error applying investment rank shift: {str(e)}")
+            raise
@@ -5,6 +5,7 @@ from typing import List, Optional
 import logging
 
 from app.utils.database import get_db_connection, hash_password, verify_password
+from app.utils.pagination import Page, build_page, keyset_sql
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +43,7 @@ class UserRepository:
     def get_by_id(self, user_id: int) -> Optional[dict]:
         """根据ID获取用户"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT * FROM users WHERE id = %s"
                     cursor.execute(sql, (user_id,))
@@ -54,7 +55,7 @@ class UserRepository:
     def get_by_username(self, username: str) -> Optional[dict]:
         """根据用户名获取用户"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT * FROM users WHERE username = %s"
                     cursor.execute(sql, (username,))
@@ -151,32 +152,41 @@ class UserRepository:
         is_active: Optional[bool] = None,
         limit: int = 100
     ) -> List[dict]:
-        """查询用户列表"""
+        """查询用户列表（最新的 limit 条）"""
+        return self.list_users_page(role, department, is_active, limit=limit).items
+
+    def list_users_page(
+        self,
+        role: Optional[str] = None,
+        department: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page:
+        """按创建时间倒序分页查询用户列表（cursor 为上一页返回的 next_cursor）"""
         try:
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = "SELECT * FROM users WHERE 1=1"
+            with get_db_connection(read_only=True) as conn:
+                with conn.cursor() as db_cursor:
+                    sql = "SELECT u.* FROM users u WHERE 1=1"
                     params = []
 
                     if role:
-                        sql += " AND role = %s"
+                        sql += " AND u.role = %s"
                         params.append(role)
                     if department:
-                        sql += " AND department = %s"
+                        sql += " AND u.department = %s"
                         params.append(department)
                     if is_active is not None:
-                        sql += " AND is_active = %s"
+                        sql += " AND u.is_active = %s"
                         params.append(is_active)
 
-                    sql += " ORDER BY created_at DESC LIMIT %s"
-                    params.append(limit)
-
-                    cursor.execute(sql, params)
-                    users = cursor.fetchall()
+                    condition, order, page_params = keyset_sql('u', cursor, limit)
+                    db_cursor.execute(sql + condition + order, params + page_params)
+                    page = build_page(db_cursor.fetchall(), limit)
                     # 不返回密码哈希
-                    for user in users:
+                    for user in page.items:
                         user.pop('password_hash', None)
-                    return users
+                    return page
         except Exception as e:
             logger.error(f"Error listing users: {str(e)}")
             raise
@@ -184,7 +194,7 @@ class UserRepository:
     def get_departments(self) -> List[str]:
         """获取所有部门列表"""
         try:
-            with get_db_connection() as conn:
+            with get_db_connection(read_only=True) as conn:
                 with conn.cursor() as cursor:
                     sql = "SELECT DISTINCT department FROM users WHERE department IS NOT NULL ORDER BY department"
                     cursor.execute(sql)
@@ -0,0 +1,148 @@
+"""
+按指标数据自动评分
+
+读取多只基金的指标数据表（每行一只基金：基金编码列加若干指标数据列，列名为 METRIC_BANDS 中的
+指标数据字段或中文名称），用 MetricScorer 一次映射为叶子指标得分，然后按基金分批：
+- 多行 upsert 写入 fund_scores（评语记录所依据的数据）
+- 同一事务中用 refresh_funds 重算父指标、维度汇总和已有的总分
+全部批次完成后一条语句重算排名。空白或无法解析为数值的单元格不评分，保留原有评分；
+还没有总分的基金在评完其余指标后按原流程计算总分。
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.database import unit_of_work
+from app.utils.fixed_point import to_decimal
+from app.utils.metric_bands import MISSING, MetricScorer
+from config.settings import scoring_config
+from core.repositories.fund_repository import FundRepository
+from core.repositories.scoring_repository import ScoringRepository
+from core.services.ranking_index import invalidate_fund_ranking_index
+from core.services.rescore_service import refresh_funds
+from core.services.scoring_catalog import get_scoring_catalog
+
+logger = logging.getLogger(__name__)
+
+# 基金编码列可用的列名
+FUND_CODE_COLUMNS = ('fund_code', '基金编码')
+
+
+@dataclass
+class AutoScoreReport:
+    """自动评分结果"""
+    funds: int = 0                  # 写入了评分的基金数
+    scores: int = 0                 # 写入的指标得分数
+    changed_funds: int = 0          # 维度汇总或总分有变化的基金数
+    grade_changes: int = 0
+    rank_changes: int = 0
+    columns: Dict[str, str] = field(default_factory=dict)   # 数据列 → 指标编码
+    unknown_funds: List[str] = field(default_factory=list)  # 找不到的基金编码
+    invalid_cells: int = 0          # 有内容但无法解析为数值的单元格
+    seconds: float = 0.0
+
+    @property
+    def funds_per_second(self) -> float:
+        return self.funds / self.seconds if self.seconds > 0 else 0.0
+
+
+def load_metrics_file(path: str) -> pd.DataFrame:
+    """读取指标数据文件（.csv 或 Excel），基金编码按文本读取"""
+    converters = {column: str for column in FUND_CODE_COLUMNS}
+    if Path(path).suffix.lower() == '.csv':
+        return pd.read_csv(path, converters=converters)
+    return pd.read_excel(path, converters=converters)
+
+
+def autoscore_funds(metrics: pd.DataFrame, scorer_id: int, chunk_size: Optional[int] = None) -> AutoScoreReport:
+    """
+    按指标数据批量评分
+
+    Args:
+        metrics: 指标数据表，每行一只基金
+        scorer_id: 记为评分人的用户ID
+        chunk_size: 每批基金数，默认 RESCORE_CHUNK_SIZE
+
+    Returns:
+        AutoScoreReport
+
+    Raises:
+        ValueError: 没有基金编码列或没有可自动评分的列
+    """
+    chunk_size = chunk_size or scoring_config.rescore_chunk_size
+    started = time.perf_counter()
+    scorer = MetricScorer()
+    report = AutoScoreReport()
+
+    code_column = next((column for column in FUND_CODE_COLUMNS if column in metrics.columns), None)
+    if code_column is None:
+        raise ValueError(f"指标数据缺少基金编码列（{' 或 '.join(FUND_CODE_COLUMNS)}）")
+    columns = scorer.resolve_columns(metrics.columns)
+    if not columns:
+        raise ValueError("指标数据中没有可自动评分的列")
+    report.columns = {column: band.code for column, band in columns.items()}
+
+    codes = metrics[code_column].astype(str).str.strip()
+    fund_ids = FundRepository().get_ids_by_codes(codes.tolist())
+    report.unknown_funds = sorted(set(codes) - set(fund_ids))
+    known = codes.isin(list(fund_ids)).to_numpy()
+    row_fund_ids = [fund_ids[code] for code in codes[known]]
+
+    values = {}
+    for column in columns:
+        raw = metrics[column]
+        parsed = pd.to_numeric(raw, errors='coerce')
+        report.invalid_cells += int((parsed.isna() & raw.notna() & (raw.astype(str).str.strip() != '')).sum())
+        values[column] = parsed.to_numpy(dtype=np.float64)[known]
+    scored = scorer.evaluate(values)
+
+    # 每只基金的评分行（同一基金出现多次时以最后一行为准）
+    catalog = get_scoring_catalog()
+    by_fund: Dict[int, Dict[int, Dict]] = {}
+    for column, band in columns.items():
+        indicator = catalog.indicator_by_code.get(band.code)
+        if indicator is None or not indicator.is_leaf:
+            logger.warning(f"Skipping metric column {column}: indicator {band.code} is not a leaf in the catalog")
+            continue
+        for fund_id, value, score in zip(row_fund_ids, values[column], scored[band.code]):
+            if score == MISSING:
+                continue
+            by_fund.setdefault(fund_id, {})[indicator.id] = {
+                'fund_id': fund_id,
+                'dimension_id': indicator.dimension_id,
+                'indicator_id': indicator.id,
+                'score': to_decimal(int(score)),
+                'weighted_score': to_decimal(int(score)),
+                'scorer_id': scorer_id,
+                'scorer_comment': f"按指标数据自动评分：{band.name} {Decimal(str(value)).normalize():f}{band.unit}"
+            }
+
+    repo = ScoringRepository()
+    scored_funds = list(by_fund)
+    total_rows = 0
+    for start in range(0, len(scored_funds), chunk_size):
+        chunk = scored_funds[start:start + chunk_size]
+        rows = [row for fund_id in chunk for row in by_fund[fund_id].values()]
+        with unit_of_work():
+            report.scores += repo.save_fund_scores_bulk(None, rows)
+            refreshed = refresh_funds(chunk, update_rankings=False)
+        report.funds += len(chunk)
+        report.changed_funds += refreshed.changed_funds
+        report.grade_changes += refreshed.grade_changes
+        total_rows += refreshed.total_rows
+
+    if total_rows:
+        report.rank_changes = repo.update_fund_rankings()
+        invalidate_fund_ranking_index()
+    report.seconds = time.perf_counter() - started
+    logger.info(
+        f"Auto-scored {report.scores} indicators for {report.funds} funds in {report.seconds:.1f}s, "
+        f"{report.changed_funds} changed, {len(report.unknown_funds)} unknown funds"
+    )
+    return report
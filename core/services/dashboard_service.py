@@ -0,0 +1,90 @@
+"""
+仪表盘数据服务
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List
+import logging
+import time
+
+from app.utils.database import bind_db_session, current_db_session
+from app.utils.query_stats import attach_rerun, current_rerun
+from core.repositories.fund_repository import FundRepository
+from core.repositories.scoring_repository import ScoringRepository
+from core.services.scoring_service import ScoringService
+
+logger = logging.getLogger(__name__)
+
+# 仪表盘的几个查询互不依赖，放到线程池里并发执行，各自从连接池借用连接
+_executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix='dashboard')
+
+
+@dataclass
+class DashboardSnapshot:
+    """仪表盘一次加载的全部数据"""
+    total_funds: int = 0
+    scored_funds: int = 0
+    grade_distribution: Dict[str, int] = field(default_factory=dict)
+    dimension_averages: Dict[str, float] = field(default_factory=dict)
+    recent_funds: List[dict] = field(default_factory=list)
+    load_ms: float = 0.0  # 加载耗时（约等于最慢的一个查询）
+
+    @property
+    def excellent_count(self) -> int:
+        return self.grade_distribution.get('excellent', 0)
+
+    @property
+    def excellent_rate(self) -> float:
+        """优秀率（百分比）"""
+        total = sum(self.grade_distribution.values())
+        return self.excellent_count / total * 100 if total > 0 else 0.0
+
+
+class DashboardService:
+    """仪表盘数据服务"""
+
+    def __init__(self):
+        self.fund_repo = FundRepository()
+        self.scoring_repo = ScoringRepository()
+        self.scoring_service = ScoringService()
+
+    def load_snapshot(self, recent_limit: int = 10) -> DashboardSnapshot:
+        """
+        并发加载仪表盘数据
+
+        五个查询同时发出，页面等待时间接近最慢的一个查询而不是五个之和。
+        单个查询失败时记录日志并使用空值，不影响其他数据的展示。
+        """
+        started = time.perf_counter()
+        report = current_rerun()
+        session = current_db_session()
+
+        def run(loader, *args):
+            # 工作线程中的SQL仍记到当前页面重跑的统计上，读写路由也沿用当前会话
+            with attach_rerun(report), bind_db_session(session):
+                return loader(*args)
+
+        tasks = {
+            'total_funds': (self.fund_repo.count_funds, 0),
+            'scored_funds': (self.scoring_repo.count_fund_totals, 0),
+            'grade_distribution': (self.scoring_service.get_fund_grade_distribution, {}),
+            'dimension_averages': (self.scoring_service.get_fund_dimension_averages, {}),
+            'recent_funds': (lambda: self.fund_repo.list_recent_with_scores(recent_limit), []),
+        }
+        futures = {name: _executor.submit(run, loader) for name, (loader, _) in tasks.items()}
+
+        values = {}
+        for name, future in futures.items():
+            try:
+                values[name] = future.result()
+            except Exception as e:
+                logger.error(f"Error loading dashboard {name}: {str(e)}")
+                values[name] = tasks[name][1]
+
+        snapshot = DashboardSnapshot(**values)
+        snapshot.load_ms = (time.perf_counter() - started) * 1000
+        return snapshot
+
+
+# 创建全局实例
+dashboard_service = DashboardService()
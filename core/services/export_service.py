@@ -12,10 +12,11 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
 
-from config.scoring_rules import SCORING_DIMENSIONS
+from app.utils.scoring_options import DIMENSION_INDICATORS, OPTION_TABLES
+from config.scoring_rules import SCORING_DIMENSIONS, GRADING_STANDARDS
 from core.repositories.fund_repository import FundRepository
 from core.repositories.scoring_repository import ScoringRepository
-from app.utils.database import get_db_connection
+from core.services.scoring_service import DimensionScore, FundScoringSnapshot, IndicatorScore, ScoringService
 
 logger = logging.getLogger(__name__)
 
@@ -26,38 +27,38 @@ class ExportService:
     def __init__(self):
         self.fund_repo = FundRepository()
         self.scoring_repo = ScoringRepository()
+        self.scoring_service = ScoringService()
 
-    def export_scoring_report_excel(self, fund_id: int) -> bytes:
+    def export_scoring_report_excel(self, fund_id: int, snapshot: Optional[FundScoringSnapshot] = None) -> bytes:
         """
         导出评分报告为Excel文件
 
         Args:
             fund_id: 基金ID
+            snapshot: 页面上已经加载的评分快照（不传则查询一次）
 
         Returns:
             Excel文件的字节流
         """
         try:
-            # 获取基金信息
-            fund = self.fund_repo.get_by_id(fund_id)
-            if not fund:
+            # 获取基金信息和评分详情
+            if snapshot is None:
+                snapshot = self.scoring_service.get_fund_scoring_snapshot(fund_id)
+            if not snapshot:
                 raise ValueError(f"基金 {fund_id} 不存在")
 
-            # 获取评分详情
-            scoring_detail = self._get_fund_scoring_detail(fund_id)
-
             # 创建工作簿
             wb = Workbook()
             wb.remove(wb.active)  # 删除默认sheet
 
             # 创建总览sheet
-            self._create_overview_sheet(wb, fund, scoring_detail)
+            self._create_overview_sheet(wb, snapshot)
 
             # 创建各维度详情sheet
             dim_idx = 0
-            for dim_code, dim_data in scoring_detail.get('dimensions', {}).items():
+            for dim_code, dimension in snapshot.dimensions.items():
                 dim_idx += 1
-                self._create_dimension_sheet(wb, dim_code, dim_data, scoring_detail, dim_idx)
+                self._create_dimension_sheet(wb, dim_code, dimension, dim_idx)
 
             # 保存到字节流
             output = io.BytesIO()
@@ -69,101 +70,65 @@ class ExportService:
             logger.error(f"Error exporting scoring report: {str(e)}")
             raise
 
-    def _get_fund_scoring_detail(self, fund_id: int) -> dict:
-        """获取投资评分详情"""
+    def export_fund_rankings_excel(self, chunk_size: int = 1000) -> bytes:
+        """
+        导出全部基金的总分、排名和同组排名（读取 fund_peer_rankings，不再重新计算）
+
+        使用服务端游标逐批读取、只写模式的工作簿逐行写入，
+        基金数量很大时内存中也只保留当前批次的数据。
+
+        Returns:
+            Excel文件的字节流
+        """
         try:
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    # 获取总分
-                    sql = """
-                        SELECT its.*, f.fund_name, f.fund_code
-                        FROM fund_total_scores its
-                        JOIN funds f ON its.fund_id = f.id
-                        WHERE its.fund_id = %s
-                    """
-                    cursor.execute(sql, (fund_id,))
-                    total_score = cursor.fetchone()
-
-                    if not total_score:
-                        return {'success': False, 'message': '未找到评分数据'}
-
-                    # 获取各维度得分
-                    sql = """
-                        SELECT iss.*, sd.dimension_code, sd.dimension_name
-                        FROM fund_scoring_summary iss
-                        JOIN scoring_dimensions sd ON iss.dimension_id = sd.id
-                        WHERE iss.fund_id = %s
-                        ORDER BY sd.display_order
-                    """
-                    cursor.execute(sql, (fund_id,))
-                    dimension_scores = cursor.fetchall()
-
-                    # 获取指标得分
-                    sql = """
-                        SELECT ins.*,
-                               si.indicator_code, si.indicator_name,
-                               sd.dimension_code, sd.dimension_name
-                        FROM fund_scores ins
-                        JOIN scoring_indicators si ON ins.indicator_id = si.id
-                        JOIN scoring_dimensions sd ON si.dimension_id = sd.id
-                        WHERE ins.fund_id = %s
-                        ORDER BY sd.display_order, si.display_order
-                    """
-                    cursor.execute(sql, (fund_id,))
-                    indicator_scores = cursor.fetchall()
-
-                    # 获取评分人信息
-                    scorer_ids = list(set([s['scorer_id'] for s in indicator_scores]))
-                    scorers = {}
-                    if scorer_ids:
-                        placeholders = ','.join(['%s'] * len(scorer_ids))
-                        sql = f"SELECT id, real_name FROM users WHERE id IN ({placeholders})"
-                        cursor.execute(sql, tuple(scorer_ids))
-                        scorers = {u['id']: u['real_name'] for u in cursor.fetchall()}
-
-                    # 整理数据
-                    dimensions = {}
-                    for dim in dimension_scores:
-                        dim_code = dim['dimension_code']
-                        dimensions[dim_code] = {
-                            'name': dim['dimension_name'],
-                            'total_score': float(dim['total_score']),
-                            'weighted_total': float(dim['weighted_total']),
-                            'indicators': []
-                        }
-
-                    for ind in indicator_scores:
-                        dim_code = ind['dimension_code']
-                        scorer_name = scorers.get(ind['scorer_id'], '未知')
-                        dimensions[dim_code]['indicators'].append({
-                            'code': ind['indicator_code'],
-                            'name': ind['indicator_name'],
-                            'score': float(ind['score']),
-                            'weighted_score': float(ind['weighted_score']),
-                            'scorer': scorer_name,
-                            'comment': ind.get('scorer_comment', ''),
-                            'scored_at': ind['scored_at'].strftime('%Y-%m-%d') if ind['scored_at'] else ''
-                        })
-
-                    return {
-                        'success': True,
-                        'data': {
-                            'fund_name': total_score['fund_name'],
-                            'fund_code': total_score['fund_code'],
-                            'total_score': float(total_score['total_score']),
-                            'policy_score': float(total_score['policy_score']),
-                            'layout_score': float(total_score['layout_score']),
-                            'execution_score': float(total_score['execution_score']),
-                            'grade': total_score['grade'] or '-',
-                            'rank': total_score['rank_in_period'],
-                            'dimensions': dimensions
-                        }
-                    }
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("基金排名")
+            ws.append(['排名', '基金编码', '基金名称', '地区', '基金类型', '总分',
+                       '政策符合性', '优化生产力布局', '政策执行能力', '等级', '百分位',
+                       '地区内排名', '地区内百分位', '类型内排名', '类型内百分位',
+                       '政策符合性排名', '优化生产力布局排名', '政策执行能力排名'])
+
+            def group_rank(total, scope):
+                rank = total[f'{scope}_rank']
+                return f"{rank}/{total[f'{scope}_group_size']}" if rank is not None else ''
+
+            def percentile(total, scope):
+                value = total[f'{scope}_percentile']
+                return float(value) if value is not None else None
+
+            for rows in self.scoring_repo.iter_fund_rankings(chunk_size=chunk_size, read_only=True):
+                for total in rows:
+                    ws.append([
+                        total['rank_in_period'],
+                        total['fund_code'],
+                        total['fund_name'],
+                        total['region'] or '',
+                        total['fund_type'] or '',
+                        float(total['total_score']),
+                        float(total['policy_score']),
+                        float(total['layout_score']),
+                        float(total['execution_score']),
+                        GRADING_STANDARDS.get(total['grade'], {}).get('name', '-'),
+                        percentile(total, 'overall'),
+                        group_rank(total, 'region'),
+                        percentile(total, 'region'),
+                        group_rank(total, 'fund_type'),
+                        percentile(total, 'fund_type'),
+                        group_rank(total, 'policy'),
+                        group_rank(total, 'layout'),
+                        group_rank(total, 'execution')
+                    ])
+
+            output = io.BytesIO()
+            wb.save(output)
+            output.seek(0)
+            return output.read()
+
         except Exception as e:
-            logger.error(f"Error getting fund scoring detail: {str(e)}")
-            return {'success': False, 'message': str(e)}
+            logger.error(f"Error exporting fund rankings: {str(e)}")
+            raise
 
-    def _create_overview_sheet(self, wb: Workbook, fund: dict, scoring_detail: dict):
+    def _create_overview_sheet(self, wb: Workbook, snapshot: FundScoringSnapshot):
         """创建评分总览sheet"""
         ws = wb.create_sheet("评分总览", 0)
 
@@ -175,36 +140,42 @@ class ExportService:
         # 基本信息
         row = 3
         ws[f'A{row}'] = '基金编码'
-        ws[f'B{row}'] = scoring_detail.get('fund_code', '')
+        ws[f'B{row}'] = snapshot.fund_code
         row += 1
         ws[f'A{row}'] = '基金名称'
-        ws[f'B{row}'] = scoring_detail.get('fund_name', '')
+        ws[f'B{row}'] = snapshot.fund_name
         row += 2
 
         # 评分结果
         ws[f'A{row}'] = '总分'
         ws[f'A{row}'].font = Font(bold=True)
-        ws[f'B{row}'] = scoring_detail.get('total_score', 0)
+        ws[f'B{row}'] = float(snapshot.total_score or 0)
         ws[f'B{row}'].font = Font(bold=True, color="0066CC")
         row += 1
         ws[f'A{row}'] = '等级'
-        ws[f'B{row}'] = scoring_detail.get('grade', '-')
+        ws[f'B{row}'] = snapshot.grade or '-'
         row += 1
         ws[f'A{row}'] = '排名'
-        ws[f'B{row}'] = f"第 {scoring_detail.get('rank', '-')} 名" if scoring_detail.get('rank') else '-'
+        ws[f'B{row}'] = f"第 {snapshot.rank} 名" if snapshot.rank else '-'
+        for ranking in snapshot.peer_rankings.values():
+            if ranking.scope == 'overall':
+                continue
+            row += 1
+            ws[f'A{row}'] = f"{ranking.label}排名"
+            ws[f'B{row}'] = (f"{ranking.group}：" if ranking.group else '') + ranking.text
 
         # 空行
         row += 2
 
         # 维度得分
         ws[f'A{row}'] = '政策符合性'
-        ws[f'B{row}'] = scoring_detail.get('policy_score', 0)
+        ws[f'B{row}'] = float(snapshot.policy_score or 0)
         row += 1
         ws[f'A{row}'] = '优化生产力布局'
-        ws[f'B{row}'] = scoring_detail.get('layout_score', 0)
+        ws[f'B{row}'] = float(snapshot.layout_score or 0)
         row += 1
         ws[f'A{row}'] = '政策执行能力'
-        ws[f'B{row}'] = scoring_detail.get('execution_score', 0)
+        ws[f'B{row}'] = float(snapshot.execution_score or 0)
 
         # 列宽
         ws.column_dimensions['A'].width = 15
@@ -222,7 +193,7 @@ class ExportService:
                 ws[f'{c}{r}'].border = thin_border
                 ws[f'{c}{r}'].alignment = Alignment(horizontal='left', vertical='center')
 
-    def _create_dimension_sheet(self, wb: Workbook, dim_code: str, dim_data: dict, scoring_detail: dict, dim_idx: int):
+    def _create_dimension_sheet(self, wb: Workbook, dim_code: str, dimension: DimensionScore, dim_idx: int):
         """创建维度详情sheet"""
         # 从 SCORING_DIMENSIONS 获取维度名称
         dim_config = SCORING_DIMENSIONS.get(dim_code, {})
@@ -231,7 +202,7 @@ class ExportService:
         ws = wb.create_sheet(dim_name)
 
         # 构建层级嵌套数据
-        rows = self._build_dimension_rows(dim_code, dim_data, dim_config, dim_idx)
+        rows = self._build_dimension_rows(dim_code, dimension, dim_config, dim_idx)
 
         # 表头
         headers = ['维度', '指标', '子指标', '得分', '满分', '权重(%)', '加权得分', '评分人', '评分时间']
@@ -275,88 +246,68 @@ class ExportService:
                 cell.border = thin_border
                 cell.alignment = Alignment(horizontal='center', vertical='center')
 
-    def _build_dimension_rows(self, dim_code: str, dim_data: dict, dim_config: dict, dim_idx: int) -> List[list]:
+    def _build_dimension_rows(self, dim_code: str, dimension: DimensionScore, dim_config: dict, dim_idx: int) -> List[list]:
         """构建维度数据的层级嵌套行"""
         rows = []
         dim_name = dim_config.get('name', dim_code)
         dim_name_with_number = f"{dim_idx}. {dim_name}"
+        scores = {ind.code: ind for ind in dimension.indicators}
 
-        # 遍历指标
-        ind_idx = 0
-        for indicator in dim_config.get('indicators', []):
-            ind_idx += 1
-            ind_code = indicator['code']
-            ind_name = indicator['name']
-            ind_max_score = indicator.get('max_score', 0)
+        # 遍历指标（共用评分选项表中的名称、满分、权重和父子关系）
+        for ind_idx, ind_code in enumerate(DIMENSION_INDICATORS.get(dim_code, ()), 1):
+            indicator = OPTION_TABLES[ind_code]
+            ind_label = f"{dim_idx}.{ind_idx} {indicator.name}"
 
-            # 判断是叶子指标还是父指标
-            if indicator.get('type') == 'leaf':
+            if not indicator.is_parent:
                 # 叶子指标，直接评分
-                # 从评分数据中找到对应的分数
-                score_data = next(
-                    (s for s in dim_data.get('indicators', []) if s['code'] == ind_code),
-                    None
-                )
+                score_data = scores.get(ind_code)
                 if score_data:
                     rows.append([
                         dim_name_with_number,
-                        f"{dim_idx}.{ind_idx} {ind_name}",
+                        ind_label,
                         '-',
-                        score_data['score'],
-                        ind_max_score,
-                        f"{indicator.get('weight', 0):.2f}",
-                        score_data['weighted_score'],
-                        score_data['scorer'],
-                        score_data['scored_at']
+                        float(score_data.score),
+                        indicator.max_score,
+                        f"{indicator.weight:.2f}",
+                        float(score_data.weighted_score),
+                        *self._scorer_cells(score_data)
                     ])
+                continue
 
-            elif indicator.get('type') == 'parent':
-                # 父指标，有子指标
-                sub_indicators = indicator.get('sub_indicators', [])
-                subtotal_score = 0
-                subtotal_max = ind_max_score
-
-                sub_idx = 0
-                for sub_ind in sub_indicators:
-                    sub_idx += 1
-                    sub_code = sub_ind['code']
-                    sub_name = sub_ind['name']
-                    sub_max = sub_ind.get('max_score', 0)
-
-                    score_data = next(
-                        (s for s in dim_data.get('indicators', []) if s['code'] == sub_code),
-                        None
-                    )
-                    if score_data:
-                        subtotal_score += score_data['score']
-                        rows.append([
-                            dim_name_with_number,
-                            f"{dim_idx}.{ind_idx} {ind_name}",
-                            f"{dim_idx}.{ind_idx}.{sub_idx} {sub_name}",
-                            score_data['score'],
-                            sub_max,
-                            f"{sub_ind.get('weight', 0):.2f}",
-                            score_data['weighted_score'],
-                            score_data['scorer'],
-                            score_data['scored_at']
-                        ])
-
-                # 添加小计行
-                if subtotal_score > 0:
+            # 父指标，有子指标
+            subtotal_score = 0
+            for sub_idx, sub_code in enumerate(indicator.children, 1):
+                sub_ind = OPTION_TABLES[sub_code]
+                score_data = scores.get(sub_code)
+                if score_data:
+                    subtotal_score += float(score_data.score)
                     rows.append([
                         dim_name_with_number,
-                        f"{dim_idx}.{ind_idx} {ind_name}",
-                        '**小计**',
-                        subtotal_score,
-                        subtotal_max,
-                        f"{indicator.get('weight', 0):.2f}",
-                        f"{subtotal_score * (indicator.get('weight', 0) / 100):.2f}",
-                        '-',
-                        '-'
+                        ind_label,
+                        f"{dim_idx}.{ind_idx}.{sub_idx} {sub_ind.name}",
+                        float(score_data.score),
+                        sub_ind.max_score,
+                        f"{sub_ind.weight:.2f}",
+                        float(score_data.weighted_score),
+                        *self._scorer_cells(score_data)
                     ])
 
+            # 添加小计行
+            if subtotal_score > 0:
+                rows.append([
+                    dim_name_with_number,
+                    ind_label,
+                    '**小计**',
+                    subtotal_score,
+                    indicator.max_score,
+                    f"{indicator.weight:.2f}",
+                    f"{subtotal_score * (indicator.weight / 100):.2f}",
+                    '-',
+                    '-'
+                ])
+
         # 添加维度合计
-        dim_total = dim_data.get('total_score', 0)
+        dim_total = float(dimension.total_score or 0)
         dim_max = dim_config.get('max_score', 0)
         dim_weight = dim_config.get('weight', 0)
         rows.append([
@@ -366,13 +317,21 @@ class ExportService:
             dim_total,
             dim_max,
             f"{dim_weight:.2f}",
-            dim_data.get('weighted_total', 0),
+            float(dimension.weighted_total or 0),
             '-',
             '-'
         ])
 
         return rows
 
+    @staticmethod
+    def _scorer_cells(score_data: IndicatorScore) -> list:
+        """评分人和评分日期两列"""
+        return [
+            score_data.scorer_name or '未知',
+            score_data.scored_at.strftime('%Y-%m-%d') if score_data.scored_at else ''
+        ]
+
 
 # 创建全局实例
 export_service = ExportService()
@@ -5,6 +5,7 @@ from typing import Dict, List, Optional
 from decimal import Decimal
 import logging
 
+from app.utils.pagination import Page
 from core.repositories.fund_repository import FundRepository
 
 logger = logging.getLogger(__name__)
@@ -63,6 +64,21 @@ class FundService:
             logger.error(f"Error listing funds: {str(e)}")
             return []
 
+    def list_funds_page(
+        self,
+        status: Optional[str] = None,
+        region: Optional[str] = None,
+        fund_type: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page:
+        """分页查询基金列表，cursor 为上一页的 next_cursor"""
+        try:
+            return self.fund_repo.list_funds_page(status, region, fund_type, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error listing funds page: {str(e)}")
+            return Page()
+
     def update_fund(self, fund_id: int, fund: dict) -> Dict:
         """
         更新基金信息
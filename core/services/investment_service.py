@@ -5,6 +5,7 @@ from typing import Dict, List, Optional
 from decimal import Decimal
 import logging
 
+from app.utils.pagination import Page
 from core.repositories.investment_repository import InvestmentRepository
 
 logger = logging.getLogger(__name__)
@@ -63,6 +64,21 @@ class InvestmentService:
             logger.error(f"Error listing investments: {str(e)}")
             return []
 
+    def list_investments_page(
+        self,
+        fund_id: Optional[int] = None,
+        status: Optional[str] = None,
+        industry: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page:
+        """分页查询投资列表，cursor 为上一页的 next_cursor"""
+        try:
+            return self.investment_repo.list_investments_page(fund_id, status, industry, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error listing investments page: {str(e)}")
+            return Page()
+
     def get_investments_for_scoring(self) -> List[dict]:
         """获取待评分投资列表"""
         try:
@@ -5,6 +5,7 @@ from typing import Dict, List, Optional
 from decimal import Decimal
 import logging
 
+from app.utils.pagination import Page
 from core.repositories.project_repository import ProjectRepository
 
 logger = logging.getLogger(__name__)
@@ -63,6 +64,21 @@ class ProjectService:
             logger.error(f"Error listing projects: {str(e)}")
             return []
 
+    def list_projects_page(
+        self,
+        status: Optional[str] = None,
+        region: Optional[str] = None,
+        industry: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page:
+        """分页查询项目列表，cursor 为上一页的 next_cursor"""
+        try:
+            return self.project_repo.list_projects_page(status, region, industry, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error listing projects page: {str(e)}")
+            return Page()
+
     def get_projects_for_scoring(self) -> List[dict]:
         """获取待评分项目列表"""
         try:
@@ -0,0 +1,213 @@
+"""
+基金排名索引
+
+把所有基金总分按"分"（0.01）放进定长的桶，用树状数组（Fenwick tree）维护每个桶的基金数：
+- 任一基金的名次 = 1 + 总分严格更高的基金数，一次前缀和查询，O(log n)
+- 一只基金总分变化时，名次变化的只有总分落在新旧总分之间的基金，
+  它们在排序中占据一段连续的位置，由 RankShift 给出
+
+索引在进程内首次使用时由 fund_total_scores 构建；其他进程写入的总分无法实时感知，所以每次写入时
+把库中的指纹（已评分基金数、总分合计和排名版本号）与索引比对，不一致或距上次构建超过
+RANKING_INDEX_REFRESH_SECONDS 秒时重新构建。全量重算排名（重新评分、自动评分、后台清扫）会把版本号加一，
+其他进程逐只写入的总分则改变基金数或总分合计。
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+import threading
+import time
+
+from app.utils import fixed_point
+from config.settings import scoring_config
+from core.repositories.scoring_repository import ScoringRepository
+
+logger = logging.getLogger(__name__)
+
+# DECIMAL(5,2) 的取值上限 999.99
+MAX_SCORE_CENTS = 99999
+
+
+@dataclass(frozen=True)
+class RankShift:
+    """
+    一次总分变化引起的名次平移
+
+    总分在 [low, high) 区间内的其他基金名次都加 step（+1 或 -1），
+    它们在新排序中占据第 first_rank 到第 last_rank 位，新名次（并列时取最高位）都落在这个区间内；
+    count 为 0 表示没有基金受影响。
+    """
+    fund_id: int
+    rank: Optional[int]             # 该基金的新名次；移除时为 None
+    step: int
+    first_rank: int
+    last_rank: int
+    low: Optional[Decimal]          # None 表示不设下限
+    high: Optional[Decimal]
+
+    @property
+    def count(self) -> int:
+        """名次变化的其他基金数"""
+        return max(0, self.last_rank - self.first_rank + 1)
+
+
+class FundRankingIndex:
+    """基金总分的名次索引（树状数组，桶宽 0.01 分）"""
+
+    def __init__(self, max_score_cents: int = MAX_SCORE_CENTS):
+        self._size = max_score_cents + 1
+        self._tree = [0] * (self._size + 1)
+        self._cents: Dict[int, int] = {}
+        self._total_cents = 0
+        self.built_at = time.monotonic()
+        # 构建时库中的排名版本号
+        self.version: Optional[int] = None
+        # 库中的 rank_in_period 是否已与索引一致（构建后首次写入时全量校正一次）
+        self.synced = False
+
+    @classmethod
+    def build(
+        cls,
+        totals: Iterable[Tuple[int, object]],
+        version: Optional[int] = None,
+        max_score_cents: int = MAX_SCORE_CENTS
+    ) -> 'FundRankingIndex':
+        """由 (fund_id, total_score) 构建索引，O(n + 桶数)"""
+        index = cls(max_score_cents)
+        index.version = version
+        counts = [0] * (index._size + 1)
+        for fund_id, total in totals:
+            cents = index._check(fixed_point.cents(total))
+            index._cents[fund_id] = cents
+            index._total_cents += cents
+            counts[cents + 1] += 1
+        # 线性建树：每个节点把自己的值加到父节点
+        tree = counts
+        for i in range(1, index._size + 1):
+            parent = i + (i & -i)
+            if parent <= index._size:
+                tree[parent] += tree[i]
+        index._tree = tree
+        return index
+
+    def __len__(self) -> int:
+        return len(self._cents)
+
+    def __contains__(self, fund_id: int) -> bool:
+        return fund_id in self._cents
+
+    def matches(self, fingerprint: Dict, fund_id: int, total) -> bool:
+        """
+        库中的指纹（get_fund_ranking_fingerprint_for_update，已写入 fund_id 的新总分）是否与索引一致
+
+        即索引按新总分更新后，基金数、总分合计与库中相同，且期间没有全量重算排名。
+        """
+        cents = fixed_point.cents(total)
+        expected_count = len(self._cents) + (fund_id not in self._cents)
+        expected_sum = self._total_cents - self._cents.get(fund_id, 0) + cents
+        return fingerprint['version'] == self.version and fingerprint['fund_count'] == expected_count \
+            and fixed_point.cents(fingerprint['total_sum']) == expected_sum
+
+    def _check(self, cents: int) -> int:
+        if not 0 <= cents < self._size:
+            raise ValueError(f"Total score out of ranking index range: {cents / 100}")
+        return cents
+
+    def _add(self, cents: int, delta: int):
+        i = cents + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _count_le(self, cents: int) -> int:
+        """总分 <= cents 的基金数"""
+        i = min(cents, self._size - 1) + 1
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _count_ge(self, cents: int) -> int:
+        return len(self._cents) - self._count_le(cents - 1) if cents > 0 else len(self._cents)
+
+    def rank_of_score(self, score) -> int:
+        """总分为 score 时的名次（并列同名次，后续名次跳过）"""
+        return 1 + len(self._cents) - self._count_le(self._check(fixed_point.cents(score)))
+
+    def rank(self, fund_id: int) -> Optional[int]:
+        """基金的名次；不在索引中时返回 None"""
+        cents = self._cents.get(fund_id)
+        if cents is None:
+            return None
+        return 1 + len(self._cents) - self._count_le(cents)
+
+    def ranks(self) -> Dict[int, int]:
+        """所有基金的名次"""
+        return {fund_id: self.rank(fund_id) for fund_id in self._cents}
+
+    def update(self, fund_id: int, total) -> RankShift:
+        """设置基金总分（新增或修改），返回引起的名次平移"""
+        new = self._check(fixed_point.cents(total))
+        old = self._cents.get(fund_id)
+        if old is not None:
+            self._add(old, -1)
+        self._add(new, 1)
+        self._cents[fund_id] = new
+        self._total_cents += new - (old or 0)
+        rank = 1 + len(self._cents) - self._count_le(new)
+
+        if old is None:
+            # 总分低于新基金的其他基金各后移一位
+            first = self._count_ge(new) + 1
+            return RankShift(fund_id, rank, 1, first, first + self._count_le(new - 1) - 1, None, fixed_point.to_decimal(new))
+        if new > old:
+            first = self._count_ge(new) + 1
+            affected = self._count_le(new - 1) - self._count_le(old - 1)
+            return RankShift(fund_id, rank, 1, first, first + affected - 1, fixed_point.to_decimal(old), fixed_point.to_decimal(new))
+        if new < old:
+            first = self._count_ge(old) + 1
+            affected = self._count_le(old - 1) - self._count_le(new - 1) - 1
+            return RankShift(fund_id, rank, -1, first, first + affected - 1, fixed_point.to_decimal(new), fixed_point.to_decimal(old))
+        return RankShift(fund_id, rank, 0, 1, 0, None, None)
+
+    def remove(self, fund_id: int) -> RankShift:
+        """移除基金，返回引起的名次平移"""
+        old = self._cents.pop(fund_id, None)
+        if old is None:
+            return RankShift(fund_id, None, 0, 1, 0, None, None)
+        self._add(old, -1)
+        self._total_cents -= old
+        first = self._count_ge(old) + 1
+        return RankShift(fund_id, None, -1, first, first + self._count_le(old - 1) - 1, None, fixed_point.to_decimal(old))
+
+
+_lock = threading.RLock()
+_index: Optional[FundRankingIndex] = None
+
+
+def get_fund_ranking_index() -> FundRankingIndex:
+    """获取本进程的基金排名索引（首次使用或超过刷新间隔时由 fund_total_scores 构建）"""
+    global _index
+    with _lock:
+        if _index is None or time.monotonic() - _index.built_at >= scoring_config.ranking_index_refresh_seconds:
+            repo = ScoringRepository()
+            # 先读版本号：读取总分期间有全量重算时，下次比对不一致而重新构建
+            version = repo.get_fund_ranking_version()
+            _index = FundRankingIndex.build(
+                ((row['fund_id'], row['total_score']) for row in repo.get_fund_total_pairs()), version
+            )
+            logger.info(f"Built fund ranking index: {len(_index)} funds")
+        return _index
+
+
+def invalidate_fund_ranking_index():
+    """丢弃本进程的索引（写入回滚或批量重算后调用），下次访问时重新构建"""
+    global _index
+    with _lock:
+        _index = None
+
+
+def ranking_index_lock() -> threading.RLock:
+    """修改索引并写回名次期间持有，保证同一进程内的并发写入按顺序平移名次"""
+    return _lock
@@ -0,0 +1,485 @@
+"""
+全量重算基金评分
+
+修改维度权重或指标满分后，按当前评分目录重新计算每只基金的指标得分（截断到满分）、
+父指标得分、维度汇总、总分、等级和排名：
+- 按 fund_id 顺序分批读取 fund_scores，每批包含若干只基金的全部评分
+- 用进程池并行执行 BatchScoringEngine，读取下一批与计算同时进行
+- 只把发生变化的行批量 upsert 回库，每批一个事务；提交后写检查点，
+  中断后再次运行从检查点之后的基金继续（评分规则变化时检查点作废，从头开始）
+- 全部完成后一条语句重算排名
+- dry_run 只比较并报告差异，不写库、不读写检查点
+
+写回的维度汇总和总分带上当前评分规则指纹（ScoringCatalog.rule_set_hash）。
+规则变化后不必立即全量重算：refresh_funds 在读取到过期基金时按需重算，
+sweep_stale_funds / start_stale_sweeper 在后台分批重算其余过期基金。
+"""
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.utils.batch_scoring import BatchScoringEngine, to_cents
+from app.utils.fixed_point import cents, to_decimal
+from app.utils.database import unit_of_work
+from config.settings import scoring_config
+from core.repositories.scoring_repository import ScoringRepository
+from core.services.ranking_index import invalidate_fund_ranking_index
+from core.services.scoring_catalog import ScoringCatalog, get_scoring_catalog
+
+logger = logging.getLogger(__name__)
+
+# 差异样例最多保留的条数
+MAX_SAMPLES = 20
+
+
+@dataclass
+class RescoreReport:
+    """全量重算结果（续跑时包含此前各批的累计数）"""
+    funds: int = 0                  # 重算的基金数
+    processed: int = 0              # 本次运行重算的基金数（不含续跑前已完成的）
+    changed_funds: int = 0          # 有任一得分变化的基金数
+    score_rows: int = 0             # 变化的指标得分行（截断的叶子指标和父指标）
+    summary_rows: int = 0           # 变化的维度汇总行
+    total_rows: int = 0             # 变化的总分行
+    grade_changes: int = 0
+    rank_changes: int = 0
+    resumed_after: int = 0          # 从这只基金之后继续（0 表示从头开始）
+    seconds: float = 0.0            # 本次运行耗时
+    dry_run: bool = False
+    samples: List[str] = field(default_factory=list)
+
+    @property
+    def funds_per_second(self) -> float:
+        return self.processed / self.seconds if self.seconds > 0 else 0.0
+
+
+def _load_checkpoint(path: Path, fingerprint: str) -> Optional[Dict]:
+    try:
+        checkpoint = json.loads(path.read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable rescore checkpoint {path}: {str(e)}")
+        return None
+    if checkpoint.get('rules') != fingerprint:
+        logger.warning(f"Scoring rules changed since checkpoint {path} was written, starting over")
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(path: Path, fingerprint: str, last_fund_id: int, report: RescoreReport):
+    """先写临时文件再替换，中断时不会留下半个检查点"""
+    counts = asdict(report)
+    for key in ('processed', 'resumed_after', 'seconds', 'dry_run', 'samples'):
+        counts.pop(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_suffix(path.suffix + '.tmp')
+    temp.write_text(
+        json.dumps({'rules': fingerprint, 'last_fund_id': last_fund_id, 'report': counts}),
+        encoding='utf-8'
+    )
+    os.replace(temp, path)
+
+
+# 进程池中每个工作进程编译一次的评分引擎
+_worker_engine: Optional[BatchScoringEngine] = None
+
+
+def _init_worker(rules: Dict):
+    global _worker_engine
+    _worker_engine = BatchScoringEngine(rules)
+
+
+def _compute(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """在工作进程中计算一批基金"""
+    return _compute_with(_worker_engine, matrix)
+
+
+def _compute_with(engine: BatchScoringEngine, matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """计算一批基金，结果以"分"为单位的整数返回"""
+    result = engine.compute(matrix)
+    return {
+        'leaf': to_cents(result.leaf_scores),
+        'parent': to_cents(result.parent_totals),
+        'dimension': to_cents(result.dimension_totals),
+        'weighted': to_cents(result.weighted_totals),
+        'total': to_cents(result.total_scores),
+        'grade': result.grades
+    }
+
+
+class _Batch:
+    """一批基金的原始评分行和评分矩阵（fund_ids 可以包含没有评分的基金，其矩阵行全为 0）"""
+
+    def __init__(
+        self,
+        rows: List[Dict],
+        engine: BatchScoringEngine,
+        catalog: ScoringCatalog,
+        fund_ids: Optional[List[int]] = None
+    ):
+        self.fund_ids: List[int] = list(dict.fromkeys(
+            fund_ids if fund_ids is not None else (row['fund_id'] for row in rows)
+        ))
+        position = {fund_id: i for i, fund_id in enumerate(self.fund_ids)}
+        self.matrix = np.zeros((len(self.fund_ids), len(engine.leaf_codes)), dtype=np.float64)
+        self.leaf_rows: Dict[tuple, Dict] = {}      # (基金位置, 叶子列) → 评分行
+        self.parent_rows: Dict[tuple, Dict] = {}    # (基金位置, 父指标编码) → 评分行
+        for row in rows:
+            indicator = catalog.indicator_by_id.get(row['indicator_id'])
+            if indicator is None:
+                continue
+            i = position[row['fund_id']]
+            if indicator.is_leaf:
+                column = engine.leaf_index[indicator.code]
+                self.matrix[i, column] = float(row['score'])
+                self.leaf_rows[(i, column)] = row
+            else:
+                self.parent_rows[(i, indicator.code)] = row
+
+
+def _diff_batch(
+    batch: _Batch,
+    computed: Dict[str, np.ndarray],
+    existing: Dict[int, Dict],
+    engine: BatchScoringEngine,
+    catalog: ScoringCatalog,
+    report: RescoreReport,
+    new_totals: Dict[int, int]
+) -> Dict[str, List[Dict]]:
+    """
+    比较一批基金的重算结果和库中数据，返回需要写回的行
+
+    维度汇总和总分的数值有变化，或评分规则指纹与当前目录不同（过期）时写回，
+    写回的行带上当前指纹；报告中只统计数值有变化的行。
+    已没有评分叶子指标的维度（规则修改移走了指标）若还有汇总行，按 0 分写回，过期检测因此能收敛。
+    """
+    writes = {'scores': [], 'summaries': [], 'totals': []}
+    current_hash = catalog.rule_set_hash
+    parent_columns = {code: j for j, code in enumerate(engine.parent_codes)}
+    dimensions = [catalog.dimension_by_code[code] for code in engine.dimension_codes]
+
+    # 每只基金有评分的维度和父指标，以及父指标的第一个子指标评分行（新建父指标行时沿用其评分人）
+    scored_dimensions = {i: set() for i in range(len(batch.fund_ids))}
+    scored_parents: Dict[tuple, Dict] = {}
+    for (i, column), row in batch.leaf_rows.items():
+        indicator = catalog.indicator_by_code[engine.leaf_codes[column]]
+        scored_dimensions[i].add(indicator.dimension_id)
+        if indicator.parent_id is not None:
+            parent = catalog.indicator_by_id[indicator.parent_id]
+            scored_parents.setdefault((i, parent.code), row)
+        new = int(computed['leaf'][i, column])
+        if new != cents(row['score']):
+            writes['scores'].append({**row, 'score': to_decimal(new)})
+
+    for (i, code), sub_row in scored_parents.items():
+        parent = catalog.indicator_by_code[code]
+        new = int(computed['parent'][i, parent_columns[code]])
+        old = batch.parent_rows.get((i, code))
+        if old is None or new != cents(old['score']):
+            writes['scores'].append({
+                'fund_id': sub_row['fund_id'], 'dimension_id': parent.dimension_id,
+                'indicator_id': parent.id, 'score': to_decimal(new), 'scorer_id': sub_row['scorer_id']
+            })
+
+    changed_funds = {row['fund_id'] for row in writes['scores']}
+    for i, fund_id in enumerate(batch.fund_ids):
+        state = existing[fund_id]
+        for j, dimension in enumerate(dimensions):
+            if dimension.id not in scored_dimensions[i] and dimension.id not in state['summaries']:
+                continue
+            total, weighted = int(computed['dimension'][i, j]), int(computed['weighted'][i, j])
+            old = state['summaries'].get(dimension.id)
+            changed = old is None or (total, weighted) != (cents(old['total_score']), cents(old['weighted_total']))
+            if changed or old.get('rule_set_hash') != current_hash:
+                writes['summaries'].append({
+                    'fund_id': fund_id, 'dimension_id': dimension.id,
+                    'total_score': to_decimal(total), 'weighted_total': to_decimal(weighted),
+                    'rule_set_hash': current_hash
+                })
+            if changed:
+                report.summary_rows += 1
+                changed_funds.add(fund_id)
+
+        old = state['total']
+        if old is None:
+            continue
+        total, grade = int(computed['total'][i]), str(computed['grade'][i])
+        new_totals[fund_id] = total
+        by_code = {code: int(computed['dimension'][i, j]) for j, code in enumerate(engine.dimension_codes)}
+        row = {
+            'fund_id': fund_id,
+            'total_score': to_decimal(total),
+            'policy_score': to_decimal(by_code.get('POLICY', 0)),
+            'layout_score': to_decimal(by_code.get('LAYOUT', 0)),
+            'execution_score': to_decimal(by_code.get('EXECUTION', 0)),
+            'grade': grade,
+            'rule_set_hash': current_hash
+        }
+        old_values = tuple(cents(old[key]) for key in ('total_score', 'policy_score', 'layout_score', 'execution_score'))
+        new_values = (total, by_code.get('POLICY', 0), by_code.get('LAYOUT', 0), by_code.get('EXECUTION', 0))
+        if old_values != new_values or grade != old['grade']:
+            writes['totals'].append(row)
+            report.total_rows += 1
+            changed_funds.add(fund_id)
+            report.grade_changes += grade != old['grade']
+            if len(report.samples) < MAX_SAMPLES:
+                report.samples.append(
+                    f"基金 {fund_id}: 总分 {old['total_score']} → {row['total_score']}，等级 {old['grade']} → {grade}"
+                )
+        elif old.get('rule_set_hash') != current_hash:
+            writes['totals'].append(row)
+
+    report.funds += len(batch.fund_ids)
+    report.processed += len(batch.fund_ids)
+    report.changed_funds += len(changed_funds)
+    report.score_rows += len(writes['scores'])
+    return writes
+
+
+def _count_rank_changes(new_totals: Dict[int, int], repo: ScoringRepository) -> int:
+    """dry_run：按重算后的总分计算排名，与库中排名比较"""
+    rows = repo.get_fund_total_pairs()
+    if not rows:
+        return 0
+    values = np.array([new_totals.get(row['fund_id'], cents(row['total_score'])) for row in rows], dtype=np.int64)
+    ranks = np.searchsorted(np.sort(-values), -values, side='left') + 1
+    return sum(1 for row, rank in zip(rows, ranks) if row['rank_in_period'] != rank)
+
+
+def rescore_funds(
+    chunk_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+    checkpoint_path: Optional[str] = None,
+    restart: bool = False,
+    progress: Optional[Callable[[RescoreReport], None]] = None
+) -> RescoreReport:
+    """
+    按当前评分目录全量重算所有已评分基金
+
+    Args:
+        chunk_size: 每批基金数，默认 RESCORE_CHUNK_SIZE
+        workers: 计算进程数，默认 CPU 核数；0 表示在当前进程中计算
+        dry_run: 只报告差异，不写库
+        checkpoint_path: 检查点文件，默认 RESCORE_CHECKPOINT
+        restart: 忽略已有检查点，从头开始
+        progress: 每批写回后以当前累计结果调用
+
+    Returns:
+        RescoreReport
+    """
+    chunk_size = chunk_size or scoring_config.rescore_chunk_size
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    path = Path(checkpoint_path or scoring_config.rescore_checkpoint)
+    repo = ScoringRepository()
+    catalog = get_scoring_catalog()
+    rules = catalog.rule_dimensions()
+    fingerprint = catalog.rule_set_hash
+    engine = BatchScoringEngine(rules)
+
+    report = RescoreReport(dry_run=dry_run)
+    checkpoint = None if dry_run or restart else _load_checkpoint(path, fingerprint)
+    if checkpoint:
+        report = RescoreReport(**checkpoint['report'], resumed_after=checkpoint['last_fund_id'])
+        logger.info(f"Resuming rescore after fund {report.resumed_after}")
+    after = report.resumed_after
+    new_totals: Dict[int, int] = {}
+    started = time.perf_counter()
+
+    executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(rules,)) if workers > 0 else None
+    if executor is None:
+        _init_worker(rules)
+
+    def submit(matrix) -> Future:
+        if executor is not None:
+            return executor.submit(_compute, matrix)
+        future = Future()
+        future.set_result(_compute(matrix))
+        return future
+
+    try:
+        pending = deque()
+        exhausted = False
+        while True:
+            # 保持每个计算进程都有一批在算，主进程同时读取下一批
+            while not exhausted and len(pending) < max(workers, 1) + 1:
+                rows = repo.get_fund_scores_after(after, chunk_size)
+                if not rows:
+                    exhausted = True
+                    break
+                batch = _Batch(rows, engine, catalog)
+                after = batch.fund_ids[-1]
+                pending.append((batch, submit(batch.matrix)))
+            if not pending:
+                break
+
+            batch, future = pending.popleft()
+            existing = repo.get_fund_results_by_funds(batch.fund_ids)
+            writes = _diff_batch(batch, future.result(), existing, engine, catalog, report, new_totals)
+            if not dry_run:
+                with unit_of_work():
+                    repo.save_fund_rescore_bulk(writes['scores'], writes['summaries'], writes['totals'])
+                _save_checkpoint(path, fingerprint, batch.fund_ids[-1], report)
+            report.seconds = time.perf_counter() - started
+            if progress:
+                progress(report)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if dry_run:
+        report.rank_changes = _count_rank_changes(new_totals, repo)
+    else:
+        report.rank_changes = repo.update_fund_rankings()
+        invalidate_fund_ranking_index()
+        path.unlink(missing_ok=True)
+
+    report.seconds = time.perf_counter() - started
+    logger.info(
+        f"Rescored {report.processed} funds in {report.seconds:.1f}s ({report.funds_per_second:.0f} funds/s), "
+        f"{report.changed_funds} changed, {report.rank_changes} ranks changed, dry_run={dry_run}"
+    )
+    return report
+
+
+# ==================== 过期基金的按需重算和后台清扫 ====================
+
+# 按需重算共用的评分引擎：(评分规则指纹, 引擎)，规则变化时重新编译
+_refresh_engine: Optional[Tuple[str, BatchScoringEngine]] = None
+
+
+def _engine_for(catalog: ScoringCatalog) -> BatchScoringEngine:
+    global _refresh_engine
+    cached = _refresh_engine
+    if cached is None or cached[0] != catalog.rule_set_hash:
+        cached = (catalog.rule_set_hash, BatchScoringEngine(catalog.rule_dimensions()))
+        _refresh_engine = cached
+    return cached[1]
+
+
+def _add_report(report: RescoreReport, part: RescoreReport):
+    for key in ('funds', 'processed', 'changed_funds', 'score_rows', 'summary_rows', 'total_rows', 'grade_changes'):
+        setattr(report, key, getattr(report, key) + getattr(part, key))
+    report.samples.extend(part.samples[:MAX_SAMPLES - len(report.samples)])
+
+
+def refresh_funds(fund_ids: List[int], update_rankings: bool = True) -> RescoreReport:
+    """
+    按当前评分目录重算指定基金，维度汇总和总分写上当前评分规则指纹
+
+    读取到过期基金时按需调用；在调用方的工作单元中执行（没有时自行开启一个）。
+    没有任何评分的基金，已有的维度汇总和总分按 0 分写回并写上当前指纹。
+
+    Args:
+        fund_ids: 基金ID
+        update_rankings: 总分有变化时是否重算排名（后台清扫在全部批次完成后统一重算）
+
+    Returns:
+        RescoreReport（只统计数值有变化的行）
+    """
+    repo = ScoringRepository()
+    catalog = get_scoring_catalog()
+    engine = _engine_for(catalog)
+    report = RescoreReport()
+    started = time.perf_counter()
+
+    with unit_of_work():
+        fund_ids = list(dict.fromkeys(fund_ids))
+        if not fund_ids:
+            return report
+        grouped = repo.get_fund_scores_by_funds(fund_ids, read_only=False)
+        rows = [row for fund_id in fund_ids for row in grouped[fund_id]]
+        batch = _Batch(rows, engine, catalog, fund_ids)
+        existing = repo.get_fund_results_by_funds(batch.fund_ids)
+        writes = _diff_batch(batch, _compute_with(engine, batch.matrix), existing, engine, catalog, report, {})
+        repo.save_fund_rescore_bulk(writes['scores'], writes['summaries'], writes['totals'])
+        if update_rankings and report.total_rows:
+            report.rank_changes = repo.update_fund_rankings()
+            invalidate_fund_ranking_index()
+
+    report.seconds = time.perf_counter() - started
+    logger.info(
+        f"Refreshed {report.funds} funds to rules {catalog.rule_set_hash}: "
+        f"{report.changed_funds} changed, {report.grade_changes} grades changed"
+    )
+    return report
+
+
+def sweep_stale_funds(batch_size: Optional[int] = None, max_batches: Optional[int] = None) -> RescoreReport:
+    """
+    按 fund_id 顺序分批重算所有评分规则指纹过期的基金，每批一个事务，最后统一重算一次排名
+
+    Args:
+        batch_size: 每批基金数，默认 STALE_SWEEP_BATCH
+        max_batches: 最多处理的批数（None 表示直到没有过期基金）
+    """
+    batch_size = batch_size or scoring_config.stale_sweep_batch
+    repo = ScoringRepository()
+    report = RescoreReport()
+    started = time.perf_counter()
+    after, batches = 0, 0
+    while max_batches is None or batches < max_batches:
+        fund_ids = repo.get_stale_fund_ids(get_scoring_catalog().rule_set_hash, after, batch_size)
+        if not fund_ids:
+            break
+        _add_report(report, refresh_funds(fund_ids, update_rankings=False))
+        after = fund_ids[-1]
+        batches += 1
+
+    if report.total_rows:
+        report.rank_changes = repo.update_fund_rankings()
+        invalidate_fund_ranking_index()
+    report.seconds = time.perf_counter() - started
+    if report.funds:
+        logger.info(
+            f"Swept {report.funds} stale funds in {report.seconds:.1f}s: "
+            f"{report.changed_funds} changed, {report.rank_changes} ranks changed"
+        )
+    return report
+
+
+_sweeper: Optional[threading.Thread] = None
+_sweeper_lock = threading.Lock()
+
+
+def _sweep_forever(interval: float):
+    while True:
+        try:
+            sweep_stale_funds()
+        except Exception as e:
+            logger.error(f"Stale score sweep failed: {str(e)}")
+        time.sleep(interval)
+
+
+def start_stale_sweeper(interval: Optional[float] = None) -> bool:
+    """
+    启动后台清扫线程：每隔 interval 秒（默认 STALE_SWEEP_SECONDS）重算一遍过期基金
+
+    每个进程只启动一个线程，重复调用无效果；间隔为 0 时不启动。
+
+    Returns:
+        本次是否启动了线程
+    """
+    global _sweeper
+    interval = scoring_config.stale_sweep_seconds if interval is None else interval
+    if interval <= 0:
+        return False
+    with _sweeper_lock:
+        if _sweeper is not None and _sweeper.is_alive():
+            return False
+        _sweeper = threading.Thread(
+            target=_sweep_forever, args=(interval,), name='stale-score-sweeper', daemon=True
+        )
+        _sweeper.start()
+        logger.info(f"Started stale score sweeper (every {interval:g}s)")
+        return True
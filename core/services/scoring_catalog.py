@@ -0,0 +1,263 @@
+"""
+评分目录缓存
+
+评分维度和指标很少变化，却在每次评分、汇总和页面渲染时被反复查询。
+这里把它们整体加载成一个不可变的目录对象，每个进程只加载一次，之后的
+编码→ID、ID→权重/满分、维度→指标查找都是字典命中。
+
+每个叶子指标有一个固定的评分完整度位（scoring_indicators.completeness_bit），基金的
+scored_mask 记录已评分叶子指标的位；评分进度、是否评完、缺哪些指标都由目录对位图做位运算得出。
+
+目录按 scoring_catalog_version 表中的版本号失效：init_scoring_data.py 和
+insert_scoring_data.py 修改维度或指标后调用 bump_catalog_version()，本进程立即重新加载，
+其他进程最多在 SCORING_CATALOG_CHECK_SECONDS 秒后发现版本变化并重新加载。
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import cached_property
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+import logging
+import threading
+import time
+
+from app.utils.scoring_options import rule_set_hash
+from config.settings import scoring_config
+from core.repositories.scoring_repository import ScoringRepository
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DimensionInfo:
+    """评分维度"""
+    id: int
+    code: str
+    name: str
+    weight: Decimal
+    max_score: Decimal
+    display_order: int
+
+
+@dataclass(frozen=True)
+class IndicatorInfo:
+    """评分指标（父指标、子指标和普通叶子指标）"""
+    id: int
+    code: str
+    name: str
+    dimension_id: int
+    weight: Decimal
+    max_score: Decimal
+    scoring_criteria: Optional[str]
+    display_order: int
+    parent_id: Optional[int] = None
+    indicator_type: str = 'leaf'
+    completeness_bit: Optional[int] = None
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.indicator_type != 'parent'
+
+
+@dataclass(frozen=True)
+class ScoringCatalog:
+    """某个版本的全部评分维度和指标（不可变）"""
+    version: int
+    dimensions: Tuple[DimensionInfo, ...]
+    indicators: Tuple[IndicatorInfo, ...]
+    dimension_by_code: Mapping[str, DimensionInfo]
+    dimension_by_id: Mapping[int, DimensionInfo]
+    indicator_by_code: Mapping[str, IndicatorInfo]
+    indicator_by_id: Mapping[int, IndicatorInfo]
+    indicators_by_dimension: Mapping[int, Tuple[IndicatorInfo, ...]]
+
+    @classmethod
+    def build(cls, version: int, dimension_rows: List[Dict], indicator_rows: List[Dict]) -> 'ScoringCatalog':
+        """由 scoring_dimensions / scoring_indicators 的查询结果构建目录"""
+        dimensions = tuple(
+            DimensionInfo(
+                id=row['id'],
+                code=row['dimension_code'],
+                name=row['dimension_name'],
+                weight=Decimal(str(row['weight'])),
+                max_score=Decimal(str(row['max_score'])),
+                display_order=row['display_order']
+            )
+            for row in dimension_rows
+        )
+        dimension_ids = {d.id for d in dimensions}
+        indicators = tuple(
+            IndicatorInfo(
+                id=row['id'],
+                code=row['indicator_code'],
+                name=row['indicator_name'],
+                dimension_id=row['dimension_id'],
+                weight=Decimal(str(row['weight'])),
+                max_score=Decimal(str(row['max_score'])),
+                scoring_criteria=row.get('scoring_criteria'),
+                display_order=row['display_order'],
+                parent_id=row.get('parent_indicator_id'),
+                indicator_type=row.get('indicator_type') or 'leaf',
+                completeness_bit=row.get('completeness_bit')
+            )
+            for row in sorted(indicator_rows, key=lambda r: r['display_order'])
+            if row['dimension_id'] in dimension_ids
+        )
+        by_dimension = {d.id: [] for d in dimensions}
+        for indicator in indicators:
+            by_dimension[indicator.dimension_id].append(indicator)
+
+        return cls(
+            version=version,
+            dimensions=dimensions,
+            indicators=indicators,
+            dimension_by_code=MappingProxyType({d.code: d for d in dimensions}),
+            dimension_by_id=MappingProxyType({d.id: d for d in dimensions}),
+            indicator_by_code=MappingProxyType({i.code: i for i in indicators}),
+            indicator_by_id=MappingProxyType({i.id: i for i in indicators}),
+            indicators_by_dimension=MappingProxyType({k: tuple(v) for k, v in by_dimension.items()})
+        )
+
+    def structure(self) -> Dict:
+        """评分结构（与 ScoringService.get_scoring_structure 的返回格式一致，每次返回新的字典）"""
+        return {
+            dimension.code: {
+                'id': dimension.id,
+                'name': dimension.name,
+                'weight': float(dimension.weight),
+                'max_score': float(dimension.max_score),
+                'indicators': [
+                    {
+                        'id': ind.id,
+                        'code': ind.code,
+                        'name': ind.name,
+                        'weight': float(ind.weight),
+                        'max_score': float(ind.max_score),
+                        'scoring_criteria': ind.scoring_criteria
+                    }
+                    for ind in self.indicators_by_dimension[dimension.id]
+                ]
+            }
+            for dimension in self.dimensions
+        }
+
+    def rule_dimensions(self) -> Dict:
+        """评分规则（与 config.scoring_rules.SCORING_DIMENSIONS 格式相同，可直接用于 BatchScoringEngine）"""
+        rules = {}
+        for dimension in self.dimensions:
+            indicators = self.indicators_by_dimension[dimension.id]
+            entries = []
+            for ind in indicators:
+                if ind.parent_id is not None:
+                    continue
+                entry = {'code': ind.code, 'name': ind.name, 'max_score': float(ind.max_score)}
+                if not ind.is_leaf:
+                    entry['type'] = 'parent'
+                    entry['sub_indicators'] = [
+                        {'code': sub.code, 'name': sub.name, 'max_score': float(sub.max_score)}
+                        for sub in indicators if sub.parent_id == ind.id
+                    ]
+                entries.append(entry)
+            rules[dimension.code] = {
+                'name': dimension.name,
+                'weight': float(dimension.weight),
+                'indicators': entries
+            }
+        return rules
+
+    @cached_property
+    def rule_set_hash(self) -> str:
+        """评分规则（rule_dimensions）和等级标准的指纹，记录在维度汇总和总分行上"""
+        return rule_set_hash(self.rule_dimensions())
+
+    @cached_property
+    def leaf_bits(self) -> Mapping[str, int]:
+        """启用的叶子指标编码 → 评分完整度位（按展示顺序）"""
+        return MappingProxyType({
+            ind.code: ind.completeness_bit
+            for dimension in self.dimensions
+            for ind in self.indicators_by_dimension[dimension.id]
+            if ind.is_leaf and ind.completeness_bit is not None
+        })
+
+    @cached_property
+    def complete_mask(self) -> int:
+        """全部启用的叶子指标都已评分时的位图"""
+        mask = 0
+        for bit in self.leaf_bits.values():
+            mask |= 1 << bit
+        return mask
+
+    @property
+    def leaf_count(self) -> int:
+        """需要评分的叶子指标数"""
+        return len(self.leaf_bits)
+
+    def scored_leaf_count(self, scored_mask: int) -> int:
+        """位图中已评分的启用叶子指标数"""
+        return (scored_mask & self.complete_mask).bit_count()
+
+    def is_complete(self, scored_mask: int) -> bool:
+        """全部启用的叶子指标是否都已评分"""
+        return scored_mask & self.complete_mask == self.complete_mask
+
+    def missing_indicators(self, scored_mask: int) -> Tuple[IndicatorInfo, ...]:
+        """位图中尚未评分的启用叶子指标（按展示顺序）"""
+        return tuple(
+            self.indicator_by_code[code]
+            for code, bit in self.leaf_bits.items()
+            if not scored_mask >> bit & 1
+        )
+
+
+_lock = threading.Lock()
+_catalog: Optional[ScoringCatalog] = None
+_checked_at = float('-inf')
+
+
+def get_scoring_catalog() -> ScoringCatalog:
+    """
+    获取当前的评分目录
+
+    距上次核对版本号不足 SCORING_CATALOG_CHECK_SECONDS 秒时直接返回缓存，
+    否则查一次版本号，版本变化时重新加载。
+    """
+    global _catalog, _checked_at
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - _checked_at < scoring_config.catalog_check_seconds:
+        return catalog
+
+    with _lock:
+        if _catalog is not None and time.monotonic() - _checked_at < scoring_config.catalog_check_seconds:
+            return _catalog
+        repo = ScoringRepository()
+        version = repo.get_catalog_version()
+        if _catalog is None or _catalog.version != version:
+            _catalog = ScoringCatalog.build(version, repo.get_all_dimensions(), repo.get_all_indicators())
+            unassigned = [i.code for i in _catalog.indicators if i.is_leaf and i.completeness_bit is None]
+            if unassigned:
+                logger.warning(
+                    f"Leaf indicators without completeness bit (not counted in scored_mask): "
+                    f"{', '.join(unassigned)}; run bump_catalog_version() to assign"
+                )
+            logger.info(
+                f"Loaded scoring catalog v{version}: "
+                f"{len(_catalog.dimensions)} dimensions, {len(_catalog.indicators)} indicators"
+            )
+        _checked_at = time.monotonic()
+        return _catalog
+
+
+def invalidate_scoring_catalog():
+    """丢弃本进程的缓存，下次访问时重新加载"""
+    global _catalog, _checked_at
+    with _lock:
+        _catalog = None
+        _checked_at = float('-inf')
+
+
+def bump_catalog_version() -> int:
+    """修改维度或指标后调用：版本号加一，并让本进程的缓存立即失效"""
+    version = ScoringRepository().bump_catalog_version()
+    invalidate_scoring_catalog()
+    return version
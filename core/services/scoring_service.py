@@ -1,18 +1,218 @@
 """
 评分业务服务类
 """
-from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
 import logging
 
-from core.repositories.scoring_repository import ScoringRepository
+import numpy as np
+
+from core.repositories.scoring_repository import PEER_RANKING_SCOPES, ScoringRepository
 from core.repositories.project_repository import ProjectRepository
+from app.utils.batch_scoring import BatchScoringEngine
+from app.utils.fixed_point import cents, to_decimal
 from app.utils.scoring import ScoringCalculator
+from app.utils.weight_sensitivity import WeightSensitivity
+from app.utils.database import on_rollback, unit_of_work
+from core.services.scoring_catalog import ScoringCatalog, get_scoring_catalog
+from core.services.ranking_index import (
+    get_fund_ranking_index, invalidate_fund_ranking_index, ranking_index_lock
+)
+from core.services.rescore_service import refresh_funds
 from config.scoring_rules import SCORING_DIMENSIONS
 from core.services.fund_service import fund_service
 
 logger = logging.getLogger(__name__)
 
+_CENT = Decimal('0.01')
+
+# 维度编码 → fund_total_scores 中对应的维度得分列
+_TOTAL_SCORE_COLUMNS = {
+    'POLICY': 'policy_score',
+    'LAYOUT': 'layout_score',
+    'EXECUTION': 'execution_score'
+}
+
+
+def _to_decimal(value) -> Optional[Decimal]:
+    return Decimal(str(value)).quantize(_CENT) if value is not None else None
+
+
+def _is_stale(row: Dict, rule_set_hash: str) -> bool:
+    """评分快照中已计算的维度汇总或总分是否按其他版本的评分规则计算"""
+    if row['total_score'] is not None and row['rule_set_hash'] != rule_set_hash:
+        return True
+    return any(item.get('rule_set_hash') != rule_set_hash for item in row['summaries'])
+
+
+def _to_datetime(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+@dataclass
+class IndicatorScore:
+    """一个指标的评分"""
+    indicator_id: int
+    code: str
+    name: str
+    score: Decimal
+    weighted_score: Decimal
+    scorer_id: Optional[int] = None
+    scorer_name: Optional[str] = None
+    comment: Optional[str] = None
+    scored_at: Optional[datetime] = None
+
+
+@dataclass
+class DimensionScore:
+    """一个维度的指标评分和汇总（尚未汇总时 total_score / weighted_total 为 None）"""
+    code: str
+    name: str
+    total_score: Optional[Decimal] = None
+    weighted_total: Optional[Decimal] = None
+    indicators: List[IndicatorScore] = field(default_factory=list)
+
+
+@dataclass
+class PeerRanking:
+    """一只基金在一个范围（全部基金、同地区、同类型或某个维度）内的排名"""
+    scope: str
+    label: str
+    group: str                      # 地区或基金类型，其余范围为空
+    rank: int
+    group_size: int
+    percentile: Decimal             # 组内得分低于本基金的比例（%）
+
+    @property
+    def text(self) -> str:
+        """名次和百分位，如：第 3 / 12 名，超过 81.82% 的基金"""
+        if self.group_size <= 1:
+            return f"第 {self.rank} / {self.group_size} 名"
+        return f"第 {self.rank} / {self.group_size} 名，超过 {self.percentile}% 的基金"
+
+
+# 同组排名范围的显示名称（按 PEER_RANKING_SCOPES 的顺序）
+PEER_RANKING_LABELS = {
+    'overall': '全部基金',
+    'region': '同地区',
+    'fund_type': '同类型',
+    **{code: dimension['name'] for code, dimension in SCORING_DIMENSIONS.items()}
+}
+
+
+@dataclass(frozen=True)
+class ScoringProgress:
+    """基金的评分进度（由评分完整度位图得出）"""
+    scored_count: int
+    leaf_count: int
+    missing: Tuple[str, ...] = ()   # 未评分的叶子指标名称，按展示顺序
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.missing
+
+    @property
+    def ratio(self) -> float:
+        """已评分比例（0~1），用于进度条"""
+        return self.scored_count / self.leaf_count if self.leaf_count else 0.0
+
+    @classmethod
+    def from_mask(cls, catalog: ScoringCatalog, scored_mask: int) -> 'ScoringProgress':
+        return cls(
+            scored_count=catalog.scored_leaf_count(scored_mask),
+            leaf_count=catalog.leaf_count,
+            missing=tuple(i.name for i in catalog.missing_indicators(scored_mask))
+        )
+
+
+@dataclass
+class FundScoringSnapshot:
+    """一只基金的完整评分数据（结果展示页面和评分报告导出共用）"""
+    fund_id: int
+    fund_code: str
+    fund_name: str
+    fund_status: str
+    fund_manager: Optional[str] = None
+    fund_type: Optional[str] = None
+    dimensions: Dict[str, DimensionScore] = field(default_factory=dict)  # 按维度显示顺序
+    total_score: Optional[Decimal] = None
+    policy_score: Optional[Decimal] = None
+    layout_score: Optional[Decimal] = None
+    execution_score: Optional[Decimal] = None
+    grade: Optional[str] = None
+    grade_name: Optional[str] = None
+    rank: Optional[int] = None
+    peer_rankings: Dict[str, PeerRanking] = field(default_factory=dict)  # 范围 → 排名
+
+    @property
+    def scored_count(self) -> int:
+        """已评分的指标数"""
+        return sum(len(d.indicators) for d in self.dimensions.values())
+
+    @classmethod
+    def from_row(cls, row: Dict, calculator: ScoringCalculator) -> 'FundScoringSnapshot':
+        """由 ScoringRepository.get_fund_scoring_snapshot 的结果构建"""
+        dimensions = {}
+
+        def dimension(item):
+            code = item['dimension_code']
+            if code not in dimensions:
+                dimensions[code] = (item['dimension_order'], DimensionScore(code, item['dimension_name']))
+            return dimensions[code][1]
+
+        for item in row['summaries']:
+            summary = dimension(item)
+            summary.total_score = _to_decimal(item['total_score'])
+            summary.weighted_total = _to_decimal(item['weighted_total'])
+
+        for item in sorted(row['scores'], key=lambda i: (i['dimension_order'], i['indicator_order'])):
+            dimension(item).indicators.append(IndicatorScore(
+                indicator_id=item['indicator_id'],
+                code=item['indicator_code'],
+                name=item['indicator_name'],
+                score=_to_decimal(item['score']),
+                weighted_score=_to_decimal(item['weighted_score']),
+                scorer_id=item['scorer_id'],
+                scorer_name=item['scorer_name'],
+                comment=item['scorer_comment'],
+                scored_at=_to_datetime(item['scored_at'])
+            ))
+
+        peer_rankings = {
+            item['ranking_scope']: PeerRanking(
+                scope=item['ranking_scope'],
+                label=PEER_RANKING_LABELS.get(item['ranking_scope'], item['ranking_scope']),
+                group=item['peer_group'],
+                rank=item['rank_in_group'],
+                group_size=item['group_size'],
+                percentile=_to_decimal(item['percentile'])
+            )
+            for item in row.get('peer_rankings', [])
+        }
+
+        grade = row['grade']
+        return cls(
+            fund_id=row['fund_id'],
+            fund_code=row['fund_code'],
+            fund_name=row['fund_name'],
+            fund_status=row['status'],
+            fund_manager=row['fund_manager'],
+            fund_type=row['fund_type'],
+            dimensions={code: d for code, (_, d) in sorted(dimensions.items(), key=lambda kv: kv[1][0])},
+            total_score=_to_decimal(row['total_score']),
+            policy_score=_to_decimal(row['policy_score']),
+            layout_score=_to_decimal(row['layout_score']),
+            execution_score=_to_decimal(row['execution_score']),
+            grade=grade,
+            grade_name=calculator.get_grade_name(grade) if grade else None,
+            rank=row['rank_in_period'],
+            peer_rankings={scope: peer_rankings[scope] for scope in PEER_RANKING_SCOPES if scope in peer_rankings}
+        )
+
 
 class ScoringService:
     """评分业务服务类"""
@@ -25,30 +225,7 @@ class ScoringService:
     def get_scoring_structure(self) -> Dict:
         """获取评分结构（维度和指标）"""
         try:
-            dimensions = self.scoring_repo.get_all_dimensions()
-
-            structure = {}
-            for dimension in dimensions:
-                indicators = self.scoring_repo.get_indicators_by_dimension(dimension['id'])
-                structure[dimension['dimension_code']] = {
-                    'id': dimension['id'],
-                    'name': dimension['dimension_name'],
-                    'weight': float(dimension['weight']),
-                    'max_score': float(dimension['max_score']),
-                    'indicators': [
-                        {
-                            'id': ind['id'],
-                            'code': ind['indicator_code'],
-                            'name': ind['indicator_name'],
-                            'weight': float(ind['weight']),
-                            'max_score': float(ind['max_score']),
-                            'scoring_criteria': ind['scoring_criteria']
-                        }
-                        for ind in indicators
-                    ]
-                }
-
-            return structure
+            return get_scoring_catalog().structure()
         except Exception as e:
             logger.error(f"Error getting scoring structure: {str(e)}")
             raise
@@ -70,21 +247,15 @@ class ScoringService:
         """
         try:
             # 获取指标信息
-            from app.utils.database import get_db_connection
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = "SELECT weight, max_score FROM scoring_indicators WHERE id = %s"
-                    cursor.execute(sql, (indicator_id,))
-                    indicator = cursor.fetchone()
-
+            indicator = get_scoring_catalog().indicator_by_id.get(indicator_id)
             if not indicator:
                 return {'success': False, 'message': '指标不存在'}
 
             # 计算加权得分
             score, weighted_score = self.calculator.calculate_indicator_score(
                 Decimal(str(raw_score)),
-                Decimal(str(indicator['max_score'])),
-                Decimal(str(indicator['weight']))
+                indicator.max_score,
+                indicator.weight
             )
 
             # 保存评分
@@ -120,50 +291,49 @@ class ScoringService:
             {'success': bool, 'message': str, 'data': dict}
         """
         try:
-            # 获取该维度的权重
-            from app.utils.database import get_db_connection
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("SELECT weight FROM scoring_dimensions WHERE id = %s", (dimension_id,))
-                    dim_result = cursor.fetchone()
-                    if not dim_result:
-                        return {'success': False, 'message': '维度不存在'}
-                    dimension_weight = Decimal(str(dim_result['weight']))
-
-            # 获取该维度下的所有评分
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = """
-                        SELECT score, weighted_score
-                        FROM project_scores
-                        WHERE project_id = %s AND dimension_id = %s
-                    """
-                    cursor.execute(sql, (project_id, dimension_id))
-                    scores = cursor.fetchall()
-
-            if not scores:
-                return {'success': False, 'message': '该维度下暂无评分数据'}
-
-            # 计算维度汇总（传入维度权重）
-            total_score, weighted_total = self.calculator.calculate_dimension_score(
-                scores,
-                dimension_weight=dimension_weight
-            )
-
-            # 保存汇总
-            summary_id = self.scoring_repo.save_dimension_summary(
-                project_id, dimension_id, total_score, weighted_total
-            )
-
-            return {
-                'success': True,
-                'message': '维度汇总计算完成',
-                'data': {
-                    'summary_id': summary_id,
-                    'total_score': float(total_score),
-                    'weighted_total': float(weighted_total)
+            # 整个计算过程共用一个连接，结束时统一提交
+            with unit_of_work():
+                # 获取该维度的权重
+                dimension = get_scoring_catalog().dimension_by_id.get(dimension_id)
+                if not dimension:
+                    return {'success': False, 'message': '维度不存在'}
+                dimension_weight = dimension.weight
+
+                # 获取该维度下的所有评分
+                from app.utils.database import get_db_connection
+                with get_db_connection() as conn:
+                    with conn.cursor() as cursor:
+                        sql = """
+                            SELECT score, weighted_score
+                            FROM project_scores
+                            WHERE project_id = %s AND dimension_id = %s
+                        """
+                        cursor.execute(sql, (project_id, dimension_id))
+                        scores = cursor.fetchall()
+
+                if not scores:
+                    return {'success': False, 'message': '该维度下暂无评分数据'}
+
+                # 计算维度汇总（传入维度权重）
+                total_score, weighted_total = self.calculator.calculate_dimension_score(
+                    scores,
+                    dimension_weight=dimension_weight
+                )
+
+                # 保存汇总
+                summary_id = self.scoring_repo.save_dimension_summary(
+                    project_id, dimension_id, total_score, weighted_total
+                )
+
+                return {
+                    'success': True,
+                    'message': '维度汇总计算完成',
+                    'data': {
+                        'summary_id': summary_id,
+                        'total_score': float(total_score),
+                        'weighted_total': float(weighted_total)
+                    }
                 }
-            }
         except Exception as e:
             logger.error(f"Error calculating dimension score: {str(e)}")
             return {'success': False, 'message': f'计算失败: {str(e)}'}
@@ -176,80 +346,75 @@ class ScoringService:
             {'success': bool, 'message': str, 'data': dict}
         """
         try:
-            # 获取各维度汇总
-            summaries = self.scoring_repo.get_dimension_summaries(project_id)
-
-            if len(summaries) < 3:
-                # 检查是否所有13个指标都有评分
-                from app.utils.database import get_db_connection
-                with get_db_connection() as conn:
-                    with conn.cursor() as cursor:
-                        cursor.execute(
-                            "SELECT COUNT(DISTINCT indicator_id) as scored_count FROM project_scores WHERE project_id = %s",
-                            (project_id,)
-                        )
-                        result = cursor.fetchone()
-                        scored_count = result['scored_count'] if result else 0
-
-                # 总共26个指标，如果全部评分完成，计算总分
-                if scored_count >= 26:
-                    # 重新计算所有维度的汇总（确保数据同步）
-                    for dim_code in ['POLICY', 'LAYOUT', 'EXECUTION']:
-                        from app.utils.database import get_db_connection
-                        with get_db_connection() as conn:
-                            with conn.cursor() as cursor:
-                                cursor.execute(
-                                    "SELECT id FROM scoring_dimensions WHERE dimension_code = %s",
-                                    (dim_code,)
-                                )
-                                dim_result = cursor.fetchone()
-                                if dim_result:
-                                    self.calculate_and_save_dimension_score(project_id, dim_result['id'])
-
-                    # 重新获取维度汇总
-                    summaries = self.scoring_repo.get_dimension_summaries(project_id)
+            # 整个计算过程共用一个连接，结束时统一提交
+            with unit_of_work():
+                # 获取各维度汇总
+                summaries = self.scoring_repo.get_dimension_summaries(project_id)
 
                 if len(summaries) < 3:
-                    return {'success': False, 'message': f'评分不完整，已完成 {len(summaries)}/3 个维度，共 {scored_count}/26 个指标'}
-
-            # 构建维度得分字典（使用未加权的维度总分）
-            # 维度的权重体现在其满分上（60、30、10分），不需要再次加权
-            dimension_scores = {
-                item['dimension_code']: Decimal(str(item['total_score']))
-                for item in summaries
-            }
-
-            # 计算总分和等级
-            total_score, grade = self.calculator.calculate_total_score(dimension_scores)
-
-            # 保存总分（使用未加权的维度得分）
-            total_id = self.scoring_repo.save_project_total(
-                project_id,
-                total_score,
-                dimension_scores.get('POLICY', Decimal('0')),
-                dimension_scores.get('LAYOUT', Decimal('0')),
-                dimension_scores.get('EXECUTION', Decimal('0')),
-                grade
-            )
-
-            # 更新排名
-            self._update_project_rankings()
-
-            # 更新项目状态
-            self.project_repo.update_status(project_id, 'completed')
-
-            logger.info(f"Calculated total score for project {project_id}: {total_score} ({grade})")
+                    # 检查是否所有13个指标都有评分
+                    from app.utils.database import get_db_connection
+                    with get_db_connection() as conn:
+                        with conn.cursor() as cursor:
+                            cursor.execute(
+                                "SELECT COUNT(DISTINCT indicator_id) as scored_count FROM project_scores WHERE project_id = %s",
+                                (project_id,)
+                            )
+                            result = cursor.fetchone()
+                            scored_count = result['scored_count'] if result else 0
+
+                    # 总共26个指标，如果全部评分完成，计算总分
+                    if scored_count >= 26:
+                        # 重新计算所有维度的汇总（确保数据同步）
+                        dimension_by_code = get_scoring_catalog().dimension_by_code
+                        for dim_code in ['POLICY', 'LAYOUT', 'EXECUTION']:
+                            if dim_code in dimension_by_code:
+                                self.calculate_and_save_dimension_score(project_id, dimension_by_code[dim_code].id)
+
+                        # 重新获取维度汇总
+                        summaries = self.scoring_repo.get_dimension_summaries(project_id)
+
+                    if len(summaries) < 3:
+                        return {'success': False, 'message': f'评分不完整，已完成 {len(summaries)}/3 个维度，共 {scored_count}/26 个指标'}
+
+                # 构建维度得分字典（使用未加权的维度总分）
+                # 维度的权重体现在其满分上（60、30、10分），不需要再次加权
+                dimension_scores = {
+                    item['dimension_code']: Decimal(str(item['total_score']))
+                    for item in summaries
+                }
 
-            return {
-                'success': True,
-                'message': '总分计算完成',
-                'data': {
-                    'total_id': total_id,
-                    'total_score': float(total_score),
-                    'grade': grade,
-                    'grade_name': self.calculator.get_grade_name(grade)
+                # 计算总分和等级
+                total_score, grade = self.calculator.calculate_total_score(dimension_scores)
+
+                # 保存总分（使用未加权的维度得分）
+                total_id = self.scoring_repo.save_project_total(
+                    project_id,
+                    total_score,
+                    dimension_scores.get('POLICY', Decimal('0')),
+                    dimension_scores.get('LAYOUT', Decimal('0')),
+                    dimension_scores.get('EXECUTION', Decimal('0')),
+                    grade
+                )
+
+                # 更新排名
+                self._update_project_rankings()
+
+                # 更新项目状态
+                self.project_repo.update_status(project_id, 'completed')
+
+                logger.info(f"Calculated total score for project {project_id}: {total_score} ({grade})")
+
+                return {
+                    'success': True,
+                    'message': '总分计算完成',
+                    'data': {
+                        'total_id': total_id,
+                        'total_score': float(total_score),
+                        'grade': grade,
+                        'grade_name': self.calculator.get_grade_name(grade)
+                    }
                 }
-            }
         except Exception as e:
             logger.error(f"Error calculating total score: {str(e)}")
             return {'success': False, 'message': f'计算失败: {str(e)}'}
@@ -257,16 +422,10 @@ class ScoringService:
     def _update_project_rankings(self):
         """更新所有项目排名"""
         try:
-            # 获取所有已完成的项目总分
-            all_totals = self.scoring_repo.get_all_project_totals()
+            # 排名在数据库中一条语句算完，只改写名次有变化的行
+            changed = self.scoring_repo.update_project_rankings()
 
-            # 计算排名
-            ranked = self.calculator.calculate_project_ranking(all_totals)
-
-            # 更新数据库
-            self.scoring_repo.update_project_rankings(ranked)
-
-            logger.info("Updated project rankings")
+            logger.info(f"Updated project rankings: {changed} changed")
         except Exception as e:
             logger.error(f"Error updating rankings: {str(e)}")
 
@@ -379,21 +538,15 @@ class ScoringService:
         """
         try:
             # 获取指标信息
-            from app.utils.database import get_db_connection
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = "SELECT weight, max_score FROM scoring_indicators WHERE id = %s"
-                    cursor.execute(sql, (indicator_id,))
-                    indicator = cursor.fetchone()
-
+            indicator = get_scoring_catalog().indicator_by_id.get(indicator_id)
             if not indicator:
                 return {'success': False, 'message': '指标不存在'}
 
             # 计算加权得分
             score, weighted_score = self.calculator.calculate_indicator_score(
                 Decimal(str(raw_score)),
-                Decimal(str(indicator['max_score'])),
-                Decimal(str(indicator['weight']))
+                indicator.max_score,
+                indicator.weight
             )
 
             # 保存评分
@@ -417,62 +570,240 @@ class ScoringService:
             logger.error(f"Error submitting investment score: {str(e)}")
             return {'success': False, 'message': f'保存失败: {str(e)}'}
 
-    def calculate_and_save_fund_dimension_score(
+    def submit_fund_indicator_scores(
         self,
         fund_id: int,
-        dimension_id: int
+        scores: List[Dict],
+        scorer_id: int
     ) -> Dict:
         """
-        计算并保存投资的维度汇总得分
+        批量提交基金的指标评分（指标信息取自评分目录缓存，一次批量写入）
+
+        Args:
+            fund_id: 基金ID
+            scores: [{'indicator_code' 或 'indicator_id', 'raw_score', 'scorer_comment'(可选)}]
+            scorer_id: 评分人ID
 
         Returns:
             {'success': bool, 'message': str, 'data': dict}
+            有任何指标不存在时不写入任何评分
         """
         try:
-            # 获取该维度的权重
-            from app.utils.database import get_db_connection
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("SELECT weight FROM scoring_dimensions WHERE id = %s", (dimension_id,))
-                    dim_result = cursor.fetchone()
-                    if not dim_result:
-                        return {'success': False, 'message': '维度不存在'}
-                    dimension_weight = Decimal(str(dim_result['weight']))
+            catalog = get_scoring_catalog()
+
+            rows = []
+            missing = []
+            for item in scores:
+                indicator = (
+                    catalog.indicator_by_id.get(item.get('indicator_id'))
+                    or catalog.indicator_by_code.get(item.get('indicator_code'))
+                )
+                if not indicator:
+                    missing.append(str(item.get('indicator_code') or item.get('indicator_id')))
+                    continue
+                score = to_decimal(
+                    self.calculator.indicator_score_cents(cents(item['raw_score']), cents(indicator.max_score))
+                )
+                rows.append({
+                    'dimension_id': indicator.dimension_id,
+                    'indicator_id': indicator.id,
+                    'score': score,
+                    'weighted_score': score,
+                    'scorer_id': scorer_id,
+                    'scorer_comment': item.get('scorer_comment')
+                })
 
-            # 获取该维度下的所有评分
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = """
-                        SELECT score, weighted_score
-                        FROM fund_scores
-                        WHERE fund_id = %s AND dimension_id = %s
-                    """
-                    cursor.execute(sql, (fund_id, dimension_id))
-                    scores = cursor.fetchall()
+            if missing:
+                return {'success': False, 'message': f"指标不存在: {', '.join(missing)}"}
 
-            if not scores:
-                return {'success': False, 'message': '该维度下暂无评分数据'}
+            saved = self.scoring_repo.save_fund_scores_bulk(fund_id, rows)
+            logger.info(f"Saved {saved} fund scores: fund={fund_id}")
 
-            # 计算维度汇总（传入维度权重）
-            total_score, weighted_total = self.calculator.calculate_dimension_score(
-                scores,
-                dimension_weight=dimension_weight
-            )
+            return {
+                'success': True,
+                'message': f'已保存 {saved} 项评分',
+                'data': {'saved_count': saved}
+            }
+        except Exception as e:
+            logger.error(f"Error submitting fund scores: {str(e)}")
+            return {'success': False, 'message': f'保存失败: {str(e)}'}
+
+    def update_fund_indicator_score(
+        self,
+        fund_id: int,
+        indicator_code: str,
+        raw_score: Decimal,
+        scorer_id: int,
+        scorer_comment: Optional[str] = None
+    ) -> Dict:
+        """
+        修改单个叶子指标评分，并把分差增量应用到父指标、维度汇总和总分
 
-            # 保存汇总
-            summary_id = self.scoring_repo.save_fund_dimension_summary(
-                fund_id, dimension_id, total_score, weighted_total
+        只读写这只基金的几行数据：叶子指标、父指标、所属维度汇总和总分各一行，
+        等级仅在总分跨过等级线时变化，排名只调整总分落在新旧总分之间的基金。
+        维度汇总或总分尚未计算时只保存评分，由「计算总分」全量计算；
+        维度汇总或总分按旧版评分规则计算（指纹过期）时不做增量，整只基金按当前规则重算。
+        结果与 calculate_and_save_fund_dimension_score / calculate_fund_total_score 全量计算一致。
+
+        Returns:
+            {'success': bool, 'message': str,
+             'data': {'score', 'delta', 'total_score', 'grade', 'grade_changed'}}
+        """
+        try:
+            catalog = get_scoring_catalog()
+            indicator = catalog.indicator_by_code.get(indicator_code)
+            if not indicator:
+                return {'success': False, 'message': f'指标不存在: {indicator_code}'}
+            if not indicator.is_leaf:
+                return {'success': False, 'message': f'父指标得分由子指标汇总，不能直接评分: {indicator_code}'}
+
+            # 全程以整数"分"计算，只在读写数据库时转换为 Decimal
+            score = self.calculator.indicator_score_cents(cents(raw_score), cents(indicator.max_score))
+            data = {'score': score / 100, 'delta': 0.0, 'total_score': None, 'grade': None, 'grade_changed': False}
+
+            with unit_of_work():
+                repo = self.scoring_repo
+                old = repo.get_fund_score_for_update(fund_id, indicator.id)
+                delta = score - (cents(old['score']) if old else 0)
+                repo.save_fund_score(
+                    fund_id, indicator.dimension_id, indicator.id,
+                    to_decimal(score), to_decimal(score), scorer_id, scorer_comment,
+                    mark_scored=old is None
+                )
+                data['delta'] = delta / 100
+                if delta == 0:
+                    return {'success': True, 'message': '评分保存成功', 'data': data}
+
+                # 父指标 = 子指标之和；父指标行不存在时按子指标重新汇总
+                if indicator.parent_id is not None and \
+                        not repo.add_fund_score_delta(fund_id, indicator.parent_id, to_decimal(delta)):
+                    sub_ids = [i.id for i in catalog.indicators_by_dimension[indicator.dimension_id]
+                               if i.parent_id == indicator.parent_id]
+                    parent_score = repo.sum_fund_scores(fund_id, sub_ids)
+                    repo.save_fund_score(
+                        fund_id, indicator.dimension_id, indicator.parent_id,
+                        parent_score, parent_score, scorer_id, mark_scored=False
+                    )
+
+                # 维度汇总
+                dimension = catalog.dimension_by_id[indicator.dimension_id]
+                summary = repo.get_fund_dimension_summary_for_update(fund_id, dimension.id)
+                if not summary:
+                    return {'success': True, 'message': '评分保存成功', 'data': data}
+                total = repo.get_fund_total_for_update(fund_id)
+                if summary['rule_set_hash'] != catalog.rule_set_hash or \
+                        (total and total['rule_set_hash'] != catalog.rule_set_hash):
+                    return {'success': True, 'message': '评分保存成功', 'data': self._refresh_fund(fund_id, data)}
+
+                dimension_total, dimension_weighted = self.calculator.dimension_score_cents(
+                    [cents(summary['total_score']) + delta], dimension.weight
+                )
+                repo.save_fund_dimension_summary(
+                    fund_id, dimension.id, to_decimal(dimension_total), to_decimal(dimension_weighted),
+                    catalog.rule_set_hash
+                )
+
+                # 总分、等级和排名
+                if not total:
+                    return {'success': True, 'message': '评分保存成功', 'data': data}
+                old_total = cents(total['total_score'])
+                dimension_scores = {
+                    code: cents(total[column]) for code, column in _TOTAL_SCORE_COLUMNS.items()
+                }
+                dimension_scores[dimension.code] = dimension_total
+                new_total = old_total + delta
+                grade = self.calculator.grade_for_cents(new_total)
+                data['grade_changed'] = grade != total['grade']
+                repo.save_fund_total(
+                    fund_id, to_decimal(new_total),
+                    to_decimal(dimension_scores['POLICY']), to_decimal(dimension_scores['LAYOUT']),
+                    to_decimal(dimension_scores['EXECUTION']),
+                    grade, total.get('reviewed_by'), total.get('review_comment'), catalog.rule_set_hash
+                )
+                self._update_fund_ranking(fund_id, to_decimal(new_total))
+
+                data.update(total_score=new_total / 100, grade=grade)
+                logger.info(
+                    f"Incrementally updated fund {fund_id}: {indicator_code} {to_decimal(delta):+}, "
+                    f"total {to_decimal(old_total)} → {to_decimal(new_total)} ({grade})"
+                )
+                return {'success': True, 'message': '评分保存成功', 'data': data}
+        except Exception as e:
+            logger.error(f"Error updating fund indicator score: {str(e)}")
+            return {'success': False, 'message': f'保存失败: {str(e)}'}
+
+    def _refresh_fund(self, fund_id: int, data: Dict) -> Dict:
+        """增量更新遇到过期的维度汇总或总分：整只基金按当前评分规则重算，返回更新后的 data"""
+        report = refresh_funds([fund_id])
+        total = self.scoring_repo.get_fund_total_for_update(fund_id)
+        if total:
+            data.update(
+                total_score=float(total['total_score']), grade=total['grade'],
+                grade_changed=report.grade_changes > 0
             )
+        logger.info(f"Fund {fund_id} was scored under older rules, recomputed instead of applying the delta")
+        return data
 
-            return {
-                'success': True,
-                'message': '维度汇总计算完成',
-                'data': {
-                    'summary_id': summary_id,
-                    'total_score': float(total_score),
-                    'weighted_total': float(weighted_total)
+    def calculate_and_save_fund_dimension_score(
+        self,
+        fund_id: int,
+        dimension_id: int
+    ) -> Dict:
+        """
+        计算并保存投资的维度汇总得分
+
+        Returns:
+            {'success': bool, 'message': str, 'data': dict}
+        """
+        try:
+            # 整个计算过程共用一个连接，结束时统一提交
+            with unit_of_work():
+                # 获取该维度的权重
+                dimension = get_scoring_catalog().dimension_by_id.get(dimension_id)
+                if not dimension:
+                    return {'success': False, 'message': '维度不存在'}
+                dimension_weight = dimension.weight
+
+                # 获取该维度下的所有评分
+                from app.utils.database import get_db_connection
+                with get_db_connection() as conn:
+                    with conn.cursor() as cursor:
+                        sql = """
+                            SELECT indicator_id, score, weighted_score
+                            FROM fund_scores
+                            WHERE fund_id = %s AND dimension_id = %s
+                        """
+                        cursor.execute(sql, (fund_id, dimension_id))
+                        # 父指标得分是子指标之和，只汇总叶子指标，避免重复计分
+                        indicator_by_id = get_scoring_catalog().indicator_by_id
+                        scores = [
+                            row for row in cursor.fetchall()
+                            if row['indicator_id'] in indicator_by_id and indicator_by_id[row['indicator_id']].is_leaf
+                        ]
+
+                if not scores:
+                    return {'success': False, 'message': '该维度下暂无评分数据'}
+
+                # 计算维度汇总（传入维度权重）
+                total_score, weighted_total = self.calculator.calculate_dimension_score(
+                    scores,
+                    dimension_weight=dimension_weight
+                )
+
+                # 保存汇总
+                summary_id = self.scoring_repo.save_fund_dimension_summary(
+                    fund_id, dimension_id, total_score, weighted_total, get_scoring_catalog().rule_set_hash
+                )
+
+                return {
+                    'success': True,
+                    'message': '维度汇总计算完成',
+                    'data': {
+                        'summary_id': summary_id,
+                        'total_score': float(total_score),
+                        'weighted_total': float(weighted_total)
+                    }
                 }
-            }
         except Exception as e:
             logger.error(f"Error calculating investment dimension score: {str(e)}")
             return {'success': False, 'message': f'计算失败: {str(e)}'}
@@ -485,171 +816,261 @@ class ScoringService:
             {'success': bool, 'message': str, 'data': dict}
         """
         try:
-            from core.repositories.investment_repository import InvestmentRepository
+            # 整个计算过程共用一个连接，结束时统一提交
+            with unit_of_work():
+                from core.repositories.investment_repository import InvestmentRepository
 
-            # 获取各维度汇总
-            from app.utils.database import get_db_connection
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = """
-                        SELECT iss.*, sd.dimension_code
-                        FROM fund_scoring_summary iss
-                        JOIN scoring_dimensions sd ON iss.dimension_id = sd.id
-                        WHERE iss.fund_id = %s
-                        ORDER BY sd.display_order
-                    """
-                    cursor.execute(sql, (fund_id,))
-                    summaries = cursor.fetchall()
-
-            if len(summaries) < 3:
-                # 检查是否所有指标都有评分
-                with get_db_connection() as conn:
-                    with conn.cursor() as cursor:
-                        cursor.execute(
-                            "SELECT COUNT(DISTINCT indicator_id) as scored_count FROM fund_scores WHERE fund_id = %s",
-                            (fund_id,)
-                        )
-                        result = cursor.fetchone()
-                        scored_count = result['scored_count'] if result else 0
-
-                # 总共26个指标
-                if scored_count >= 26:
-                    # 重新计算所有维度的汇总
-                    for dim_code in ['POLICY', 'LAYOUT', 'EXECUTION']:
-                        from app.utils.database import get_db_connection
-                        with get_db_connection() as conn:
-                            with conn.cursor() as cursor:
-                                cursor.execute(
-                                    "SELECT id FROM scoring_dimensions WHERE dimension_code = %s",
-                                    (dim_code,)
-                                )
-                                dim_result = cursor.fetchone()
-                                if dim_result:
-                                    self.calculate_and_save_fund_dimension_score(fund_id, dim_result['id'])
-
-                    # 重新获取维度汇总
-                    with get_db_connection() as conn:
-                        with conn.cursor() as cursor:
-                            sql = """
-                                SELECT iss.*, sd.dimension_code
-                                FROM fund_scoring_summary iss
-                                JOIN scoring_dimensions sd ON iss.dimension_id = sd.id
-                                WHERE iss.fund_id = %s
-                                ORDER BY sd.display_order
-                            """
-                            cursor.execute(sql, (fund_id,))
-                            summaries = cursor.fetchall()
+                # 获取各维度汇总；有按旧版评分规则计算的汇总时，先按当前规则重算整只基金
+                rule_set_hash = get_scoring_catalog().rule_set_hash
+                summaries = self._load_fund_summaries(fund_id)
+                if any(item['rule_set_hash'] != rule_set_hash for item in summaries):
+                    refresh_funds([fund_id], update_rankings=False)
+                    summaries = self._load_fund_summaries(fund_id)
 
                 if len(summaries) < 3:
-                    return {'success': False, 'message': f'评分不完整，已完成 {len(summaries)}/3 个维度，共 {scored_count}/26 个指标'}
-
-            # 构建维度得分字典
-            dimension_scores = {
-                item['dimension_code']: Decimal(str(item['total_score']))
-                for item in summaries
-            }
-
-            # 计算总分和等级
-            total_score, grade = self.calculator.calculate_total_score(dimension_scores)
-
-            # 保存总分
-            total_id = self.scoring_repo.save_fund_total(
-                fund_id,
-                total_score,
-                dimension_scores.get('POLICY', Decimal('0')),
-                dimension_scores.get('LAYOUT', Decimal('0')),
-                dimension_scores.get('EXECUTION', Decimal('0')),
-                grade
-            )
-
-            # 更新排名
-            self._update_fund_rankings()
-
-            # 更新基金状态
-            from core.repositories.fund_repository import FundRepository
-            fund_repo = FundRepository()
-            fund_repo.update_status(fund_id, 'completed')
-
-            logger.info(f"Calculated total score for fund {fund_id}: {total_score} ({grade})")
+                    # 检查是否所有叶子指标都有评分（评分完整度位图）
+                    catalog = get_scoring_catalog()
+                    scored_mask = self.scoring_repo.get_fund_scored_mask(fund_id)
+
+                    if catalog.is_complete(scored_mask):
+                        # 重新计算所有维度的汇总
+                        dimension_by_code = catalog.dimension_by_code
+                        for dim_code in ['POLICY', 'LAYOUT', 'EXECUTION']:
+                            if dim_code in dimension_by_code:
+                                self.calculate_and_save_fund_dimension_score(fund_id, dimension_by_code[dim_code].id)
+
+                        # 重新获取维度汇总
+                        summaries = self._load_fund_summaries(fund_id)
+
+                    if len(summaries) < 3:
+                        message = (f'评分不完整，已完成 {len(summaries)}/3 个维度，'
+                                   f'共 {catalog.scored_leaf_count(scored_mask)}/{catalog.leaf_count} 个指标')
+                        missing = catalog.missing_indicators(scored_mask)
+                        if missing:
+                            message += f"，未评分：{'、'.join(i.name for i in missing[:5])}"
+                            message += ' 等' if len(missing) > 5 else ''
+                        return {'success': False, 'message': message}
+
+                # 构建维度得分字典
+                dimension_scores = {
+                    item['dimension_code']: Decimal(str(item['total_score']))
+                    for item in summaries
+                }
 
-            return {
-                'success': True,
-                'message': '总分计算完成',
-                'data': {
-                    'total_id': total_id,
-                    'total_score': float(total_score),
-                    'grade': grade,
-                    'grade_name': self.calculator.get_grade_name(grade)
+                # 计算总分和等级
+                total_score, grade = self.calculator.calculate_total_score(dimension_scores)
+
+                # 保存总分
+                total_id = self.scoring_repo.save_fund_total(
+                    fund_id,
+                    total_score,
+                    dimension_scores.get('POLICY', Decimal('0')),
+                    dimension_scores.get('LAYOUT', Decimal('0')),
+                    dimension_scores.get('EXECUTION', Decimal('0')),
+                    grade,
+                    rule_set_hash=rule_set_hash
+                )
+
+                # 更新排名：只平移名次受影响的基金
+                self._update_fund_ranking(fund_id, total_score)
+
+                # 更新基金状态
+                from core.repositories.fund_repository import FundRepository
+                fund_repo = FundRepository()
+                fund_repo.update_status(fund_id, 'completed')
+
+                logger.info(f"Calculated total score for fund {fund_id}: {total_score} ({grade})")
+
+                return {
+                    'success': True,
+                    'message': '总分计算完成',
+                    'data': {
+                        'total_id': total_id,
+                        'total_score': float(total_score),
+                        'grade': grade,
+                        'grade_name': self.calculator.get_grade_name(grade)
+                    }
                 }
-            }
         except Exception as e:
             logger.error(f"Error calculating investment total score: {str(e)}")
             return {'success': False, 'message': f'计算失败: {str(e)}'}
 
+    @staticmethod
+    def _load_fund_summaries(fund_id: int) -> List[Dict]:
+        """基金的各维度汇总（含维度编码，按维度显示顺序，主库读取）"""
+        from app.utils.database import get_db_connection
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                sql = """
+                    SELECT iss.*, sd.dimension_code
+                    FROM fund_scoring_summary iss
+                    JOIN scoring_dimensions sd ON iss.dimension_id = sd.id
+                    WHERE iss.fund_id = %s
+                    ORDER BY sd.display_order
+                """
+                cursor.execute(sql, (fund_id,))
+                return cursor.fetchall()
+
     def _update_fund_rankings(self):
         """更新所有投资排名"""
         try:
-            # 获取所有已完成的 investment 总分
-            all_totals = self.scoring_repo.get_all_fund_totals()
+            # 排名在数据库中一条语句算完，只改写名次有变化的行
+            changed = self.scoring_repo.update_fund_rankings()
+            invalidate_fund_ranking_index()
 
-            # 计算排名
-            ranked = self.calculator.calculate_project_ranking(all_totals)
+            logger.info(f"Updated fund rankings: {changed} changed")
+        except Exception as e:
+            logger.error(f"Error updating investment rankings: {str(e)}")
 
-            # 更新数据库
-            rankings = [{'rank': r['rank'], 'fund_id': r['fund_id']} for r in ranked]
-            self.scoring_repo.update_fund_rankings(rankings)
+    def _update_fund_ranking(self, fund_id: int, total_score: Decimal):
+        """
+        一只基金总分变化后更新排名（在保存总分的工作单元中调用）
 
-            logger.info("Updated investment rankings")
+        由排名索引算出名次受影响的连续区间，只改写这些基金的 rank_in_period；
+        同组排名只重算包含这只基金的分区（全部基金、各维度、它所在的地区组和基金类型组）。
+        索引与库中的指纹（已评分基金数、总分合计和排名版本号）不一致时重新构建，
+        其他进程逐只修改的总分和全量重算的排名都能发现；构建后的第一次写入全量校正一次排名。
+        工作单元回滚时丢弃索引。
+        """
+        with ranking_index_lock():
+            index = get_fund_ranking_index()
+            fingerprint = self.scoring_repo.get_fund_ranking_fingerprint_for_update()
+            if not index.matches(fingerprint, fund_id, total_score):
+                invalidate_fund_ranking_index()
+                index = get_fund_ranking_index()
+            on_rollback(invalidate_fund_ranking_index)
+            shift = index.update(fund_id, total_score)
+
+            if not index.synced:
+                changed = self.scoring_repo.update_fund_rankings()
+                # 全量校正使版本号加一，索引与校正后的排名一致
+                index.version = self.scoring_repo.get_fund_ranking_version()
+                index.synced = True
+            else:
+                changed = self.scoring_repo.apply_fund_rank_shift(
+                    fund_id, shift.rank, shift.step, shift.low, shift.high
+                )
+                # 同组百分位和维度排名随这只基金的得分变化，只重算它所在的分区
+                self.scoring_repo.update_fund_peer_rankings(fund_id)
+            logger.info(
+                f"Fund {fund_id} rank {shift.rank}: {shift.count} funds shifted {shift.step:+} "
+                f"(ranks {shift.first_rank}-{shift.last_rank}), {changed} rows written"
+            )
+
+    def _refresh_stale(self, rows: Dict[int, Dict]) -> List[int]:
+        """
+        评分快照中维度汇总或总分按旧版评分规则计算的基金，按当前规则重算
+
+        Returns:
+            重算的基金ID（需要重新读取）；重算失败时记录错误并返回空列表（照常展示已有数据）
+        """
+        rule_set_hash = get_scoring_catalog().rule_set_hash
+        stale = [fund_id for fund_id, row in rows.items() if _is_stale(row, rule_set_hash)]
+        if not stale:
+            return []
+        try:
+            refresh_funds(stale)
+            return stale
         except Exception as e:
-            logger.error(f"Error updating investment rankings: {str(e)}")
+            logger.error(f"Error refreshing stale funds {stale[:10]}: {str(e)}")
+            return []
+
+    def get_fund_scoring_progress(self, fund_id: int) -> ScoringProgress:
+        """基金的评分进度（读一次位图，不统计 fund_scores）"""
+        return ScoringProgress.from_mask(get_scoring_catalog(), self.scoring_repo.get_fund_scored_mask(fund_id))
+
+    def list_fund_scoring_progress(
+        self,
+        statuses: Optional[List[str]] = None,
+        complete: Optional[bool] = None
+    ) -> List[Dict]:
+        """
+        一次查询列出基金的评分进度
+
+        Args:
+            statuses: 只列这些状态的基金，None 表示全部
+            complete: True 只列已评完的，False 只列未评完的，None 不筛选
+
+        Returns:
+            [{'id', 'fund_code', 'fund_name', 'status', 'scored_mask', 'is_complete', 'has_total',
+              'progress': ScoringProgress}]，按创建时间倒序
+        """
+        catalog = get_scoring_catalog()
+        rows = self.scoring_repo.list_fund_completeness(catalog.complete_mask, statuses, complete)
+        for row in rows:
+            row['progress'] = ScoringProgress.from_mask(catalog, row['scored_mask'])
+        return rows
+
+    def get_fund_scoring_snapshot(self, fund_id: int) -> Optional[FundScoringSnapshot]:
+        """
+        获取基金的完整评分数据（一次数据库往返）；基金不存在时返回 None
+
+        汇总或总分按旧版评分规则计算时先按需重算，再从主库重新读取。
+        """
+        row = self.scoring_repo.get_fund_scoring_snapshot(fund_id)
+        if row and self._refresh_stale({fund_id: row}):
+            row = self.scoring_repo.get_fund_scoring_snapshot(fund_id, read_only=False)
+        return FundScoringSnapshot.from_row(row, self.calculator) if row else None
+
+    def get_fund_scoring_snapshots(self, fund_ids: List[int]) -> Dict[int, FundScoringSnapshot]:
+        """
+        批量获取多只基金的评分数据（按块批量查询，查询次数与基金数量无关）
+
+        Returns:
+            {fund_id: FundScoringSnapshot}，按 fund_ids 的顺序；不存在的基金不出现在结果中
+        """
+        rows = self.scoring_repo.get_fund_scoring_snapshots(fund_ids)
+        refreshed = self._refresh_stale(rows)
+        if refreshed:
+            rows.update(self.scoring_repo.get_fund_scoring_snapshots(refreshed, read_only=False))
+        return {
+            fund_id: FundScoringSnapshot.from_row(rows[fund_id], self.calculator)
+            for fund_id in dict.fromkeys(fund_ids)
+            if fund_id in rows
+        }
 
     def get_fund_scoring_detail(self, fund_id: int) -> Dict:
         """获取基金评分详情"""
         try:
-            # 获取基金基本信息
-            fund = fund_service.get_fund(fund_id)
-            if not fund:
+            snapshot = self.get_fund_scoring_snapshot(fund_id)
+            if not snapshot:
                 return {'success': False, 'message': '基金不存在'}
 
-            # 获取所有评分记录
-            scores = self.scoring_repo.get_fund_scores(fund_id)
-
-            # 获取总分
-            total = self.scoring_repo.get_fund_total_score(fund_id)
-
-            # 按维度组织评分数据
-            dimension_details = {}
-            for score in scores:
-                dim_code = score['dimension_code']
-                if dim_code not in dimension_details:
-                    dimension_details[dim_code] = {
-                        'name': score['dimension_name'],
-                        'indicators': []
-                    }
-                dimension_details[dim_code]['indicators'].append({
-                    'code': score['indicator_code'],
-                    'name': score['indicator_name'],
-                    'score': float(score['score']),
-                    'weighted_score': float(score['weighted_score']),
-                    'scorer': score['scorer_name'],
-                    'comment': score['scorer_comment'],
-                    'scored_at': score['scored_at'].isoformat() if score['scored_at'] else None
-                })
+            # 按维度组织评分数据（只包含已有指标评分的维度）
+            dimension_details = {
+                code: {
+                    'name': dimension.name,
+                    'indicators': [
+                        {
+                            'code': ind.code,
+                            'name': ind.name,
+                            'score': float(ind.score),
+                            'weighted_score': float(ind.weighted_score),
+                            'scorer': ind.scorer_name,
+                            'comment': ind.comment,
+                            'scored_at': ind.scored_at.isoformat() if ind.scored_at else None
+                        }
+                        for ind in dimension.indicators
+                    ]
+                }
+                for code, dimension in snapshot.dimensions.items()
+                if dimension.indicators
+            }
 
             return {
                 'success': True,
                 'data': {
                     'fund': {
-                        'id': fund['id'],
-                        'code': fund['fund_code'],
-                        'name': fund['fund_name'],
-                        'status': fund['status']
+                        'id': snapshot.fund_id,
+                        'code': snapshot.fund_code,
+                        'name': snapshot.fund_name,
+                        'status': snapshot.fund_status
                     },
                     'dimensions': dimension_details,
-                    'total_score': float(total['total_score']) if total else None,
-                    'grade': total['grade'] if total else None,
-                    'grade_name': self.calculator.get_grade_name(total['grade']) if total and total['grade'] else None,
-                    'rank': total['rank_in_period'] if total else None
+                    'total_score': float(snapshot.total_score) if snapshot.total_score is not None else None,
+                    'grade': snapshot.grade,
+                    'grade_name': snapshot.grade_name,
+                    'rank': snapshot.rank
                 }
             }
         except Exception as e:
@@ -657,38 +1078,48 @@ class ScoringService:
             return {'success': False, 'message': f'获取失败: {str(e)}'}
 
     def get_fund_grade_distribution(self) -> Dict[str, int]:
-        """获取投资等级分布统计"""
+        """获取投资等级分布统计（读取汇总统计表，与基金数量无关）"""
         try:
-            from app.utils.database import get_db_connection
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = """
-                        SELECT grade, COUNT(*) as count
-                        FROM fund_total_scores
-                        GROUP BY grade
-                    """
-                    cursor.execute(sql)
-                    results = cursor.fetchall()
-                    return {r['grade']: r['count'] for r in results}
+            return {
+                row['bucket'] or None: int(row['item_count'])
+                for row in self.scoring_repo.get_fund_aggregates('grade')
+            }
         except Exception as e:
             logger.error(f"Error getting investment grade distribution: {str(e)}")
             return {}
 
     def get_fund_dimension_averages(self) -> Dict[str, float]:
-        """获取投资各维度平均分"""
+        """获取投资各维度平均分（读取汇总统计表，与基金数量无关）"""
         try:
-            from app.utils.database import get_db_connection
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    sql = """
-                        SELECT sd.dimension_code, AVG(iss.weighted_total) as avg_score
-                        FROM fund_scoring_summary iss
-                        JOIN scoring_dimensions sd ON iss.dimension_id = sd.id
-                        GROUP BY sd.dimension_code
-                    """
-                    cursor.execute(sql)
-                    results = cursor.fetchall()
-                    return {r['dimension_code']: float(r['avg_score']) for r in results}
+            dimension_by_id = get_scoring_catalog().dimension_by_id
+            averages = {}
+            for row in self.scoring_repo.get_fund_aggregates('dimension'):
+                dimension = dimension_by_id.get(int(row['bucket']))
+                if dimension:
+                    averages[dimension.code] = float(row['value_sum']) / int(row['item_count'])
+            return averages
         except Exception as e:
             logger.error(f"Error getting investment dimension averages: {str(e)}")
             return {}
+
+    def load_weight_sensitivity(self) -> Optional[WeightSensitivity]:
+        """
+        载入全部已计算总分基金的维度得分，用于维度权重的 what-if 分析
+
+        只读取一次（走只读副本）；之后各权重方案的计算都在内存中完成，不访问数据库。
+        """
+        try:
+            engine = BatchScoringEngine(get_scoring_catalog().rule_dimensions())
+            fund_ids, scores, names = [], [], {}
+            for rows in self.scoring_repo.iter_fund_totals(read_only=True):
+                for row in rows:
+                    fund_ids.append(row['fund_id'])
+                    scores.append([
+                        row[_TOTAL_SCORE_COLUMNS[code]] if code in _TOTAL_SCORE_COLUMNS else 0
+                        for code in engine.dimension_codes
+                    ])
+                    names[row['fund_id']] = f"{row['fund_code']} {row['fund_name']}"
+            return WeightSensitivity(fund_ids, np.array(scores, dtype=np.float64), engine, names)
+        except Exception as e:
+            logger.error(f"Error loading weight sensitivity data: {str(e)}")
+            return None
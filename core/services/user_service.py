@@ -4,6 +4,7 @@
 from typing import Dict, List, Optional
 import logging
 
+from app.utils.pagination import Page
 from core.repositories.user_repository import UserRepository
 from config.scoring_rules import ROLE_PERMISSIONS, ROLE_NAMES
 
@@ -79,6 +80,21 @@ class UserService:
             logger.error(f"Error listing users: {str(e)}")
             return []
 
+    def list_users_page(
+        self,
+        role: Optional[str] = None,
+        department: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Page:
+        """分页查询用户列表，cursor 为上一页的 next_cursor"""
+        try:
+            return self.user_repo.list_users_page(role, department, is_active, cursor, limit)
+        except Exception as e:
+            logger.error(f"Error listing users page: {str(e)}")
+            return Page()
+
     def update_user(self, user_id: int, user: dict) -> Dict:
         """
         更新用户信息
@@ -0,0 +1,58 @@
+-- 基金投向评分系统 - 数据库迁移
+-- 创建基金评分相关表（fund_scores / fund_scoring_summary / fund_total_scores）
+-- 结构与 project_scores / scoring_summaries / project_total_scores 对应，按基金评分
+
+-- 1. 基金指标评分表
+CREATE TABLE IF NOT EXISTS fund_scores (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    fund_id INT NOT NULL COMMENT '基金ID',
+    dimension_id INT NOT NULL,
+    indicator_id INT NOT NULL,
+    score DECIMAL(5,2) NOT NULL COMMENT '原始评分',
+    weighted_score DECIMAL(5,2) NOT NULL COMMENT '加权后得分',
+    scorer_id INT NOT NULL,
+    scorer_comment TEXT,
+    scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (fund_id) REFERENCES funds(id) ON DELETE CASCADE,
+    FOREIGN KEY (dimension_id) REFERENCES scoring_dimensions(id),
+    FOREIGN KEY (indicator_id) REFERENCES scoring_indicators(id),
+    FOREIGN KEY (scorer_id) REFERENCES users(id),
+    UNIQUE KEY uk_fund_indicator (fund_id, indicator_id),
+    INDEX idx_fund (fund_id),
+    INDEX idx_scorer (scorer_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 2. 基金维度汇总表
+CREATE TABLE IF NOT EXISTS fund_scoring_summary (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    fund_id INT NOT NULL COMMENT '基金ID',
+    dimension_id INT NOT NULL,
+    total_score DECIMAL(5,2) NOT NULL COMMENT '维度总分',
+    weighted_total DECIMAL(5,2) NOT NULL COMMENT '维度加权总分',
+    calculated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (fund_id) REFERENCES funds(id) ON DELETE CASCADE,
+    FOREIGN KEY (dimension_id) REFERENCES scoring_dimensions(id),
+    UNIQUE KEY uk_fund_dimension (fund_id, dimension_id),
+    INDEX idx_fund (fund_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 3. 基金总分表
+CREATE TABLE IF NOT EXISTS fund_total_scores (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    fund_id INT NOT NULL COMMENT '基金ID',
+    total_score DECIMAL(5,2) NOT NULL COMMENT '基金总分',
+    policy_score DECIMAL(5,2) NOT NULL COMMENT '政策符合性得分',
+    layout_score DECIMAL(5,2) NOT NULL COMMENT '优化生产力布局得分',
+    execution_score DECIMAL(5,2) NOT NULL COMMENT '政策执行能力得分',
+    rank_in_period INT,
+    grade VARCHAR(50) COMMENT '评级：excellent/good/qualified/unqualified',
+    reviewed_by INT,
+    review_comment TEXT,
+    reviewed_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (fund_id) REFERENCES funds(id) ON DELETE CASCADE,
+    FOREIGN KEY (reviewed_by) REFERENCES users(id),
+    UNIQUE KEY uk_fund (fund_id),
+    INDEX idx_grade (grade),
+    INDEX idx_rank (rank_in_period)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
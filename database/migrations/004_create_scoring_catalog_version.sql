@@ -0,0 +1,11 @@
+-- 基金投向评分系统 - 数据库迁移
+-- 评分目录版本号：进程内缓存的评分维度和指标按此版本号失效
+-- init_scoring_data.py / insert_scoring_data.py 修改维度或指标后把版本号加一
+
+CREATE TABLE IF NOT EXISTS scoring_catalog_version (
+    id INT PRIMARY KEY,
+    version INT NOT NULL DEFAULT 1 COMMENT '评分维度和指标的版本号',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO scoring_catalog_version (id, version) VALUES (1, 1);
@@ -0,0 +1,18 @@
+-- 基金投向评分系统 - 数据库迁移
+-- 键集分页索引：列表按 (created_at, id) 倒序翻页，按状态/基金筛选时索引前缀为筛选列
+-- 翻到任意一页都只读取 limit + 1 条索引记录，不再随页码线性变慢
+
+ALTER TABLE funds
+ADD INDEX idx_created_id (created_at, id),
+ADD INDEX idx_status_created_id (status, created_at, id);
+
+ALTER TABLE investments
+ADD INDEX idx_fund_created_id (fund_id, created_at, id),
+ADD INDEX idx_status_created_id (status, created_at, id);
+
+ALTER TABLE projects
+ADD INDEX idx_created_id (created_at, id),
+ADD INDEX idx_status_created_id (status, created_at, id);
+
+ALTER TABLE users
+ADD INDEX idx_created_id (created_at, id);
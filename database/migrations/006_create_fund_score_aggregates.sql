@@ -0,0 +1,25 @@
+-- 基金投向评分系统 - 数据库迁移
+-- 基金评分汇总统计：仪表盘和统计页面的等级分布、已评分基金数、各维度平均分直接读取此表，
+-- 不再每次扫描 fund_total_scores / fund_scoring_summary
+-- 由 ScoringRepository.save_fund_total / save_fund_dimension_summary 在同一事务中增量维护，
+-- 出现偏差时运行 python rebuild_score_aggregates.py 重建
+
+CREATE TABLE IF NOT EXISTS fund_score_aggregates (
+    metric VARCHAR(20) NOT NULL COMMENT '统计项：grade=按等级统计总分，dimension=按维度统计加权得分',
+    bucket VARCHAR(50) NOT NULL COMMENT '等级代码或维度ID',
+    item_count INT NOT NULL DEFAULT 0 COMMENT '行数',
+    value_sum DECIMAL(14,2) NOT NULL DEFAULT 0 COMMENT '得分合计',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (metric, bucket)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 按已有数据初始化
+INSERT IGNORE INTO fund_score_aggregates (metric, bucket, item_count, value_sum)
+SELECT 'grade', COALESCE(grade, ''), COUNT(*), SUM(total_score)
+FROM fund_total_scores
+GROUP BY grade;
+
+INSERT IGNORE INTO fund_score_aggregates (metric, bucket, item_count, value_sum)
+SELECT 'dimension', CAST(dimension_id AS CHAR), COUNT(*), SUM(weighted_total)
+FROM fund_scoring_summary
+GROUP BY dimension_id;
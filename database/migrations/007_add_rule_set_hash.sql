@@ -0,0 +1,12 @@
+-- 基金投向评分系统 - 数据库迁移
+-- 评分规则版本：维度汇总和总分记录计算时所用评分规则（维度权重、指标满分和等级标准）的指纹，
+-- 指纹与当前规则不一致的行视为过期：读取时按需重算，后台清扫任务分批重算其余基金
+-- 已有数据的指纹为 NULL，同样视为过期
+
+ALTER TABLE fund_scoring_summary
+ADD COLUMN rule_set_hash CHAR(16) NULL COMMENT '计算时的评分规则指纹',
+ADD INDEX idx_fund_rule_set (fund_id, rule_set_hash);
+
+ALTER TABLE fund_total_scores
+ADD COLUMN rule_set_hash CHAR(16) NULL COMMENT '计算时的评分规则指纹',
+ADD INDEX idx_rule_set_hash (rule_set_hash);
@@ -0,0 +1,45 @@
+-- 基金投向评分系统 - 数据库迁移
+-- 同组排名：每只已计算总分的基金在全部基金、同地区、同基金类型中按总分的排名和百分位，
+-- 以及在全部基金中按各维度得分的排名。由 ScoringRepository.update_fund_peer_rankings
+-- 用一条窗口函数语句（PARTITION BY 范围和分组）重算，结果展示页面和排名导出直接读取
+
+CREATE TABLE IF NOT EXISTS fund_peer_rankings (
+    fund_id INT NOT NULL,
+    ranking_scope VARCHAR(20) NOT NULL COMMENT '排名范围：overall / region / fund_type / 维度编码',
+    peer_group VARCHAR(100) NOT NULL DEFAULT '' COMMENT '分组（地区或基金类型，其余范围为空）',
+    score DECIMAL(5,2) NOT NULL COMMENT '参与排名的得分',
+    rank_in_group INT NOT NULL COMMENT '组内名次（并列同名次）',
+    group_size INT NOT NULL COMMENT '组内基金数',
+    percentile DECIMAL(5,2) NOT NULL COMMENT '百分位：组内得分低于本基金的比例（%）',
+    PRIMARY KEY (fund_id, ranking_scope),
+    INDEX idx_scope_group_rank (ranking_scope, peer_group, rank_in_group),
+    FOREIGN KEY (fund_id) REFERENCES funds(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- 按已有数据初始化
+INSERT IGNORE INTO fund_peer_rankings
+(fund_id, ranking_scope, peer_group, score, rank_in_group, group_size, percentile)
+SELECT fund_id, ranking_scope, peer_group, score,
+       RANK() OVER (PARTITION BY ranking_scope, peer_group ORDER BY score DESC),
+       COUNT(*) OVER (PARTITION BY ranking_scope, peer_group),
+       ROUND(PERCENT_RANK() OVER (PARTITION BY ranking_scope, peer_group ORDER BY score) * 100, 2)
+FROM (
+    SELECT t.fund_id, s.ranking_scope,
+           CASE s.ranking_scope
+               WHEN 'region' THEN COALESCE(f.region, '')
+               WHEN 'fund_type' THEN COALESCE(f.fund_type, '')
+               ELSE ''
+           END AS peer_group,
+           CASE s.ranking_scope
+               WHEN 'POLICY' THEN t.policy_score
+               WHEN 'LAYOUT' THEN t.layout_score
+               WHEN 'EXECUTION' THEN t.execution_score
+               ELSE t.total_score
+           END AS score
+    FROM fund_total_scores t
+    JOIN funds f ON f.id = t.fund_id
+    CROSS JOIN (
+        SELECT 'overall' AS ranking_scope UNION ALL SELECT 'region' UNION ALL SELECT 'fund_type'
+        UNION ALL SELECT 'POLICY' UNION ALL SELECT 'LAYOUT' UNION ALL SELECT 'EXECUTION'
+    ) s
+) scoped;
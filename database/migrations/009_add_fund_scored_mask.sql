@@ -0,0 +1,30 @@
+-- 基金投向评分系统 - 数据库迁移
+-- 评分完整度位图：每个叶子指标分配一个固定的位（completeness_bit，分配后不再变化），
+-- 基金的 scored_mask 记录已评分叶子指标的位，随评分写入在同一事务中更新。
+-- 「哪些基金已评完」「缺哪些指标」「评分进度」都变成位运算，不再逐只基金 COUNT(DISTINCT indicator_id)
+
+ALTER TABLE scoring_indicators
+ADD COLUMN completeness_bit TINYINT NULL COMMENT '叶子指标在评分完整度位图中的位（父指标为空）',
+ADD UNIQUE INDEX uk_completeness_bit (completeness_bit);
+
+ALTER TABLE funds
+ADD COLUMN scored_mask BIGINT NOT NULL DEFAULT 0 COMMENT '已评分叶子指标的位图（按 scoring_indicators.completeness_bit）';
+
+-- 按指标ID顺序为已有叶子指标分配位
+UPDATE scoring_indicators si
+JOIN (
+    SELECT id, ROW_NUMBER() OVER (ORDER BY id) - 1 AS bit
+    FROM scoring_indicators
+    WHERE COALESCE(indicator_type, 'leaf') <> 'parent'
+) b ON b.id = si.id
+SET si.completeness_bit = b.bit;
+
+-- 按已有评分初始化
+UPDATE funds f
+JOIN (
+    SELECT fs.fund_id, SUM(1 << si.completeness_bit) AS scored_mask
+    FROM fund_scores fs, scoring_indicators si
+    WHERE si.id = fs.indicator_id AND si.completeness_bit IS NOT NULL
+    GROUP BY fs.fund_id
+) m ON m.fund_id = f.id
+SET f.scored_mask = m.scored_mask;
@@ -0,0 +1,11 @@
+-- 基金投向评分系统 - 数据库迁移
+-- 基金排名版本号：全量重算排名（重新评分、自动评分、后台清扫、计算总分）时在同一事务中加一。
+-- 进程内的排名索引记录构建时的版本号，与已评分基金数、总分合计一起和库中比对，不一致时重新构建
+
+CREATE TABLE IF NOT EXISTS fund_ranking_version (
+    id INT PRIMARY KEY,
+    version INT NOT NULL DEFAULT 1 COMMENT '基金排名的版本号',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO fund_ranking_version (id, version) VALUES (1, 1);
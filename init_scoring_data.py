@@ -8,6 +8,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from app.utils.database import get_db_connection
+from core.services.scoring_catalog import bump_catalog_version
 
 
 def init_scoring_data():
@@ -27,8 +28,17 @@ def init_scoring_data():
                 cursor.execute("DELETE FROM fund_scores")
                 cursor.execute("DELETE FROM fund_scoring_summary")
                 cursor.execute("DELETE FROM fund_total_scores")
+                cursor.execute("DELETE FROM fund_peer_rankings")
+                cursor.execute("DELETE FROM fund_score_aggregates")
+                # 总分已清空，排名版本号加一，运行中的进程丢弃排名索引
+                cursor.execute("""
+                    INSERT INTO fund_ranking_version (id, version) VALUES (1, 1)
+                    ON DUPLICATE KEY UPDATE version = version + 1
+                """)
                 cursor.execute("DELETE FROM scoring_indicators")
                 cursor.execute("DELETE FROM scoring_dimensions")
+                # 指标重建后重新分配评分完整度位
+                cursor.execute("UPDATE funds SET scored_mask = 0")
                 conn.commit()
                 print("✓ 清空完成")
 
@@ -234,6 +244,10 @@ def init_scoring_data():
                 for row in cursor.fetchall():
                     print(f"  {row['dimension_code']}: {row['count']}个")
 
+                # 维度和指标已重建（ID 已变化），通知各进程重新加载评分目录
+                version = bump_catalog_version()
+                print(f"\n✓ 评分目录版本: {version}")
+
                 print("\n✅ 评分数据初始化完成！")
                 print(f"\n现在您可以开始评分了。总共有 {leaf_count} 个叶子指标需要评分。")
                 return True
@@ -7,6 +7,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app.utils.database import get_db_connection
+from core.services.scoring_catalog import bump_catalog_version
 
 def insert_scoring_data():
     """插入评分维度和指标数据"""
@@ -97,10 +98,14 @@ def insert_scoring_data():
                 conn.commit()
                 print(f"✓ 插入 {len(execution_indicators)} 个政策执行能力指标")
 
+                # 通知各进程重新加载评分目录
+                version = bump_catalog_version()
+
                 print("\n" + "=" * 60)
                 print("✓ 评分数据导入完成！")
                 print(f"  - 3 个评分维度")
                 print(f"  - 13 个评分指标")
+                print(f"  - 评分目录版本 {version}")
                 print("=" * 60)
 
                 return True
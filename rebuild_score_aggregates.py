@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+重建基金评分汇总统计（fund_score_aggregates）和评分完整度位图（funds.scored_mask）
+
+汇总统计和位图由评分保存时增量维护；直接改库、导入数据或异常中断导致与明细不一致时，
+运行此脚本按 fund_total_scores / fund_scoring_summary / fund_scores 重新计算，并列出修正的统计项。
+
+使用方法: python rebuild_score_aggregates.py
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.repositories.scoring_repository import ScoringRepository
+
+
+def rebuild_score_aggregates() -> bool:
+    """重建汇总统计"""
+    try:
+        print("开始重建基金评分汇总统计...")
+        repo = ScoringRepository()
+        drift = repo.rebuild_fund_aggregates()
+        if not drift:
+            print("✓ 汇总统计与评分明细一致，无需修正")
+        else:
+            print(f"✓ 修正了 {len(drift)} 个统计项:")
+            for (metric, bucket), (old, new) in sorted(drift.items()):
+                print(f"  {metric}/{bucket or '-'}: 行数 {old[0]} → {new[0]}，合计 {old[1]} → {new[1]}")
+        changed = repo.rebuild_fund_scored_masks()
+        print(f"✓ 评分完整度位图: 修正了 {changed} 只基金" if changed else "✓ 评分完整度位图与评分明细一致")
+        print("\n✅ 汇总统计重建完成")
+        return True
+    except Exception as e:
+        print(f"❌ 重建失败: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == '__main__':
+    sys.exit(0 if rebuild_score_aggregates() else 1)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+全量重算基金评分
+
+修改维度权重、指标满分或等级标准后，按当前评分目录重新计算所有已评分基金的
+维度汇总、总分、等级和排名，只写回发生变化的行。中断后再次运行会从检查点继续。
+
+使用方法:
+    python rescore_funds.py                 # 重算并写回
+    python rescore_funds.py --dry-run       # 只报告差异，不写库
+    python rescore_funds.py --restart       # 忽略检查点，从头开始
+    python rescore_funds.py --workers 4 --chunk-size 1000
+    python rescore_funds.py --stale         # 只重算评分规则指纹过期的基金（与后台清扫相同）
+"""
+import argparse
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core.services.rescore_service import RescoreReport, rescore_funds, sweep_stale_funds
+
+
+def print_progress(report: RescoreReport):
+    print(f"  已重算 {report.funds} 只基金，{report.changed_funds} 只有变化，{report.funds_per_second:.0f} 只/秒")
+
+
+def main() -> bool:
+    parser = argparse.ArgumentParser(description='按当前评分规则全量重算基金评分')
+    parser.add_argument('--dry-run', action='store_true', help='只报告差异，不写库')
+    parser.add_argument('--restart', action='store_true', help='忽略检查点，从头开始')
+    parser.add_argument('--workers', type=int, default=None, help='计算进程数（默认CPU核数，0为不使用进程池）')
+    parser.add_argument('--chunk-size', type=int, default=None, help='每批基金数（默认 RESCORE_CHUNK_SIZE）')
+    parser.add_argument('--checkpoint', default=None, help='检查点文件（默认 RESCORE_CHECKPOINT）')
+    parser.add_argument('--stale', action='store_true', help='只重算评分规则指纹过期的基金')
+    args = parser.parse_args()
+
+    try:
+        if args.stale:
+            print("开始重算评分规则过期的基金...")
+            report = sweep_stale_funds(batch_size=args.chunk_size)
+            print(f"✓ 重算 {report.funds} 只过期基金，用时 {report.seconds:.1f}s")
+            print(f"  有变化的基金: {report.changed_funds}，等级变化: {report.grade_changes}，排名变化: {report.rank_changes}")
+            for sample in report.samples:
+                print(f"  - {sample}")
+            print("\n✅ 过期基金重算完成")
+            return True
+
+        print("开始全量重算基金评分" + ("（只报告差异）" if args.dry_run else "") + "...")
+        report = rescore_funds(
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            dry_run=args.dry_run,
+            checkpoint_path=args.checkpoint,
+            restart=args.restart,
+            progress=print_progress
+        )
+        if report.resumed_after:
+            print(f"✓ 从基金 {report.resumed_after} 之后继续")
+        print(f"✓ 重算 {report.funds} 只基金，本次 {report.processed} 只，"
+              f"用时 {report.seconds:.1f}s（{report.funds_per_second:.0f} 只/秒）")
+        print(f"  有变化的基金: {report.changed_funds}")
+        print(f"  指标得分行: {report.score_rows}，维度汇总行: {report.summary_rows}，总分行: {report.total_rows}")
+        print(f"  等级变化: {report.grade_changes}，排名变化: {report.rank_changes}")
+        for sample in report.samples:
+            print(f"  - {sample}")
+        print("\n✅ " + ("差异报告完成，未写入数据库" if report.dry_run else "全量重算完成"))
+        return True
+    except KeyboardInterrupt:
+        print("\n⚠️ 已中断，再次运行将从检查点继续")
+        return False
+    except Exception as e:
+        print(f"❌ 重算失败: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
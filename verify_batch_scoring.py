@@ -0,0 +1,166 @@
+"""
+验证批量评分计算
+
+随机生成大量评分矩阵（评分选项值、带半分的三位小数、超出满分和负数等），
+逐只基金用 ScoringCalculator 计算，与 BatchScoringEngine 的批量结果逐项比较：
+父指标得分、维度得分、维度加权得分、总分、等级和排名在保留2位小数后必须完全一致。
+
+使用方法: python verify_batch_scoring.py [轮数]
+"""
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils.batch_scoring import BatchScoringEngine
+from app.utils.scoring import ScoringCalculator
+from config.scoring_rules import SCORING_DIMENSIONS
+
+CENT = Decimal('0.01')
+
+
+def leaf_configs():
+    """按 SCORING_DIMENSIONS 顺序列出 (维度编码, 父指标编码, 叶子指标配置)"""
+    for dim_code, dimension in SCORING_DIMENSIONS.items():
+        for indicator in dimension['indicators']:
+            if indicator.get('type') == 'parent':
+                for sub in indicator['sub_indicators']:
+                    yield dim_code, indicator['code'], sub
+            else:
+                yield dim_code, None, indicator
+
+
+LEAVES = list(leaf_configs())
+
+
+def random_score(rng: random.Random, leaf: dict) -> float:
+    """随机原始评分：大多取评分选项，其余覆盖舍入和越界的边界情况"""
+    max_score = leaf['max_score']
+    kind = rng.random()
+    if kind < 0.6 and leaf.get('scoring_guide'):
+        return float(rng.choice(list(leaf['scoring_guide'])))
+    if kind < 0.8:
+        # 三位小数，约一半落在半分上（x.xx5）
+        return round(rng.uniform(0, max_score), 2) + rng.choice([0, 0.005])
+    if kind < 0.9:
+        return round(rng.uniform(-1, max_score + 1), 3)
+    return rng.choice([0.0, max_score, max_score + 0.004, -0.004])
+
+
+def reference(rows):
+    """逐只基金用 ScoringCalculator 计算"""
+    calculator = ScoringCalculator()
+    results = []
+    for row in rows:
+        parent_scores, dimension_rows = {}, {code: [] for code in SCORING_DIMENSIONS}
+        for (dim_code, parent_code, leaf), raw in zip(LEAVES, row):
+            score, _ = calculator.calculate_indicator_score(Decimal(str(raw)), Decimal(str(leaf['max_score'])))
+            dimension_rows[dim_code].append({'score': score})
+            if parent_code:
+                parent_scores[parent_code] = parent_scores.get(parent_code, Decimal('0')) + score
+
+        dimension_totals, weighted_totals = {}, {}
+        for dim_code, scores in dimension_rows.items():
+            weight = Decimal(str(SCORING_DIMENSIONS[dim_code]['weight']))
+            dimension_totals[dim_code], weighted_totals[dim_code] = calculator.calculate_dimension_score(scores, weight)
+        total_score, grade = calculator.calculate_total_score(dimension_totals)
+        results.append({
+            'parents': {code: value.quantize(CENT) for code, value in parent_scores.items()},
+            'dimensions': dimension_totals,
+            'weighted': weighted_totals,
+            'total_score': total_score,
+            'grade': grade
+        })
+    ranked = calculator.calculate_project_ranking(
+        [{'index': i, 'total_score': r['total_score']} for i, r in enumerate(results)]
+    )
+    for item in ranked:
+        results[item['index']]['rank'] = item['rank']
+    return results
+
+
+def as_cent(value) -> Decimal:
+    return Decimal(str(round(float(value), 2))).quantize(CENT)
+
+
+def compare(engine: BatchScoringEngine, rows) -> list:
+    """比较一批基金的批量结果和逐只结果，返回不一致的描述"""
+    batch = engine.compute(rows)
+    errors = []
+    for i, expected in enumerate(reference(rows)):
+        actual = {
+            'parents': {code: as_cent(batch.parent_totals[i, j]) for j, code in enumerate(engine.parent_codes)},
+            'dimensions': {code: as_cent(batch.dimension_totals[i, j]) for j, code in enumerate(engine.dimension_codes)},
+            'weighted': {code: as_cent(batch.weighted_totals[i, j]) for j, code in enumerate(engine.dimension_codes)},
+            'total_score': as_cent(batch.total_scores[i]),
+            'grade': batch.grades[i],
+            'rank': int(batch.ranks[i])
+        }
+        for key, value in expected.items():
+            if actual[key] != value:
+                errors.append(f"第{i}只基金 {key}: 批量 {actual[key]}，逐只 {value}，评分 {list(rows[i])}")
+    return errors
+
+
+def verify_engine(rounds: int) -> list:
+    engine = BatchScoringEngine()
+    print(f"  编译评分规则: {len(engine.leaf_codes)} 个叶子指标，{len(engine.parent_codes)} 个父指标，"
+          f"{len(engine.dimension_codes)} 个维度")
+    if list(engine.leaf_codes) != [leaf['code'] for _, _, leaf in LEAVES]:
+        return ["叶子指标顺序与评分规则不一致"]
+
+    errors = []
+    rng = random.Random(20240101)
+    funds = 0
+    for round_no in range(rounds):
+        size = rng.randint(1, 40)
+        rows = [[random_score(rng, leaf) for _, _, leaf in LEAVES] for _ in range(size)]
+        if size > 1 and rng.random() < 0.3:
+            rows.append(list(rows[0]))  # 制造并列总分
+        funds += len(rows)
+        errors += compare(engine, rows)
+        if len(errors) > 10:
+            break
+    print(f"  随机比较: {rounds} 轮，{funds} 只基金")
+
+    # 以评分字典构建矩阵：未评分的指标按0分
+    matrix = engine.score_matrix([{'POLICY_01': 10, 'POLICY_02_01': '2.5', 'UNKNOWN': 5}, {}])
+    result = engine.compute(matrix)
+    if list(result.total_scores) != [12.5, 0.0] or list(result.ranks) != [1, 2]:
+        errors.append(f"评分字典构建的矩阵计算结果不正确: {result.total_scores}")
+    return errors
+
+
+def benchmark(engine: BatchScoringEngine, size: int = 100000):
+    rng = random.Random(1)
+    rows = [[float(rng.choice(list(leaf['scoring_guide']))) for _, _, leaf in LEAVES] for _ in range(1000)]
+    matrix = [rows[i % len(rows)] for i in range(size)]
+    started = time.perf_counter()
+    engine.compute(matrix)
+    batch_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    reference(rows)
+    single_seconds = (time.perf_counter() - started) * size / len(rows)
+    print(f"  {size} 只基金: 批量 {batch_seconds:.3f}s，逐只计算约 {single_seconds:.1f}s")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print("=== 验证批量评分计算 ===")
+    errors = verify_engine(rounds)
+    benchmark(BatchScoringEngine())
+
+    print("\n" + "=" * 50)
+    if errors:
+        print(f"❌ 发现 {len(errors)} 个问题:")
+        for error in errors[:10]:
+            print(f"  - {error}")
+        sys.exit(1)
+    print("✅ 批量评分计算与逐只计算结果一致")
+
+
+if __name__ == '__main__':
+    main()
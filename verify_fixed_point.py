@@ -0,0 +1,178 @@
+"""
+验证定点数（整数"分"）评分计算
+
+随机生成指标原始评分、维度权重和维度得分，与原来逐步 quantize 的 Decimal 实现逐位比较
+（比较数值和小数位数；原实现对 -0 返回 -0.00，现在是 0.00，数值相等）：
+- calculate_indicator_score：截断到 [0, 最高分]，保留2位小数
+- calculate_dimension_score：指标得分相加、乘以维度权重 / 100
+- calculate_total_score：维度得分相加并评定等级
+并测量 100 万次指标评分的耗时。
+
+使用方法: python verify_fixed_point.py [轮数]
+"""
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils.batch_scoring import to_cents
+from app.utils.fixed_point import cents
+from app.utils.scoring import ScoringCalculator
+from config.scoring_rules import GRADING_STANDARDS
+
+
+# ---- 原 Decimal 实现（参照） ----
+
+def reference_indicator_score(raw_score: Decimal, max_score: Decimal):
+    if raw_score > max_score:
+        raw_score = max_score
+    if raw_score < 0:
+        raw_score = Decimal('0')
+    raw_score = raw_score.quantize(Decimal('0.01'))
+    return raw_score, raw_score
+
+
+def reference_dimension_score(indicator_scores, dimension_weight=None):
+    if not indicator_scores:
+        return Decimal('0'), Decimal('0')
+    total_score = sum(item['score'] for item in indicator_scores)
+    total_score = total_score.quantize(Decimal('0.01'))
+    if dimension_weight is not None:
+        weighted_total = (total_score * dimension_weight) / Decimal('100')
+    else:
+        weighted_total = total_score
+    return total_score, weighted_total.quantize(Decimal('0.01'))
+
+
+def reference_grade(total_score: Decimal) -> str:
+    score = float(total_score)
+    if score >= GRADING_STANDARDS['excellent']['min']:
+        return 'excellent'
+    elif score >= GRADING_STANDARDS['good']['min']:
+        return 'good'
+    elif score >= GRADING_STANDARDS['qualified']['min']:
+        return 'qualified'
+    return 'unqualified'
+
+
+def reference_total_score(dimension_weighted_scores):
+    total_score = sum(dimension_weighted_scores.values())
+    total_score = total_score.quantize(Decimal('0.01'))
+    return total_score, reference_grade(total_score)
+
+
+def same_key(value):
+    """逐位比较用的键：Decimal 比较数值和小数位数（0 的正负号不区分），其余按 repr"""
+    if isinstance(value, tuple):
+        return tuple(same_key(item) for item in value)
+    if isinstance(value, Decimal):
+        return value, value.as_tuple().exponent
+    return repr(value)
+
+
+# ---- 随机输入 ----
+
+def random_decimal(rng: random.Random, low: float, high: float, places=(0, 1, 2, 3, 4)) -> Decimal:
+    """随机小数位数的 Decimal，常落在 0.005 等舍入边界上"""
+    digits = rng.choice(places)
+    if rng.random() < 0.2:
+        # 恰好在半分上：x.xx5
+        return Decimal(str(round(rng.uniform(low, high), 2))) + Decimal('0.005')
+    return Decimal(f"{rng.uniform(low, high):.{digits}f}")
+
+
+def verify_calculator(rounds: int) -> list:
+    errors = []
+    rng = random.Random(20240701)
+    calculator = ScoringCalculator()
+    checks = 0
+
+    def compare(name, actual, expected, case):
+        nonlocal checks
+        checks += 1
+        if same_key(actual) != same_key(expected):
+            errors.append(f"{name}{case}: {actual!r}，期望 {expected!r}")
+
+    for _ in range(rounds):
+        max_score = random_decimal(rng, 0, 20, places=(0, 1, 2))
+        raw = random_decimal(rng, -5, float(max_score) + 5)
+        compare('指标得分', calculator.calculate_indicator_score(raw, max_score),
+                reference_indicator_score(raw, max_score), (raw, max_score))
+
+        items = [{'score': random_decimal(rng, 0, 10)} for _ in range(rng.randint(0, 8))]
+        if rng.random() < 0.7:
+            # 实际保存的指标得分都是两位小数
+            items = [{'score': item['score'].quantize(Decimal('0.01'))} for item in items]
+        weight = rng.choice([None, random_decimal(rng, 0, 100, places=(0, 1, 2, 3))])
+        compare('维度得分', calculator.calculate_dimension_score(items, weight),
+                reference_dimension_score(items, weight), (items, weight))
+
+        dimensions = {f"d{i}": random_decimal(rng, 0, 40) for i in range(rng.randint(1, 6))}
+        compare('总分', calculator.calculate_total_score(dimensions),
+                reference_total_score(dimensions), dimensions)
+
+        value = rng.choice([rng.uniform(-1000, 1000), round(rng.uniform(-100, 100), 2) + 0.005, rng.randint(0, 999) / 1000])
+        compare('转换', cents(value), int(Decimal(str(value)).quantize(Decimal('0.01')).scaleb(2)), value)
+
+        boundary = Decimal(str(rng.choice([59.99, 60, 79.99, 80, 89.99, 90, 100])))
+        compare('等级', calculator.calculate_total_score({'d': boundary}),
+                reference_total_score({'d': boundary}), boundary)
+        if len(errors) > 10:
+            break
+    print(f"  随机比较: {checks} 次")
+    return errors
+
+
+def benchmark(count: int = 1_000_000):
+    rng = random.Random(1)
+    max_score = 10.0
+    raws = [round(rng.uniform(-1, 11), rng.choice([0, 1, 2])) for _ in range(count)]
+
+    started = time.perf_counter()
+    max_decimal = Decimal(str(max_score))
+    for raw in raws:
+        reference_indicator_score(Decimal(str(raw)), max_decimal)
+    decimal_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    max_cents = cents(max_score)
+    indicator_score_cents = ScoringCalculator.indicator_score_cents
+    for raw in raws:
+        indicator_score_cents(cents(raw), max_cents)
+    cents_seconds = time.perf_counter() - started
+
+    array = np.array(raws)
+    started = time.perf_counter()
+    batch = np.clip(to_cents(array), 0, max_cents)
+    numpy_seconds = time.perf_counter() - started
+
+    sample = [cents(reference_indicator_score(Decimal(str(raw)), max_decimal)[0]) for raw in raws[:10000]]
+    if batch[:10000].tolist() != sample:
+        print("  ⚠️ NumPy 批量结果与 Decimal 不一致")
+    print(f"  {count:,} 次指标评分: Decimal {decimal_seconds:.2f}s，整数分 {cents_seconds:.2f}s "
+          f"({decimal_seconds / cents_seconds:.1f}x)，NumPy 批量 {numpy_seconds:.3f}s "
+          f"({decimal_seconds / numpy_seconds:.0f}x)")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print("=== 验证定点数评分计算 ===")
+    errors = verify_calculator(rounds)
+    benchmark()
+
+    print("\n" + "=" * 50)
+    if errors:
+        print(f"❌ 发现 {len(errors)} 个问题:")
+        for error in errors[:10]:
+            print(f"  - {error}")
+        sys.exit(1)
+    print("✅ 定点数评分与原 Decimal 计算逐位一致")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+验证指标数据自动评分
+
+- 按 scoring_guide 描述挑选的边界值得分正确（如新质生产力比例 90% 得 10 分、89.99% 得 9 分）
+- 随机数据（大量落在分档下限上）的向量化 searchsorted 结果与单值 bisect、逐档比较的参考实现一致
+- 每个分档得分都是评分选项中的分值
+并测量大批量基金的评分耗时。
+
+使用方法: python verify_metric_bands.py [轮数]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils.metric_bands import MISSING, METRIC_BAND_TABLES, MetricScorer
+from app.utils.scoring_options import OPTION_TABLES
+from config.scoring_rules import METRIC_BANDS
+
+# (指标编码, 数据, 期望得分)
+CASES = [
+    ('POLICY_01', 0, 0), ('POLICY_01', 0.5, 1), ('POLICY_01', 10, 2), ('POLICY_01', 89.99, 9), ('POLICY_01', 90, 10),
+    ('POLICY_02_01', 0, 0), ('POLICY_02_01', 1, 0.5), ('POLICY_02_01', 5, 2.5), ('POLICY_02_01', 12, 3),
+    ('POLICY_03_01', 0, 3), ('POLICY_03_01', 49.9, 3), ('POLICY_03_01', 50, 2), ('POLICY_03_01', 100, 1),
+    ('POLICY_03_01', 150, 0),
+    ('POLICY_04_02', 0, 0), ('POLICY_04_02', 20, 1), ('POLICY_04_02', 20.1, 2),
+    ('POLICY_08_01', 10, 5), ('POLICY_08_01', 10.5, 4), ('POLICY_08_01', 90, 1), ('POLICY_08_01', 95, 0),
+    ('LAYOUT_03_01', -6, 0), ('LAYOUT_03_01', -5, 3), ('LAYOUT_03_01', 5, 3), ('LAYOUT_03_01', 5.5, 5),
+    ('EXEC_01_01', 29.99, 0), ('EXEC_01_01', 30, 0.5), ('EXEC_01_01', 50, 1),
+    ('EXEC_01_02', 29, 1), ('EXEC_01_02', 30, 0),
+    ('EXEC_02_01', 10, 0), ('EXEC_02_01', 10.5, 1),
+]
+
+
+def reference_score(config: dict, value: float):
+    """逐档比较：取数据满足下限条件的最后一档"""
+    score = config['base']
+    for low, inclusive, band_score in config['bands']:
+        if value > low or (inclusive and value == low):
+            score = band_score
+    return round(score * 100)
+
+
+def verify_cases() -> list:
+    errors = []
+    for code, value, expected in CASES:
+        actual = METRIC_BAND_TABLES[code].score_cents(value)
+        if actual != round(expected * 100):
+            errors.append(f"{code} 数据 {value}: {actual}，期望 {round(expected * 100)}")
+    for code, band in METRIC_BAND_TABLES.items():
+        invalid = [score for score in band.scores if score / 100 not in OPTION_TABLES[code].scores]
+        if invalid:
+            errors.append(f"{code} 得分 {invalid} 不在评分选项中")
+    print(f"  边界值: {len(CASES)} 个，{len(METRIC_BAND_TABLES)} 个指标可自动评分")
+    return errors
+
+
+def verify_random(rounds: int) -> list:
+    errors = []
+    rng = random.Random(20240801)
+    scorer = MetricScorer()
+    for round_no in range(rounds):
+        count = rng.randint(1, 50)
+        metrics = {}
+        for code, config in METRIC_BANDS.items():
+            lows = [band[0] for band in config['bands']]
+            column = []
+            for _ in range(count):
+                kind = rng.random()
+                if kind < 0.4:
+                    column.append(float(rng.choice(lows)))
+                elif kind < 0.5:
+                    column.append(float('nan'))
+                else:
+                    column.append(round(rng.uniform(lows[0] - 20, lows[-1] + 20), rng.choice([0, 1, 2])))
+            # 交替使用字段名和中文名称作为列名
+            metrics[config['metric'] if round_no % 2 else config['name']] = column
+
+        result = scorer.evaluate(metrics)
+        for column, values in metrics.items():
+            band = scorer.resolve_columns([column])[column]
+            expected = [MISSING if np.isnan(v) else reference_score(METRIC_BANDS[band.code], v) for v in values]
+            single = [MISSING if band.score_cents(v) is None else band.score_cents(v) for v in values]
+            if result[band.code].tolist() != expected or single != expected:
+                errors.append(f"第{round_no}轮 {band.code}: {result[band.code].tolist()} / {single}，期望 {expected}")
+        if len(errors) > 10:
+            break
+    print(f"  随机比较: {rounds} 轮")
+    return errors
+
+
+def benchmark(funds: int = 100_000):
+    rng = np.random.default_rng(1)
+    scorer = MetricScorer()
+    metrics = {band.metric: rng.uniform(-10, 160, funds).round(1) for band in METRIC_BAND_TABLES.values()}
+    started = time.perf_counter()
+    scorer.evaluate(metrics)
+    vector_seconds = time.perf_counter() - started
+
+    sample = 10_000
+    started = time.perf_counter()
+    for band in METRIC_BAND_TABLES.values():
+        for value in metrics[band.metric][:sample].tolist():
+            band.score_cents(value)
+    single_seconds = (time.perf_counter() - started) * funds / sample
+    print(f"  {funds:,} 只基金 × {len(METRIC_BAND_TABLES)} 个指标: searchsorted {vector_seconds:.3f}s，"
+          f"逐个 bisect 约 {single_seconds:.1f}s")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print("=== 验证指标数据自动评分 ===")
+    errors = verify_cases()
+    errors += verify_random(rounds)
+    benchmark()
+
+    print("\n" + "=" * 50)
+    if errors:
+        print(f"❌ 发现 {len(errors)} 个问题:")
+        for error in errors[:10]:
+            print(f"  - {error}")
+        sys.exit(1)
+    print("✅ 指标数据分档评分正确")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+验证读写分离
+
+用两个 SQLite 文件分别充当主库和只读副本（副本不做同步，便于区分读到的是哪个库）：
+- 写入后粘滞窗口内，本会话的只读查询仍走主库，能读到自己的写入
+- 窗口过后只读查询走副本；写查询和工作单元内的查询始终走主库
+- 不同会话互不影响
+
+使用方法: python verify_read_replicas.py
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+_workdir = tempfile.mkdtemp(prefix='fund_scoring_replica_')
+os.environ['DB_PRIMARY_DSN'] = f"sqlite:///{_workdir}/primary.db"
+os.environ['DB_REPLICA_DSNS'] = f"sqlite:///{_workdir}/replica.db"
+os.environ['DB_REPLICA_STICKY_SECONDS'] = '0.3'
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils.database import DbSession, bind_db_session, get_db_connection, unit_of_work, with_db_session
+
+STICKY_SECONDS = 0.3
+
+
+def mark_databases():
+    """在两个库里各写一个不同的标记用户，用来判断查询落在哪个库"""
+    from app.utils.sqlite_backend import connect
+    for path, marker in ((f"{_workdir}/replica.db", 'REPLICA'), (f"{_workdir}/primary.db", 'PRIMARY')):
+        conn = connect(path)
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO users (username, password_hash, real_name, role) VALUES (%s, %s, %s, %s)",
+                (marker, '-', marker, 'viewer')
+            )
+        conn.commit()
+        conn.close()
+
+
+def read_marker(read_only: bool = True) -> str:
+    with get_db_connection(read_only=read_only) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT username FROM users WHERE username IN ('PRIMARY', 'REPLICA')")
+            row = cursor.fetchone()
+            return row['username'] if row else None
+
+
+def write_something():
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE users SET real_name = real_name WHERE username = %s", ('PRIMARY',))
+        conn.commit()
+
+
+def verify_routing():
+    errors = []
+
+    def expect(label, actual, expected):
+        status = '✓' if actual == expected else '✗'
+        print(f"  {status} {label}: {actual}")
+        if actual != expected:
+            errors.append(f"{label}: 期望 {expected}，实际 {actual}")
+
+    mark_databases()
+
+    writer, other = DbSession(), DbSession()
+    with bind_db_session(writer):
+        expect("新会话只读查询", read_marker(), 'REPLICA')
+        expect("非只读查询", read_marker(read_only=False), 'PRIMARY')
+        write_something()
+        expect("写入后粘滞窗口内的只读查询", read_marker(), 'PRIMARY')
+
+    with bind_db_session(other):
+        expect("其他会话的只读查询", read_marker(), 'REPLICA')
+
+    time.sleep(STICKY_SECONDS + 0.1)
+    with bind_db_session(writer):
+        expect("粘滞窗口过后的只读查询", read_marker(), 'REPLICA')
+        with unit_of_work():
+            expect("工作单元内的只读查询", read_marker(), 'PRIMARY')
+
+    # 控件回调在 main() 绑定会话之前执行：未包装的回调写入记在线程默认会话上，包装后记在用户会话上
+    unbound, bound = DbSession(), DbSession()
+    write_something()
+    with bind_db_session(unbound):
+        expect("未绑定会话的回调写入后的只读查询", read_marker(), 'REPLICA')
+    with_db_session(bound, write_something)()
+    with bind_db_session(bound):
+        expect("包装后的回调写入后的只读查询", read_marker(), 'PRIMARY')
+    return errors
+
+
+def main():
+    print(f"=== 验证读写分离（{_workdir}） ===")
+    errors = verify_routing()
+
+    print("\n" + "=" * 50)
+    if errors:
+        print(f"❌ 发现 {len(errors)} 个问题:")
+        for error in errors:
+            print(f"  - {error}")
+        sys.exit(1)
+    print("✅ 读写分离验证通过")
+
+
+if __name__ == '__main__':
+    main()
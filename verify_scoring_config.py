@@ -118,6 +118,29 @@ def verify_all_indicators():
 
     return missing
 
+def verify_option_tables():
+    """验证编译后的评分选项表：分值在 [0, 满分] 内且降序，最高选项等于满分，子指标满分之和等于父指标满分"""
+    from app.utils.scoring_options import OPTION_TABLES
+
+    errors = []
+    for code, table in OPTION_TABLES.items():
+        if table.is_parent:
+            children_max = sum(OPTION_TABLES[sub].max_score for sub in table.children)
+            if abs(children_max - table.max_score) > 1e-9:
+                errors.append(f"{code}: 子指标满分之和 {children_max} 不等于父指标满分 {table.max_score}")
+            continue
+        scores = table.scores
+        if not scores:
+            errors.append(f"{code}: 没有评分选项")
+            continue
+        if list(scores) != sorted(scores, reverse=True):
+            errors.append(f"{code}: 选项未按分值降序排列")
+        if scores[-1] < 0 or scores[0] > table.max_score:
+            errors.append(f"{code}: 选项分值超出 [0, {table.max_score}]")
+        elif scores[0] != table.max_score:
+            errors.append(f"{code}: 最高选项 {scores[0]} 不等于满分 {table.max_score}")
+    return errors
+
 if __name__ == '__main__':
     print("=" * 70)
     print("政府投资基金投向评分系统 - 配置完整性验证")
@@ -137,6 +160,12 @@ if __name__ == '__main__':
     print("\n### 第二步: 验证scoring_guide配置 ###")
     errors, warnings = verify_scoring_guide_completeness()
 
+    # 验证编译后的评分选项表
+    print("\n### 第三步: 验证评分选项表 ###")
+    from app.utils.scoring_options import OPTION_TABLES, RULE_SET_HASH
+    errors.extend(verify_option_tables())
+    print(f"  {len(OPTION_TABLES)} 个指标，规则指纹 {RULE_SET_HASH}")
+
     # 输出结果
     print("\n" + "=" * 70)
     print("### 验证结果 ###")
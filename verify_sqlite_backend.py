@@ -0,0 +1,1038 @@
+"""
+验证SQLite后端
+
+在内存数据库（或 DB_SQLITE_PATH 指定的文件）上跑通完整评分流程：
+建表 → 初始化评分维度和指标 → 创建基金 → 批量评分 → 维度汇总 → 总分、等级和排名
+
+使用方法: python verify_sqlite_backend.py
+"""
+import os
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ.setdefault('DB_SQLITE_PATH', ':memory:')
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils.database import get_db_connection
+from app.utils.sqlite_backend import translate_sql
+from config.scoring_rules import SCORING_DIMENSIONS
+from core.services.fund_service import fund_service
+from core.services.scoring_service import ScoringService
+from init_scoring_data import init_scoring_data
+
+
+def verify_translation():
+    """验证MySQL语法翻译"""
+    errors = []
+    cases = [
+        (
+            "INSERT INTO t (a, b) VALUES (%s, %s) ON DUPLICATE KEY UPDATE b = VALUES(b), c = CURRENT_TIMESTAMP",
+            "INSERT INTO t (a, b) VALUES (?, ?) ON CONFLICT DO UPDATE SET b = excluded.b, c = CURRENT_TIMESTAMP"
+        ),
+        ("SELECT * FROM t WHERE name LIKE %s AND note = '%s'", "SELECT * FROM t WHERE name LIKE ? AND note = '%s'"),
+        ("SELECT * FROM t WHERE id = %(id)s FOR UPDATE", "SELECT * FROM t WHERE id = :id"),
+        (
+            "UPDATE t a JOIN (SELECT id, RANK() OVER (ORDER BY s DESC) AS r FROM t) x ON x.id = a.id "
+            "SET a.rank = x.r WHERE NOT (a.rank <=> x.r)",
+            "UPDATE t AS a SET rank = x.r FROM (SELECT id, RANK() OVER (ORDER BY s DESC) AS r FROM t) AS x "
+            "WHERE (x.id = a.id) AND (NOT (a.rank IS x.r))"
+        ),
+    ]
+    for mysql_sql, expected in cases:
+        actual = translate_sql(mysql_sql)
+        if actual != (expected,):
+            errors.append(f"{mysql_sql}\n    期望: {expected}\n    实际: {actual}")
+
+    ddl = translate_sql(
+        "CREATE TABLE IF NOT EXISTS t (id INT PRIMARY KEY AUTO_INCREMENT, "
+        "status ENUM('a', 'b') DEFAULT 'a' COMMENT '状态', "
+        "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP, "
+        "UNIQUE KEY uk_status (status), INDEX idx_updated (updated_at)) ENGINE=InnoDB",
+        False
+    )
+    if len(ddl) != 3 or "CHECK (status IN ('a', 'b'))" not in ddl[0] or 'TRIGGER' not in ddl[2]:
+        errors.append(f"建表语句翻译不正确: {ddl}")
+    return errors
+
+
+def create_scorer() -> int:
+    """创建评分用户（直接写入，避免依赖bcrypt）"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM users WHERE username = %s", ('sqlite_scorer',))
+            row = cursor.fetchone()
+            if row:
+                return row['id']
+            cursor.execute(
+                "INSERT INTO users (username, password_hash, real_name, role) VALUES (%s, %s, %s, %s)",
+                ('sqlite_scorer', '-', '评分员', 'scorer')
+            )
+            conn.commit()
+            return cursor.lastrowid
+
+
+def leaf_indicators():
+    """按配置顺序列出所有叶子指标 (维度编码, 指标配置)"""
+    for dim_code, dimension in SCORING_DIMENSIONS.items():
+        for indicator in dimension['indicators']:
+            if indicator.get('type') == 'parent':
+                for sub in indicator.get('sub_indicators', []):
+                    yield dim_code, sub
+            else:
+                yield dim_code, indicator
+
+
+def score_fund(service: ScoringService, fund_id: int, scorer_id: int, ratio: Decimal) -> dict:
+    """按满分的 ratio 倍给所有叶子指标评分，然后计算维度汇总和总分"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id, dimension_code FROM scoring_dimensions")
+            dim_ids = {row['dimension_code']: row['id'] for row in cursor.fetchall()}
+            cursor.execute("SELECT id, indicator_code FROM scoring_indicators")
+            ind_ids = {row['indicator_code']: row['id'] for row in cursor.fetchall()}
+
+    leaves = list(leaf_indicators())
+    scores = [
+        {
+            'indicator_code': indicator['code'],
+            'raw_score': (Decimal(str(indicator['max_score'])) * ratio).quantize(Decimal('0.01'))
+        }
+        for _, indicator in leaves
+    ]
+    # 先按单个指标提交一项，再整体批量提交（批量 upsert 覆盖已有评分）
+    dim_code, indicator = leaves[0]
+    result = service.submit_fund_indicator_score(
+        fund_id, dim_ids[dim_code], ind_ids[indicator['code']], scores[0]['raw_score'], scorer_id
+    )
+    if not result['success']:
+        raise RuntimeError(result['message'])
+    result = service.submit_fund_indicator_scores(fund_id, scores, scorer_id)
+    if not result['success'] or result['data']['saved_count'] != len(scores):
+        raise RuntimeError(result['message'])
+
+    for dim_id in dim_ids.values():
+        service.calculate_and_save_fund_dimension_score(fund_id, dim_id)
+    return service.calculate_fund_total_score(fund_id)
+
+
+def verify_scoring_flow():
+    """验证完整评分流程"""
+    errors = []
+    if not init_scoring_data():
+        return ["初始化评分数据失败"]
+
+    scorer_id = create_scorer()
+    service = ScoringService()
+    expected = {}
+    run_id = int(time.time())
+    for index, ratio in enumerate(['1', '0.85', '0.5']):
+        created = fund_service.create_fund({
+            'fund_code': f'SQLITE_{run_id}_{index}',
+            'fund_name': f'SQLite验证基金{index}',
+            'fund_manager': '验证管理人',
+            'status': 'active',
+            'created_by': scorer_id
+        })
+        if not created['success']:
+            return [f"创建基金失败: {created['message']}"]
+        fund_id = created['data']['fund_id']
+        result = score_fund(service, fund_id, scorer_id, Decimal(ratio))
+        if not result['success']:
+            errors.append(f"基金{fund_id}总分计算失败: {result['message']}")
+            continue
+        print(f"  基金 {fund_id}: 总分 {result['data']['total_score']:.2f}，等级 {result['data']['grade_name']}")
+        expected[fund_id] = result['data']['total_score']
+
+    detail = service.get_fund_scoring_detail(next(iter(expected)))
+    if not detail['success'] or detail['data']['total_score'] is None:
+        errors.append(f"读取评分详情失败: {detail.get('message')}")
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT fund_id, total_score, rank_in_period FROM fund_total_scores ORDER BY rank_in_period")
+            ranked = cursor.fetchall()
+    if [row['fund_id'] for row in ranked] != sorted(expected, key=lambda f: -expected[f]):
+        errors.append(f"排名不正确: {ranked}")
+    if ranked and not isinstance(ranked[0]['total_score'], Decimal):
+        errors.append("DECIMAL列未按Decimal返回")
+    errors += verify_incremental_update(service, list(expected), scorer_id)
+    errors += verify_tie_ranking(service)
+    errors += verify_ranking_index(service, scorer_id)
+    errors += verify_catalog_cache(service)
+    errors += verify_batch_snapshots(service, list(expected) + [0])
+    errors += verify_pagination(scorer_id)
+    errors += verify_score_aggregates(service, list(expected))
+    errors += verify_rescore(service, [f for f in expected if f != list(expected)[1]])
+    errors += verify_weight_sensitivity(service)
+    errors += verify_rule_set_versioning(service, [f for f in expected if f != list(expected)[1]], scorer_id)
+    errors += verify_autoscore(service, [f for f in expected if f != list(expected)[1]], scorer_id)
+    errors += verify_peer_rankings(service, [f for f in expected if f != list(expected)[1]])
+    errors += verify_scored_masks(service, [f for f in expected if f != list(expected)[1]], scorer_id)
+    errors += verify_unit_of_work_rollback(service, scorer_id)
+    errors += verify_orphaned_stale_rows(service, scorer_id)
+    errors += verify_reinit(service)
+    return errors
+
+
+def verify_score_aggregates(service: ScoringService, fund_ids: list):
+    """汇总统计与明细表的 GROUP BY 结果一致，改等级和删除基金后无偏差"""
+    from core.services.scoring_catalog import get_scoring_catalog
+
+    errors = []
+    repo = service.scoring_repo
+    # verify_tie_ranking 直接改过总分，先重建一次
+    repo.rebuild_fund_aggregates()
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT grade, COUNT(*) as count FROM fund_total_scores GROUP BY grade")
+            grades = {r['grade']: r['count'] for r in cursor.fetchall()}
+            cursor.execute("""
+                SELECT sd.dimension_code, AVG(iss.weighted_total) as avg_score
+                FROM fund_scoring_summary iss
+                JOIN scoring_dimensions sd ON iss.dimension_id = sd.id
+                GROUP BY sd.dimension_code
+            """)
+            averages = {r['dimension_code']: round(float(r['avg_score']), 6) for r in cursor.fetchall()}
+    actual_averages = {k: round(v, 6) for k, v in service.get_fund_dimension_averages().items()}
+    if service.get_fund_grade_distribution() != grades or repo.count_fund_totals() != sum(grades.values()):
+        errors.append(f"等级分布与明细不一致: {service.get_fund_grade_distribution()}，期望 {grades}")
+    if actual_averages != averages:
+        errors.append(f"维度平均分与明细不一致: {actual_averages}，期望 {averages}")
+
+    repo.save_fund_total(fund_ids[0], Decimal('42.5'), Decimal('30'), Decimal('10'), Decimal('2.5'), 'unqualified')
+    layout_id = get_scoring_catalog().dimension_by_code['LAYOUT'].id
+    repo.save_fund_dimension_summary(fund_ids[0], layout_id, Decimal('10'), Decimal('3.33'))
+    fund_service.delete_fund(fund_ids[1])
+    drift = repo.rebuild_fund_aggregates()
+    print(f"  汇总统计: 等级分布 {service.get_fund_grade_distribution()}，重建偏差 {len(drift)} 项")
+    if drift:
+        errors.append(f"增量维护的汇总统计出现偏差: {drift}")
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE fund_score_aggregates SET item_count = item_count + 5 WHERE metric = 'grade'")
+            conn.commit()
+    if not repo.rebuild_fund_aggregates():
+        errors.append("重建未发现人为制造的偏差")
+    return errors
+
+
+def verify_pagination(scorer_id: int):
+    """逐页读取的基金不重复、不遗漏，同一时刻创建的行按 id 区分先后"""
+    from core.repositories.fund_repository import FundRepository
+
+    errors = []
+    repo = FundRepository()
+    for index in range(7):
+        fund_service.create_fund({
+            'fund_code': f'PAGE_{int(time.time())}_{index}',
+            'fund_name': f'分页验证基金{index}',
+            'fund_manager': '验证管理人',
+            'status': 'draft',
+            'created_by': scorer_id
+        })
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            # 让一半基金的创建时间完全相同，验证 id 作为第二排序键
+            cursor.execute("UPDATE funds SET created_at = %s WHERE id %% 2 = 0", ('2024-01-01 00:00:00',))
+            conn.commit()
+
+    expected = [f['id'] for f in repo.list_funds(limit=1000)]
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = repo.list_funds_page(cursor=cursor, limit=3)
+        seen += [f['id'] for f in page.items]
+        pages += 1
+        if not page.has_more:
+            break
+        cursor = page.next_cursor
+    print(f"  分页: {len(seen)} 只基金，{pages} 页")
+    if seen != expected:
+        errors.append(f"分页结果与完整列表不一致: {seen}，期望 {expected}")
+    drafts = repo.list_funds_page(status='draft', limit=100).items
+    if not drafts or any(f['status'] != 'draft' for f in drafts):
+        errors.append("分页查询未应用筛选条件")
+    try:
+        repo.list_funds_page(cursor='not-a-cursor')
+        errors.append("非法游标未报错")
+    except ValueError:
+        pass
+    return errors
+
+
+def scoring_state(fund_ids: list) -> dict:
+    """基金的总分、等级、排名、维度汇总和父指标得分"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT fund_id, total_score, policy_score, layout_score, execution_score, grade, rank_in_period
+                FROM fund_total_scores ORDER BY fund_id
+            """)
+            totals = cursor.fetchall()
+            cursor.execute("""
+                SELECT fund_id, dimension_id, total_score, weighted_total
+                FROM fund_scoring_summary ORDER BY fund_id, dimension_id
+            """)
+            summaries = cursor.fetchall()
+            cursor.execute("""
+                SELECT fs.fund_id, fs.indicator_id, fs.score
+                FROM fund_scores fs JOIN scoring_indicators si ON fs.indicator_id = si.id
+                WHERE si.indicator_type = 'parent' ORDER BY fs.fund_id, fs.indicator_id
+            """)
+            parents = cursor.fetchall()
+    return {
+        'totals': [dict(r) for r in totals if r['fund_id'] in fund_ids],
+        'summaries': [dict(r) for r in summaries if r['fund_id'] in fund_ids],
+        'parents': [dict(r) for r in parents if r['fund_id'] in fund_ids]
+    }
+
+
+def verify_incremental_update(service: ScoringService, fund_ids: list, scorer_id: int):
+    """单个指标的增量更新与全量重算结果一致，每次修改的SQL条数固定"""
+    from app.utils.query_stats import track_rerun
+
+    errors = []
+    fund_id = fund_ids[1]
+    queries = set()
+    grade_changes = 0
+    # 把第二只基金的政策符合性指标逐个改为0分：总分跨过等级线，并落到第三只基金之后
+    for dim_code, indicator in leaf_indicators():
+        if dim_code != 'POLICY':
+            continue
+        with track_rerun('verify_incremental') as report:
+            result = service.update_fund_indicator_score(fund_id, indicator['code'], Decimal('0'), scorer_id)
+        if not result['success']:
+            return [f"增量更新失败: {result['message']}"]
+        queries.add(report.stats.queries)
+        grade_changes += result['data']['grade_changed']
+    incremental = scoring_state(fund_ids)
+    print(f"  增量更新: 总分 {result['data']['total_score']:.2f}，等级变化 {grade_changes} 次，"
+          f"每次 {min(queries)}-{max(queries)} 条SQL")
+    if max(queries) > 20:
+        errors.append(f"单个指标增量更新执行了 {max(queries)} 条SQL")
+
+    for each in fund_ids:
+        for dimension in service.get_scoring_structure().values():
+            service.calculate_and_save_fund_dimension_score(each, dimension['id'])
+        service.calculate_fund_total_score(each)
+    full = scoring_state(fund_ids)
+    for key in full:
+        if incremental[key] != full[key]:
+            errors.append(f"增量更新的{key}与全量重算不一致: {incremental[key]}，期望 {full[key]}")
+    return errors
+
+
+def verify_batch_snapshots(service: ScoringService, fund_ids: list):
+    """批量读取的评分数据与逐只读取一致，查询次数只与分块数有关"""
+    from app.utils.query_stats import track_rerun
+
+    errors = []
+    with track_rerun('verify_batch') as report:
+        snapshots = service.scoring_repo.get_fund_scoring_snapshots(fund_ids, chunk_size=2)
+        scores = service.scoring_repo.get_fund_scores_by_funds(fund_ids, chunk_size=2)
+    print(f"  批量读取 {len(fund_ids)} 只基金: {report.stats.queries} 次查询")
+    if report.stats.queries != 4:
+        errors.append(f"批量读取应为4次查询，实际 {report.stats.queries} 次")
+    if 0 in snapshots or scores.get(0) != []:
+        errors.append("不存在的基金不应有评分数据")
+    for fund_id in fund_ids[:-1]:
+        single = service.get_fund_scoring_snapshot(fund_id)
+        batch = service.get_fund_scoring_snapshots([fund_id])[fund_id]
+        if single != batch or len(scores[fund_id]) != single.scored_count:
+            errors.append(f"基金{fund_id}批量读取结果与逐只读取不一致")
+    return errors
+
+
+def verify_catalog_cache(service: ScoringService):
+    """评分目录只加载一次，版本号变化后重新加载"""
+    from app.utils.query_stats import track_rerun
+    from core.services.scoring_catalog import bump_catalog_version, get_scoring_catalog
+
+    errors = []
+    catalog = get_scoring_catalog()
+    with track_rerun('verify_catalog') as report:
+        structure = service.get_scoring_structure()
+        service.get_scoring_structure()
+    if report.stats.queries != 0:
+        errors.append(f"评分目录缓存命中时仍执行了 {report.stats.queries} 条SQL")
+    if sum(len(d['indicators']) for d in structure.values()) != len(catalog.indicators):
+        errors.append("评分结构与评分目录不一致")
+
+    version = bump_catalog_version()
+    reloaded = get_scoring_catalog()
+    print(f"  评分目录: v{catalog.version} → v{reloaded.version}，{len(reloaded.indicators)} 个指标")
+    if reloaded is catalog or reloaded.version != version:
+        errors.append("版本号变化后评分目录未重新加载")
+    return errors
+
+
+def verify_tie_ranking(service: ScoringService):
+    """并列总分的排名与 ScoringCalculator.calculate_project_ranking 一致，且只更新有变化的行"""
+    errors = []
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT fund_id FROM fund_total_scores ORDER BY fund_id")
+            fund_ids = [row['fund_id'] for row in cursor.fetchall()]
+            for fund_id, score in zip(fund_ids, ['80.00', '90.00', '80.00']):
+                cursor.execute("UPDATE fund_total_scores SET total_score = %s WHERE fund_id = %s", (score, fund_id))
+            conn.commit()
+
+    changed = service.scoring_repo.update_fund_rankings()
+    unchanged = service.scoring_repo.update_fund_rankings()
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT fund_id, total_score, rank_in_period FROM fund_total_scores")
+            rows = cursor.fetchall()
+    expected = {
+        r['fund_id']: r['rank']
+        for r in service.calculator.calculate_project_ranking([dict(r) for r in rows])
+    }
+    actual = {r['fund_id']: r['rank_in_period'] for r in rows}
+    print(f"  并列排名: {sorted(actual.items())}（变化 {changed} 行，再次计算变化 {unchanged} 行）")
+    if actual != expected:
+        errors.append(f"并列排名不正确: {actual}，期望 {expected}")
+    if unchanged != 0:
+        errors.append(f"排名未变化时仍更新了 {unchanged} 行")
+    return errors
+
+
+def verify_ranking_index(service: ScoringService, scorer_id: int):
+    """排名索引的名次和平移区间与全量排名一致，写回后库中排名正确"""
+    import random
+    from core.services.ranking_index import FundRankingIndex, invalidate_fund_ranking_index
+
+    errors = []
+    calculator = service.calculator
+    rng = random.Random(7)
+    totals = {fund_id: Decimal(rng.randint(0, 400)) / 4 for fund_id in range(1, 61)}
+    index = FundRankingIndex.build(totals.items())
+    for step in range(300):
+        fund_id = rng.randint(1, 70)
+        before = index.ranks()
+        if rng.random() < 0.1:
+            shift = index.remove(fund_id)
+            totals.pop(fund_id, None)
+        else:
+            totals[fund_id] = Decimal(rng.randint(0, 400)) / 4
+            shift = index.update(fund_id, totals[fund_id])
+        expected = {
+            r['fund_id']: r['rank']
+            for r in calculator.calculate_project_ranking([{'fund_id': f, 'total_score': t} for f, t in totals.items()])
+        }
+        after = index.ranks()
+        if after != expected:
+            errors.append(f"第{step}次修改后索引名次与全量排名不一致")
+            break
+        moved = sorted(after[f] for f in after if f != fund_id and f in before and after[f] != before[f])
+        # 并列时名次可能重复，区间按排序位置计，名次都落在区间内
+        if len(moved) != shift.count or (moved and (moved[0] != shift.first_rank or moved[-1] > shift.last_rank)):
+            errors.append(f"第{step}次修改的名次平移区间不正确: {shift}，实际 {moved}")
+            break
+        if any(after[f] - before[f] != shift.step for f in after if f != fund_id and f in before and after[f] != before[f]):
+            errors.append(f"第{step}次修改的名次平移步长不正确: {shift}")
+            break
+    print(f"  排名索引: 随机修改 {step + 1} 次，{len(index)} 只基金")
+
+    # 总分被直接修改过，丢弃索引后由库中数据重新构建
+    invalidate_fund_ranking_index()
+    dim_code, indicator = next(leaf_indicators())
+    for raw_score in ['0', str(indicator['max_score'])]:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT fund_id FROM fund_total_scores ORDER BY total_score LIMIT 1")
+                fund_id = cursor.fetchone()['fund_id']
+        result = service.update_fund_indicator_score(fund_id, indicator['code'], Decimal(raw_score), scorer_id)
+        if not result['success']:
+            return errors + [f"增量更新失败: {result['message']}"]
+        actual, expected = stored_and_expected_ranks(calculator)
+        if actual != expected:
+            errors.append(f"排名索引写回的排名不正确: {actual}，期望 {expected}")
+    return errors + verify_ranking_index_staleness(service, scorer_id, indicator)
+
+
+def stored_and_expected_ranks(calculator) -> tuple:
+    """库中的 rank_in_period 和按总分全量计算的名次"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT fund_id, total_score, rank_in_period FROM fund_total_scores")
+            rows = cursor.fetchall()
+    expected = {r['fund_id']: r['rank'] for r in calculator.calculate_project_ranking([dict(r) for r in rows])}
+    return {r['fund_id']: r['rank_in_period'] for r in rows}, expected
+
+
+def verify_ranking_index_staleness(service: ScoringService, scorer_id: int, indicator: dict) -> list:
+    """其他进程修改总分但基金数不变时（逐只保存、全量重算排名），排名索引按库中指纹发现并重新构建"""
+    from core.services.ranking_index import get_fund_ranking_index
+
+    errors = []
+    repo = service.scoring_repo
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT * FROM fund_total_scores ORDER BY total_score, fund_id")
+            rows = cursor.fetchall()
+    low, high, edited = rows[0], rows[-1], rows[len(rows) // 2]
+    original = next(
+        row['score'] for row in repo.get_fund_scores(edited['fund_id']) if row['indicator_code'] == indicator['code']
+    )
+    changed = Decimal('0') if original else Decimal(str(indicator['max_score']))
+
+    def save_total(row, total_score):
+        repo.save_fund_total(
+            row['fund_id'], total_score, row['policy_score'], row['layout_score'], row['execution_score'],
+            row['grade'], row.get('reviewed_by'), row.get('review_comment'), row.get('rule_set_hash')
+        )
+
+    def other_process_saves_total():
+        # 另一个进程逐只保存总分：基金数不变，总分合计变化
+        save_total(high, Decimal('0'))
+
+    def other_process_rescores():
+        # 另一个进程重新评分：两只基金交换总分，基金数和总分合计都不变，全量重算排名使版本号加一
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                for row, other in ((low, high), (high, low)):
+                    cursor.execute(
+                        "UPDATE fund_total_scores SET total_score = %s, grade = %s WHERE fund_id = %s",
+                        (other['total_score'], other['grade'], row['fund_id'])
+                    )
+            conn.commit()
+        repo.update_fund_rankings()
+
+    for label, write in (("逐只保存总分", other_process_saves_total), ("重新评分", other_process_rescores)):
+        index = get_fund_ranking_index()
+        write()
+        result = service.update_fund_indicator_score(edited['fund_id'], indicator['code'], changed, scorer_id)
+        rebuilt = get_fund_ranking_index() is not index
+        actual, expected = stored_and_expected_ranks(service.calculator)
+        if not result['success'] or not rebuilt or actual != expected:
+            errors.append(f"其他进程{label}后排名索引未重新构建或排名不正确: 重建 {rebuilt}，{actual}，期望 {expected}")
+        print(f"  排名索引过期检测: 其他进程{label}后重新构建 {rebuilt}，排名与全量计算一致 {actual == expected}")
+
+        # 恢复
+        service.update_fund_indicator_score(edited['fund_id'], indicator['code'], original, scorer_id)
+        for row in (low, high):
+            save_total(row, row['total_score'])
+        repo.update_fund_rankings()
+    return errors
+
+
+def verify_rescore(service: ScoringService, fund_ids: list):
+    """全量重算：dry_run 只报告差异；写回后与逐只全量计算一致；从检查点续跑只重算剩余基金"""
+    import json
+    import tempfile
+    from app.utils.scoring_options import rule_set_hash
+    from core.services.rescore_service import rescore_funds
+    from core.services.scoring_catalog import bump_catalog_version, get_scoring_catalog
+
+    errors = []
+    repo = service.scoring_repo
+    checkpoint = Path(tempfile.mkdtemp()) / 'rescore_checkpoint.json'
+    # verify_score_aggregates 直接改过第一只基金的总分和维度汇总
+    before = scoring_state(fund_ids)
+    dry = rescore_funds(chunk_size=1, workers=0, dry_run=True, checkpoint_path=str(checkpoint))
+    if dry.changed_funds == 0 or scoring_state(fund_ids) != before or checkpoint.exists():
+        errors.append(f"dry_run 未报告差异或修改了数据库: {dry}")
+
+    report = rescore_funds(chunk_size=1, workers=2, checkpoint_path=str(checkpoint))
+    rescored = scoring_state(fund_ids)
+    print(f"  全量重算: {report.funds} 只基金，{report.changed_funds} 只有变化，"
+          f"写回 {report.summary_rows} 行汇总、{report.total_rows} 行总分，{report.funds_per_second:.0f} 只/秒")
+    if report.changed_funds != dry.changed_funds or checkpoint.exists():
+        errors.append(f"全量重算结果与 dry_run 报告不一致: {report}，dry_run {dry}")
+    for fund_id in fund_ids:
+        for dimension in service.get_scoring_structure().values():
+            service.calculate_and_save_fund_dimension_score(fund_id, dimension['id'])
+        service.calculate_fund_total_score(fund_id)
+    full = scoring_state(fund_ids)
+    for key in full:
+        if rescored[key] != full[key]:
+            errors.append(f"全量重算的{key}与逐只计算不一致: {rescored[key]}，期望 {full[key]}")
+    if repo.rebuild_fund_aggregates():
+        errors.append("全量重算后汇总统计出现偏差")
+
+    # 修改维度权重后从第一只基金之后续跑：第一只基金的维度汇总保持原值
+    layout = get_scoring_catalog().dimension_by_code['LAYOUT']
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE scoring_dimensions SET weight = weight + 10 WHERE id = %s", (layout.id,))
+            conn.commit()
+    bump_catalog_version()
+    checkpoint.write_text(json.dumps({
+        'rules': rule_set_hash(get_scoring_catalog().rule_dimensions()),
+        'last_fund_id': fund_ids[0],
+        'report': {'funds': 1}
+    }))
+    resumed = rescore_funds(chunk_size=1, workers=0, checkpoint_path=str(checkpoint))
+    after = {(r['fund_id'], r['dimension_id']): r['weighted_total'] for r in scoring_state(fund_ids)['summaries']}
+    old = {(r['fund_id'], r['dimension_id']): r['weighted_total'] for r in full['summaries']}
+    print(f"  检查点续跑: 从基金 {resumed.resumed_after} 之后继续，本次 {resumed.processed} 只，累计 {resumed.funds} 只")
+    if resumed.resumed_after != fund_ids[0] or resumed.processed != len(fund_ids) - 1:
+        errors.append(f"未从检查点继续: {resumed}")
+    if after[(fund_ids[0], layout.id)] != old[(fund_ids[0], layout.id)] or \
+            all(after[(f, layout.id)] == old[(f, layout.id)] for f in fund_ids[1:]):
+        errors.append("续跑重算的基金范围不正确")
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE scoring_dimensions SET weight = weight - 10 WHERE id = %s", (layout.id,))
+            conn.commit()
+    bump_catalog_version()
+    rescore_funds(workers=0, restart=True, checkpoint_path=str(checkpoint))
+    if scoring_state(fund_ids) != full:
+        errors.append("恢复维度权重后全量重算结果不一致")
+    return errors
+
+
+def scratch_checkpoint() -> str:
+    """一次性的全量重算检查点文件（重算完成后删除，不能用 os.devnull：检查点按临时文件改名写入）"""
+    import tempfile
+    return str(Path(tempfile.mkdtemp()) / 'rescore_checkpoint.json')
+
+
+def rule_set_hashes(fund_ids: list) -> dict:
+    """{fund_id: 该基金维度汇总和总分行上的评分规则指纹集合}"""
+    hashes = {fund_id: set() for fund_id in fund_ids}
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT fund_id, rule_set_hash FROM fund_scoring_summary "
+                           "UNION ALL SELECT fund_id, rule_set_hash FROM fund_total_scores")
+            for row in cursor.fetchall():
+                if row['fund_id'] in hashes:
+                    hashes[row['fund_id']].add(row['rule_set_hash'])
+    return hashes
+
+
+def verify_rule_set_versioning(service: ScoringService, fund_ids: list, scorer_id: int):
+    """修改评分规则后：读取过期基金时按需重算，增量修改过期基金时整只重算，后台清扫其余基金，结果与全量重算一致"""
+    from core.services.rescore_service import rescore_funds, sweep_stale_funds
+    from core.services.scoring_catalog import bump_catalog_version, get_scoring_catalog
+
+    errors = []
+    repo = service.scoring_repo
+    current = get_scoring_catalog().rule_set_hash
+    if any(hashes != {current} for hashes in rule_set_hashes(fund_ids).values()):
+        errors.append(f"维度汇总或总分未记录当前评分规则指纹: {rule_set_hashes(fund_ids)}")
+    before = scoring_state(fund_ids)
+
+    def set_policy_weight(delta):
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("UPDATE scoring_dimensions SET weight = weight + %s WHERE dimension_code = 'POLICY'", (delta,))
+                conn.commit()
+        bump_catalog_version()
+        return get_scoring_catalog().rule_set_hash
+
+    changed = set_policy_weight(-20)
+    stale = repo.count_stale_funds(changed)
+    if changed == current or stale != len(fund_ids):
+        errors.append(f"修改维度权重后过期基金数为 {stale}，期望 {len(fund_ids)}")
+
+    # 读取：过期基金按需重算后再返回
+    snapshot = service.get_fund_scoring_snapshot(fund_ids[0])
+    hashes = rule_set_hashes(fund_ids)
+    if hashes[fund_ids[0]] != {changed} or hashes[fund_ids[1]] == {changed}:
+        errors.append(f"读取过期基金未按需重算或重算了其他基金: {hashes}")
+    policy = snapshot.dimensions['POLICY']
+    if policy.weighted_total != (policy.total_score * 40 / 100).quantize(Decimal('0.01')):
+        errors.append(f"按需重算后返回的仍是旧权重下的加权得分: {policy.weighted_total}")
+
+    # 增量修改：过期基金整只重算，不在旧汇总上累加
+    dim_code, indicator = next(leaf_indicators())
+    original = next(row['score'] for row in repo.get_fund_scores(fund_ids[1]) if row['indicator_code'] == indicator['code'])
+    result = service.update_fund_indicator_score(
+        fund_ids[1], indicator['code'], Decimal('0') if original else Decimal(str(indicator['max_score'])), scorer_id
+    )
+    if not result['success'] or rule_set_hashes(fund_ids)[fund_ids[1]] != {changed}:
+        errors.append(f"增量修改过期基金未整只重算: {result}")
+
+    # 后台清扫其余过期基金，结果与全量重算一致
+    swept = sweep_stale_funds(batch_size=1)
+    print(f"  评分规则版本: {current} → {changed}，读取和修改时按需重算 2 只，后台清扫 {swept.funds} 只")
+    if repo.count_stale_funds(changed) != 0 or swept.funds != len(fund_ids) - 2:
+        errors.append(f"后台清扫后仍有过期基金: {swept}")
+    lazy = scoring_state(fund_ids)
+    full = rescore_funds(workers=0, restart=True, checkpoint_path=scratch_checkpoint())
+    if full.changed_funds or scoring_state(fund_ids) != lazy:
+        errors.append(f"按需重算和清扫的结果与全量重算不一致: {full}")
+
+    # 恢复权重并恢复修改过的评分（修改时重算该基金，其余基金由清扫重算）
+    restored = set_policy_weight(20)
+    service.update_fund_indicator_score(fund_ids[1], indicator['code'], original, scorer_id)
+    swept = sweep_stale_funds()
+    if swept.funds != len(fund_ids) - 1 or repo.count_stale_funds(restored):
+        errors.append(f"恢复评分规则后清扫的基金数不正确: {swept}")
+    if restored != current or scoring_state(fund_ids) != before or repo.rebuild_fund_aggregates():
+        errors.append("恢复评分规则和评分后结果与修改前不一致，或汇总统计出现偏差")
+    return errors
+
+
+def verify_autoscore(service: ScoringService, fund_ids: list, scorer_id: int):
+    """按指标数据自动评分：得分符合分档，无效数据不评分，汇总与全量重算一致，恢复后结果与评分前相同"""
+    import pandas as pd
+    from core.repositories.fund_repository import FundRepository
+    from core.services.autoscore_service import autoscore_funds
+    from core.services.rescore_service import rescore_funds
+
+    errors = []
+    repo = service.scoring_repo
+    codes = [FundRepository().get_by_id(fund_id)['fund_code'] for fund_id in fund_ids]
+    original = {
+        fund_id: {row['indicator_code']: row['score'] for row in repo.get_fund_scores(fund_id)} for fund_id in fund_ids
+    }
+    before = scoring_state(fund_ids)
+
+    metrics = pd.DataFrame({
+        'fund_code': codes + ['NO_SUCH_FUND'],
+        'new_productivity_ratio': [95, 45.5] + [None] * (len(codes) - 2) + [80],
+        '资产周转率': ['120', 'n/a'] + [''] * (len(codes) - 2) + [60],
+    })
+    report = autoscore_funds(metrics, scorer_id, chunk_size=1)
+    scores = {fund_id: {row['indicator_code']: row['score'] for row in repo.get_fund_scores(fund_id)} for fund_id in fund_ids}
+    print(f"  自动评分: {report.funds} 只基金 {report.scores} 项，列 {report.columns}，"
+          f"无效单元格 {report.invalid_cells}，未知基金 {report.unknown_funds}")
+    expected = {
+        fund_ids[0]: {'POLICY_01': Decimal('10.00'), 'LAYOUT_03_02': Decimal('5.00')},
+        fund_ids[1]: {'POLICY_01': Decimal('5.00'), 'LAYOUT_03_02': original[fund_ids[1]]['LAYOUT_03_02']},
+    }
+    for fund_id, items in expected.items():
+        for code, score in items.items():
+            if scores[fund_id][code] != score:
+                errors.append(f"基金{fund_id} {code} 自动评分为 {scores[fund_id][code]}，期望 {score}")
+    if (report.funds, report.scores, report.invalid_cells, report.unknown_funds) != (2, 3, 1, ['NO_SUCH_FUND']):
+        errors.append(f"自动评分统计不正确: {report}")
+    full = rescore_funds(workers=0, restart=True, checkpoint_path=scratch_checkpoint())
+    if full.changed_funds or repo.rebuild_fund_aggregates():
+        errors.append(f"自动评分后的汇总、总分或汇总统计与全量重算不一致: {full}")
+
+    # 按单指标修改恢复原评分
+    for fund_id, items in expected.items():
+        for code in items:
+            if scores[fund_id][code] != original[fund_id][code]:
+                service.update_fund_indicator_score(fund_id, code, original[fund_id][code], scorer_id)
+    if scoring_state(fund_ids) != before:
+        errors.append("恢复自动评分前的评分后结果不一致")
+    return errors
+
+
+def reference_peer_rankings() -> dict:
+    """按 pandas 分组计算的同组名次（并列取最小名次）、组内基金数和百分位（组内得分更低的比例）"""
+    import pandas as pd
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT t.fund_id, t.total_score, t.policy_score, t.layout_score, t.execution_score,
+                       COALESCE(f.region, '') AS region, COALESCE(f.fund_type, '') AS fund_type, '' AS none
+                FROM fund_total_scores t JOIN funds f ON f.id = t.fund_id
+            """)
+            frame = pd.DataFrame(cursor.fetchall())
+    expected = {}
+    scopes = [('overall', 'none', 'total_score'), ('region', 'region', 'total_score'),
+              ('fund_type', 'fund_type', 'total_score'), ('POLICY', 'none', 'policy_score'),
+              ('LAYOUT', 'none', 'layout_score'), ('EXECUTION', 'none', 'execution_score')]
+    for scope, group_column, score_column in scopes:
+        for group, part in frame.groupby(group_column):
+            scores = part[score_column].astype(float)
+            ranks = scores.rank(method='min', ascending=False)
+            lower = scores.rank(method='min') - 1
+            for fund_id, rank, below in zip(part['fund_id'], ranks, lower):
+                percentile = below / (len(part) - 1) * 100 if len(part) > 1 else 0
+                expected[(fund_id, scope)] = (group, int(rank), len(part), round(percentile, 2))
+    return expected
+
+
+def verify_peer_rankings(service: ScoringService, fund_ids: list):
+    """同组排名与 pandas 分组计算一致，修改地区后随之重算，结果页面快照和排名导出读取同一张表"""
+    from io import BytesIO
+    from openpyxl import load_workbook
+    from core.repositories.fund_repository import FundRepository
+    from core.services.export_service import export_service
+
+    errors = []
+
+    def stored() -> dict:
+        with get_db_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT * FROM fund_peer_rankings")
+                return {
+                    (row['fund_id'], row['ranking_scope']): (
+                        row['peer_group'], row['rank_in_group'], row['group_size'], round(float(row['percentile']), 2)
+                    )
+                    for row in cursor.fetchall()
+                }
+
+    if stored() != reference_peer_rankings():
+        errors.append("同组排名与分组计算结果不一致")
+
+    # 修改地区和基金类型：同一事务中重算同组排名
+    for fund_id in fund_ids:
+        fund = FundRepository().get_by_id(fund_id)
+        fund_service.update_fund(fund_id, {**fund, 'region': '验证地区', 'fund_type': '验证类型'})
+    rankings = stored()
+    if rankings != reference_peer_rankings():
+        errors.append(f"修改地区后同组排名未重算: {rankings}")
+    snapshot = service.get_fund_scoring_snapshot(fund_ids[0])
+    region = snapshot.peer_rankings.get('region')
+    if region is None or (region.group, region.rank, region.group_size) != rankings[(fund_ids[0], 'region')][:3]:
+        errors.append(f"评分快照中的同组排名不正确: {snapshot.peer_rankings}")
+    print(f"  同组排名: {len(rankings)} 行，基金 {fund_ids[0]} 地区内{region.text if region else '-'}")
+
+    sheet = load_workbook(BytesIO(export_service.export_fund_rankings_excel())).active
+    exported = {row[1]: row for row in sheet.iter_rows(min_row=2, values_only=True)}
+    code = snapshot.fund_code
+    if code not in exported or exported[code][11] != f"{region.rank}/{region.group_size}":
+        errors.append(f"排名导出中的地区内排名不正确: {exported.get(code)}")
+
+    # 单个指标修改在同一事务中只重算这只基金所在的分区，不依赖后台清扫
+    errors += verify_fund_peer_rankings(service, fund_ids, stored)
+    return errors
+
+
+def verify_fund_peer_rankings(service: ScoringService, fund_ids: list, stored) -> list:
+    errors = []
+    repo = service.scoring_repo
+    scorer_id = next(row['scorer_id'] for row in repo.get_fund_scores(fund_ids[0]))
+    original = {row['indicator_code']: row['score'] for row in repo.get_fund_scores(fund_ids[0])}
+    code = next(code for code in original if catalog_leaf(code))
+    before = stored()
+    # 排名索引重建后的第一次写入会全量校正排名，先改一次分，再改回原分
+    for raw_score in (Decimal('0') if original[code] else Decimal('1'), original[code]):
+        result = service.update_fund_indicator_score(fund_ids[0], code, raw_score, scorer_id)
+        if not result['success'] or stored() != reference_peer_rankings():
+            errors.append(f"单个指标修改后同组排名与分组计算结果不一致: {result}")
+            return errors
+    if stored() != before:
+        errors.append("恢复评分后同组排名与修改前不一致")
+    print("  单只基金的同组排名: 单个指标修改后立即与分组计算一致")
+    return errors
+
+
+def catalog_leaf(code: str) -> bool:
+    from core.services.scoring_catalog import get_scoring_catalog
+    indicator = get_scoring_catalog().indicator_by_code.get(code)
+    return indicator is not None and indicator.is_leaf
+
+
+def reference_scored_masks() -> dict:
+    """按 fund_scores 逐只基金统计的已评分叶子指标位图"""
+    masks = {}
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id FROM funds")
+            for row in cursor.fetchall():
+                masks[row['id']] = 0
+            cursor.execute("""
+                SELECT fs.fund_id, si.completeness_bit FROM fund_scores fs
+                JOIN scoring_indicators si ON si.id = fs.indicator_id
+                WHERE si.completeness_bit IS NOT NULL
+            """)
+            for row in cursor.fetchall():
+                masks[row['fund_id']] |= 1 << row['completeness_bit']
+    return masks
+
+
+def stored_scored_masks() -> dict:
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT id, scored_mask FROM funds")
+            return {row['id']: row['scored_mask'] for row in cursor.fetchall()}
+
+
+def verify_scored_masks(service: ScoringService, fund_ids: list, scorer_id: int):
+    """评分完整度位图：叶子指标各占一位，随单个、批量评分写入维护，评分进度、缺失指标和完整基金查询由位运算得出"""
+    from core.services.scoring_catalog import get_scoring_catalog
+
+    errors = []
+    catalog = get_scoring_catalog()
+    leaves = [i for i in catalog.indicators if i.is_leaf]
+    bits = sorted(catalog.leaf_bits.values())
+    if len(bits) != len(leaves) or bits != list(range(len(leaves))) or \
+            any(i.completeness_bit is not None for i in catalog.indicators if not i.is_leaf):
+        errors.append(f"叶子指标的完整度位分配不正确: {dict(catalog.leaf_bits)}")
+    if stored_scored_masks() != reference_scored_masks():
+        errors.append("基金的评分完整度位图与评分明细不一致")
+    for fund_id in fund_ids:
+        if not service.get_fund_scoring_progress(fund_id).is_complete:
+            errors.append(f"已评完的基金{fund_id}未标记为完整")
+
+    created = fund_service.create_fund({
+        'fund_code': f'MASK_{int(time.time())}', 'fund_name': '位图验证基金',
+        'fund_manager': '验证管理人', 'status': 'active', 'created_by': scorer_id
+    })
+    fund_id = created['data']['fund_id']
+    first, second, *rest = [catalog.indicator_by_code[indicator['code']] for _, indicator in leaf_indicators()]
+    service.submit_fund_indicator_score(fund_id, first.dimension_id, first.id, Decimal('1'), scorer_id)
+    service.update_fund_indicator_score(fund_id, second.code, Decimal('1'), scorer_id)
+    service.update_fund_indicator_score(fund_id, second.code, Decimal('0'), scorer_id)
+    progress = service.get_fund_scoring_progress(fund_id)
+    result = service.calculate_fund_total_score(fund_id)
+    if (progress.scored_count, progress.leaf_count, len(progress.missing)) != (2, len(leaves), len(leaves) - 2) \
+            or set(progress.missing) != {i.name for i in rest} or result['success'] \
+            or f'2/{len(leaves)}' not in result['message']:
+        errors.append(f"部分评分的进度不正确: {progress}，{result}")
+    incomplete = {row['id'] for row in service.list_fund_scoring_progress(complete=False)}
+    if fund_id not in incomplete or incomplete & set(fund_ids):
+        errors.append(f"未评完的基金查询不正确: {incomplete}")
+
+    service.submit_fund_indicator_scores(
+        fund_id, [{'indicator_code': i.code, 'raw_score': Decimal('0')} for i in rest], scorer_id
+    )
+    complete = {row['id'] for row in service.list_fund_scoring_progress(statuses=['active', 'completed'], complete=True)}
+    if fund_id not in complete or not complete >= set(fund_ids):
+        errors.append(f"已评完的基金查询不正确: {complete}")
+    if not service.calculate_fund_total_score(fund_id)['success']:
+        errors.append("评完全部指标后计算总分失败")
+
+    # 直接改库后由重建修正
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE funds SET scored_mask = 1 WHERE id = %s", (fund_id,))
+            conn.commit()
+    changed = service.scoring_repo.rebuild_fund_scored_masks()
+    if changed != 1 or stored_scored_masks() != reference_scored_masks():
+        errors.append(f"重建评分完整度位图不正确: 修正 {changed} 只基金")
+    print(f"  评分完整度位图: {len(leaves)} 个叶子指标，部分评分 {progress.scored_count}/{progress.leaf_count}，"
+          f"已评完 {len(complete)} 只基金")
+    fund_service.delete_fund(fund_id)
+    return errors
+
+
+def verify_unit_of_work_rollback(service: ScoringService, scorer_id: int):
+    """工作单元内仓储方法失败、异常被调用方捕获后，已写入的部分不随工作单元提交"""
+    from app.utils.database import UnitOfWorkRollback, unit_of_work
+    from core.services.scoring_catalog import get_scoring_catalog
+
+    errors = []
+    created = fund_service.create_fund({
+        'fund_code': f'UOW_{int(time.time())}', 'fund_name': '工作单元验证基金',
+        'fund_manager': '验证管理人', 'status': 'active', 'created_by': scorer_id
+    })
+    fund_id = created['data']['fund_id']
+    leaves = [i for i in get_scoring_catalog().indicators if i.is_leaf][:2]
+    rows = [
+        {'dimension_id': i.dimension_id, 'indicator_id': i.id, 'score': Decimal('1'),
+         'weighted_score': Decimal('1'), 'scorer_id': scorer_id}
+        for i in leaves
+    ]
+    rows[1]['score'] = None  # 第二批违反 NOT NULL，第一批已写入
+
+    rolled_back = caught = False
+    try:
+        with unit_of_work():
+            try:
+                service.scoring_repo.save_fund_scores_bulk(fund_id, rows, chunk_size=1)
+            except Exception:
+                caught = True
+    except UnitOfWorkRollback:
+        rolled_back = True
+    remaining = service.scoring_repo.get_fund_scores(fund_id)
+    print(f"  工作单元回滚: 捕获仓储异常 {caught}，整体回滚 {rolled_back}，残留 {len(remaining)} 行评分")
+    if not (caught and rolled_back) or remaining or service.scoring_repo.get_fund_scored_mask(fund_id):
+        errors.append(f"工作单元内被捕获的仓储异常未使整个工作单元回滚: 残留 {remaining}")
+    fund_service.delete_fund(fund_id)
+    return errors
+
+
+def verify_orphaned_stale_rows(service: ScoringService, scorer_id: int):
+    """没有评分的基金、已没有评分叶子指标的维度，其过期的维度汇总和总分也由清扫写上当前指纹，不会一直被报告为过期"""
+    from app.utils.fixed_point import cents
+    from core.services.rescore_service import sweep_stale_funds
+    from core.services.scoring_catalog import get_scoring_catalog
+
+    errors = []
+    repo = service.scoring_repo
+    catalog = get_scoring_catalog()
+    policy = catalog.dimension_by_code['POLICY']
+    layout_leaf = next(i for i in catalog.indicators if i.is_leaf and i.dimension_id != policy.id)
+    fund_ids = [
+        fund_service.create_fund({
+            'fund_code': f'ORPHAN_{n}_{int(time.time())}', 'fund_name': '过期孤立行验证基金',
+            'fund_manager': '验证管理人', 'status': 'active', 'created_by': scorer_id
+        })['data']['fund_id']
+        for n in range(2)
+    ]
+    # 第一只没有任何评分；第二只只有其他维度的评分，政策维度的汇总行是规则修改前留下的
+    repo.save_fund_score(
+        fund_ids[1], layout_leaf.dimension_id, layout_leaf.id, Decimal('1'), Decimal('1'), scorer_id
+    )
+    for fund_id in fund_ids:
+        repo.save_fund_dimension_summary(fund_id, policy.id, Decimal('5'), Decimal('2'), 'stale')
+        repo.save_fund_total(fund_id, Decimal('2'), Decimal('5'), Decimal('0'), Decimal('0'), 'poor', rule_set_hash='stale')
+
+    swept = sweep_stale_funds()
+    results = repo.get_fund_results_by_funds(fund_ids)
+    stale = repo.get_stale_fund_ids(catalog.rule_set_hash, 0, 100)
+    print(f"  过期孤立行: 清扫 {swept.funds} 只，仍过期 {stale}")
+    if stale or swept.funds != len(fund_ids):
+        errors.append(f"没有评分的基金或维度的过期汇总未写上当前指纹: 仍过期 {stale}")
+    if any(cents(results[f]['summaries'][policy.id]['total_score']) for f in fund_ids) or \
+            cents(results[fund_ids[0]]['total']['total_score']):
+        errors.append(f"没有评分的维度汇总或总分未按 0 分写回: {results}")
+    for fund_id in fund_ids:
+        fund_service.delete_fund(fund_id)
+    return errors
+
+
+def verify_reinit(service: ScoringService):
+    """重新初始化评分数据时一并清空同组排名，并使排名版本号加一（最后执行：清空全部评分）"""
+    errors = []
+    repo = service.scoring_repo
+    version = repo.get_fund_ranking_version()
+    if not init_scoring_data():
+        return ["重新初始化评分数据失败"]
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) AS count FROM fund_peer_rankings")
+            peer_rows = cursor.fetchone()['count']
+    print(f"  重新初始化: 同组排名剩余 {peer_rows} 行，排名版本号 {version} → {repo.get_fund_ranking_version()}")
+    if peer_rows or repo.get_fund_ranking_version() <= version:
+        errors.append(f"重新初始化后仍有同组排名或排名版本号未变化: {peer_rows} 行")
+    return errors
+
+
+def verify_weight_sensitivity(service: ScoringService):
+    """权重模拟载入的基线总分与库中一致，当前权重方案与基线完全相同，分析过程不执行SQL"""
+    from app.utils.query_stats import track_rerun
+
+    errors = []
+    analyzer = service.load_weight_sensitivity()
+    if analyzer is None:
+        return ["载入权重模拟数据失败"]
+    stored = {row['fund_id']: row['total_score'] for row in service.scoring_repo.get_fund_total_pairs()}
+    loaded = dict(zip(analyzer.fund_ids.tolist(), (Decimal(int(t)) / 100 for t in analyzer.baseline_totals)))
+    if loaded != stored:
+        errors.append(f"权重模拟的基线总分与库中不一致: {loaded}，期望 {stored}")
+
+    with track_rerun('verify_sensitivity') as report:
+        baseline, shifted = analyzer.run([analyzer.current_weights, {'POLICY': 50, 'LAYOUT': 40}], top_n=1)
+    print(f"  权重模拟: {len(analyzer.fund_ids)} 只基金，POLICY 50 / LAYOUT 40 时 Spearman {shifted.spearman:.3f}，"
+          f"等级分布 {shifted.grade_counts}")
+    if report.stats.queries != 0:
+        errors.append(f"权重模拟计算时执行了 {report.stats.queries} 条SQL")
+    if baseline.grade_changed or baseline.entered_top or baseline.left_top:
+        errors.append(f"当前权重方案与基线不一致: {baseline}")
+    return errors
+
+
+def main():
+    print("=== 验证SQL翻译 ===")
+    errors = verify_translation()
+    print("\n=== 验证评分流程 ===")
+    errors += verify_scoring_flow()
+
+    print("\n" + "=" * 50)
+    if errors:
+        print(f"❌ 发现 {len(errors)} 个问题:")
+        for error in errors:
+            print(f"  - {error}")
+        sys.exit(1)
+    print("✅ SQLite后端验证通过")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+验证维度权重敏感性分析
+
+随机生成基金的维度得分和一批权重方案，与逐只、逐对的参考实现比较：
+- 缩放后的总分（Decimal 逐维度缩放、保留2位小数后相加）、等级和前 N 名
+- Spearman（pandas 平均名次的相关系数）和 Kendall tau-b（逐对计数）
+并测量大批量方案的耗时。
+
+使用方法: python verify_weight_sensitivity.py [轮数]
+"""
+import math
+import random
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils.scoring import ScoringCalculator
+from app.utils.weight_sensitivity import WeightSensitivity
+from config.scoring_rules import SCORING_DIMENSIONS
+
+CENT = Decimal('0.01')
+CODES = list(SCORING_DIMENSIONS)
+WEIGHTS = {code: Decimal(str(d['weight'])) for code, d in SCORING_DIMENSIONS.items()}
+
+
+def reference_totals(scores, weights) -> list:
+    """逐只基金：维度得分 × 新权重 / 当前权重，保留2位小数后相加"""
+    return [
+        sum((Decimal(str(s)) * Decimal(str(w)) / WEIGHTS[code]).quantize(CENT) for code, s, w in zip(CODES, row, weights))
+        for row in scores
+    ]
+
+
+def reference_kendall(x, y) -> float:
+    concordant = discordant = x_only = y_only = 0
+    for i in range(len(x)):
+        for j in range(i + 1, len(x)):
+            dx, dy = (x[i] > x[j]) - (x[i] < x[j]), (y[i] > y[j]) - (y[i] < y[j])
+            if dx == 0 and dy == 0:
+                continue
+            if dx == 0:
+                x_only += 1
+            elif dy == 0:
+                y_only += 1
+            elif dx == dy:
+                concordant += 1
+            else:
+                discordant += 1
+    denominator = math.sqrt((concordant + discordant + x_only) * (concordant + discordant + y_only))
+    return (concordant - discordant) / denominator if denominator else float('nan')
+
+
+def same(a: float, b: float) -> bool:
+    return (math.isnan(a) and math.isnan(b)) or abs(a - b) < 1e-9
+
+
+def random_scores(rng: random.Random, count: int) -> list:
+    """维度得分：取值较粗以制造并列"""
+    return [
+        [rng.choice([0, rng.randint(0, int(d['max_score'])) / 2, float(d['max_score'])]) for d in SCORING_DIMENSIONS.values()]
+        for _ in range(count)
+    ]
+
+
+def verify_analysis(rounds: int) -> list:
+    errors = []
+    rng = random.Random(20240601)
+    calculator = ScoringCalculator()
+    for round_no in range(rounds):
+        scores = random_scores(rng, rng.randint(1, 60))
+        fund_ids = list(range(100, 100 + len(scores)))
+        analyzer = WeightSensitivity(fund_ids, scores)
+        scenarios = [[round(rng.uniform(1, 80), rng.choice([0, 1, 2])) for _ in CODES] for _ in range(rng.randint(1, 8))]
+        scenarios.append([float(WEIGHTS[code]) for code in CODES])
+        top_n = rng.randint(1, 10)
+        base_totals = reference_totals(scores, [WEIGHTS[code] for code in CODES])
+        base_ranks = {r['fund_id']: r['rank'] for r in calculator.calculate_project_ranking(
+            [{'fund_id': f, 'total_score': t} for f, t in zip(fund_ids, base_totals)])}
+
+        for weights, result in zip(scenarios, analyzer.run(scenarios, top_n=top_n)):
+            totals = reference_totals(scores, weights)
+            grades = [calculator._determine_grade(t) for t in totals]
+            ranks = {r['fund_id']: r['rank'] for r in calculator.calculate_project_ranking(
+                [{'fund_id': f, 'total_score': t} for f, t in zip(fund_ids, totals)])}
+            actual = analyzer.scenario_totals(weights)[0]
+            if [int(t * 100) for t in totals] != actual.tolist():
+                errors.append(f"第{round_no}轮 权重 {weights} 总分不一致")
+                continue
+            expected_counts = {code: grades.count(code) for code in result.grade_counts}
+            if result.grade_counts != expected_counts:
+                errors.append(f"第{round_no}轮 等级分布 {result.grade_counts}，期望 {expected_counts}")
+            changed = [f for f, t in zip(fund_ids, base_totals) if calculator._determine_grade(t) != grades[f - 100]]
+            entered = [f for f in fund_ids if ranks[f] <= top_n < base_ranks[f]]
+            left = [f for f in fund_ids if base_ranks[f] <= top_n < ranks[f]]
+            if (result.grade_changed, result.entered_top, result.left_top) != (changed, entered, left):
+                errors.append(f"第{round_no}轮 等级变化或前{top_n}名变化不一致")
+            x = [float(t) for t in base_totals]
+            y = [float(t) for t in totals]
+            rho = pd.Series(x).rank().corr(pd.Series(y).rank()) if len(x) > 1 else float('nan')
+            if not same(result.spearman, rho) or not same(result.kendall, reference_kendall(x, y)):
+                errors.append(f"第{round_no}轮 相关系数 {result.spearman}/{result.kendall}，"
+                              f"期望 {rho}/{reference_kendall(x, y)}")
+        if len(errors) > 10:
+            break
+    print(f"  随机比较: {rounds} 轮")
+    return errors
+
+
+def benchmark(funds: int = 2000, scenarios: int = 2000):
+    rng = np.random.default_rng(1)
+    maxima = np.array([d['max_score'] for d in SCORING_DIMENSIONS.values()])
+    analyzer = WeightSensitivity(range(funds), np.round(rng.uniform(0, 1, (funds, len(CODES))) * maxima, 2))
+    weights = rng.uniform(1, 80, (scenarios, len(CODES))).round(1)
+    started = time.perf_counter()
+    analyzer.run(weights, with_kendall=False)
+    spearman_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    analyzer.run(weights)
+    print(f"  {funds} 只基金 × {scenarios} 个方案: 不含 Kendall {spearman_seconds:.2f}s，"
+          f"含 Kendall {time.perf_counter() - started:.2f}s")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print("=== 验证权重敏感性分析 ===")
+    errors = verify_analysis(rounds)
+    benchmark()
+
+    print("\n" + "=" * 50)
+    if errors:
+        print(f"❌ 发现 {len(errors)} 个问题:")
+        for error in errors[:10]:
+            print(f"  - {error}")
+        sys.exit(1)
+    print("✅ 权重敏感性分析与逐只计算结果一致")
+
+
+if __name__ == '__main__':
+    main()